@@ -20,6 +20,10 @@ def create_app(config_name='default'):
     # Extensions initialisieren
     db.init_app(app)
     migrate.init_app(app, db)
+
+    # SQLite-Pragmas (WAL, Cache, busy_timeout) für jede Verbindung
+    from . import datenbank_tuning
+    datenbank_tuning.init_app(app, db)
     login_manager.init_app(app)
 
     # Login Manager Settings
@@ -27,9 +31,29 @@ def create_app(config_name='default'):
     login_manager.login_message = 'Bitte loggen Sie sich ein, um auf diese Seite zugreifen zu können.'
     login_manager.login_message_category = 'info'
 
+    # Request-Cache für Model-Getter und Debug-Header mit Query-Anzahl
+    from . import anfrage_cache
+    anfrage_cache.init_app(app)
+
     # Models importieren
     from app import models
 
+    # Push-Kanal: Model-Änderungen nach Commit an offene Seiten melden (SSE)
+    from .services import ereignis_bus
+    ereignis_bus.init_app(app)
+
+    # Statistik-Snapshots: betroffene Kennzahlen bei Änderungen als veraltet markieren
+    from .services import statistik_service
+    statistik_service.init_app(app)
+
+    # Lesemodell der Wartungsseiten: nach Patronen-/Wechsel-Commits verwerfen
+    from .services import wartung_lesemodell
+    wartung_lesemodell.init_app(app)
+
+    # Index-Audit der häufigsten Abfragen (`flask index-audit`)
+    from .services import index_audit
+    index_audit.init_app(app)
+
     # Blueprints registrieren
     from .routes.main import main_bp
     app.register_blueprint(main_bp)
@@ -61,6 +85,19 @@ def create_app(config_name='default'):
     from .routes.kunden_api import bp as kunden_api_bp
     app.register_blueprint(kunden_api_bp)
 
+    from .routes.kunden_import_api import bp as kunden_import_api_bp
+    app.register_blueprint(kunden_import_api_bp)
+
+    from .routes.warteliste_api import bp as warteliste_api_bp
+    app.register_blueprint(warteliste_api_bp)
+
+    from .routes.export_api import bp as export_api_bp
+    app.register_blueprint(export_api_bp)
+
+    # Patronenwechsel-Seiten und Etikettendruck (Druckjobs für den Druck-Worker)
+    from .routes.patronenwechsel import bp as patronenwechsel_bp
+    app.register_blueprint(patronenwechsel_bp)
+
     # Shelly IoT Integration
     try:
         from .routes.shelly import shelly_bp
@@ -89,6 +126,61 @@ def create_app(config_name='default'):
     except ImportError:
         app.logger.warning("Admin-Modul nicht gefunden.")
 
+    # Kunden-Suchindex beim Start aufbauen (SQLAlchemy-Events halten ihn aktuell)
+    # und FTS5-Volltextindex für Kunden/Flaschen einrichten
+    from .services.kunden_suchindex import kunden_suchindex
+    from .services.volltext_suche import VolltextSuche
+    if not app.testing:
+        with app.app_context():
+            try:
+                kunden_suchindex.aufbauen()
+                VolltextSuche.einrichten()
+            except Exception as e:
+                db.session.rollback()
+                app.logger.warning(f"Suchindizes konnten nicht aufgebaut werden: {e}")
+
+            # Nummernkreise für Mitglieds-, Flaschen- und Auftragsnummern
+            try:
+                from .models.nummernkreis import Nummernkreis
+                Nummernkreis.einrichten()
+            except Exception as e:
+                db.session.rollback()
+                app.logger.warning(f"Nummernkreise konnten nicht eingerichtet werden: {e}")
+
+            # Betriebsstunden-Zähler initialisieren (einmalig aus allen Zyklen)
+            try:
+                from .models.kompressor import KompressorBetriebsstundenZaehler
+                KompressorBetriebsstundenZaehler.einrichten()
+            except Exception as e:
+                db.session.rollback()
+                app.logger.warning(f"Betriebsstunden-Zähler konnte nicht eingerichtet werden: {e}")
+
+            # Vorberechnete Statistiken (Dashboard, /statistiken-Routen)
+            try:
+                from .models.statistik_snapshot import StatistikSnapshot
+                StatistikSnapshot.einrichten()
+            except Exception as e:
+                db.session.rollback()
+                app.logger.warning(f"Statistik-Snapshots konnten nicht eingerichtet werden: {e}")
+
+            # Indizes für häufige Filter auf bestehenden Datenbanken nachziehen
+            try:
+                index_audit.indizes_einrichten()
+            except Exception as e:
+                db.session.rollback()
+                app.logger.warning(f"Indizes konnten nicht angelegt werden: {e}")
+
+    if not app.testing:
+        # Shelly-Erkennung per mDNS: die Registry liegt im Speicher, daher in jedem
+        # Prozess; jeder Browser sendet dabei eigene mDNS-Anfragen (Multicast)
+        from .services.shelly_mdns import shelly_mdns
+        shelly_mdns.init_app(app)
+
+        # Mit mehreren Worker-Prozessen startet der Produktionsserver die
+        # Hintergrund-Dienste nur in einem Prozess (siehe produktionsserver.py)
+        if app.config.get('HINTERGRUND_DIENSTE', True):
+            hintergrund_dienste_starten(app)
+
     # Error Handlers
     @app.errorhandler(404)
     def not_found_error(error):
@@ -100,3 +192,27 @@ def create_app(config_name='default'):
         return "<h1>500 - Server-Fehler</h1>", 500
     
     return app
+
+
+def hintergrund_dienste_starten(app):
+    """
+    Startet die schreibenden Hintergrund-Threads dieses Prozesses
+
+    - Shelly-Poller mit Zeitreihen-Aufzeichnung (Schreibpuffer, Verdichtung)
+    - SQLite-Wartung (WAL-Checkpoint, PRAGMA optimize)
+    - Druck-Worker (Etiketten aus print_jobs, eine Verbindung je Drucker)
+
+    Abfragen der Shelly-Zeitreihe funktionieren in jedem Prozess; nur das
+    Schreiben (Puffer, Verdichtung, Bereinigung) hängt am Poller.
+    """
+    from .services.shelly_poller import shelly_poller
+    from .services.shelly_zeitreihe import shelly_zeitreihe
+    from .datenbank_tuning import datenbank_wartung
+    from .services.druck_worker import druck_worker
+    try:
+        shelly_zeitreihe.init_app(app)
+    except Exception as e:
+        app.logger.warning(f"Shelly-Zeitreihe nicht verfügbar: {e}")
+    shelly_poller.init_app(app)
+    datenbank_wartung.init_app(app)
+    druck_worker.init_app(app)
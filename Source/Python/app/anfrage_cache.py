@@ -0,0 +1,85 @@
+# Request-Cache für wiederkehrende Model-Abfragen
+# Dashboard und Wartungsstatus rufen dieselben Getter mehrfach pro Request auf
+
+import functools
+import logging
+
+from flask import g, has_request_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+# Debug-Header mit Anzahl und Dauer der SQL-Abfragen pro Request
+QUERY_HEADER = 'X-DB-Queries'
+QUERY_ZEIT_HEADER = 'X-DB-Query-Time-Ms'
+
+
+def _cache():
+    if '_anfrage_cache' not in g:
+        g._anfrage_cache = {}
+    return g._anfrage_cache
+
+
+def anfrage_cache(funktion):
+    """
+    Merkt sich das Ergebnis eines Getters für die Dauer eines Requests
+
+    Außerhalb eines Requests (Hintergrund-Threads, CLI) wird die Funktion
+    unverändert ausgeführt. Jeder Flush mit Änderungen leert den Cache.
+    """
+    @functools.wraps(funktion)
+    def wrapper(*args, **kwargs):
+        if not has_request_context():
+            return funktion(*args, **kwargs)
+
+        schluessel = (funktion.__qualname__, args, tuple(sorted(kwargs.items())))
+        cache = _cache()
+        if schluessel not in cache:
+            cache[schluessel] = funktion(*args, **kwargs)
+        return cache[schluessel]
+
+    return wrapper
+
+
+def anfrage_cache_leeren():
+    """Verwirft alle im aktuellen Request gemerkten Ergebnisse"""
+    if has_request_context():
+        g.pop('_anfrage_cache', None)
+
+
+@event.listens_for(Session, 'after_flush')
+def _nach_flush(session, flush_context):
+    # Jede Schreiboperation kann gemerkte Werte ungültig machen
+    if session.new or session.dirty or session.deleted:
+        anfrage_cache_leeren()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _nach_rollback(session):
+    anfrage_cache_leeren()
+
+
+def init_app(app):
+    """
+    Registriert den Debug-Header mit der Anzahl der SQL-Abfragen
+
+    Aktiv wenn QUERY_COUNT_HEADER gesetzt ist (Standard: DEBUG) und
+    SQLALCHEMY_RECORD_QUERIES die Abfragen aufzeichnet.
+    """
+    if not app.config.get('QUERY_COUNT_HEADER', app.debug):
+        return
+    if not app.config.get('SQLALCHEMY_RECORD_QUERIES'):
+        logger.warning("QUERY_COUNT_HEADER benötigt SQLALCHEMY_RECORD_QUERIES = True")
+        return
+
+    from flask_sqlalchemy.record_queries import get_recorded_queries
+
+    @app.after_request
+    def _query_header(response):
+        abfragen = get_recorded_queries()
+        response.headers[QUERY_HEADER] = str(len(abfragen))
+        response.headers[QUERY_ZEIT_HEADER] = str(
+            round(sum(a.duration for a in abfragen) * 1000, 1)
+        )
+        return response
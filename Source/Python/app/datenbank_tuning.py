@@ -0,0 +1,100 @@
+# SQLite-Tuning: Pragmas bei jedem Verbindungsaufbau, periodische Wartung
+# Profile und Werte siehe config/sqlite_tuning.py
+
+import logging
+import threading
+
+from sqlalchemy import event
+
+from config.sqlite_tuning import profil, pragmas_anwenden
+
+logger = logging.getLogger(__name__)
+
+
+class DatenbankWartung:
+    """
+    Hintergrund-Thread für WAL-Checkpoint und PRAGMA optimize (pro Prozess)
+
+    Der Checkpoint (PASSIVE) überträgt die WAL-Datei in die Datenbank, ohne
+    auf laufende Leser oder Schreiber zu warten; so wächst die WAL-Datei bei
+    Dauerbetrieb nicht unbegrenzt. PRAGMA optimize aktualisiert bei Bedarf die
+    Statistiken für den Query-Planer.
+    """
+
+    INTERVALL_SEKUNDEN = 600
+
+    def __init__(self):
+        self._stop = threading.Event()
+        self._thread = None
+        self._app = None
+
+    def init_app(self, app):
+        """Startet den Thread (nur bei WAL-Modus, siehe init_app unten)"""
+        if app.extensions.get('sqlite_pragmas', {}).get('journal_mode', '').upper() != 'WAL':
+            return
+        self._app = app
+        self.INTERVALL_SEKUNDEN = app.config.get('SQLITE_WARTUNG_INTERVALL', self.INTERVALL_SEKUNDEN)
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._schleife, name='datenbank-wartung', daemon=True)
+        self._thread.start()
+
+    def stoppen(self):
+        self._stop.set()
+
+    def ausfuehren(self):
+        """Checkpoint und optimize einmal ausführen"""
+        from app import db
+        with self._app.app_context():
+            with db.engine.connect() as connection:
+                checkpoint = connection.exec_driver_sql('PRAGMA wal_checkpoint(PASSIVE)').fetchone()
+                connection.exec_driver_sql('PRAGMA optimize')
+        return {
+            'blockiert': checkpoint[0] if checkpoint else None,
+            'wal_seiten': checkpoint[1] if checkpoint else None,
+            'uebertragen': checkpoint[2] if checkpoint else None
+        }
+
+    def _schleife(self):
+        while not self._stop.wait(self.INTERVALL_SEKUNDEN):
+            try:
+                ergebnis = self.ausfuehren()
+                logger.debug(f"Datenbank-Wartung: {ergebnis}")
+            except Exception as e:
+                logger.warning(f"Datenbank-Wartung fehlgeschlagen: {e}")
+
+
+datenbank_wartung = DatenbankWartung()
+
+
+def init_app(app, db):
+    """
+    Registriert die Pragmas für jede neue SQLite-Verbindung der App
+
+    Konfiguration: SQLITE_TUNING_PROFIL ('standard', 'nas', 'aus'),
+    SQLITE_PRAGMAS (einzelne Werte überschreiben), SQLITE_WARTUNG_INTERVALL
+    """
+    uri = app.config.get('SQLALCHEMY_DATABASE_URI', '')
+    if not uri.startswith('sqlite'):
+        return
+
+    pragmas = dict(profil(app.config.get('SQLITE_TUNING_PROFIL', 'standard')))
+    pragmas.update(app.config.get('SQLITE_PRAGMAS', {}))
+
+    # In-Memory-Datenbanken (Tests) kennen kein WAL/mmap
+    if ':memory:' in uri or uri in ('sqlite://', 'sqlite:///'):
+        pragmas = {k: v for k, v in pragmas.items() if k in ('temp_store', 'busy_timeout')}
+
+    if not pragmas:
+        return
+    app.extensions['sqlite_pragmas'] = pragmas
+
+    with app.app_context():
+        engine = db.engine
+
+    @event.listens_for(engine, 'connect')
+    def _verbindung_aufgebaut(dbapi_connection, connection_record):
+        journal_mode = pragmas_anwenden(dbapi_connection, pragmas)
+        if 'journal_mode' in pragmas and journal_mode and journal_mode.upper() != pragmas['journal_mode'].upper():
+            logger.warning(f"SQLite-Journal-Modus {pragmas['journal_mode']} nicht aktiv ({journal_mode})")
@@ -7,7 +7,7 @@ from .protocol import Handbefuellung
 from .users import User, create_default_users
 
 # Neue Kompressor-System Modelle
-from .kompressor import KompressorBetrieb
+from .kompressor import KompressorBetrieb, KompressorBetriebsstundenZaehler
 from .kunden import Kunde
 from .flaschen import Flasche
 from .warteliste import WartelisteEintrag
@@ -16,6 +16,9 @@ from .wartungsintervall import Wartungsintervall
 from .patronenwechsel import Patronenwechsel, PatronenwechselKonfiguration
 from .patrone_erweitert import PatroneVorbereitung, PatroneEinkauf, PatroneWechselProtokoll
 from .print_jobs import PrintJob, PrinterKonfiguration
+from .shelly_messwerte import ShellyMesswert, ShellyMesswertAggregat
+from .nummernkreis import Nummernkreis
+from .statistik_snapshot import StatistikSnapshot
 # Temporär auskommentiert wegen Import-Problem:
 # from .print_jobs import PrinterStatus
 
@@ -30,6 +33,7 @@ __all__ = [
     'create_default_users',
     # Neue Modelle
     'KompressorBetrieb',
+    'KompressorBetriebsstundenZaehler',
     'Kunde',
     'Flasche',
     'WartelisteEintrag',
@@ -45,6 +49,13 @@ __all__ = [
     'PrintJob',
     'PrinterKonfiguration',
     # 'PrinterStatus'  # Temporär entfernt
+    # Shelly-Zeitreihe
+    'ShellyMesswert',
+    'ShellyMesswertAggregat',
+    # Nummernkreise
+    'Nummernkreis',
+    # Statistik-Snapshots
+    'StatistikSnapshot',
     # Füllmanager
     'FuellManager',
     'FuellManagerSignatur',
@@ -211,7 +211,13 @@ class BulkFuellvorgang(db.Model):
     
     @staticmethod
     def get_statistiken():
-        """Gibt Bulk-Füllvorgang Statistiken zurück"""
+        """Gibt Bulk-Füllvorgang Statistiken zurück (vorberechneter Snapshot)"""
+        from app.services.statistik_service import statistik_lesen
+        return statistik_lesen('bulk')
+
+    @staticmethod
+    def berechne_statistiken():
+        """Berechnet die Bulk-Füllvorgang Statistiken"""
         total_vorgaenge = BulkFuellvorgang.query.filter_by(status='beendet').count()
         
         if total_vorgaenge == 0:
@@ -279,6 +285,12 @@ class FlascheFuellvorgang(db.Model):
     """
     
     __tablename__ = 'flasche_fuellvorgang'
+    __table_args__ = (
+        # Flaschen eines Bulk-Vorgangs
+        db.Index('ix_flasche_fuellvorgang_bulk_flasche', 'bulk_fuellvorgang_id', 'flasche_id'),
+        # "Flasche bereits in aktivem Bulk-Vorgang?"
+        db.Index('ix_flasche_fuellvorgang_flasche', 'flasche_id'),
+    )
     
     # Primary Key
     id = db.Column(db.Integer, primary_key=True)
@@ -14,6 +14,14 @@ class Flasche(db.Model):
     """
     
     __tablename__ = 'flaschen'
+    __table_args__ = (
+        # Flaschen eines Kunden (Kundendetail, Besitzer-Statistiken)
+        db.Index('ix_flaschen_kunde_aktiv', 'kunde_id', 'ist_aktiv'),
+        # Fällige / bald fällige Prüfungen aktiver Flaschen
+        db.Index('ix_flaschen_aktiv_pruefung', 'ist_aktiv', 'naechste_pruefung'),
+        # Zum Füllen vorgemerkte Flaschen (Bulk-Füllung)
+        db.Index('ix_flaschen_vorgemerkt_aktiv', 'ist_zum_fuellen_vorgemerkt', 'ist_aktiv'),
+    )
     
     # Primary Key
     id = db.Column(db.Integer, primary_key=True)
@@ -140,23 +148,17 @@ class Flasche(db.Model):
                 else:
                     prefix = f"FL-{kunde.mitgliedsnummer}-"
                 
-                # Finde höchste Sequenznummer für diesen Kunden
-                existing_flaschen = Flasche.query.filter(
-                    Flasche.flasche_nummer.like(f"{prefix}%")
-                ).all()
+                # Nächste Sequenznummer aus dem Nummernkreis des Kunden
+                # (beim ersten Zugriff aus den vorhandenen Flaschen übernommen)
+                from sqlalchemy import func, Integer
+                from app.models.nummernkreis import Nummernkreis
                 
-                # Extrahiere Sequenznummern
-                sequenzen = []
-                for flasche in existing_flaschen:
-                    try:
-                        sequenz_teil = flasche.flasche_nummer.replace(prefix, '')
-                        sequenz = int(sequenz_teil)
-                        sequenzen.append(sequenz)
-                    except (ValueError, IndexError):
-                        continue
+                def hoechste_sequenz():
+                    return db.session.query(
+                        func.max(db.cast(func.substr(Flasche.flasche_nummer, len(prefix) + 1), Integer))
+                    ).filter(Flasche.flasche_nummer.like(f"{prefix}%")).scalar() or 0
                 
-                # Nächste Sequenznummer
-                naechste_sequenz = max(sequenzen) + 1 if sequenzen else 1
+                naechste_sequenz = Nummernkreis.naechster(prefix, startwert=hoechste_sequenz)
                 
                 return f"{prefix}{naechste_sequenz:02d}"
             else:
@@ -172,6 +174,42 @@ class Flasche(db.Model):
             else:
                 return f"FL-TEMP-{timestamp}"
     
+    @staticmethod
+    def get_vorgemerkte_flaschen():
+        """Gibt alle aktiven, zum Füllen vorgemerkten Flaschen zurück"""
+        return Flasche.query.filter(
+            Flasche.ist_zum_fuellen_vorgemerkt == True,
+            Flasche.ist_aktiv == True
+        ).order_by(Flasche.flasche_nummer).all()
+    
+    @staticmethod
+    def suche_flaschen(suchbegriff, limit=None):
+        """Sucht Flaschen nach Nummern, Barcode, Seriennummer oder Besitzer"""
+        # Bevorzugt FTS5-Volltextindex (Präfix-Suche, nach Relevanz sortiert)
+        from app.services.volltext_suche import VolltextSuche
+        ids = VolltextSuche.flaschen_ids_suchen(suchbegriff, limit=limit)
+        if ids is not None:
+            return VolltextSuche.nach_ids_laden(Flasche, ids)
+        
+        # Fallback ohne FTS5: LIKE-Suche
+        from app.models.kunden import Kunde
+        suchbegriff = f"%{suchbegriff}%"
+        
+        query = Flasche.query.join(Kunde, Flasche.kunde_id == Kunde.id).filter(
+            db.or_(
+                Flasche.flasche_nummer.like(suchbegriff),
+                Flasche.externe_flasche_nummer.like(suchbegriff),
+                Flasche.barcode.like(suchbegriff),
+                Flasche.seriennummer.like(suchbegriff),
+                Kunde.vorname.like(suchbegriff),
+                Kunde.nachname.like(suchbegriff),
+                (Kunde.vorname + ' ' + Kunde.nachname).like(suchbegriff)
+            )
+        )
+        if limit:
+            query = query.limit(limit)
+        return query.all()
+    
     @staticmethod
     def generiere_barcode(flasche_nummer, barcode_typ='CODE128'):
         """Generiert einen Barcode basierend auf der Flaschennummer"""
@@ -244,8 +282,16 @@ class Flasche(db.Model):
             parts.append(f"SN: {self.seriennummer}")
             
         return " | ".join(parts)
+
+    @staticmethod
     def get_flaschen_statistiken():
-        """Gibt Flaschen-Statistiken zurück"""
+        """Gibt Flaschen-Statistiken zurück (vorberechneter Snapshot)"""
+        from app.services.statistik_service import statistik_lesen
+        return statistik_lesen('flaschen')
+
+    @staticmethod
+    def berechne_flaschen_statistiken():
+        """Berechnet die Flaschen-Statistiken aus den Flaschen-Daten"""
         try:
             total_flaschen = Flasche.query.count()
             aktive_flaschen = Flasche.query.filter_by(ist_aktiv=True).count()
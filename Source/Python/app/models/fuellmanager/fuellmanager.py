@@ -15,6 +15,10 @@ class FuellManager(db.Model):
     Verwaltet den gesamten Füllprozess von Annahme bis Unterschrift
     """
     __tablename__ = 'fuellmanager'
+    __table_args__ = (
+        # Aktive / heutige Füllungen, neueste zuerst
+        db.Index('ix_fuellmanager_status_erstellt', 'status', 'erstellt_am'),
+    )
     
     # Primärschlüssel
     id = db.Column(db.Integer, primary_key=True)
@@ -77,15 +81,21 @@ class FuellManager(db.Model):
     
     def generiere_auftragsnummer(self):
         """Generiert eine eindeutige Auftragsnummer"""
+        from app.models.nummernkreis import Nummernkreis
+        
         jahr = datetime.now().year
-        # Finde die höchste Nummer für dieses Jahr
-        letzte_nummer = db.session.query(db.func.max(
-            db.func.cast(db.func.substr(FuellManager.auftragsnummer, -3), db.Integer)
-        )).filter(
-            FuellManager.auftragsnummer.like(f'FM-{jahr}-%')
-        ).scalar() or 0
+        praefix = f'FM-{jahr}-'
+        
+        def hoechste_nummer():
+            # Nur beim ersten Auftrag des Jahres: bisher höchste Nummer übernehmen
+            return db.session.query(db.func.max(
+                db.func.cast(db.func.substr(FuellManager.auftragsnummer, len(praefix) + 1), db.Integer)
+            )).filter(
+                FuellManager.auftragsnummer.like(f'{praefix}%')
+            ).scalar() or 0
         
-        self.auftragsnummer = f'FM-{jahr}-{letzte_nummer + 1:03d}'
+        nummer = Nummernkreis.naechster(praefix, startwert=hoechste_nummer)
+        self.auftragsnummer = f'{praefix}{nummer:03d}'
         return self.auftragsnummer
     
     def berechne_preise(self):
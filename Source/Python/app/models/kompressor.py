@@ -1,6 +1,13 @@
 # SQLAlchemy Model für Kompressor-Betrieb
 from datetime import datetime, timedelta
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import attributes
 from app import db
+from app.anfrage_cache import anfrage_cache
+
+# Status-Werte, deren Laufzeit in die Gesamt-Betriebsstunden eingeht
+ABGESCHLOSSENE_STATUS = ('beendet', 'notaus')
 
 class KompressorBetrieb(db.Model):
     """
@@ -14,6 +21,12 @@ class KompressorBetrieb(db.Model):
     """
     
     __tablename__ = 'kompressor_betrieb'
+    __table_args__ = (
+        # Laufender Zyklus, abgeschlossene Zyklen je Zeitraum
+        db.Index('ix_kompressor_betrieb_status_start', 'status', 'start_zeit'),
+        # Letzte Starts, Starts seit Datum
+        db.Index('ix_kompressor_betrieb_start', 'start_zeit'),
+    )
     
     # Primary Key
     id = db.Column(db.Integer, primary_key=True)
@@ -102,6 +115,7 @@ class KompressorBetrieb(db.Model):
         self.updated_at = datetime.utcnow()
     
     @staticmethod
+    @anfrage_cache
     def get_aktiver_kompressor():
         """Gibt den aktuell laufenden Kompressor zurück"""
         return KompressorBetrieb.query.filter_by(status='laufend').first()
@@ -112,15 +126,27 @@ class KompressorBetrieb(db.Model):
         return KompressorBetrieb.get_aktiver_kompressor() is not None
     
     @staticmethod
+    @anfrage_cache
     def get_gesamt_betriebsstunden():
-        """Berechnet Gesamt-Betriebsstunden aller Zyklen"""
+        """Gesamt-Betriebsstunden aller Zyklen (aus dem laufenden Zähler, O(1))"""
+        minuten = KompressorBetriebsstundenZaehler.get_gesamt_minuten()
+        
+        if minuten is None:
+            # Zähler noch nicht initialisiert: klassische Summe
+            minuten = KompressorBetrieb.summe_betriebsminuten()
+        
+        return round(minuten / 60.0, 1)  # Stunden mit 1 Dezimalstelle
+    
+    @staticmethod
+    def summe_betriebsminuten():
+        """Summiert die Betriebsminuten aller abgeschlossenen Zyklen (Vollscan)"""
         result = db.session.query(
             db.func.sum(KompressorBetrieb.betriebsdauer_minuten)
         ).filter(
-            KompressorBetrieb.status.in_(['beendet', 'notaus'])
+            KompressorBetrieb.status.in_(ABGESCHLOSSENE_STATUS)
         ).scalar()
         
-        return round((result or 0) / 60.0, 1)  # Stunden mit 1 Dezimalstelle
+        return result or 0
     
     @staticmethod
     def get_betriebsstunden_seit(datum):
@@ -152,7 +178,13 @@ class KompressorBetrieb(db.Model):
     
     @staticmethod
     def get_kompressor_statistiken():
-        """Gibt umfassende Kompressor-Statistiken zurück"""
+        """Gibt umfassende Kompressor-Statistiken zurück (vorberechneter Snapshot)"""
+        from app.services.statistik_service import statistik_lesen
+        return statistik_lesen('kompressor')
+
+    @staticmethod
+    def berechne_kompressor_statistiken():
+        """Berechnet die Kompressor-Statistiken"""
         total_zyklen = KompressorBetrieb.query.filter(
             KompressorBetrieb.status.in_(['beendet', 'notaus'])
         ).count()
@@ -196,3 +228,166 @@ class KompressorBetrieb(db.Model):
             'ist_aktiv': self.ist_aktiv,
             'notizen': self.notizen
         }
+
+
+class KompressorBetriebsstundenZaehler(db.Model):
+    """
+    Laufender Zähler der Gesamt-Betriebsminuten (eine Zeile, id=1)
+    
+    Wird über SQLAlchemy-Events in derselben Transaktion wie die
+    Änderung am KompressorBetrieb fortgeschrieben (Ausschalten, Not-Aus,
+    Korrektur-Einträge). Statt SUM über alle Zyklen ist das Lesen der
+    Gesamt-Betriebsstunden damit ein Primärschlüssel-Zugriff.
+    """
+    
+    __tablename__ = 'kompressor_betriebsstunden_zaehler'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    gesamt_minuten = db.Column(db.Integer, nullable=False, default=0)
+    anzahl_zyklen = db.Column(db.Integer, nullable=False, default=0)
+    aktualisiert_am = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    ZAEHLER_ID = 1
+    
+    def __repr__(self):
+        return f'<KompressorBetriebsstundenZaehler {self.gesamt_minuten} min>'
+    
+    @staticmethod
+    def get_gesamt_minuten():
+        """Aktueller Zählerstand in Minuten (None wenn nicht initialisiert)"""
+        try:
+            return db.session.query(KompressorBetriebsstundenZaehler.gesamt_minuten).filter_by(
+                id=KompressorBetriebsstundenZaehler.ZAEHLER_ID
+            ).scalar()
+        except OperationalError:
+            # Tabelle existiert noch nicht (alte Datenbank ohne Migration)
+            return None
+    
+    @staticmethod
+    def einrichten():
+        """
+        Legt Tabelle und Zählerzeile an, falls sie fehlen (idempotent)
+        
+        Schema aus Migration 0014_betriebsstunden_zaehler; das Anlegen hier
+        ist der Fallback für Datenbanken ohne `flask db upgrade`.
+        """
+        KompressorBetriebsstundenZaehler.__table__.create(db.engine, checkfirst=True)
+        if KompressorBetriebsstundenZaehler.get_gesamt_minuten() is None:
+            KompressorBetriebsstundenZaehler.neu_aufbauen()
+    
+    @staticmethod
+    def neu_aufbauen():
+        """Berechnet den Zähler aus allen KompressorBetrieb-Einträgen neu"""
+        minuten = KompressorBetrieb.summe_betriebsminuten()
+        zyklen = KompressorBetrieb.query.filter(
+            KompressorBetrieb.status.in_(ABGESCHLOSSENE_STATUS)
+        ).count()
+        
+        zaehler = db.session.get(KompressorBetriebsstundenZaehler, KompressorBetriebsstundenZaehler.ZAEHLER_ID)
+        if not zaehler:
+            zaehler = KompressorBetriebsstundenZaehler(id=KompressorBetriebsstundenZaehler.ZAEHLER_ID)
+            db.session.add(zaehler)
+        
+        zaehler.gesamt_minuten = minuten
+        zaehler.anzahl_zyklen = zyklen
+        zaehler.aktualisiert_am = datetime.utcnow()
+        db.session.commit()
+        
+        return zaehler
+    
+    @staticmethod
+    def konsistenz_pruefen(reparieren=False):
+        """
+        Vergleicht den Zähler mit der Summe über alle Zyklen
+        
+        Args:
+            reparieren: Zähler bei Abweichung neu aufbauen
+        """
+        zaehler_minuten = KompressorBetriebsstundenZaehler.get_gesamt_minuten()
+        summe_minuten = KompressorBetrieb.summe_betriebsminuten()
+        konsistent = zaehler_minuten == summe_minuten
+        
+        ergebnis = {
+            'konsistent': konsistent,
+            'zaehler_minuten': zaehler_minuten,
+            'summe_minuten': summe_minuten,
+            'differenz_minuten': (zaehler_minuten or 0) - summe_minuten,
+            'repariert': False
+        }
+        
+        if not konsistent and reparieren:
+            KompressorBetriebsstundenZaehler.neu_aufbauen()
+            ergebnis['repariert'] = True
+        
+        return ergebnis
+    
+    def to_dict(self):
+        """Konvertiert Model zu Dictionary (für JSON API)"""
+        return {
+            'gesamt_minuten': self.gesamt_minuten,
+            'gesamt_stunden': round(self.gesamt_minuten / 60.0, 1),
+            'anzahl_zyklen': self.anzahl_zyklen,
+            'aktualisiert_am': self.aktualisiert_am.isoformat() if self.aktualisiert_am else None
+        }
+
+
+# ============================================================================
+# Zähler-Fortschreibung (gleiche Transaktion wie die Änderung)
+# ============================================================================
+
+def _beitrag(status, minuten):
+    """Beitrag eines Zyklus zum Zähler: (Minuten, Zyklen)"""
+    if status in ABGESCHLOSSENE_STATUS:
+        return (minuten or 0), 1
+    return 0, 0
+
+
+def _gespeicherter_beitrag(connection, betrieb_id):
+    """Beitrag des Zyklus, wie er aktuell in der Datenbank steht"""
+    tabelle = KompressorBetrieb.__table__
+    zeile = connection.execute(
+        db.select(tabelle.c.status, tabelle.c.betriebsdauer_minuten)
+        .where(tabelle.c.id == betrieb_id)
+    ).first()
+    if zeile is None:
+        return 0, 0
+    return _beitrag(zeile[0], zeile[1])
+
+
+def _zaehler_aendern(connection, delta_minuten, delta_zyklen):
+    if not delta_minuten and not delta_zyklen:
+        return
+    tabelle = KompressorBetriebsstundenZaehler.__table__
+    # Nicht initialisierter Zähler (keine Zeile) bleibt unverändert
+    connection.execute(
+        tabelle.update()
+        .where(tabelle.c.id == KompressorBetriebsstundenZaehler.ZAEHLER_ID)
+        .values(
+            gesamt_minuten=tabelle.c.gesamt_minuten + delta_minuten,
+            anzahl_zyklen=tabelle.c.anzahl_zyklen + delta_zyklen,
+            aktualisiert_am=datetime.utcnow()
+        )
+    )
+
+
+@event.listens_for(KompressorBetrieb, 'after_insert')
+def _betrieb_eingefuegt(mapper, connection, target):
+    minuten, zyklen = _beitrag(target.status, target.betriebsdauer_minuten)
+    _zaehler_aendern(connection, minuten, zyklen)
+
+
+@event.listens_for(KompressorBetrieb, 'before_update')
+def _betrieb_geaendert(mapper, connection, target):
+    # Nur relevante Änderungen kosten einen zusätzlichen Lesezugriff
+    if not any(attributes.get_history(target, feld).has_changes()
+               for feld in ('status', 'betriebsdauer_minuten')):
+        return
+    alt_minuten, alt_zyklen = _gespeicherter_beitrag(connection, target.id)
+    neu_minuten, neu_zyklen = _beitrag(target.status, target.betriebsdauer_minuten)
+    _zaehler_aendern(connection, neu_minuten - alt_minuten, neu_zyklen - alt_zyklen)
+
+
+@event.listens_for(KompressorBetrieb, 'before_delete')
+def _betrieb_geloescht(mapper, connection, target):
+    minuten, zyklen = _gespeicherter_beitrag(connection, target.id)
+    _zaehler_aendern(connection, -minuten, -zyklen)
@@ -1,4 +1,5 @@
 # SQLAlchemy Model für Kunden/Mitglieder-Verwaltung
+import re
 from datetime import datetime
 from app import db
 
@@ -103,31 +104,60 @@ class Kunde(db.Model):
             self.notizen += f"\nReaktiviert: {grund} ({datetime.utcnow().strftime('%d.%m.%Y')})"
         self.updated_at = datetime.utcnow()
     
+    @staticmethod
+    def _hoechste_mitgliedsnummer():
+        """Höchste numerische Mitgliedsnummer im Bestand (Startwert des Nummernkreises)"""
+        from sqlalchemy import func, Integer
+        
+        return db.session.query(
+            func.max(db.cast(func.substr(Kunde.mitgliedsnummer, 3), Integer))
+        ).filter(Kunde.mitgliedsnummer.like('M-%')).scalar() or 0
+    
     @staticmethod
     def get_naechste_mitgliedsnummer():
-        """Generiert die nächste verfügbare Mitgliedsnummer"""
-        # Findet die höchste numerische Mitgliedsnummer
-        letzter_kunde = Kunde.query.order_by(Kunde.id.desc()).first()
+        """Generiert die nächste verfügbare Mitgliedsnummer (Nummernkreis "M-")"""
+        from app.models.nummernkreis import Nummernkreis
         
-        if not letzter_kunde:
-            return "M-001"
+        nummer = Nummernkreis.naechster('M-', startwert=Kunde._hoechste_mitgliedsnummer)
+        return f"M-{nummer:03d}"
+    
+    @staticmethod
+    def mitgliedsnummer_uebernehmen(mitgliedsnummer):
+        """
+        Meldet eine explizit angegebene Mitgliedsnummer dem Nummernkreis "M-"
+
+        Nummern im Format M-<Zahl> schieben den Zähler hinter sich, sodass
+        get_naechste_mitgliedsnummer() sie nicht noch einmal vergibt.
+        """
+        from app.models.nummernkreis import Nummernkreis
         
-        try:
-            # Versuche numerischen Teil zu extrahieren
-            letzte_nummer = int(letzter_kunde.mitgliedsnummer.split('-')[1])
-            neue_nummer = letzte_nummer + 1
-            return f"M-{neue_nummer:03d}"
-        except (ValueError, IndexError):
-            # Fallback: Zähle alle Kunden + 1
-            anzahl = Kunde.query.count()
-            return f"M-{anzahl + 1:03d}"
+        treffer = re.fullmatch(r'M-(\d+)', (mitgliedsnummer or '').strip())
+        if treffer:
+            Nummernkreis.mindestens('M-', int(treffer.group(1)))
     
     @staticmethod
-    def suche_kunde(suchbegriff):
+    def reserviere_mitgliedsnummern(anzahl):
+        """Reserviert einen zusammenhängenden Block von Mitgliedsnummern (z.B. für Importe)"""
+        from app.models.nummernkreis import Nummernkreis
+        
+        if anzahl < 1:
+            return []
+        erste = Nummernkreis.reservieren('M-', anzahl, startwert=Kunde._hoechste_mitgliedsnummer)
+        return [f"M-{nummer:03d}" for nummer in range(erste, erste + anzahl)]
+    
+    @staticmethod
+    def suche_kunde(suchbegriff, limit=None):
         """Sucht Kunden nach verschiedenen Kriterien inklusive externe Nummern"""
+        # Bevorzugt FTS5-Volltextindex (Präfix-Suche, nach Relevanz sortiert)
+        from app.services.volltext_suche import VolltextSuche
+        ids = VolltextSuche.kunden_ids_suchen(suchbegriff, limit=limit)
+        if ids is not None:
+            return VolltextSuche.nach_ids_laden(Kunde, ids)
+        
+        # Fallback ohne FTS5: LIKE-Suche
         suchbegriff = f"%{suchbegriff}%"
         
-        return Kunde.query.filter(
+        query = Kunde.query.filter(
             db.or_(
                 Kunde.mitgliedsnummer.like(suchbegriff),
                 Kunde.externe_kundennummer.like(suchbegriff),
@@ -135,10 +165,72 @@ class Kunde(db.Model):
                 Kunde.nachname.like(suchbegriff),
                 Kunde.firma.like(suchbegriff),
                 Kunde.email.like(suchbegriff),
+                Kunde.telefon.like(suchbegriff),
                 # Kombinierte Suche für "Vorname Nachname" (SQLite-Syntax)
                 (Kunde.vorname + ' ' + Kunde.nachname).like(suchbegriff)
             )
-        ).all()
+        )
+        if limit:
+            query = query.limit(limit)
+        return query.all()
+    
+    # Felder der Kundenliste (Spalten + aggregierte Flaschen-Zahlen)
+    LISTEN_FELDER = (
+        'id', 'vorname', 'nachname', 'mitgliedsnummer', 'externe_kundennummer',
+        'telefon', 'email', 'firma', 'ist_aktiv', 'mitglied_seit', 'erstellt_am',
+        'anzahl_flaschen', 'pruefungen_faellig'
+    )
+    
+    @staticmethod
+    def liste_mit_flaschen_zahlen(felder=None, nach_id=None, limit=None):
+        """
+        Kundenliste mit Flaschen-Anzahl und fälligen Prüfungen in einer Abfrage
+        
+        Die Flaschen werden einmal pro kunde_id gruppiert und per LEFT JOIN
+        angehängt (statt flaschen.count() und Python-Schleife je Kunde).
+        Keyset-Pagination über die id: nach_id = letzte id der vorherigen Seite.
+        """
+        from sqlalchemy import func, case, and_
+        from app.models.flaschen import Flasche
+        
+        felder = [f for f in (felder or Kunde.LISTEN_FELDER) if f in Kunde.LISTEN_FELDER]
+        if 'id' not in felder:
+            felder.insert(0, 'id')  # wird als Cursor benötigt
+        
+        heute = datetime.utcnow().date()
+        flaschen_zahlen = db.session.query(
+            Flasche.kunde_id.label('kunde_id'),
+            func.count(Flasche.id).label('anzahl_flaschen'),
+            func.sum(case(
+                (and_(Flasche.ist_aktiv == True, Flasche.naechste_pruefung <= heute), 1),
+                else_=0
+            )).label('pruefungen_faellig')
+        ).group_by(Flasche.kunde_id).subquery()
+        
+        spalten = []
+        for feld in felder:
+            if feld in ('anzahl_flaschen', 'pruefungen_faellig'):
+                spalten.append(func.coalesce(getattr(flaschen_zahlen.c, feld), 0).label(feld))
+            else:
+                spalten.append(getattr(Kunde, feld))
+        
+        query = db.session.query(*spalten)
+        if 'anzahl_flaschen' in felder or 'pruefungen_faellig' in felder:
+            query = query.outerjoin(flaschen_zahlen, flaschen_zahlen.c.kunde_id == Kunde.id)
+        if nach_id is not None:
+            query = query.filter(Kunde.id > nach_id)
+        query = query.order_by(Kunde.id)
+        if limit:
+            query = query.limit(limit)
+        
+        kunden_liste = []
+        for zeile in query.all():
+            daten = dict(zip(felder, zeile))
+            for feld in ('mitglied_seit', 'erstellt_am'):
+                if daten.get(feld) is not None:
+                    daten[feld] = daten[feld].isoformat()
+            kunden_liste.append(daten)
+        return kunden_liste
     
     @staticmethod
     def pruefen_kunde_existiert(vorname=None, nachname=None, email=None, mitgliedsnummer=None):
@@ -160,10 +252,16 @@ class Kunde(db.Model):
     
     @staticmethod
     def get_kunden_statistiken():
-        """Gibt Kunden-Statistiken zurück"""
+        """Gibt Kunden-Statistiken zurück (vorberechneter Snapshot)"""
+        from app.services.statistik_service import statistik_lesen
+        return statistik_lesen('kunden')
+    
+    @staticmethod
+    def berechne_kunden_statistiken():
+        """Berechnet die Kunden-Statistiken"""
         try:
             from datetime import timedelta
-            from sqlalchemy import func
+            from sqlalchemy import func, case, and_
             
             total_kunden = Kunde.query.count()
             aktive_kunden = Kunde.query.filter_by(ist_aktiv=True).count()
@@ -189,12 +287,25 @@ class Kunde(db.Model):
                 print(f"Fehler bei neuen Mitgliedern: {e}")
                 neue_mitglieder = 0
             
+            # Kunden mit Flaschen und fällige Prüfungen (über alle Kunden)
+            from app.models.flaschen import Flasche
+            heute = datetime.utcnow().date()
+            kunden_mit_flaschen, pruefungen_faellig = db.session.query(
+                func.count(db.distinct(Flasche.kunde_id)),
+                func.sum(case(
+                    (and_(Flasche.ist_aktiv == True, Flasche.naechste_pruefung <= heute), 1),
+                    else_=0
+                ))
+            ).one()
+            
             return {
                 'total_kunden': total_kunden,
                 'aktive_kunden': aktive_kunden,
                 'inaktive_kunden': total_kunden - aktive_kunden,
                 'mitgliedschaftstypen': typen,
-                'neue_mitglieder_30_tage': neue_mitglieder
+                'neue_mitglieder_30_tage': neue_mitglieder,
+                'kunden_mit_flaschen': kunden_mit_flaschen or 0,
+                'pruefungen_faellig': pruefungen_faellig or 0
             }
             
         except Exception as e:
@@ -204,7 +315,9 @@ class Kunde(db.Model):
                 'aktive_kunden': 0,
                 'inaktive_kunden': 0,
                 'mitgliedschaftstypen': {},
-                'neue_mitglieder_30_tage': 0
+                'neue_mitglieder_30_tage': 0,
+                'kunden_mit_flaschen': 0,
+                'pruefungen_faellig': 0
             }
     
     @staticmethod
@@ -226,7 +339,11 @@ class Kunde(db.Model):
             }
         
         # Erstelle neuen Kunden
-        neue_mitgliedsnummer = daten.get('mitgliedsnummer') or Kunde.get_naechste_mitgliedsnummer()
+        if daten.get('mitgliedsnummer'):
+            neue_mitgliedsnummer = daten['mitgliedsnummer']
+            Kunde.mitgliedsnummer_uebernehmen(neue_mitgliedsnummer)
+        else:
+            neue_mitgliedsnummer = Kunde.get_naechste_mitgliedsnummer()
         
         neuer_kunde = Kunde(
             mitgliedsnummer=neue_mitgliedsnummer,
@@ -251,8 +368,12 @@ class Kunde(db.Model):
             'message': f'Neuer Kunde erstellt: {neuer_kunde.vollname} ({neue_mitgliedsnummer})'
         }
 
-    def to_dict(self, include_flaschen=False):
-        """Konvertiert Model zu Dictionary (für JSON API)"""
+    def to_dict(self, include_flaschen=False, anzahl_flaschen=None):
+        """
+        Konvertiert Model zu Dictionary (für JSON API)
+        
+        anzahl_flaschen: bereits gezählte Flaschen (spart die Abfrage pro Kunde)
+        """
         data = {
             'id': self.id,
             'mitgliedsnummer': self.mitgliedsnummer,
@@ -270,7 +391,7 @@ class Kunde(db.Model):
             'mitgliedschaft_typ': self.mitgliedschaft_typ,
             'mitgliedschaft_dauer_jahre': self.mitgliedschaft_dauer_jahre,
             'ist_aktiv': self.ist_aktiv,
-            'anzahl_flaschen': self.anzahl_flaschen,
+            'anzahl_flaschen': self.anzahl_flaschen if anzahl_flaschen is None else anzahl_flaschen,
             'notizen': self.notizen,
             'erstellt_am': self.erstellt_am.isoformat() if self.erstellt_am else None
         }
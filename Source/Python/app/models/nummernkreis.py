@@ -0,0 +1,106 @@
+# SQLAlchemy Model für Nummernkreise (Mitglieds-, Flaschen- und Auftragsnummern)
+from datetime import datetime
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import IntegrityError
+from app import db
+
+
+class Nummernkreis(db.Model):
+    """
+    Zähler je Präfix (z.B. "M-", "FL-M-001-", "FM-2025-")
+
+    Statt bei jeder neuen Nummer alle vorhandenen Nummern zu durchsuchen,
+    wird der letzte vergebene Wert hier gespeichert und per UPDATE atomar
+    hochgezählt. Das UPDATE läuft in der Transaktion des Aufrufers: parallele
+    Anfragen warten auf dessen Commit (SQLite-Schreibsperre) und können so
+    keine doppelten Nummern ziehen; ein Rollback gibt die Nummern wieder frei.
+    """
+
+    __tablename__ = 'nummernkreise'
+
+    praefix = db.Column(db.String(100), primary_key=True)
+    letzter_wert = db.Column(db.Integer, nullable=False, default=0)
+    aktualisiert_am = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<Nummernkreis {self.praefix}{self.letzter_wert}>'
+
+    @staticmethod
+    def einrichten():
+        """
+        Legt die Tabelle an, falls sie fehlt (idempotent)
+
+        Schema aus Migration 0016_nummernkreise; das Anlegen hier ist der
+        Fallback für Datenbanken ohne `flask db upgrade`.
+        """
+        Nummernkreis.__table__.create(db.engine, checkfirst=True)
+
+    @staticmethod
+    def reservieren(praefix, anzahl=1, startwert=None):
+        """
+        Reserviert einen zusammenhängenden Block von Werten
+
+        Args:
+            praefix: Nummernkreis
+            anzahl: Größe des Blocks (z.B. für Importe)
+            startwert: Funktion, die den bisher höchsten Wert aus den
+                       vorhandenen Daten liefert; wird nur beim ersten Zugriff
+                       auf einen Präfix aufgerufen
+
+        Returns:
+            Erster Wert des Blocks (der Block ist erster .. erster + anzahl - 1)
+        """
+        if anzahl < 1:
+            raise ValueError('anzahl muss mindestens 1 sein')
+
+        tabelle = Nummernkreis.__table__
+
+        for _ in range(3):
+            ergebnis = db.session.execute(
+                update(tabelle)
+                .where(tabelle.c.praefix == praefix)
+                .values(letzter_wert=tabelle.c.letzter_wert + anzahl, aktualisiert_am=datetime.utcnow())
+            )
+            if ergebnis.rowcount:
+                letzter = db.session.execute(
+                    select(tabelle.c.letzter_wert).where(tabelle.c.praefix == praefix)
+                ).scalar()
+                return letzter - anzahl + 1
+
+            # Erster Zugriff: Zähler aus den vorhandenen Nummern übernehmen
+            bisher = (startwert() if startwert else 0) or 0
+            try:
+                with db.session.begin_nested():
+                    db.session.execute(
+                        insert(tabelle).values(
+                            praefix=praefix, letzter_wert=bisher + anzahl, aktualisiert_am=datetime.utcnow()
+                        )
+                    )
+                return bisher + 1
+            except IntegrityError:
+                # Parallel angelegt -> erneut hochzählen
+                continue
+
+        raise RuntimeError(f'Nummernkreis {praefix} konnte nicht reserviert werden')
+
+    @staticmethod
+    def mindestens(praefix, wert):
+        """
+        Setzt den Zähler mindestens auf 'wert' (z.B. nach einer von Hand
+        vergebenen Nummer), damit er diese Nummer später nicht erneut ausgibt
+
+        Existiert der Präfix noch nicht, ist nichts zu tun: der erste Zugriff
+        über reservieren() liest den Startwert aus den vorhandenen Nummern.
+        """
+        tabelle = Nummernkreis.__table__
+        db.session.execute(
+            update(tabelle)
+            .where(tabelle.c.praefix == praefix)
+            .where(tabelle.c.letzter_wert < wert)
+            .values(letzter_wert=wert, aktualisiert_am=datetime.utcnow())
+        )
+
+    @staticmethod
+    def naechster(praefix, startwert=None):
+        """Nächster Wert eines Nummernkreises"""
+        return Nummernkreis.reservieren(praefix, 1, startwert)
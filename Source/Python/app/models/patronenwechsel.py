@@ -1,6 +1,7 @@
 # Patronenwechsel Model für WartungsManager
 from datetime import datetime, timedelta
 from app import db
+from app.anfrage_cache import anfrage_cache
 
 class PatronenwechselKonfiguration(db.Model):
     """
@@ -24,6 +25,7 @@ class PatronenwechselKonfiguration(db.Model):
     erstellt_am = db.Column(db.DateTime, default=datetime.utcnow)
     
     @staticmethod
+    @anfrage_cache
     def get_aktuelle_konfiguration():
         """Gibt die aktuelle Patronenwechsel-Konfiguration zurück"""
         config = PatronenwechselKonfiguration.query.filter_by(ist_aktiv=True).first()
@@ -47,6 +49,10 @@ class Patronenwechsel(db.Model):
     """
     
     __tablename__ = 'patronenwechsel'
+    __table_args__ = (
+        # Letzter Wechsel, Historie
+        db.Index('ix_patronenwechsel_wechsel_datum', 'wechsel_datum'),
+    )
     
     # Primary Key
     id = db.Column(db.Integer, primary_key=True)
@@ -90,6 +96,27 @@ class Patronenwechsel(db.Model):
         """Gibt den letzten Patronenwechsel zurück"""
         return Patronenwechsel.query.order_by(Patronenwechsel.wechsel_datum.desc()).first()
     
+    @staticmethod
+    def status_berechnen(intervall_stunden, warnung_vor_stunden, aktuelle_betriebsstunden,
+                         betriebsstunden_bei_letztem_wechsel=None):
+        """Countdown-Werte aus Konfiguration, Betriebsstunden und letztem Wechsel (ohne DB-Zugriff)"""
+        basis = betriebsstunden_bei_letztem_wechsel or 0.0
+        naechster_wechsel_bei = basis + intervall_stunden
+        stunden_bis_wechsel = max(0.0, naechster_wechsel_bei - aktuelle_betriebsstunden)
+        
+        return {
+            'hat_patronenwechsel': betriebsstunden_bei_letztem_wechsel is not None,
+            'stunden_seit_letztem_wechsel': aktuelle_betriebsstunden - basis,
+            'naechster_wechsel_bei': naechster_wechsel_bei,
+            'stunden_bis_wechsel': stunden_bis_wechsel,
+            'wechsel_faellig': stunden_bis_wechsel <= 0,
+            'warnung_aktiv': stunden_bis_wechsel <= warnung_vor_stunden,
+            'konfiguration': {
+                'intervall_stunden': intervall_stunden,
+                'warnung_vor_stunden': warnung_vor_stunden
+            }
+        }
+    
     @staticmethod
     def get_patronenwechsel_status():
         """Gibt aktuellen Patronenwechsel-Status zurück"""
@@ -99,39 +126,15 @@ class Patronenwechsel(db.Model):
         letzter_wechsel = Patronenwechsel.get_letzter_patronenwechsel()
         aktuelle_betriebsstunden = KompressorBetrieb.get_gesamt_betriebsstunden()
         
-        if not letzter_wechsel:
-            # Noch nie Patronen gewechselt
-            return {
-                'hat_patronenwechsel': False,
-                'stunden_seit_letztem_wechsel': aktuelle_betriebsstunden,
-                'naechster_wechsel_bei': config.patronenwechsel_intervall_stunden,
-                'stunden_bis_wechsel': max(0.0, config.patronenwechsel_intervall_stunden - aktuelle_betriebsstunden),
-                'wechsel_faellig': aktuelle_betriebsstunden >= config.patronenwechsel_intervall_stunden,
-                'warnung_aktiv': aktuelle_betriebsstunden >= (config.patronenwechsel_intervall_stunden - config.warnung_vor_stunden),
-                'konfiguration': {
-                    'intervall_stunden': config.patronenwechsel_intervall_stunden,
-                    'warnung_vor_stunden': config.warnung_vor_stunden
-                }
-            }
-        else:
-            # Patronen wurden schon gewechselt
-            stunden_seit_letztem = aktuelle_betriebsstunden - letzter_wechsel.betriebsstunden_bei_wechsel
-            naechster_wechsel_bei = letzter_wechsel.betriebsstunden_bei_wechsel + config.patronenwechsel_intervall_stunden
-            stunden_bis_wechsel = max(0.0, naechster_wechsel_bei - aktuelle_betriebsstunden)
-            
-            return {
-                'hat_patronenwechsel': True,
-                'letzter_wechsel': letzter_wechsel.to_dict(),
-                'stunden_seit_letztem_wechsel': stunden_seit_letztem,
-                'naechster_wechsel_bei': naechster_wechsel_bei,
-                'stunden_bis_wechsel': stunden_bis_wechsel,
-                'wechsel_faellig': stunden_bis_wechsel <= 0,
-                'warnung_aktiv': stunden_bis_wechsel <= config.warnung_vor_stunden,
-                'konfiguration': {
-                    'intervall_stunden': config.patronenwechsel_intervall_stunden,
-                    'warnung_vor_stunden': config.warnung_vor_stunden
-                }
-            }
+        status = Patronenwechsel.status_berechnen(
+            config.patronenwechsel_intervall_stunden,
+            config.warnung_vor_stunden,
+            aktuelle_betriebsstunden,
+            letzter_wechsel.betriebsstunden_bei_wechsel if letzter_wechsel else None
+        )
+        if letzter_wechsel:
+            status['letzter_wechsel'] = letzter_wechsel.to_dict()
+        return status
     
     @staticmethod
     def neuer_patronenwechsel(durchgefuehrt_von, wechsel_datum=None, 
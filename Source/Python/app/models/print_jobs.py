@@ -69,6 +69,12 @@ class PrintJob(db.Model):
     """
     
     __tablename__ = 'print_jobs'
+    __table_args__ = (
+        # Warteschlange (pending, älteste zuerst)
+        db.Index('ix_print_jobs_status_erstellt', 'status', 'erstellt_am'),
+        # Druckhistorie eines Patronenwechsels
+        db.Index('ix_print_jobs_patronenwechsel', 'patronenwechsel_id', 'erstellt_am'),
+    )
     
     # Primary Key
     id = db.Column(db.Integer, primary_key=True)
@@ -0,0 +1,82 @@
+# SQLAlchemy Models für Shelly-Messwerte (Zeitreihe)
+from datetime import datetime
+from app import db
+
+
+class ShellyMesswert(db.Model):
+    """
+    Rohe Messwerte des Shelly-Pollers (ein Eintrag pro Abfrage)
+
+    Nur anhängen - Verdichtung und Löschung übernimmt ShellyZeitreihe.
+    """
+
+    __tablename__ = 'shelly_messwerte'
+    __table_args__ = (
+        db.Index('ix_shelly_messwerte_ip_zeitpunkt', 'ip', 'zeitpunkt'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    ip = db.Column(db.String(64), nullable=False)
+    zeitpunkt = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    apower = db.Column(db.Float, nullable=True)       # Watt
+    voltage = db.Column(db.Float, nullable=True)      # Volt
+    temperatur = db.Column(db.Float, nullable=True)   # °C
+    output = db.Column(db.Boolean, nullable=True)     # Relais an/aus
+
+    def __repr__(self):
+        return f'<ShellyMesswert {self.ip} {self.zeitpunkt}: {self.apower} W>'
+
+    def to_dict(self):
+        """Konvertiert Model zu Dictionary (für JSON API)"""
+        return {
+            'zeitpunkt': self.zeitpunkt.isoformat(),
+            'apower': self.apower,
+            'voltage': self.voltage,
+            'temperatur': self.temperatur,
+            'output': self.output
+        }
+
+
+class ShellyMesswertAggregat(db.Model):
+    """
+    Verdichtete Messwerte je Minute ('1m') bzw. Stunde ('1h')
+
+    zeitpunkt ist der Beginn des Zeitfensters (UTC).
+    """
+
+    __tablename__ = 'shelly_messwerte_aggregat'
+    __table_args__ = (
+        db.UniqueConstraint('ip', 'aufloesung', 'zeitpunkt', name='uq_shelly_aggregat_fenster'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    ip = db.Column(db.String(64), nullable=False)
+    aufloesung = db.Column(db.String(4), nullable=False)  # '1m', '1h'
+    zeitpunkt = db.Column(db.DateTime, nullable=False)
+
+    anzahl = db.Column(db.Integer, nullable=False, default=0)
+    apower_mittel = db.Column(db.Float, nullable=True)
+    apower_min = db.Column(db.Float, nullable=True)
+    apower_max = db.Column(db.Float, nullable=True)
+    voltage_mittel = db.Column(db.Float, nullable=True)
+    temperatur_mittel = db.Column(db.Float, nullable=True)
+    temperatur_max = db.Column(db.Float, nullable=True)
+    ein_anteil = db.Column(db.Float, nullable=True)  # Anteil der Messungen mit Relais an (0..1)
+
+    def __repr__(self):
+        return f'<ShellyMesswertAggregat {self.ip} {self.aufloesung} {self.zeitpunkt}>'
+
+    def to_dict(self):
+        """Konvertiert Model zu Dictionary (für JSON API)"""
+        return {
+            'zeitpunkt': self.zeitpunkt.isoformat(),
+            'anzahl': self.anzahl,
+            'apower': self.apower_mittel,
+            'apower_min': self.apower_min,
+            'apower_max': self.apower_max,
+            'voltage': self.voltage_mittel,
+            'temperatur': self.temperatur_mittel,
+            'temperatur_max': self.temperatur_max,
+            'ein_anteil': self.ein_anteil
+        }
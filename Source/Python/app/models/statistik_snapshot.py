@@ -0,0 +1,36 @@
+# SQLAlchemy Model für vorberechnete Statistiken (Dashboard, /statistiken-Routen)
+from app import db
+
+
+class StatistikSnapshot(db.Model):
+    """
+    Vorberechnete Statistik einer Kennzahlen-Familie (eine Zeile je Familie)
+
+    Die Werte liegen als JSON vor. Änderungen an den zugrunde liegenden Models
+    setzen 'veraltet' und erhöhen 'version' in derselben Transaktion; beim
+    nächsten Lesen wird die Familie einmal neu berechnet (siehe
+    app/services/statistik_service.py). 'gueltig_bis' sorgt dafür, dass
+    tagesabhängige Werte (fällige Prüfungen, "heute") um Mitternacht neu entstehen.
+    """
+
+    __tablename__ = 'statistik_snapshots'
+
+    familie = db.Column(db.String(50), primary_key=True)
+    daten = db.Column(db.Text, nullable=False, default='{}')
+    version = db.Column(db.Integer, nullable=False, default=0)
+    veraltet = db.Column(db.Boolean, nullable=False, default=True)
+    berechnet_am = db.Column(db.DateTime, nullable=True)
+    gueltig_bis = db.Column(db.DateTime, nullable=True)
+
+    def __repr__(self):
+        return f'<StatistikSnapshot {self.familie} v{self.version}{" (veraltet)" if self.veraltet else ""}>'
+
+    @staticmethod
+    def einrichten():
+        """
+        Legt die Tabelle an, falls sie fehlt (idempotent)
+
+        Schema aus Migration 0017_statistik_snapshots; das Anlegen hier ist
+        der Fallback für Datenbanken ohne `flask db upgrade`.
+        """
+        StatistikSnapshot.__table__.create(db.engine, checkfirst=True)
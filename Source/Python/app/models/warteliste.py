@@ -12,6 +12,14 @@ class WartelisteEintrag(db.Model):
     """
     
     __tablename__ = 'warteliste_eintraege'
+    __table_args__ = (
+        # Warteliste nach Status, sortiert nach Annahme
+        db.Index('ix_warteliste_status_annahme', 'status', 'annahme_datum'),
+        # Archiv / heute gefüllt
+        db.Index('ix_warteliste_status_fuell_ende', 'status', 'fuell_ende'),
+        # "Flasche bereits in Warteliste?"
+        db.Index('ix_warteliste_flasche_status', 'flasche_id', 'status'),
+    )
     
     # Primary Key
     id = db.Column(db.Integer, primary_key=True)
@@ -163,7 +171,13 @@ class WartelisteEintrag(db.Model):
     
     @staticmethod
     def get_warteliste_statistiken():
-        """Gibt Warteliste-Statistiken zurück"""
+        """Gibt Warteliste-Statistiken zurück (vorberechneter Snapshot)"""
+        from app.services.statistik_service import statistik_lesen
+        return statistik_lesen('warteliste')
+
+    @staticmethod
+    def berechne_warteliste_statistiken():
+        """Berechnet die Warteliste-Statistiken"""
         heute = date.today()
         
         # Grundzahlen
@@ -206,17 +220,16 @@ class WartelisteEintrag(db.Model):
         ).scalar()
         
         # Wartende Kunden (unique)
+        from app.models.flaschen import Flasche
         wartende_kunden = db.session.query(
-            'Kunde.id'
+            db.func.count(db.distinct(Flasche.kunde_id))
         ).select_from(
             WartelisteEintrag
         ).join(
-            'flasche'
-        ).join(
-            'flasche.besitzer'
+            Flasche, WartelisteEintrag.flasche_id == Flasche.id
         ).filter(
             WartelisteEintrag.status == 'wartend'
-        ).distinct().count()
+        ).scalar() or 0
         
         return {
             'wartend': wartend,
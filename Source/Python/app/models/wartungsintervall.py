@@ -1,6 +1,7 @@
 # Wartungsintervall Model für WartungsManager
 from datetime import datetime
 from app import db
+from app.anfrage_cache import anfrage_cache
 
 class Wartungsintervall(db.Model):
     """
@@ -60,6 +61,7 @@ class Wartungsintervall(db.Model):
         return self.wartung_faellig_in <= 0
     
     @staticmethod
+    @anfrage_cache
     def get_aktuelles_intervall():
         """Gibt das aktuelle (aktive) Wartungsintervall zurück"""
         return Wartungsintervall.query.filter_by(ist_aktiv=True).first()
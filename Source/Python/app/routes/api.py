@@ -1,6 +1,7 @@
 # API Routes für WartungsManager
-from flask import Blueprint, jsonify
+from flask import Blueprint, jsonify, request, Response, stream_with_context
 from app.models import Fuellvorgang, Wartung, Handbefuellung
+from app.services.ereignis_bus import ereignis_bus, ZuVieleClients
 
 bp = Blueprint('api', __name__)
 
@@ -11,3 +12,45 @@ def status():
         'status': 'online',
         'version': '1.0.0'
     })
+
+@bp.route('/ereignisse')
+def ereignisse():
+    """
+    Server-Sent Events: Push-Kanal für Zustandsänderungen
+
+    ?kanaele=kompressor,warteliste,bulk,wartung,kunden,fuellmanager (Standard: alle)
+    Der Browser sendet nach Verbindungsabbruch Last-Event-ID, verpasste
+    Ereignisse werden dann aus der Historie nachgeliefert.
+    Sind alle Plätze belegt (EREIGNISSE_MAX_CLIENTS), antwortet der Server
+    mit 503 und die Seite fällt auf Timer-Polling zurück.
+    """
+    kanaele = [k for k in request.args.get('kanaele', '').split(',') if k.strip()]
+    letzte_id = request.headers.get('Last-Event-ID', type=int)
+
+    try:
+        abo = ereignis_bus.abonnieren([k.strip() for k in kanaele] or None, letzte_id, begrenzt=True)
+    except ZuVieleClients:
+        response = Response(f"retry: {ereignis_bus.BESETZT_RETRY_MS}\n\n", status=503,
+                            mimetype='text/event-stream')
+        response.headers['Retry-After'] = str(ereignis_bus.BESETZT_RETRY_MS // 1000)
+        return response
+
+    # Nur mit channel_request_lookahead vorhanden (produktionsserver.py)
+    getrennt = request.environ.get('waitress.client_disconnected')
+    response = Response(
+        stream_with_context(ereignis_bus.sse_stream(abo=abo, getrennt=getrennt)),
+        mimetype='text/event-stream'
+    )
+    # Falls der Stream nie gestartet wird, Platz trotzdem freigeben
+    response.call_on_close(lambda: ereignis_bus.abmelden(abo))
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # Puffern in nginx verhindern
+    return response
+
+@bp.route('/ereignisse/status')
+def ereignisse_status():
+    """Anzahl verbundener Push-Clients"""
+    return jsonify({
+        'success': True,
+        'clients': ereignis_bus.anzahl_clients
+    })
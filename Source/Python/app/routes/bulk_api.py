@@ -393,18 +393,11 @@ def kunden_suchen():
         
         # KundenService verwenden falls verfügbar
         try:
-            result = KundenService.kunden_suchen(suchbegriff)
+            result = KundenService.kunde_suchen(suchbegriff, limit=10)
         except:
-            # Fallback: Direkte DB-Abfrage
+            # Fallback: Direkte DB-Abfrage (Volltextsuche)
             from app.models import Kunde
-            kunden = Kunde.query.filter(
-                db.or_(
-                    Kunde.vorname.ilike(f'%{suchbegriff}%'),
-                    Kunde.nachname.ilike(f'%{suchbegriff}%'),
-                    Kunde.telefon.ilike(f'%{suchbegriff}%'),
-                    Kunde.email.ilike(f'%{suchbegriff}%')
-                )
-            ).limit(10).all()
+            kunden = Kunde.suche_kunde(suchbegriff, limit=10)
             
             result = {
                 'success': True,
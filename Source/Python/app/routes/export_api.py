@@ -0,0 +1,83 @@
+# Export API Routes (Kunden, Flaschen, Warteliste, Füllaufträge, Kompressor)
+from datetime import datetime
+from flask import Blueprint, jsonify, request, Response, stream_with_context
+from app.services.export_service import (
+    ExportService, ExportFormatNichtVerfuegbar, XLSX_MIMETYPE, CSV_MIMETYPE
+)
+
+bp = Blueprint('export_api', __name__, url_prefix='/api/export')
+
+
+def _datum_parameter(name):
+    wert = request.args.get(name)
+    if not wert:
+        return None
+    return datetime.strptime(wert, '%Y-%m-%d').date()
+
+
+def export_response(art, format='xlsx'):
+    """
+    Gestreamte Export-Antwort für eine Exportart
+
+    Optionale Query-Parameter: von, bis (YYYY-MM-DD)
+    """
+    try:
+        definition = ExportService.definition(art)
+        if format not in ExportService.FORMATE:
+            raise ValueError(f'Unbekanntes Format: {format} (erlaubt: {", ".join(ExportService.FORMATE)})')
+        von = _datum_parameter('von')
+        bis = _datum_parameter('bis')
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+
+    try:
+        if format == 'csv':
+            response = Response(
+                stream_with_context(ExportService.csv_stream(definition, von, bis)),
+                mimetype=CSV_MIMETYPE
+            )
+        else:
+            pfad = ExportService.xlsx_datei(definition, von, bis)
+            response = Response(ExportService.datei_stream(pfad), mimetype=XLSX_MIMETYPE)
+
+        response.headers['Content-Disposition'] = (
+            f'attachment; filename={ExportService.dateiname(definition, format)}'
+        )
+        response.headers['X-Accel-Buffering'] = 'no'
+        return response
+
+    except ExportFormatNichtVerfuegbar as e:
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'alternative': request.base_url + '?format=csv'
+        }), 501
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@bp.route('/<art>')
+def export(art):
+    """
+    Export als Download
+
+    art: kunden, flaschen, warteliste, fuellauftraege, kompressor
+    ?format=xlsx (Standard) oder csv, optional von/bis (YYYY-MM-DD)
+    """
+    return export_response(art, request.args.get('format', 'xlsx').lower())
+
+
+@bp.route('/')
+def export_arten():
+    """Verfügbare Exporte und Formate"""
+    return jsonify({
+        'success': True,
+        'arten': list(ExportService.ARTEN),
+        'formate': list(ExportService.FORMATE)
+    })
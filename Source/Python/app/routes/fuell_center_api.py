@@ -92,10 +92,10 @@ def kunden_suche():
             })
         
         # Nutze die Suchfunktion aus dem Kunde-Model
-        kunden = Kunde.suche_kunde(suchbegriff)
+        kunden = Kunde.suche_kunde(suchbegriff, limit=10)
         
         result = []
-        for kunde in kunden[:10]:  # Maximal 10 Ergebnisse
+        for kunde in kunden:  # Maximal 10 Ergebnisse
             result.append({
                 'id': kunde.id,
                 'mitgliedsnummer': kunde.mitgliedsnummer,
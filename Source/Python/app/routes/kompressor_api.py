@@ -1,15 +1,21 @@
 # Kompressor-System API Routes für WartungsManager
 # RESTful API für alle Kompressor-System Funktionen
 
-from flask import Blueprint, jsonify, request
-from datetime import datetime, date
+from flask import Blueprint, jsonify, request, url_for, current_app
+from datetime import datetime, date, timedelta
 import logging
+import os
+from app import db
+from app.models.kompressor import KompressorBetrieb, KompressorBetriebsstundenZaehler
 from app.services.kompressor_service import KompressorService, KompressorScheduleService
 from app.services.bulk_fuelling_service import BulkFuellvorgangService
 from app.services.kunden_service import KundenService
 from app.services.flaschen_service import FlaschenService, FlaschenScanService
 from app.services.wartungsintervall_service import WartungsintervallService
 from app.services.patronenwechsel_service import PatronenwechselService
+from app.services.shelly_client import shelly_client
+from app.services.shelly_poller import shelly_poller
+from app.services.shelly_zeitreihe import shelly_zeitreihe
 
 logger = logging.getLogger(__name__)
 bp = Blueprint('kompressor_api', __name__, url_prefix='/api/kompressor')
@@ -27,25 +33,28 @@ def kompressor_status():
             ip = data.get('ip')
 
             if ip:
-                import requests
-                try:
-                    response = requests.get(f'http://{ip}/rpc/Shelly.GetStatus', timeout=5)
-                    if response.status_code == 200:
-                        shelly_data = response.json()
-                        return jsonify({
-                            'success': True,
-                            'status': {
-                                'output': shelly_data.get('switch:0', {}).get('output', False),
-                                'apower': shelly_data.get('switch:0', {}).get('apower', 0),
-                                'voltage': shelly_data.get('switch:0', {}).get('voltage', 0),
-                                'temperature': shelly_data.get('switch:0', {}).get('temperature', {}),
-                                'model': 'Shelly Plus Plug S',
-                                'fw_id': shelly_data.get('sys', {}).get('fw_id', '-')
-                            }
-                        })
-                except Exception as e:
-                    logger.error(f"Shelly Status Fehler: {str(e)}")
-                    return jsonify({'success': False, 'error': str(e)}), 200
+                # Letzter Stand aus dem Hintergrund-Poller (kein Geräte-Roundtrip)
+                snapshot = shelly_poller.snapshot(ip)
+                if not snapshot.get('online'):
+                    return jsonify({
+                        'success': False,
+                        'error': snapshot.get('error'),
+                        'alter_sekunden': snapshot['alter_sekunden']
+                    }), 200
+                
+                return jsonify({
+                    'success': True,
+                    'status': {
+                        'output': snapshot['output'],
+                        'apower': snapshot['apower'],
+                        'voltage': snapshot['voltage'],
+                        'temperature': snapshot['temperature'],
+                        'model': 'Shelly Plus Plug S',
+                        'fw_id': snapshot['fw_id'],
+                        'aktualisiert_am': snapshot['aktualisiert_am'],
+                        'alter_sekunden': snapshot['alter_sekunden']
+                    }
+                })
 
         status = KompressorService.get_kompressor_status()
         return jsonify(status)
@@ -64,43 +73,84 @@ def kompressor_control():
         if not ip or not action:
             return jsonify({'success': False, 'error': 'IP und Action erforderlich'}), 400
 
-        import requests
-
-        try:
-            if action == 'on':
-                response = requests.get(
-                    f'http://{ip}/rpc/Switch.Set',
-                    params={'id': 0, 'on': False},
-                    timeout=2
-                )
-                import time
-                time.sleep(0.5)
-
-                response = requests.get(
-                    f'http://{ip}/rpc/Switch.Set',
-                    params={'id': 0, 'on': True},
-                    timeout=5
-                )
-            else:
-                response = requests.get(
-                    f'http://{ip}/rpc/Switch.Set',
-                    params={'id': 0, 'on': False},
-                    timeout=5
-                )
-
-            if response.status_code == 200:
-                return jsonify({'success': True, 'action': action})
-            else:
-                return jsonify({'success': False, 'error': f'HTTP {response.status_code}'}), 200
-
-        except Exception as e:
-            logger.error(f"Shelly Control Fehler: {str(e)}")
-            return jsonify({'success': False, 'error': str(e)}), 200
+        # Offline-Gerät: sofort ablehnen statt Auftrag anzulegen
+        if shelly_client.leistungsschalter(ip).ist_blockiert():
+            return jsonify({'success': False, 'error': f'Shelly {ip} nicht erreichbar'}), 200
+
+        # Schalten im Hintergrund (EIN mit AUS/EIN-Workaround für sauberen Zustand)
+        auftrag = shelly_client.schalten_im_hintergrund(
+            ip, an=(action == 'on'), neu_synchronisieren=(action == 'on')
+        )
+        
+        return jsonify({
+            'success': True,
+            'action': action,
+            'auftrag': auftrag,
+            'status_url': url_for('kompressor_api.kompressor_control_status', auftrag_id=auftrag['auftrag_id'])
+        }), 202
 
     except Exception as e:
         logger.error(f"API Fehler - Kompressor Control: {str(e)}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@bp.route('/control/<auftrag_id>', methods=['GET'])
+def kompressor_control_status(auftrag_id):
+    """Status eines Shelly-Schaltauftrags"""
+    auftrag = shelly_client.auftrag_status(auftrag_id)
+    if not auftrag:
+        return jsonify({'success': False, 'error': 'Auftrag nicht gefunden'}), 404
+    
+    return jsonify({'success': True, 'auftrag': auftrag})
+
+def _kompressor_shelly_ip():
+    """IP der Kompressor-Steckdose: Parameter, verknüpfte Shelly oder Konfiguration"""
+    return (request.args.get('ip')
+            or os.environ.get('SHELLY_KOMPRESSOR_IP')
+            or current_app.config.get('SHELLY_CONFIG', {}).get('ip_address'))
+
+@bp.route('/leistung', methods=['GET'])
+def leistung_verlauf():
+    """
+    Leistungs-/Spannungs-/Temperaturverlauf der Kompressor-Steckdose
+    
+    Query-Parameter: von, bis (ISO, UTC; Standard: letzte Stunde),
+    aufloesung (roh, 1m, 1h; Standard: automatisch), ip
+    """
+    try:
+        ip = _kompressor_shelly_ip()
+        if not ip:
+            return jsonify({'success': False, 'error': 'Keine Kompressor-Shelly konfiguriert'}), 400
+        
+        bis = datetime.fromisoformat(request.args['bis']) if request.args.get('bis') else datetime.utcnow()
+        von = datetime.fromisoformat(request.args['von']) if request.args.get('von') else bis - timedelta(hours=1)
+        
+        verlauf = shelly_zeitreihe.abfragen(ip, von, bis, request.args.get('aufloesung'))
+        return jsonify({'success': True, **verlauf})
+        
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"API Fehler - Leistungsverlauf: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@bp.route('/betrieb/<int:betrieb_id>/leistung', methods=['GET'])
+def betrieb_leistung(betrieb_id):
+    """Leistungsverlauf und Energie eines Kompressor-Zyklus"""
+    try:
+        ip = _kompressor_shelly_ip()
+        if not ip:
+            return jsonify({'success': False, 'error': 'Keine Kompressor-Shelly konfiguriert'}), 400
+        
+        betrieb = db.session.get(KompressorBetrieb, betrieb_id)
+        if not betrieb:
+            return jsonify({'success': False, 'error': 'Betrieb nicht gefunden'}), 404
+        
+        return jsonify({'success': True, **shelly_zeitreihe.betrieb_auswerten(ip, betrieb)})
+        
+    except Exception as e:
+        logger.error(f"API Fehler - Betrieb Leistung: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @bp.route('/einschalten', methods=['POST'])
 def kompressor_einschalten():
     """Schaltet Kompressor ein"""
@@ -284,6 +334,29 @@ def gesamt_betriebszeit_korrigieren():
         logger.error(f"API Fehler - Gesamt-Betriebszeit Korrektur: {str(e)}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@bp.route('/gesamt-betriebszeit/zaehler', methods=['GET'])
+def betriebsstunden_zaehler_pruefen():
+    """Prüft den Betriebsstunden-Zähler gegen die Summe aller Zyklen"""
+    try:
+        ergebnis = KompressorBetriebsstundenZaehler.konsistenz_pruefen(reparieren=False)
+        return jsonify({'success': True, **ergebnis})
+        
+    except Exception as e:
+        logger.error(f"API Fehler - Betriebsstunden-Zähler prüfen: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@bp.route('/gesamt-betriebszeit/zaehler/neu-aufbauen', methods=['POST'])
+def betriebsstunden_zaehler_neu_aufbauen():
+    """Baut den Betriebsstunden-Zähler aus allen Zyklen neu auf"""
+    try:
+        zaehler = KompressorBetriebsstundenZaehler.neu_aufbauen()
+        return jsonify({'success': True, 'zaehler': zaehler.to_dict()})
+        
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"API Fehler - Betriebsstunden-Zähler neu aufbauen: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 # =============================================================================
 # BULK-FÜLLVORGANG API
 # =============================================================================
@@ -337,6 +410,37 @@ def bulk_flasche_hinzufuegen(bulk_id):
         logger.error(f"API Fehler - Flasche hinzufügen: {str(e)}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@bp.route('/bulk/<int:bulk_id>/flaschen/hinzufuegen', methods=['POST'])
+def bulk_flaschen_hinzufuegen(bulk_id):
+    """
+    Fügt mehrere Flaschen in einem Schritt zum Bulk-Füllvorgang hinzu
+    
+    Body: {"flaschen_ids": [1, 2, 3], "ziel_druck": 300}
+    Antwort enthält "hinzugefuegt" und "abgelehnt" (mit Grund je Flasche)
+    """
+    try:
+        data = request.get_json() or {}
+        flaschen_ids = data.get('flaschen_ids')
+        
+        if not isinstance(flaschen_ids, list) or not flaschen_ids:
+            return jsonify({'success': False, 'error': 'Liste flaschen_ids ist erforderlich'}), 400
+        
+        if not all(isinstance(flasche_id, int) and flasche_id > 0 for flasche_id in flaschen_ids):
+            return jsonify({'success': False, 'error': 'Ungültige Flasche-ID in flaschen_ids'}), 400
+        
+        result = BulkFuellvorgangService.flaschen_hinzufuegen(
+            bulk_vorgang_id=bulk_id,
+            flaschen_ids=flaschen_ids,
+            ziel_druck=data.get('ziel_druck', 300)
+        )
+        
+        status_code = 200 if result['success'] else 400
+        return jsonify(result), status_code
+        
+    except Exception as e:
+        logger.error(f"API Fehler - Flaschen hinzufügen: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @bp.route('/bulk/<int:bulk_id>/flasche/<int:flasche_id>/entfernen', methods=['DELETE'])
 def bulk_flasche_entfernen(bulk_id, flasche_id):
     """Entfernt Flasche aus Bulk-Füllvorgang"""
@@ -401,6 +505,40 @@ def bulk_flasche_fehlgeschlagen(bulk_id, flasche_id):
         logger.error(f"API Fehler - Flasche als fehlgeschlagen markieren: {str(e)}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@bp.route('/bulk/<int:bulk_id>/flaschen/ergebnisse', methods=['POST'])
+def bulk_flaschen_ergebnisse(bulk_id):
+    """
+    Markiert mehrere Flaschen auf einmal als gefüllt/fehlgeschlagen (ein Commit)
+    
+    Body: {"flaschen": [{"flasche_id": 1, "status": "gefuellt", "druck": 300},
+                        {"flasche_id": 2, "status": "fehlgeschlagen", "grund": "Ventil undicht"}]}
+    """
+    try:
+        data = request.get_json() or {}
+        eintraege = data.get('flaschen')
+        
+        if not isinstance(eintraege, list) or not eintraege:
+            return jsonify({'success': False, 'error': 'Liste flaschen ist erforderlich'}), 400
+        
+        for eintrag in eintraege:
+            if not isinstance(eintrag, dict) or not isinstance(eintrag.get('flasche_id'), int):
+                return jsonify({'success': False, 'error': 'Jeder Eintrag benötigt eine flasche_id'}), 400
+            druck = eintrag.get('druck')
+            if druck is not None and (not isinstance(druck, int) or druck < 0 or druck > 400):
+                return jsonify({
+                    'success': False,
+                    'error': f"Ungültiger Druck für Flasche {eintrag['flasche_id']}"
+                }), 400
+        
+        result = BulkFuellvorgangService.flaschen_ergebnisse_setzen(bulk_id, eintraege)
+        
+        status_code = 200 if result['success'] else 400
+        return jsonify(result), status_code
+        
+    except Exception as e:
+        logger.error(f"API Fehler - Flaschen-Ergebnisse: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @bp.route('/bulk/<int:bulk_id>/beenden', methods=['POST'])
 def bulk_beenden(bulk_id):
     """Beendet Bulk-Füllvorgang"""
@@ -1,7 +1,6 @@
 # Kunden-Management API Routes
 from datetime import datetime
 from flask import Blueprint, jsonify, request
-from sqlalchemy import or_
 from app.models.kunden import Kunde
 from app.models.flaschen import Flasche
 from app import db
@@ -22,21 +21,8 @@ def kunden_suchen():
                 'message': 'Suchbegriff zu kurz'
             })
         
-        # Erweiterte Suche mit externen Kundennummern
-        search_pattern = f'%{suchbegriff}%'
-        
-        kunden = Kunde.query.filter(
-            or_(
-                Kunde.vorname.ilike(search_pattern),
-                Kunde.nachname.ilike(search_pattern),
-                Kunde.telefon.ilike(search_pattern),
-                Kunde.email.ilike(search_pattern),
-                Kunde.mitgliedsnummer.ilike(search_pattern),
-                Kunde.externe_kundennummer.ilike(search_pattern),
-                # Kombinierte Suche für "Vorname Nachname" (SQLite-Syntax)
-                (Kunde.vorname + ' ' + Kunde.nachname).ilike(search_pattern)
-            )
-        ).limit(10).all()
+        # Volltextsuche (FTS5) inkl. externer Kundennummern, nach Relevanz sortiert
+        kunden = Kunde.suche_kunde(suchbegriff, limit=10)
         
         print(f"Gefundene Kunden: {len(kunden)}")  # Debug
         
@@ -462,45 +448,43 @@ def kunde_export(kunde_id):
 
 @bp.route('/alle')
 def alle_kunden():
-    """Alle Kunden abrufen"""
+    """
+    Alle Kunden mit Flaschen-Anzahl und fälligen Prüfungen abrufen
+    
+    Optionale Parameter:
+    - felder: kommagetrennte Feldauswahl (z.B. id,vorname,nachname,anzahl_flaschen)
+    - limit: Seitengröße (ohne Angabe: alle Kunden)
+    - nach_id: Cursor, id des letzten Kunden der vorherigen Seite
+    """
     try:
-        kunden = Kunde.query.all()
-        
-        kunden_liste = []
-        for kunde in kunden:
-            # Flaschen-Statistiken
-            anzahl_flaschen = kunde.flaschen.count()
-            
-            # Prüfungen fällig
-            from datetime import datetime
-            heute = datetime.utcnow().date()
-            pruefungen_faellig = 0
-            for flasche in kunde.flaschen:
-                if (flasche.ist_aktiv and flasche.naechste_pruefung and 
-                    flasche.naechste_pruefung <= heute):
-                    pruefungen_faellig += 1
-            
-            kunde_data = {
-                'id': kunde.id,
-                'vorname': kunde.vorname,
-                'nachname': kunde.nachname,
-                'mitgliedsnummer': kunde.mitgliedsnummer,
-                'externe_kundennummer': kunde.externe_kundennummer,
-                'telefon': kunde.telefon,
-                'email': kunde.email,
-                'firma': kunde.firma,
-                'ist_aktiv': kunde.ist_aktiv,
-                'mitglied_seit': kunde.mitglied_seit.isoformat() if kunde.mitglied_seit else None,
-                'erstellt_am': kunde.erstellt_am.isoformat() if kunde.erstellt_am else None,
-                'anzahl_flaschen': anzahl_flaschen,
-                'pruefungen_faellig': pruefungen_faellig
-            }
-            kunden_liste.append(kunde_data)
+        felder = None
+        if request.args.get('felder'):
+            felder = [f.strip() for f in request.args['felder'].split(',') if f.strip()]
+            unbekannt = [f for f in felder if f not in Kunde.LISTEN_FELDER]
+            if unbekannt:
+                return jsonify({
+                    'success': False,
+                    'error': f'Unbekannte Felder: {", ".join(unbekannt)}',
+                    'erlaubte_felder': list(Kunde.LISTEN_FELDER)
+                }), 400
+        
+        limit = request.args.get('limit', type=int)
+        nach_id = request.args.get('nach_id', type=int)
+        if limit is not None and limit < 1:
+            return jsonify({'success': False, 'error': 'limit muss größer als 0 sein'}), 400
+        
+        kunden_liste = Kunde.liste_mit_flaschen_zahlen(felder=felder, nach_id=nach_id, limit=limit)
+        
+        # Cursor nur, wenn die Seite voll ist (es könnte weitere Kunden geben)
+        naechste_id = None
+        if limit and len(kunden_liste) == limit:
+            naechste_id = kunden_liste[-1]['id']
         
         return jsonify({
             'success': True,
             'kunden': kunden_liste,
-            'count': len(kunden_liste)
+            'count': len(kunden_liste),
+            'naechste_id': naechste_id
         })
         
     except Exception as e:
@@ -511,33 +495,17 @@ def alle_kunden():
 
 @bp.route('/statistiken')
 def alle_kunden_statistiken():
-    """Gesamtstatistiken aller Kunden"""
+    """Gesamtstatistiken aller Kunden (vorberechneter Snapshot)"""
     try:
-        from datetime import datetime
-        
-        total_kunden = Kunde.query.count()
-        aktive_kunden = Kunde.query.filter_by(ist_aktiv=True).count()
-        
-        # Kunden mit Flaschen
-        kunden_mit_flaschen = db.session.query(Kunde.id).join(
-            Flasche, Kunde.id == Flasche.kunde_id
-        ).distinct().count()
-        
-        # Prüfungen fällig (über alle Kunden)
-        heute = datetime.utcnow().date()
-        pruefungen_faellig = db.session.query(Flasche).filter(
-            Flasche.ist_aktiv == True,
-            Flasche.naechste_pruefung <= heute,
-            Flasche.naechste_pruefung.isnot(None)
-        ).count()
+        stats = Kunde.get_kunden_statistiken()
         
         return jsonify({
             'success': True,
             'statistiken': {
-                'total_kunden': total_kunden,
-                'aktive_kunden': aktive_kunden,
-                'kunden_mit_flaschen': kunden_mit_flaschen,
-                'pruefungen_faellig': pruefungen_faellig
+                'total_kunden': stats['total_kunden'],
+                'aktive_kunden': stats['aktive_kunden'],
+                'kunden_mit_flaschen': stats['kunden_mit_flaschen'],
+                'pruefungen_faellig': stats['pruefungen_faellig']
             }
         })
         
@@ -549,53 +517,6 @@ def alle_kunden_statistiken():
 
 @bp.route('/export/alle')
 def export_alle_kunden():
-    """Alle Kunden als Excel exportieren"""
-    try:
-        from io import BytesIO
-        import pandas as pd
-        from flask import send_file
-        from datetime import datetime
-        
-        kunden = Kunde.query.all()
-        
-        # Excel-Datei erstellen
-        output = BytesIO()
-        
-        kunden_data = []
-        for kunde in kunden:
-            kunden_data.append({
-                'Mitgliedsnummer': kunde.mitgliedsnummer,
-                'Vorname': kunde.vorname,
-                'Nachname': kunde.nachname or '',
-                'Firma': kunde.firma or '',
-                'Telefon': kunde.telefon or '',
-                'E-Mail': kunde.email or '',
-                'Externe Nummer': kunde.externe_kundennummer or '',
-                'Mitglied seit': kunde.mitglied_seit.strftime('%d.%m.%Y') if kunde.mitglied_seit else '',
-                'Aktiv': 'Ja' if kunde.ist_aktiv else 'Nein',
-                'Anzahl Flaschen': kunde.flaschen.count(),
-                'Erstellt am': kunde.erstellt_am.strftime('%d.%m.%Y %H:%M') if kunde.erstellt_am else ''
-            })
-        
-        df = pd.DataFrame(kunden_data)
-        
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            df.to_excel(writer, sheet_name='Alle Kunden', index=False)
-        
-        output.seek(0)
-        
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M')
-        filename = f"Alle_Kunden_{timestamp}.xlsx"
-        
-        return send_file(
-            output,
-            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-            as_attachment=True,
-            download_name=filename
-        )
-        
-    except Exception as e:
-        return jsonify({
-            'success': False,
-            'error': str(e)
-        }), 500
+    """Alle Kunden als Excel exportieren (gestreamt, ?format=csv möglich)"""
+    from app.routes.export_api import export_response
+    return export_response('kunden', request.args.get('format', 'xlsx').lower())
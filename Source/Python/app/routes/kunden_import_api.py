@@ -1,10 +1,11 @@
 # Kunden-Import API Routes
-from datetime import datetime
-from flask import Blueprint, jsonify, request, make_response
+from flask import Blueprint, jsonify, request, make_response, current_app, url_for
 from werkzeug.utils import secure_filename
 import csv
 import io
-from app.models.kunden import Kunde
+import os
+import tempfile
+from app.services.kunden_import_service import KundenImportService, KundenImportJobs, csv_oeffnen, spalten_zuordnen
 from app import db
 
 bp = Blueprint('kunden_import_api', __name__, url_prefix='/api/kunden')
@@ -13,6 +14,31 @@ bp = Blueprint('kunden_import_api', __name__, url_prefix='/api/kunden')
 ALLOWED_EXTENSIONS = {'csv'}
 MAX_FILE_SIZE = 5 * 1024 * 1024  # 5MB
 
+# Spalten-Mapping (CSV-Spaltenname -> Kunden-Feld)
+PREVIEW_SPALTEN_MAPPING = {
+    'vorname': ['vorname', 'first_name', 'firstname', 'name'],
+    'nachname': ['nachname', 'last_name', 'lastname', 'surname', 'familienname'],
+    'telefon': ['telefon', 'phone', 'tel', 'telefonnummer', 'handy', 'mobile'],
+    'email': ['email', 'e-mail', 'mail', 'e_mail'],
+    'adresse': ['adresse', 'address', 'anschrift', 'strasse', 'wohnort'],
+    'externe_kundennummer': ['externe_kundennummer', 'kundennummer', 'nummer', 'id', 'vereinsnummer'],
+    'externe_system': ['externe_system', 'system', 'herkunft', 'quelle'],
+    'mitgliedschaft_typ': ['mitgliedschaft_typ', 'typ', 'type', 'kategorie'],
+    'notizen': ['notizen', 'notes', 'bemerkungen', 'kommentare']
+}
+
+IMPORT_SPALTEN_MAPPING = {
+    'vorname': ['vorname', 'first_name', 'firstname', 'name'],
+    'nachname': ['nachname', 'last_name', 'lastname', 'surname'],
+    'telefon': ['telefon', 'phone', 'tel', 'telefonnummer'],
+    'email': ['email', 'e-mail', 'mail'],
+    'adresse': ['adresse', 'address', 'anschrift'],
+    'externe_kundennummer': ['externe_kundennummer', 'kundennummer', 'nummer'],
+    'externe_system': ['externe_system', 'system', 'herkunft'],
+    'mitgliedschaft_typ': ['mitgliedschaft_typ', 'typ', 'type'],
+    'notizen': ['notizen', 'notes', 'bemerkungen']
+}
+
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
@@ -121,61 +147,22 @@ def import_preview():
                 'error': 'Ungültiges Dateiformat. Nur CSV-Dateien sind erlaubt.'
             }), 400
         
-        # CSV einlesen
+        # CSV als Stream öffnen (Trennzeichen aus den ersten KB erkennen)
         try:
-            content = file.read().decode('utf-8-sig', errors='ignore')
-        except:
+            headers, rows = csv_oeffnen(file.stream)
+        except ValueError as e:
             return jsonify({
                 'success': False,
-                'error': 'Fehler beim Lesen der Datei. Stellen Sie sicher, dass die Datei UTF-8 kodiert ist.'
+                'error': str(e)
             }), 400
-        
-        # CSV parsen mit verschiedenen Separatoren
-        separators = [';', ',', '\t']
-        csv_data = None
-        used_separator = None
-        
-        for sep in separators:
-            try:
-                reader = csv.DictReader(io.StringIO(content), delimiter=sep)
-                rows = list(reader)
-                if len(reader.fieldnames) > 1 and len(rows) > 0:  # Erfolgreich geparst
-                    csv_data = rows
-                    used_separator = sep
-                    headers = reader.fieldnames
-                    break
-            except:
-                continue
-        
-        if csv_data is None:
+        except Exception:
             return jsonify({
                 'success': False,
-                'error': 'CSV-Format nicht erkannt. Verwenden Sie Semikolon (;) als Trenner.'
+                'error': 'Fehler beim Lesen der Datei. Stellen Sie sicher, dass die Datei UTF-8 kodiert ist.'
             }), 400
         
-        # Spalten-Mapping
-        column_mapping = {
-            'vorname': ['vorname', 'first_name', 'firstname', 'name'],
-            'nachname': ['nachname', 'last_name', 'lastname', 'surname', 'familienname'],
-            'telefon': ['telefon', 'phone', 'tel', 'telefonnummer', 'handy', 'mobile'],
-            'email': ['email', 'e-mail', 'mail', 'e_mail'],
-            'adresse': ['adresse', 'address', 'anschrift', 'strasse', 'wohnort'],
-            'externe_kundennummer': ['externe_kundennummer', 'kundennummer', 'nummer', 'id', 'vereinsnummer'],
-            'externe_system': ['externe_system', 'system', 'herkunft', 'quelle'],
-            'mitgliedschaft_typ': ['mitgliedschaft_typ', 'typ', 'type', 'kategorie'],
-            'notizen': ['notizen', 'notes', 'bemerkungen', 'kommentare']
-        }
-        
         # Automatisches Spalten-Mapping
-        mapped_columns = {}
-        available_columns = [col.lower().strip() for col in headers]
-        
-        for target_col, possible_names in column_mapping.items():
-            for possible_name in possible_names:
-                if possible_name.lower() in available_columns:
-                    original_col = headers[available_columns.index(possible_name.lower())]
-                    mapped_columns[target_col] = original_col
-                    break
+        mapped_columns = spalten_zuordnen(headers, PREVIEW_SPALTEN_MAPPING)
         
         # Validierung
         errors = []
@@ -184,25 +171,31 @@ def import_preview():
         if 'vorname' not in mapped_columns:
             errors.append('Spalte "vorname" nicht gefunden. Diese ist erforderlich.')
         
-        # Preview-Daten erstellen (erste 10 Zeilen)
-        preview_data = []
-        preview_rows = min(10, len(csv_data))
+        # Preview-Daten erstellen (erste 10 Zeilen), alle Zeilen auf Duplikate prüfen
+        vorschau = KundenImportService.vorschau(rows, mapped_columns, max_zeilen=10)
+        preview_data = vorschau['data']
+        total_rows = vorschau['total_rows']
+        
+        if total_rows == 0:
+            return jsonify({
+                'success': False,
+                'error': 'CSV-Format nicht erkannt. Verwenden Sie Semikolon (;) als Trenner.'
+            }), 400
         
-        for i in range(preview_rows):
-            row_data = {}
-            for target_col, source_col in mapped_columns.items():
-                value = csv_data[i].get(source_col, '') or ''
-                row_data[target_col] = str(value).strip()
-            preview_data.append(row_data)
+        if vorschau['duplikate']:
+            warnings.append(f'{vorschau["duplikate"]} Zeilen sind bereits vorhanden oder doppelt in der Datei')
+        if vorschau['ohne_vorname'] and 'vorname' in mapped_columns:
+            warnings.append(f'{vorschau["ohne_vorname"]} Zeilen ohne Vorname werden übersprungen')
         
         # Statistiken
         stats = {
-            'total_rows': len(csv_data),
-            'preview_rows': preview_rows,
+            'total_rows': total_rows,
+            'preview_rows': len(preview_data),
             'mapped_columns': len(mapped_columns),
             'available_columns': headers,
             'missing_required': ['vorname'] if 'vorname' not in mapped_columns else [],
-            'estimated_new_customers': len(csv_data)  # TODO: Echte Duplikat-Prüfung
+            'estimated_new_customers': vorschau['neue_kunden'],
+            'estimated_duplicates': vorschau['duplikate']
         }
         
         return jsonify({
@@ -247,124 +240,25 @@ def execute_import():
         skip_duplicates = import_options.get('skip_duplicates', True)
         update_existing = import_options.get('update_existing', False)
         
-        # CSV verarbeiten (gleicher Code wie Preview)
-        content = file.read().decode('utf-8-sig', errors='ignore')
-        
-        separators = [';', ',', '\t']
-        csv_data = None
-        
-        for sep in separators:
-            try:
-                reader = csv.DictReader(io.StringIO(content), delimiter=sep)
-                rows = list(reader)
-                if len(reader.fieldnames) > 1 and len(rows) > 0:
-                    csv_data = rows
-                    headers = reader.fieldnames
-                    break
-            except:
-                continue
-        
-        if csv_data is None:
+        # CSV als Stream verarbeiten (Zeilen werden nicht im Speicher gesammelt)
+        try:
+            headers, rows = csv_oeffnen(file.stream)
+        except ValueError:
             return jsonify({
                 'success': False,
                 'error': 'CSV-Format nicht erkannt'
             }), 400
         
-        # Spalten-Mapping (gleicher Code)
-        column_mapping = {
-            'vorname': ['vorname', 'first_name', 'firstname', 'name'],
-            'nachname': ['nachname', 'last_name', 'lastname', 'surname'],
-            'telefon': ['telefon', 'phone', 'tel', 'telefonnummer'],
-            'email': ['email', 'e-mail', 'mail'],
-            'adresse': ['adresse', 'address', 'anschrift'],
-            'externe_kundennummer': ['externe_kundennummer', 'kundennummer', 'nummer'],
-            'externe_system': ['externe_system', 'system', 'herkunft'],
-            'mitgliedschaft_typ': ['mitgliedschaft_typ', 'typ', 'type'],
-            'notizen': ['notizen', 'notes', 'bemerkungen']
-        }
-        
-        mapped_columns = {}
-        available_columns = [col.lower().strip() for col in headers]
-        
-        for target_col, possible_names in column_mapping.items():
-            for possible_name in possible_names:
-                if possible_name.lower() in available_columns:
-                    original_col = headers[available_columns.index(possible_name.lower())]
-                    mapped_columns[target_col] = original_col
-                    break
-        
-        # Import durchführen
-        imported_count = 0
-        skipped_count = 0
-        error_count = 0
-        errors = []
+        mapped_columns = spalten_zuordnen(headers, IMPORT_SPALTEN_MAPPING)
         
-        for i, row in enumerate(csv_data):
-            try:
-                # Daten extrahieren
-                kunde_data = {}
-                for target_col, source_col in mapped_columns.items():
-                    value = row.get(source_col, '') or ''
-                    kunde_data[target_col] = str(value).strip()
-                
-                # Pflichtfeld prüfen
-                if not kunde_data.get('vorname'):
-                    error_count += 1
-                    errors.append(f'Zeile {i+2}: Vorname fehlt')
-                    continue
-                
-                # Duplikat-Prüfung
-                existing_kunde = None
-                if kunde_data.get('externe_kundennummer'):
-                    existing_kunde = Kunde.query.filter_by(
-                        externe_kundennummer=kunde_data['externe_kundennummer']
-                    ).first()
-                
-                if not existing_kunde and kunde_data.get('email'):
-                    existing_kunde = Kunde.query.filter_by(
-                        email=kunde_data['email']
-                    ).first()
-                
-                if existing_kunde:
-                    if skip_duplicates:
-                        skipped_count += 1
-                        continue
-                    elif update_existing:
-                        # Update existing customer
-                        for field, value in kunde_data.items():
-                            if value and field != 'vorname':  # Vorname nicht überschreiben
-                                setattr(existing_kunde, field, value)
-                        existing_kunde.updated_at = datetime.utcnow()
-                        imported_count += 1
-                    else:
-                        skipped_count += 1
-                        continue
-                else:
-                    # Neuen Kunden erstellen
-                    neuer_kunde = Kunde(
-                        mitgliedsnummer=Kunde.get_naechste_mitgliedsnummer(),
-                        vorname=kunde_data['vorname'],
-                        nachname=kunde_data.get('nachname') or None,
-                        telefon=kunde_data.get('telefon') or None,
-                        email=kunde_data.get('email') or None,
-                        adresse=kunde_data.get('adresse') or None,
-                        externe_kundennummer=kunde_data.get('externe_kundennummer') or None,
-                        externe_system=kunde_data.get('externe_system') or 'Import',
-                        mitgliedschaft_typ=kunde_data.get('mitgliedschaft_typ') or 'Standard',
-                        notizen=kunde_data.get('notizen') or None,
-                        erstellt_am=datetime.utcnow()
-                    )
-                    
-                    db.session.add(neuer_kunde)
-                    imported_count += 1
-                
-            except Exception as e:
-                error_count += 1
-                errors.append(f'Zeile {i+2}: {str(e)}')
-        
-        # Transaktion abschließen
+        # Import durchführen (mengenbasiert, Duplikat-Prüfung über Hash-Sets)
         try:
-            db.session.commit()
+            result = KundenImportService.import_ausfuehren(
+                rows,
+                mapped_columns,
+                skip_duplicates=skip_duplicates,
+                update_existing=update_existing
+            )
         except Exception as e:
             db.session.rollback()
             return jsonify({
@@ -374,13 +268,7 @@ def execute_import():
         
         return jsonify({
             'success': True,
-            'result': {
-                'imported_count': imported_count,
-                'skipped_count': skipped_count,
-                'error_count': error_count,
-                'total_processed': len(csv_data),
-                'errors': errors[:10]  # Nur erste 10 Fehler anzeigen
-            }
+            'result': result
         })
         
     except Exception as e:
@@ -389,3 +277,74 @@ def execute_import():
             'success': False,
             'error': str(e)
         }), 500
+
+@bp.route('/import/jobs', methods=['POST'])
+def start_import_job():
+    """
+    Startet einen Import im Hintergrund (für große Dateien)
+    
+    Die Datei wird auf die Platte gestreamt und von einem Worker-Thread
+    zeilenweise verarbeitet. Die Antwort kommt sofort mit der Job-ID,
+    der Fortschritt ist über /api/kunden/import/jobs/<id> abrufbar.
+    """
+    try:
+        # Datei-Upload prüfen
+        if 'file' not in request.files:
+            return jsonify({
+                'success': False,
+                'error': 'Keine Datei hochgeladen'
+            }), 400
+        
+        file = request.files['file']
+        if file.filename == '' or not allowed_file(file.filename):
+            return jsonify({
+                'success': False,
+                'error': 'Ungültiges Dateiformat. Nur CSV-Dateien sind erlaubt.'
+            }), 400
+        
+        # Import-Optionen
+        import json
+        try:
+            import_options = json.loads(request.form.get('options', '{}'))
+        except:
+            import_options = {}
+        
+        # Upload in temporäre Datei streamen (wird vom Job gelöscht)
+        fd, pfad = tempfile.mkstemp(prefix='kunden_import_', suffix='.csv')
+        os.close(fd)
+        file.save(pfad)
+        
+        job = KundenImportJobs.starten(
+            current_app._get_current_object(),
+            pfad,
+            IMPORT_SPALTEN_MAPPING,
+            skip_duplicates=import_options.get('skip_duplicates', True),
+            update_existing=import_options.get('update_existing', False)
+        )
+        
+        return jsonify({
+            'success': True,
+            'job': job,
+            'status_url': url_for('kunden_import_api.import_job_status', job_id=job['id'])
+        }), 202
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@bp.route('/import/jobs/<job_id>')
+def import_job_status(job_id):
+    """Status und Fortschritt eines Hintergrund-Imports"""
+    job = KundenImportJobs.status(job_id)
+    if not job:
+        return jsonify({
+            'success': False,
+            'error': 'Import-Job nicht gefunden'
+        }), 404
+    
+    return jsonify({
+        'success': True,
+        'job': job
+    })
@@ -4,6 +4,7 @@ from app.models import Wartung
 from app.services.patrone_vorbereitung_service import PatroneVorbereitungService
 from app.services.patrone_einkauf_service import PatroneEinkaufService
 from app.services.erweiterter_patronenwechsel_service import ErweiterterPatronenwechselService
+from app.services.wartung_lesemodell import wartung_lesemodell
 import logging
 
 logger = logging.getLogger(__name__)
@@ -13,19 +14,14 @@ bp = Blueprint('maintenance', __name__)
 def index():
     """Wartungs-Übersichtsseite mit Patronenverwaltung"""
     
-    # Verfügbare vorbereitete Patronen laden
-    verfuegbare_patronen = PatroneVorbereitungService.get_verfuegbare_patronen()
-    
-    # Lagerbestand laden
-    lagerbestand = PatroneEinkaufService.get_lagerbestand()
-    
-    # Dashboard-Status für Countdown
-    dashboard_status = ErweiterterPatronenwechselService.get_dashboard_status_minimal()
+    # Patronen-Bestand, Countdown und Lagerbestand aus dem Lesemodell
+    uebersicht = wartung_lesemodell.uebersicht()
     
     return render_template('maintenance/index.html', 
-                         verfuegbare_patronen=verfuegbare_patronen,
-                         lagerbestand=lagerbestand,
-                         dashboard_status=dashboard_status)
+                         verfuegbare_patronen=uebersicht['verfuegbare_patronen'],
+                         lagerbestand=uebersicht['lagerbestand'],
+                         dashboard_status=uebersicht['dashboard_status'],
+                         patronenwechsel=uebersicht['patronenwechsel'])
 
 # =============================================================================
 # PATRONE VORBEREITEN
@@ -87,11 +83,10 @@ def api_etikett_drucken(vorbereitung_id):
 @bp.route('/patrone-einkauf')
 def patrone_einkauf():
     """Seite für Patronen-Einkauf"""
+    # Lagerbestand lädt die Seite selbst über /api/maintenance/lagerbestand
     historie = PatroneEinkaufService.get_einkaufs_historie(limit=20)
-    lagerbestand = PatroneEinkaufService.get_lagerbestand()
     return render_template('maintenance/patrone_einkauf.html', 
-                         historie=historie, 
-                         lagerbestand=lagerbestand)
+                         historie=historie)
 
 @bp.route('/api/patrone-einkauf', methods=['POST'])
 def api_patrone_einkauf():
@@ -168,7 +163,7 @@ def patrone_wechseln():
     """Seite für Patronenwechsel mit vorbereiteten Patronen"""
     verfuegbare_patronen = PatroneVorbereitungService.get_verfuegbare_patronen()
     wechsel_historie = ErweiterterPatronenwechselService.get_wechsel_historie_erweitert(limit=10)
-    dashboard_status = ErweiterterPatronenwechselService.get_dashboard_status_minimal()
+    dashboard_status = wartung_lesemodell.uebersicht()['dashboard_status']
     
     return render_template('maintenance/patrone_wechseln.html',
                          verfuegbare_patronen=verfuegbare_patronen,
@@ -302,8 +297,7 @@ def api_wechsel_historie_erweitert():
 def api_dashboard_status():
     """API: Minimaler Dashboard-Status für Countdown"""
     try:
-        result = ErweiterterPatronenwechselService.get_dashboard_status_minimal()
-        return jsonify(result)
+        return jsonify(wartung_lesemodell.uebersicht()['dashboard_status'])
     except Exception as e:
         logger.error(f"API FEHLER bei Dashboard-Status: {str(e)}")
         return jsonify({
@@ -313,6 +307,12 @@ def api_dashboard_status():
             'error': str(e)
         }), 500
 
+@bp.route('/api/uebersicht')
+def api_uebersicht():
+    """API: Stand der Wartungs-Übersicht (Patronen, Countdown, Lagerbestand)"""
+    uebersicht = wartung_lesemodell.uebersicht()
+    return jsonify(uebersicht), (200 if uebersicht['success'] else 500)
+
 @bp.route('/reset-test')
 def reset_test():
     """Reset-Test Seite für Entwicklung und Tests"""
@@ -1,5 +1,5 @@
 # Patronenwechsel-Routes für WartungsManager
-from flask import Blueprint, render_template, request, jsonify
+from flask import Blueprint, render_template, request, jsonify, redirect, url_for
 from app.services.patronenwechsel_service import PatronenwechselService
 from app.services.print_service import print_service
 from app.models.print_jobs import PrintJob, PrinterKonfiguration
@@ -16,13 +16,13 @@ def index():
 
 @bp.route('/historie')
 def historie():
-    """Patronenwechsel-Historie Seite"""
-    return render_template('patronenwechsel/historie.html')
+    """Patronenwechsel-Historie (Abschnitt der Übersichtsseite)"""
+    return redirect(url_for('patronenwechsel.index'))
 
 @bp.route('/konfiguration') 
 def konfiguration():
-    """Patronenwechsel-Konfiguration Seite"""
-    return render_template('patronenwechsel/konfiguration.html')
+    """Patronenwechsel-Konfiguration (Abschnitt der Übersichtsseite)"""
+    return redirect(url_for('patronenwechsel.index'))
 
 # ============================================================================
 # 62MM DRUCKER APIs - NEU
@@ -3,17 +3,21 @@ Shelly IoT Integration für WartungsManager
 Netzwerk-Discovery und Gerätesteuerung
 """
 
-from flask import Blueprint, jsonify, request, render_template
+from flask import Blueprint, jsonify, request, render_template, url_for
 import socket
 import subprocess
 import platform
 import json
 import requests
 import ipaddress
-import concurrent.futures
 from datetime import datetime
 import os
 
+from app.services.shelly_client import shelly_client, ShellyNichtErreichbar
+from app.services.shelly_poller import shelly_poller
+from app.services.shelly_discovery import shelly_discovery
+from app.services.shelly_mdns import shelly_mdns
+
 shelly_bp = Blueprint('shelly', __name__, url_prefix='/shelly')
 
 # Dashboard Route
@@ -219,68 +223,55 @@ def discover_devices():
         
         # Nutze Konfiguration oder Defaults
         network = data.get('network', get_network_range())
-        timeout = data.get('timeout', config.get('scan_timeout', 1))  # Reduziert auf 1 Sekunde
-        workers = config.get('parallel_workers', 50)  # Erhöht für schnelleren Scan
-        
-        discovered = []
-        scan_stats = {
-            'total_ips': 254,
-            'scanned': 0,
-            'found': 0,
-            'timeout': timeout,
-            'workers': workers
-        }
+        timeout = data.get('timeout', config.get('scan_timeout', 1.5))
+        ports = config.get('ports', [80])
+        # auto: mDNS-Geräte (über den Cache) direkt prüfen, Sweep nur als Fallback
+        # (mDNS inaktiv oder ohne Treffer); sweep: immer vollständiger Sweep
+        modus = data.get('modus', 'auto')  # auto | mdns | sweep
+        mdns_geraete = shelly_mdns.geraete(nur_online=True)
+        
+        if modus == 'mdns':
+            return jsonify({
+                'status': 'success',
+                'discovered': mdns_geraete,
+                'count': len(mdns_geraete),
+                'network_scanned': None,
+                'stats': {'modus': 'mdns', 'mdns_aktiv': shelly_mdns.aktiv, 'found': len(mdns_geraete)}
+            })
+        
+        vollstaendig = data.get('vollstaendig', modus == 'sweep' or not shelly_mdns.aktiv or not mdns_geraete)
         
         print(f"[SHELLY] ========================================")
         print(f"[SHELLY] Starte Netzwerk-Scan")
         print(f"[SHELLY] Netzwerk: {network}.0/24")
-        print(f"[SHELLY] Timeout: {timeout}s pro IP")
-        print(f"[SHELLY] Worker-Threads: {workers}")
+        print(f"[SHELLY] Timeout: {timeout}s (HTTP), Ports: {ports}")
+        print(f"[SHELLY] mDNS: {len(mdns_geraete)} Geräte, Sweep: {'ja' if vollstaendig else 'nein'}")
         print(f"[SHELLY] ========================================")
         
-        # Optional: Prüfe bekannte Geräte aus Config zuerst
+        # Konfigurierte Geräte werden direkt geprüft (wie bekannte Geräte aus dem Cache)
+        configured_names = {}
         if config.get('enabled', True):
-            known_devices = config.get('known_devices', [])
-            for device in known_devices:
+            for device in config.get('known_devices', []):
                 if device.get('enabled', False):
-                    print(f"[SHELLY] Prüfe konfiguriertes Gerät: {device['ip']}")
-                    result = check_shelly_device(device['ip'], timeout=timeout+1)
-                    if result:
-                        # Füge Config-Namen hinzu falls vorhanden
-                        result['configured_name'] = device.get('name', result['name'])
-                        discovered.append(result)
-                        scan_stats['found'] += 1
-        
-        # IPs zum Scannen (1-254)
-        ips_to_scan = [f"{network}.{i}" for i in range(1, 255)]
-        
-        print(f"[SHELLY] Scanne {len(ips_to_scan)} IP-Adressen...")
-        
-        # Parallel-Scan mit ThreadPool
-        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
-            # Starte alle Scans
-            future_to_ip = {
-                executor.submit(check_shelly_device, ip, timeout): ip 
-                for ip in ips_to_scan
-            }
-            
-            # Sammle Ergebnisse mit Progress-Tracking
-            for future in concurrent.futures.as_completed(future_to_ip):
-                scan_stats['scanned'] += 1
-                
-                # Progress alle 25 IPs
-                if scan_stats['scanned'] % 25 == 0:
-                    print(f"[SHELLY] Progress: {scan_stats['scanned']}/254 IPs gescannt...")
-                
-                try:
-                    result = future.result()
-                    if result:
-                        discovered.append(result)
-                        scan_stats['found'] += 1
-                        print(f"[SHELLY] ✓ Gerät #{scan_stats['found']} gefunden: {result['name']} ({result['ip']}) - {result['model']}")
-                except Exception as e:
-                    # Fehler ignorieren (normale Timeouts etc.)
-                    pass
+                    configured_names[device['ip']] = device.get('name')
+        
+        # TCP-Vorfilter + parallele Gen1/Gen2-Proben (asyncio)
+        ergebnis = shelly_discovery.scannen(
+            network if vollstaendig else None,
+            ips=configured_names.keys(),
+            ports=ports,
+            vollstaendig=vollstaendig,
+            timeout=timeout
+        )
+        discovered = ergebnis['geraete']
+        # Per mDNS angekündigt, aber (noch) nicht per HTTP bestätigt
+        bestaetigt = {device.get('mac') for device in discovered} | {device['ip'] for device in discovered}
+        discovered += [device for device in mdns_geraete
+                       if device['mac'] not in bestaetigt and device['ip'] not in bestaetigt]
+        scan_stats = dict(ergebnis['stats'], modus=modus, mdns_geraete=len(mdns_geraete), found=len(discovered))
+        for device in discovered:
+            if configured_names.get(device['ip']):
+                device['configured_name'] = configured_names[device['ip']]
         
         print(f"[SHELLY] ========================================")
         print(f"[SHELLY] Scan abgeschlossen!")
@@ -331,6 +322,15 @@ def discover_devices():
             'discovered': []
         })
 
+@shelly_bp.route('/api/mdns')
+def mdns_devices():
+    """Per mDNS angekündigte Shelly-Geräte (Live-Registry, ohne Netzwerkzugriff)"""
+    return jsonify({
+        'success': True,
+        'aktiv': shelly_mdns.aktiv,
+        'geraete': shelly_mdns.geraete()
+    })
+
 @shelly_bp.route('/api/scan')
 def quick_scan():
     """Schneller Scan für bekannte Shelly-IPs"""
@@ -344,11 +344,8 @@ def quick_scan():
             f'{network}.102'
         ]
         
-        devices = []
-        for ip in known_ips:
-            device = check_shelly_device(ip, timeout=1)
-            if device:
-                devices.append(device)
+        # Geräte aus dem Discovery-Cache und die bekannten IPs parallel prüfen
+        devices = shelly_discovery.scannen(None, ips=known_ips, vollstaendig=False, timeout=1)['geraete']
         
         # Demo-Gerät wenn nichts gefunden
         if len(devices) == 0:
@@ -414,17 +411,20 @@ def get_device_status(ip):
             
             status_data = {}
             for endpoint in endpoints:
-                url = f'http://{ip}{endpoint}'
-                print(f"[SHELLY] Versuche: {url}")
+                print(f"[SHELLY] Versuche: http://{ip}{endpoint}")
                 
                 try:
-                    response = requests.get(url, timeout=2)
-                    if response.status_code == 200:
-                        data = response.json()
-                        print(f"[SHELLY] {endpoint}: {json.dumps(data, indent=2)}")
-                        status_data[endpoint] = data
-                except Exception as e:
+                    data = shelly_client.status(ip, endpoint)
+                    print(f"[SHELLY] {endpoint}: {json.dumps(data, indent=2)}")
+                    status_data[endpoint] = data
+                except ShellyNichtErreichbar as e:
                     print(f"[SHELLY] Fehler bei {endpoint}: {e}")
+                    # Gerät offline: restliche Endpoints nicht mehr abwarten
+                    if shelly_client.leistungsschalter(ip).ist_blockiert():
+                        break
+            
+            if not status_data:
+                raise ShellyNichtErreichbar(f"Keine Gen2-Antwort von {ip}")
             
             # Extrahiere wichtige Infos
             result = {
@@ -453,18 +453,15 @@ def get_device_status(ip):
         
         # Gen 1 API Fallback
         try:
-            url = f'http://{ip}/status'
-            response = requests.get(url, timeout=2)
-            if response.status_code == 200:
-                data = response.json()
-                print(f"[SHELLY] Gen1 Status: {json.dumps(data, indent=2)}")
-                return jsonify({
-                    'ip': ip,
-                    'online': True,
-                    'gen': 1,
-                    'raw_status': data
-                })
-        except Exception as e:
+            data = shelly_client.status(ip, '/status')
+            print(f"[SHELLY] Gen1 Status: {json.dumps(data, indent=2)}")
+            return jsonify({
+                'ip': ip,
+                'online': True,
+                'gen': 1,
+                'raw_status': data
+            })
+        except ShellyNichtErreichbar as e:
             print(f"[SHELLY] Gen1 Status-Fehler: {e}")
         
         return jsonify({
@@ -484,77 +481,75 @@ def toggle_device(ip):
         print(f"[SHELLY] Toggle Gerät {ip}")
         
         # Gen 2 API - Toggle-Befehl
-        url = f'http://{ip}/rpc/Switch.Toggle'
-        print(f"[SHELLY] Versuche Toggle: {url}")
-        
-        response = requests.post(
-            url,
-            json={'id': 0},
-            timeout=3
-        )
+        print(f"[SHELLY] Versuche Toggle: http://{ip}/rpc/Switch.Toggle")
         
-        print(f"[SHELLY] Toggle Response: {response.status_code} - {response.text}")
+        result = shelly_client.anfrage(ip, '/rpc/Switch.Toggle', methode='POST', json={'id': 0})
+        print(f"[SHELLY] Toggle Response: {result}")
         
-        if response.status_code == 200:
-            result = response.json()
-            was_on = result.get('was_on', False)
-            print(f"[SHELLY] ✓ Toggle erfolgreich. War vorher: {'EIN' if was_on else 'AUS'}, ist jetzt: {'AUS' if was_on else 'EIN'}")
-            return jsonify({
-                'success': True,
-                'was_on': was_on,
-                'is_on': not was_on,
-                'message': f'Gerät {ip} umgeschaltet'
-            })
+        was_on = result.get('was_on', False)
+        print(f"[SHELLY] ✓ Toggle erfolgreich. War vorher: {'EIN' if was_on else 'AUS'}, ist jetzt: {'AUS' if was_on else 'EIN'}")
+        return jsonify({
+            'success': True,
+            'was_on': was_on,
+            'is_on': not was_on,
+            'message': f'Gerät {ip} umgeschaltet'
+        })
         
+    except ShellyNichtErreichbar as e:
+        print(f"[SHELLY] Toggle-Fehler für {ip}: {e}")
         return jsonify({'success': False, 'error': 'Toggle fehlgeschlagen'})
         
     except Exception as e:
         print(f"[SHELLY] Toggle-Fehler für {ip}: {e}")
         return jsonify({'success': False, 'error': str(e)})
 
+def _ausschalten_mit_fallback(ip):
+    """Schaltet aus: Gen2 (switch:0, switch:1), danach Gen1 als Fallback"""
+    for switch_id in [0, 1]:  # Manche Geräte haben mehrere Switches
+        try:
+            print(f"[SHELLY] Versuche Gen2 API: http://{ip}/rpc/Switch.Set mit switch_id={switch_id}")
+            result = shelly_client.anfrage(
+                ip, '/rpc/Switch.Set', methode='POST', json={'id': switch_id, 'on': False}
+            )
+            print(f"[SHELLY] Response Body: {result}")
+            
+            # Prüfe ob erfolgreich
+            if result.get('was_on') is not None:
+                print(f"[SHELLY] ✓ Gerät {ip} switch:{switch_id} erfolgreich ausgeschaltet")
+                return {'switch_id': switch_id, 'was_on': result.get('was_on')}
+        except ShellyNichtErreichbar as e:
+            print(f"[SHELLY] Gen2 API Fehler für {ip} switch:{switch_id}: {e}")
+            if shelly_client.leistungsschalter(ip).ist_blockiert():
+                raise
+    
+    # Gen 1 API Fallback
+    print(f"[SHELLY] Versuche Gen1 API: http://{ip}/relay/0?turn=off")
+    shelly_client.anfrage(ip, '/relay/0', params={'turn': 'off'})
+    print(f"[SHELLY] ✓ Gerät {ip} erfolgreich ausgeschaltet (Gen1)")
+    return {'gen': 1}
+
+def _auftrag_antwort(auftrag, nachricht):
+    """202-Antwort für einen gestarteten Schaltauftrag"""
+    return jsonify({
+        'success': True,
+        'message': nachricht,
+        'auftrag': auftrag,
+        'status_url': url_for('shelly.auftrag_status', auftrag_id=auftrag['auftrag_id'])
+    }), 202
+
 @shelly_bp.route('/api/device/<device_id>/on', methods=['POST'])
 def switch_on(device_id):
-    """Shelly einschalten - mit Workaround für Sync-Probleme"""
+    """Shelly einschalten - mit Workaround für Sync-Probleme (im Hintergrund)"""
     try:
         ip = device_id
         print(f"[SHELLY] Schalte Gerät {ip} EIN")
         
-        # WORKAROUND: Erst ausschalten, dann einschalten für Sync
-        print(f"[SHELLY] Workaround: Erst OFF dann ON für sauberen Zustand")
-        
-        # Schritt 1: Ausschalten
-        try:
-            response = requests.post(
-                f'http://{ip}/rpc/Switch.Set',
-                json={'id': 0, 'on': False},
-                timeout=2
-            )
-            print(f"[SHELLY] Schritt 1 (OFF): {response.text}")
-        except Exception as e:
-            print(f"[SHELLY] Schritt 1 Fehler: {e}")
-        
-        # Kurz warten
-        import time
-        time.sleep(0.5)
-        
-        # Schritt 2: Einschalten
-        try:
-            response = requests.post(
-                f'http://{ip}/rpc/Switch.Set',
-                json={'id': 0, 'on': True},
-                timeout=2
-            )
-            print(f"[SHELLY] Schritt 2 (ON): Status {response.status_code} - {response.text}")
-            
-            if response.status_code == 200:
-                result = response.json()
-                print(f"[SHELLY] ✓ Gerät {ip} sollte jetzt eingeschaltet sein")
-                print(f"[SHELLY] Response: {result}")
-                return jsonify({'success': True, 'message': f'Gerät {ip} eingeschaltet', 'response': result})
-        except Exception as e:
-            print(f"[SHELLY] Schritt 2 Fehler: {e}")
+        if shelly_client.leistungsschalter(ip).ist_blockiert():
+            return jsonify({'success': False, 'error': 'Gerät nicht erreichbar'})
         
-        return jsonify({'success': False, 'error': 'Schaltvorgang fehlgeschlagen'})
+        # WORKAROUND: Erst ausschalten, dann einschalten für Sync
+        auftrag = shelly_client.schalten_im_hintergrund(ip, an=True, neu_synchronisieren=True)
+        return _auftrag_antwort(auftrag, f'Gerät {ip} wird eingeschaltet')
         
     except Exception as e:
         print(f"[SHELLY] Fehler beim Einschalten von {device_id}: {e}")
@@ -562,69 +557,32 @@ def switch_on(device_id):
 
 @shelly_bp.route('/api/device/<device_id>/off', methods=['POST'])
 def switch_off(device_id):
-    """Shelly ausschalten"""
+    """Shelly ausschalten (im Hintergrund)"""
     try:
         # device_id IST die IP-Adresse
         ip = device_id
         print(f"[SHELLY] Schalte Gerät {ip} AUS")
         
-        # Gen 2 API (Shelly Plus) - Versuche verschiedene IDs
-        for switch_id in [0, 1]:  # Manche Geräte haben mehrere Switches
-            try:
-                url = f'http://{ip}/rpc/Switch.Set'
-                payload = {'id': switch_id, 'on': False}
-                print(f"[SHELLY] Versuche Gen2 API: {url} mit switch_id={switch_id}")
-                
-                response = requests.post(
-                    url,
-                    json=payload,
-                    timeout=3
-                )
-                
-                print(f"[SHELLY] Response Status: {response.status_code}")
-                print(f"[SHELLY] Response Body: {response.text}")
-                
-                if response.status_code == 200:
-                    result = response.json()
-                    # Prüfe ob erfolgreich
-                    if result.get('was_on') is not None:
-                        print(f"[SHELLY] ✓ Gerät {ip} switch:{switch_id} erfolgreich ausgeschaltet")
-                        print(f"[SHELLY] War vorher: {'EIN' if result.get('was_on') else 'AUS'}")
-                        return jsonify({'success': True, 'message': f'Gerät {ip} ausgeschaltet', 'switch_id': switch_id})
-                    elif 'error' in result:
-                        print(f"[SHELLY] API Fehler: {result['error']}")
-                        if switch_id == 0:
-                            continue  # Versuche nächste ID
-            except requests.exceptions.Timeout:
-                print(f"[SHELLY] Gen2 API Timeout für {ip} switch:{switch_id}")
-            except Exception as e:
-                print(f"[SHELLY] Gen2 API Fehler für {ip} switch:{switch_id}: {e}")
+        if shelly_client.leistungsschalter(ip).ist_blockiert():
+            return jsonify({'success': False, 'error': 'Gerät nicht erreichbar'})
         
-        # Gen 1 API Fallback
-        try:
-            url = f'http://{ip}/relay/0?turn=off'
-            print(f"[SHELLY] Versuche Gen1 API: {url}")
-            response = requests.get(
-                url,
-                timeout=3
-            )
-            print(f"[SHELLY] Gen1 Response: {response.text}")
-            
-            if response.status_code == 200:
-                print(f"[SHELLY] ✓ Gerät {ip} erfolgreich ausgeschaltet (Gen1)")
-                return jsonify({'success': True, 'message': f'Gerät {ip} ausgeschaltet'})
-        except requests.exceptions.Timeout:
-            print(f"[SHELLY] Gen1 API Timeout für {ip}")
-        except Exception as e:
-            print(f"[SHELLY] Gen1 API Fehler für {ip}: {e}")
-        
-        print(f"[SHELLY] ✗ Gerät {ip} konnte nicht ausgeschaltet werden")
-        return jsonify({'success': False, 'error': 'Gerät nicht erreichbar'})
+        # Gen2 switch:0 und switch:1, danach Gen1
+        auftrag = shelly_client.auftrag_starten(ip, 'off', _ausschalten_mit_fallback, ip, max_anfragen=3)
+        return _auftrag_antwort(auftrag, f'Gerät {ip} wird ausgeschaltet')
         
     except Exception as e:
         print(f"[SHELLY] Fehler beim Ausschalten von {device_id}: {e}")
         return jsonify({'success': False, 'error': str(e)})
 
+@shelly_bp.route('/api/auftrag/<auftrag_id>')
+def auftrag_status(auftrag_id):
+    """Status eines Schaltauftrags (wartend, laeuft, fertig, fehler)"""
+    auftrag = shelly_client.auftrag_status(auftrag_id)
+    if not auftrag:
+        return jsonify({'success': False, 'error': 'Auftrag nicht gefunden'}), 404
+    
+    return jsonify({'success': True, 'auftrag': auftrag})
+
 @shelly_bp.route('/api/config', methods=['GET', 'POST'])
 def handle_config():
     """Konfiguration lesen oder speichern"""
@@ -696,6 +654,15 @@ def get_all_status():
             'error': str(e)
         })
 
+@shelly_bp.route('/api/snapshots')
+def get_snapshots():
+    """Letzte Messwerte aller vom Hintergrund-Poller beobachteten Geräte"""
+    return jsonify({
+        'success': True,
+        'intervall_sekunden': shelly_poller.INTERVALL_SEKUNDEN,
+        'geraete': shelly_poller.alle_snapshots()
+    })
+
 @shelly_bp.route('/api/kompressor/link', methods=['POST'])
 def link_kompressor():
     """Verknüpfe Shelly mit Kompressor-Modul"""
@@ -705,6 +672,7 @@ def link_kompressor():
         
         # Update Umgebungsvariable für Kompressor-Modul
         os.environ['SHELLY_KOMPRESSOR_IP'] = shelly_ip
+        shelly_poller.beobachten(shelly_ip, konfiguriert=True)
         
         print(f"[SHELLY] Kompressor verknüpft mit Shelly {shelly_ip}")
         
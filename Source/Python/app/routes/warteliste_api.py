@@ -1,13 +1,10 @@
 # Warteliste-Management API Routes
 from datetime import datetime, date
-from flask import Blueprint, jsonify, request, send_file
+from flask import Blueprint, jsonify, request
 from app.models.warteliste import WartelisteEintrag
 from app.models.flaschen import Flasche
 from app.models.kunden import Kunde
 from app import db
-import tempfile
-# import openpyxl  # Temporarily disabled
-# from openpyxl.styles import Font, Alignment, PatternFill
 
 bp = Blueprint('warteliste_api', __name__, url_prefix='/api/warteliste')
 
@@ -64,9 +61,9 @@ def warteliste_laden():
         prioritaet_order = {'hoch': 1, 'normal': 2, 'niedrig': 3}
         
         eintraege = WartelisteEintrag.query.filter_by(status='wartend').join(
-            Flasche
+            Flasche, WartelisteEintrag.flasche_id == Flasche.id
         ).join(
-            Kunde
+            Kunde, Flasche.kunde_id == Kunde.id
         ).add_columns(
             Flasche.flasche_nummer,
             Flasche.barcode,
@@ -129,45 +126,17 @@ def aus_warteliste_entfernen(warteliste_id):
 
 @bp.route('/statistiken')
 def warteliste_statistiken():
-    """Warteliste-Statistiken laden"""
+    """Warteliste-Statistiken laden (vorberechneter Snapshot)"""
     try:
-        heute = date.today()
-        
-        # Anzahl in Warteliste
-        in_warteliste = WartelisteEintrag.query.filter_by(status='wartend').count()
-        
-        # Heute angenommen
-        heute_angenommen = WartelisteEintrag.query.filter(
-            WartelisteEintrag.annahme_datum == heute
-        ).count()
-        
-        # Wartende Kunden (unique)
-        wartende_kunden = db.session.query(
-            Kunde.id
-        ).join(
-            Flasche
-        ).join(
-            WartelisteEintrag
-        ).filter(
-            WartelisteEintrag.status == 'wartend'
-        ).distinct().count()
-        
-        # Älteste Flasche
-        aeltester_eintrag = WartelisteEintrag.query.filter_by(
-            status='wartend'
-        ).order_by(
-            WartelisteEintrag.annahme_datum.asc()
-        ).first()
-        
-        aelteste_flasche = aeltester_eintrag.annahme_datum.isoformat() if aeltester_eintrag else None
+        stats = WartelisteEintrag.get_warteliste_statistiken()
         
         return jsonify({
             'success': True,
             'statistiken': {
-                'in_warteliste': in_warteliste,
-                'heute_angenommen': heute_angenommen,
-                'wartende_kunden': wartende_kunden,
-                'aelteste_flasche': aelteste_flasche
+                'in_warteliste': stats['wartend'],
+                'heute_angenommen': stats['heute_angenommen'],
+                'wartende_kunden': stats['wartende_kunden'],
+                'aelteste_flasche': stats['aeltester_eintrag']['datum']
             }
         })
         
@@ -185,9 +154,9 @@ def fuellbare_flaschen():
         prioritaet_order = {'hoch': 1, 'normal': 2, 'niedrig': 3}
         
         eintraege = WartelisteEintrag.query.filter_by(status='wartend').join(
-            Flasche
+            Flasche, WartelisteEintrag.flasche_id == Flasche.id
         ).join(
-            Kunde
+            Kunde, Flasche.kunde_id == Kunde.id
         ).add_columns(
             Flasche.flasche_nummer,
             Flasche.barcode,
@@ -285,16 +254,6 @@ def flasche_fuellen_abschliessen(warteliste_id):
 
 @bp.route('/export/excel')
 def warteliste_excel_export():
-    """Warteliste als Excel exportieren"""
-    try:
-        # Excel-Export temporär deaktiviert - openpyxl nicht installiert
-        return jsonify({
-            'success': False,
-            'error': 'Excel-Export benötigt openpyxl: pip install openpyxl'
-        }), 501
-        
-    except Exception as e:
-        return jsonify({
-            'success': False,
-            'error': str(e)
-        }), 500
+    """Warteliste als Excel exportieren (gestreamt, ?format=csv möglich)"""
+    from app.routes.export_api import export_response
+    return export_response('warteliste', request.args.get('format', 'xlsx').lower())
@@ -4,6 +4,8 @@
 from datetime import datetime, timedelta
 from typing import Dict, Any, Optional, List
 import logging
+from sqlalchemy import func, insert, or_, update
+from sqlalchemy.orm import joinedload
 from app import db
 from app.models import BulkFuellvorgang, FlascheFuellvorgang, Flasche, Kunde, KompressorBetrieb
 
@@ -65,15 +67,17 @@ class BulkFuellvorgangService:
             db.session.add(bulk_vorgang)
             db.session.flush()  # Für ID
             
-            # Flaschen hinzufügen falls angegeben
+            # Flaschen hinzufügen falls angegeben (gesammelt geprüft und eingefügt)
             hinzugefuegte_flaschen = 0
+            abgelehnt = []
             if flaschen_ids:
-                for flasche_id in flaschen_ids:
-                    result = BulkFuellvorgangService.flasche_hinzufuegen(
-                        bulk_vorgang.id, flasche_id, commit=False
-                    )
-                    if result['success']:
-                        hinzugefuegte_flaschen += 1
+                result = BulkFuellvorgangService.flaschen_hinzufuegen(
+                    bulk_vorgang.id, flaschen_ids, commit=False, bulk_vorgang=bulk_vorgang
+                )
+                if not result['success']:
+                    raise ValueError(result['error'])
+                hinzugefuegte_flaschen = len(result['hinzugefuegt'])
+                abgelehnt = result['abgelehnt']
             
             db.session.commit()
             
@@ -83,7 +87,8 @@ class BulkFuellvorgangService:
                 'success': True,
                 'message': f'Bulk-Füllvorgang erstellt mit {hinzugefuegte_flaschen} Flaschen',
                 'bulk_vorgang': bulk_vorgang.to_dict(include_flaschen=True),
-                'kompressor_id': kompressor.id
+                'kompressor_id': kompressor.id,
+                'abgelehnt': abgelehnt
             }
             
         except Exception as e:
@@ -95,24 +100,30 @@ class BulkFuellvorgangService:
             }
     
     @staticmethod
-    def flasche_hinzufuegen(bulk_vorgang_id: int, flasche_id: int, 
-                           ziel_druck: int = 300, commit: bool = True) -> Dict[str, Any]:
+    def flaschen_hinzufuegen(bulk_vorgang_id: int, flaschen_ids: List[int],
+                             ziel_druck: int = 300, commit: bool = True,
+                             bulk_vorgang: BulkFuellvorgang = None) -> Dict[str, Any]:
         """
-        Fügt Flasche zum Bulk-Füllvorgang hinzu
+        Fügt mehrere Flaschen in einem Schritt zum Bulk-Füllvorgang hinzu
+        
+        Alle Flaschen werden mit einer Abfrage geprüft (aktiv, TÜV gültig,
+        Mindestdruck, nicht bereits in einem aktiven Bulk-Vorgang) und die
+        FlascheFuellvorgang-Zeilen mit einem INSERT angelegt.
         
         Args:
             bulk_vorgang_id: ID des Bulk-Vorgangs
-            flasche_id: ID der Flasche
-            ziel_druck: Zieldruck in Bar
+            flaschen_ids: Liste von Flaschen-IDs
+            ziel_druck: Zieldruck in Bar (für alle Flaschen)
             commit: DB-Commit ausführen
+            bulk_vorgang: Bereits geladener Bulk-Vorgang (spart eine Abfrage)
         
         Returns:
-            Dict mit Ergebnis
+            Dict mit hinzugefügten und abgelehnten Flaschen (inkl. Grund)
         """
         
         try:
-            # Bulk-Vorgang finden
-            bulk_vorgang = BulkFuellvorgang.query.get(bulk_vorgang_id)
+            if bulk_vorgang is None:
+                bulk_vorgang = BulkFuellvorgang.query.get(bulk_vorgang_id)
             if not bulk_vorgang:
                 return {
                     'success': False,
@@ -125,55 +136,115 @@ class BulkFuellvorgangService:
                     'error': 'Flaschen können nur in Vorbereitung oder laufendem Vorgang hinzugefügt werden'
                 }
             
-            # Flasche finden und prüfen
-            flasche = Flasche.query.get(flasche_id)
-            if not flasche:
-                return {
-                    'success': False,
-                    'error': 'Flasche nicht gefunden'
-                }
+            hinzugefuegt = []
+            abgelehnt = []
             
-            if not flasche.ist_fuellbereit:
-                return {
-                    'success': False,
-                    'error': f'Flasche {flasche.flaschennummer} ist nicht füllbereit (TÜV, Status, etc.)'
-                }
+            # Doppelte IDs in der Anfrage nur einmal berücksichtigen
+            ids = []
+            for flasche_id in flaschen_ids or []:
+                if flasche_id in ids:
+                    abgelehnt.append({'flasche_id': flasche_id, 'grund': 'Mehrfach in der Anfrage'})
+                else:
+                    ids.append(flasche_id)
             
-            # Prüfe ob Flasche bereits hinzugefügt
-            existing = bulk_vorgang.flasche_fuellungen.filter_by(flasche_id=flasche_id).first()
-            if existing:
+            if not ids:
                 return {
-                    'success': False,
-                    'error': f'Flasche {flasche.flaschennummer} bereits im Bulk-Vorgang'
+                    'success': True,
+                    'message': 'Keine Flaschen hinzugefügt',
+                    'hinzugefuegt': hinzugefuegt,
+                    'abgelehnt': abgelehnt
                 }
             
-            # Flasche hinzufügen
-            flasche_fuellung = FlascheFuellvorgang(
-                bulk_fuellvorgang_id=bulk_vorgang_id,
-                flasche_id=flasche_id,
-                ziel_druck=ziel_druck,
-                status='wartend'
-            )
-            
-            db.session.add(flasche_fuellung)
-            bulk_vorgang.anzahl_flaschen += 1
-            
-            # Flasche als vorgemerkt markieren
-            flasche.vormerkung_setzen(True)
+            # Mitgliedschaft in diesem oder einem anderen aktiven Bulk-Vorgang
+            aktive_mitgliedschaft = db.session.query(
+                FlascheFuellvorgang.flasche_id.label('flasche_id'),
+                func.max(FlascheFuellvorgang.bulk_fuellvorgang_id).label('bulk_id')
+            ).join(
+                BulkFuellvorgang, BulkFuellvorgang.id == FlascheFuellvorgang.bulk_fuellvorgang_id
+            ).filter(
+                FlascheFuellvorgang.flasche_id.in_(ids),
+                or_(
+                    BulkFuellvorgang.id == bulk_vorgang.id,
+                    BulkFuellvorgang.status.in_(['vorbereitung', 'laufend'])
+                )
+            ).group_by(FlascheFuellvorgang.flasche_id).subquery()
+            
+            zeilen = db.session.query(
+                Flasche.id, Flasche.flasche_nummer, Flasche.ist_aktiv,
+                Flasche.naechste_pruefung, Flasche.max_druck_bar,
+                aktive_mitgliedschaft.c.bulk_id
+            ).outerjoin(
+                aktive_mitgliedschaft, aktive_mitgliedschaft.c.flasche_id == Flasche.id
+            ).filter(Flasche.id.in_(ids)).all()
+            
+            gefunden = {zeile.id: zeile for zeile in zeilen}
+            heute = datetime.utcnow().date()
+            
+            for flasche_id in ids:
+                zeile = gefunden.get(flasche_id)
+                if zeile is None:
+                    abgelehnt.append({'flasche_id': flasche_id, 'grund': 'Flasche nicht gefunden'})
+                    continue
+                
+                grund = None
+                if zeile.bulk_id == bulk_vorgang.id:
+                    grund = 'Bereits im Bulk-Vorgang'
+                elif zeile.bulk_id is not None:
+                    grund = f'Bereits in aktivem Bulk-Vorgang {zeile.bulk_id}'
+                elif not zeile.ist_aktiv:
+                    grund = 'Flasche ist nicht aktiv'
+                elif not zeile.naechste_pruefung or zeile.naechste_pruefung <= heute:
+                    grund = 'TÜV-Prüfung fällig'
+                elif (zeile.max_druck_bar or 0) < 200:
+                    grund = f'Max. Druck zu niedrig ({zeile.max_druck_bar} Bar)'
+                
+                if grund:
+                    abgelehnt.append({
+                        'flasche_id': flasche_id,
+                        'flasche_nummer': zeile.flasche_nummer,
+                        'grund': grund
+                    })
+                else:
+                    hinzugefuegt.append({'flasche_id': flasche_id, 'flasche_nummer': zeile.flasche_nummer})
+            
+            if hinzugefuegt:
+                neue_ids = [f['flasche_id'] for f in hinzugefuegt]
+                
+                db.session.execute(insert(FlascheFuellvorgang), [
+                    {
+                        'bulk_fuellvorgang_id': bulk_vorgang.id,
+                        'flasche_id': flasche_id,
+                        'ziel_druck': ziel_druck,
+                        'status': 'wartend'
+                    }
+                    for flasche_id in neue_ids
+                ])
+                
+                # Flaschen als vorgemerkt markieren
+                db.session.execute(
+                    update(Flasche).where(Flasche.id.in_(neue_ids)).values(ist_zum_fuellen_vorgemerkt=True),
+                    execution_options={'synchronize_session': False}
+                )
+                
+                bulk_vorgang.anzahl_flaschen = (bulk_vorgang.anzahl_flaschen or 0) + len(neue_ids)
             
             if commit:
                 db.session.commit()
             
-            logger.info(f"Flasche {flasche.flaschennummer} zu Bulk-Vorgang {bulk_vorgang_id} hinzugefügt")
+            logger.info(
+                f"{len(hinzugefuegt)} Flaschen zu Bulk-Vorgang {bulk_vorgang.id} hinzugefügt, "
+                f"{len(abgelehnt)} abgelehnt"
+            )
             
             return {
                 'success': True,
-                'message': f'Flasche {flasche.flaschennummer} hinzugefügt',
-                'flasche_fuellung': flasche_fuellung.to_dict()
+                'message': f'{len(hinzugefuegt)} Flaschen hinzugefügt, {len(abgelehnt)} abgelehnt',
+                'hinzugefuegt': hinzugefuegt,
+                'abgelehnt': abgelehnt
             }
             
         except Exception as e:
-            logger.error(f"Fehler beim Hinzufügen der Flasche: {str(e)}")
+            logger.error(f"Fehler beim Hinzufügen der Flaschen: {str(e)}")
             if commit:
                 db.session.rollback()
             return {
@@ -181,6 +252,47 @@ class BulkFuellvorgangService:
                 'error': f'Fehler: {str(e)}'
             }
     
+    @staticmethod
+    def flasche_hinzufuegen(bulk_vorgang_id: int, flasche_id: int, 
+                           ziel_druck: int = 300, commit: bool = True) -> Dict[str, Any]:
+        """
+        Fügt Flasche zum Bulk-Füllvorgang hinzu
+        
+        Args:
+            bulk_vorgang_id: ID des Bulk-Vorgangs
+            flasche_id: ID der Flasche
+            ziel_druck: Zieldruck in Bar
+            commit: DB-Commit ausführen
+        
+        Returns:
+            Dict mit Ergebnis
+        """
+        
+        result = BulkFuellvorgangService.flaschen_hinzufuegen(
+            bulk_vorgang_id, [flasche_id], ziel_druck, commit=commit
+        )
+        if not result['success']:
+            return result
+        
+        if result['abgelehnt']:
+            abgelehnt = result['abgelehnt'][0]
+            bezeichnung = f"Flasche {abgelehnt['flasche_nummer']}" if abgelehnt.get('flasche_nummer') else 'Flasche'
+            return {
+                'success': False,
+                'error': f"{bezeichnung}: {abgelehnt['grund']}"
+            }
+        
+        flasche_nummer = result['hinzugefuegt'][0]['flasche_nummer']
+        flasche_fuellung = FlascheFuellvorgang.query.filter_by(
+            bulk_fuellvorgang_id=bulk_vorgang_id, flasche_id=flasche_id
+        ).first()
+        
+        return {
+            'success': True,
+            'message': f'Flasche {flasche_nummer} hinzugefügt',
+            'flasche_fuellung': flasche_fuellung.to_dict() if flasche_fuellung else None
+        }
+    
     @staticmethod
     def flasche_entfernen(bulk_vorgang_id: int, flasche_id: int) -> Dict[str, Any]:
         """
@@ -434,6 +546,118 @@ class BulkFuellvorgangService:
                 'error': f'Fehler: {str(e)}'
             }
     
+    @staticmethod
+    def flaschen_ergebnisse_setzen(bulk_vorgang_id: int,
+                                  eintraege: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Markiert mehrere Flaschen in einer Transaktion als gefüllt/fehlgeschlagen
+        
+        Die Liste wird vollständig geprüft, bevor etwas geändert wird: ist ein
+        Eintrag ungültig, bleibt der ganze Batch unverändert. Die Zähler des
+        Bulk-Vorgangs werden einmal pro Batch aus den Flaschen-Status berechnet.
+        
+        Args:
+            bulk_vorgang_id: ID des Bulk-Vorgangs
+            eintraege: Liste von {flasche_id, status ('gefuellt'|'fehlgeschlagen'),
+                       druck (optional), grund (optional)}
+        
+        Returns:
+            Dict mit Ergebnis je Flasche und neuem Bulk-Status
+        """
+        
+        try:
+            bulk_vorgang = BulkFuellvorgang.query.get(bulk_vorgang_id)
+            if not bulk_vorgang:
+                return {
+                    'success': False,
+                    'error': 'Bulk-Füllvorgang nicht gefunden'
+                }
+            
+            flaschen_ids = [eintrag.get('flasche_id') for eintrag in eintraege]
+            fuellungen = {
+                ff.flasche_id: ff
+                for ff in FlascheFuellvorgang.query.options(
+                    joinedload(FlascheFuellvorgang.flasche)
+                ).filter(
+                    FlascheFuellvorgang.bulk_fuellvorgang_id == bulk_vorgang_id,
+                    FlascheFuellvorgang.flasche_id.in_(flaschen_ids)
+                ).all()
+            }
+            
+            # Erst alles prüfen, dann ändern
+            fehler = []
+            gesehen = set()
+            for eintrag in eintraege:
+                flasche_id = eintrag.get('flasche_id')
+                flasche_fuellung = fuellungen.get(flasche_id)
+                if flasche_id in gesehen:
+                    fehler.append({'flasche_id': flasche_id, 'error': 'Mehrfach im Batch'})
+                elif eintrag.get('status') not in ('gefuellt', 'fehlgeschlagen'):
+                    fehler.append({'flasche_id': flasche_id, 'error': f"Ungültiger Status: {eintrag.get('status')}"})
+                elif not flasche_fuellung:
+                    fehler.append({'flasche_id': flasche_id, 'error': 'Flasche nicht im Bulk-Vorgang gefunden'})
+                elif flasche_fuellung.status != 'wartend':
+                    fehler.append({
+                        'flasche_id': flasche_id,
+                        'error': f'Flasche bereits bearbeitet (Status: {flasche_fuellung.status})'
+                    })
+                gesehen.add(flasche_id)
+            
+            if fehler:
+                return {
+                    'success': False,
+                    'error': f'{len(fehler)} Einträge ungültig, keine Änderungen gespeichert',
+                    'fehler': fehler
+                }
+            
+            ergebnisse = []
+            for eintrag in eintraege:
+                flasche_fuellung = fuellungen[eintrag['flasche_id']]
+                flasche = flasche_fuellung.flasche
+                
+                if eintrag['status'] == 'gefuellt':
+                    druck = eintrag.get('druck')
+                    flasche_fuellung.als_erfolgreich_markieren(druck)
+                    if druck:
+                        flasche.letzter_fuellstand = druck
+                else:
+                    flasche_fuellung.als_fehlgeschlagen_markieren(eintrag.get('grund'))
+                
+                flasche.ist_zum_fuellen_vorgemerkt = False
+                ergebnisse.append(flasche_fuellung.to_dict())
+            
+            # Zähler einmal aus dem Datenbestand berechnen (Autoflush enthält den Batch)
+            zaehler = dict(db.session.query(
+                FlascheFuellvorgang.status, func.count(FlascheFuellvorgang.id)
+            ).filter(
+                FlascheFuellvorgang.bulk_fuellvorgang_id == bulk_vorgang_id
+            ).group_by(FlascheFuellvorgang.status).all())
+            bulk_vorgang.erfolgreich_gefuellt = zaehler.get('gefuellt', 0)
+            bulk_vorgang.fehlgeschlagen = zaehler.get('fehlgeschlagen', 0)
+            
+            db.session.commit()
+            
+            logger.info(f"Bulk-Vorgang {bulk_vorgang_id}: {len(ergebnisse)} Flaschen-Ergebnisse gespeichert")
+            
+            return {
+                'success': True,
+                'message': f'{len(ergebnisse)} Flaschen aktualisiert',
+                'flasche_fuellungen': ergebnisse,
+                'bulk_status': {
+                    'bearbeitet': bulk_vorgang.bearbeitete_flaschen,
+                    'offen': bulk_vorgang.offene_flaschen,
+                    'erfolgsquote': bulk_vorgang.erfolgsquote_prozent
+                }
+            }
+            
+        except Exception as e:
+            logger.error(f"Fehler beim Speichern der Flaschen-Ergebnisse: {str(e)}")
+            db.session.rollback()
+            return {
+                'success': False,
+                'error': f'Fehler: {str(e)}'
+            }
+    
     @staticmethod
     def bulk_vorgang_beenden(bulk_vorgang_id: int, notizen: str = None) -> Dict[str, Any]:
         """
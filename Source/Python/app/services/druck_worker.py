@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+Druck-Worker für ESC/POS-Etiketten (print_jobs) im WartungsManager
+
+Web-Anfragen legen nur einen Druckjob an (status 'pending') und kehren
+sofort zurück. Ein einzelner Hintergrund-Thread arbeitet die Tabelle
+print_jobs ab:
+
+- eine dauerhafte Verbindung je PrinterKonfiguration (statt einer neuen
+  USB-/Serial-/Netzwerk-Verbindung pro Etikett); nach längerer Ruhe oder
+  einem Fehler wird sie geschlossen und beim nächsten Job neu geöffnet
+- aufeinanderfolgende Etiketten desselben Druckers werden als Stapel über
+  diese Verbindung gedruckt und gemeinsam committet
+- fehlgeschlagene Jobs bleiben 'pending' und werden mit exponentiellem
+  Backoff wiederholt; nach MAX_VERSUCHE Versuchen werden sie 'error'
+- PrinterStatus wird nur bei Zustandswechseln protokolliert
+"""
+
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from app import db
+from app.models.print_jobs import PrintJob, PrinterKonfiguration, PrinterStatus
+from app.services.print_service import print_service, ESCPOS_AVAILABLE
+
+if ESCPOS_AVAILABLE:
+    from escpos.printer import Dummy
+
+logger = logging.getLogger(__name__)
+
+
+class DruckWorker:
+    """Arbeitet die Druckwarteschlange im Hintergrund ab (ein Thread pro Prozess)"""
+
+    # Abfrage-Takt: Jobs aus anderen Worker-Prozessen werden spätestens dann gedruckt
+    POLL_SEKUNDEN = 2.0
+
+    MAX_VERSUCHE = 5
+    BACKOFF_BASIS_SEKUNDEN = 5.0
+    BACKOFF_MAX_SEKUNDEN = 300.0
+
+    # Etiketten pro Stapel (danach wird committet und neu gelesen)
+    MAX_STAPEL = 20
+
+    # Ungenutzte Druckerverbindungen nach dieser Zeit schließen
+    LEERLAUF_SEKUNDEN = 300.0
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._app = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._aufwecken = threading.Event()
+        # drucker_id -> {'instanz', 'signatur', 'geoeffnet', 'zuletzt'}
+        self._verbindungen: Dict[Optional[int], Dict[str, Any]] = {}
+        # drucker_id -> zuletzt protokollierter Status ('online' / 'error')
+        self._drucker_status: Dict[int, str] = {}
+        self._gedruckt = 0
+        self._fehlgeschlagen = 0
+
+    @property
+    def laeuft(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def init_app(self, app):
+        """Übernimmt die Konfiguration und startet den Thread"""
+        self._app = app
+        self.POLL_SEKUNDEN = app.config.get('DRUCK_POLL_INTERVALL', self.POLL_SEKUNDEN)
+        self.MAX_VERSUCHE = app.config.get('DRUCK_MAX_VERSUCHE', self.MAX_VERSUCHE)
+        if self.laeuft:
+            return
+
+        # Beim letzten Beenden unterbrochene Jobs wieder einreihen
+        with app.app_context():
+            try:
+                PrintJob.query.filter_by(status='printing').update(
+                    {'status': 'pending'}, synchronize_session=False
+                )
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                logger.warning(f"Druckwarteschlange nicht verfügbar: {e}")
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._schleife, name='druck-worker', daemon=True)
+        self._thread.start()
+
+    def anstossen(self):
+        """Weckt den Worker (neuer Job in diesem Prozess)"""
+        self._aufwecken.set()
+
+    def stoppen(self):
+        self._stop.set()
+        self._aufwecken.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self._alle_verbindungen_schliessen()
+
+    def status(self) -> Dict[str, Any]:
+        """Zustand des Workers für /api/printer/status"""
+        with self._lock:
+            verbindungen = [
+                {'drucker_id': drucker_id,
+                 'offen_seit_sekunden': round(time.monotonic() - v['geoeffnet'], 1)}
+                for drucker_id, v in self._verbindungen.items()
+            ]
+            return {
+                'laeuft': self.laeuft,
+                'verbindungen': verbindungen,
+                'gedruckt': self._gedruckt,
+                'fehlgeschlagen': self._fehlgeschlagen
+            }
+
+    def _schleife(self):
+        while not self._stop.is_set():
+            self._aufwecken.wait(self.POLL_SEKUNDEN)
+            self._aufwecken.clear()
+            if self._stop.is_set():
+                break
+            try:
+                with self._app.app_context():
+                    self.abarbeiten()
+            except Exception as e:
+                logger.warning(f"Druck-Worker: {e}")
+            self._leerlauf_schliessen()
+
+    @classmethod
+    def backoff(cls, druckversuche: int) -> float:
+        """Wartezeit vor dem nächsten Versuch (5s, 10s, 20s, ... höchstens 5 min)"""
+        return min(cls.BACKOFF_BASIS_SEKUNDEN * 2 ** max(druckversuche - 1, 0), cls.BACKOFF_MAX_SEKUNDEN)
+
+    def faellige_jobs(self) -> List[PrintJob]:
+        """Wartende Jobs, deren Backoff abgelaufen ist (älteste zuerst)"""
+        jetzt = datetime.utcnow()
+        faellig = []
+        for job in PrintJob.get_pending_jobs():
+            if job.druckversuche and job.letzter_druckversuch and \
+                    job.letzter_druckversuch + timedelta(seconds=self.backoff(job.druckversuche)) > jetzt:
+                continue
+            faellig.append(job)
+            if len(faellig) >= self.MAX_STAPEL:
+                break
+        return faellig
+
+    def abarbeiten(self) -> int:
+        """
+        Druckt alle fälligen Jobs (innerhalb eines App-Kontexts aufrufen)
+
+        Returns:
+            Anzahl erfolgreich gedruckter Etiketten
+        """
+        gedruckt = 0
+        while not self._stop.is_set():
+            jobs = self.faellige_jobs()
+            if not jobs:
+                break
+
+            # Stapel je Drucker, Reihenfolge innerhalb des Druckers bleibt erhalten
+            stapel: Dict[Optional[int], List[PrintJob]] = {}
+            for job in jobs:
+                stapel.setdefault(job.drucker_id, []).append(job)
+
+            fehler = False
+            for drucker_id, stapel_jobs in stapel.items():
+                erfolgreich = self._stapel_drucken(drucker_id, stapel_jobs)
+                gedruckt += erfolgreich
+                fehler = fehler or erfolgreich < len(stapel_jobs)
+
+            # Fehlgeschlagene Jobs warten auf ihren Backoff
+            if fehler:
+                break
+        return gedruckt
+
+    def _stapel_drucken(self, drucker_id: Optional[int], jobs: List[PrintJob]) -> int:
+        """Druckt einen Stapel über die Verbindung des Druckers; liefert die Anzahl gedruckter Jobs"""
+        jetzt = datetime.utcnow()
+        for job in jobs:
+            job.status = 'printing'
+            job.letzter_druckversuch = jetzt
+            job.druckversuche += 1
+        db.session.commit()
+
+        drucker_config = (db.session.get(PrinterKonfiguration, drucker_id) if drucker_id
+                          else PrinterKonfiguration.get_standard_drucker())
+
+        gedruckt = 0
+        fehler_nachricht = None
+        try:
+            instanz = self._verbindung(drucker_config)
+            for job in jobs:
+                print_service.etikett_drucken(instanz, job, drucker_config)
+                job.status = 'success'
+                job.gedruckt_am = datetime.utcnow()
+                job.fehler_nachricht = None
+                gedruckt += 1
+        except Exception as e:
+            fehler_nachricht = f"Druck fehlgeschlagen: {e}"
+            logger.warning(f"Druck-Worker ({drucker_config.name if drucker_config else 'kein Drucker'}): {e}")
+            self._verbindung_schliessen(drucker_config.id if drucker_config else None)
+
+        for job in jobs[gedruckt:]:
+            job.fehler_nachricht = fehler_nachricht
+            job.status = 'error' if job.druckversuche >= self.MAX_VERSUCHE else 'pending'
+        db.session.commit()
+
+        # 'online' erst nach einem tatsächlich gesendeten Etikett (nicht schon beim Öffnen)
+        if fehler_nachricht:
+            self._status_protokollieren(drucker_config, 'error', fehler_nachricht)
+        elif gedruckt:
+            self._status_protokollieren(drucker_config, 'online', 'Etiketten gedruckt (Druck-Worker)')
+
+        with self._lock:
+            self._gedruckt += gedruckt
+            self._fehlgeschlagen += len(jobs) - gedruckt
+        if gedruckt:
+            logger.info(f"Druck-Worker: {gedruckt} Etikett(en) gedruckt")
+        return gedruckt
+
+    # ------------------------------------------------------------------
+    # Dauerhafte Druckerverbindungen
+    # ------------------------------------------------------------------
+
+    def _verbindung(self, drucker_config: Optional[PrinterKonfiguration]):
+        """Offene Verbindung des Druckers (wird bei Bedarf bzw. Konfigurationsänderung neu geöffnet)"""
+        if not ESCPOS_AVAILABLE:
+            return None  # Druck simulieren (Entwicklung ohne python-escpos)
+        if drucker_config is None:
+            return Dummy()
+
+        signatur = (drucker_config.interface_typ, drucker_config.verbindung_config)
+        with self._lock:
+            verbindung = self._verbindungen.get(drucker_config.id)
+        if verbindung and verbindung['signatur'] != signatur:
+            self._verbindung_schliessen(drucker_config.id)
+            verbindung = None
+
+        if verbindung is None:
+            instanz = print_service.verbindung_oeffnen(drucker_config)
+            verbindung = {'instanz': instanz, 'signatur': signatur, 'geoeffnet': time.monotonic()}
+            with self._lock:
+                self._verbindungen[drucker_config.id] = verbindung
+
+        verbindung['zuletzt'] = time.monotonic()
+        return verbindung['instanz']
+
+    def _verbindung_schliessen(self, drucker_id: Optional[int]):
+        with self._lock:
+            verbindung = self._verbindungen.pop(drucker_id, None)
+        if verbindung is None:
+            return
+        try:
+            schliessen = getattr(verbindung['instanz'], 'close', None)
+            if schliessen:
+                schliessen()
+        except Exception as e:
+            logger.debug(f"Druckerverbindung {drucker_id} nicht sauber geschlossen: {e}")
+
+    def _leerlauf_schliessen(self):
+        grenze = time.monotonic() - self.LEERLAUF_SEKUNDEN
+        with self._lock:
+            ungenutzt = [d for d, v in self._verbindungen.items() if v.get('zuletzt', 0) < grenze]
+        for drucker_id in ungenutzt:
+            self._verbindung_schliessen(drucker_id)
+
+    def _alle_verbindungen_schliessen(self):
+        with self._lock:
+            drucker_ids = list(self._verbindungen)
+        for drucker_id in drucker_ids:
+            self._verbindung_schliessen(drucker_id)
+
+    def _status_protokollieren(self, drucker_config: Optional[PrinterKonfiguration], status: str, nachricht: str):
+        """PrinterStatus nur bei Zustandswechseln schreiben"""
+        if drucker_config is None or self._drucker_status.get(drucker_config.id) == status:
+            return
+        self._drucker_status[drucker_config.id] = status
+        try:
+            PrinterStatus.log_status(drucker_id=drucker_config.id, status=status, nachricht=nachricht[:255])
+        except Exception as e:
+            db.session.rollback()
+            logger.debug(f"Drucker-Status nicht protokolliert: {e}")
+
+
+# Globale Instanz (ein Druck-Thread im Prozess mit den Hintergrund-Diensten)
+druck_worker = DruckWorker()
@@ -0,0 +1,233 @@
+# Ereignis-Bus für Server-Sent Events (SSE)
+# Veröffentlicht Zustandsänderungen an alle offenen Seiten statt Timer-Polling
+
+import json
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, object_session
+
+logger = logging.getLogger(__name__)
+
+
+class Abonnement:
+    """Warteschlange eines verbundenen Clients"""
+
+    def __init__(self, kanaele: Optional[Iterable[str]], max_groesse: int):
+        self.kanaele = set(kanaele) if kanaele else None  # None = alle Kanäle
+        self.queue: queue.Queue = queue.Queue(maxsize=max_groesse)
+        self.verloren = False
+
+    def passt(self, ereignis: Dict[str, Any]) -> bool:
+        return self.kanaele is None or ereignis['kanal'] in self.kanaele
+
+
+class ZuVieleClients(Exception):
+    """Maximale Anzahl gleichzeitiger Push-Verbindungen erreicht"""
+
+
+class EreignisBus:
+    """
+    Prozessweiter Publish/Subscribe-Bus
+
+    - veroeffentlichen() ist thread-sicher und blockiert nie
+    - Clients mit voller Warteschlange werden getrennt (Browser verbindet neu)
+    - Die letzten Ereignisse werden für Last-Event-ID nachgeliefert
+    - Jede Verbindung belegt einen Server-Thread, daher ist die Anzahl
+      begrenzt (EREIGNISSE_MAX_CLIENTS); weitere Seiten pollen per Timer
+    """
+
+    MAX_WARTESCHLANGE = 200
+    HISTORIE = 500
+    HEARTBEAT_SEKUNDEN = 5.0
+    PRUEF_SEKUNDEN = 1.0  # Intervall für die Prüfung auf getrennte Clients
+    MAX_CLIENTS = 16
+
+    # Wartezeit, die der Browser vor einem Neuverbinden einhält
+    RETRY_MS = 3000
+    # Wartezeit bis zum nächsten Versuch, wenn alle Plätze belegt sind
+    BESETZT_RETRY_MS = 60000
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._abonnements: List[Abonnement] = []
+        self._historie: deque = deque(maxlen=self.HISTORIE)
+        self._naechste_id = 1
+        self.max_clients = self.MAX_CLIENTS
+
+    def veroeffentlichen(self, kanal: str, typ: str, daten: Optional[Dict[str, Any]] = None):
+        """Verteilt ein Ereignis an alle passenden Abonnements"""
+        with self._lock:
+            ereignis = {
+                'id': self._naechste_id,
+                'kanal': kanal,
+                'typ': typ,
+                'zeit': datetime.now().isoformat(),
+                'daten': daten or {}
+            }
+            self._naechste_id += 1
+            self._historie.append(ereignis)
+            abonnements = list(self._abonnements)
+
+        for abo in abonnements:
+            if not abo.passt(ereignis):
+                continue
+            try:
+                abo.queue.put_nowait(ereignis)
+            except queue.Full:
+                # Langsamer Client: trennen statt Speicher zu füllen
+                abo.verloren = True
+
+    def abonnieren(self, kanaele: Optional[Iterable[str]] = None,
+                   letzte_id: Optional[int] = None,
+                   begrenzt: bool = False) -> Abonnement:
+        """begrenzt: ZuVieleClients, wenn max_clients bereits verbunden sind"""
+        abo = Abonnement(kanaele, self.MAX_WARTESCHLANGE)
+        with self._lock:
+            if begrenzt and len(self._abonnements) >= self.max_clients:
+                raise ZuVieleClients(self.max_clients)
+            if letzte_id is not None:
+                for ereignis in self._historie:
+                    if ereignis['id'] > letzte_id and abo.passt(ereignis):
+                        abo.queue.put_nowait(ereignis)
+            self._abonnements.append(abo)
+        return abo
+
+    def abmelden(self, abo: Abonnement):
+        with self._lock:
+            if abo in self._abonnements:
+                self._abonnements.remove(abo)
+
+    @property
+    def anzahl_clients(self) -> int:
+        with self._lock:
+            return len(self._abonnements)
+
+    def sse_stream(self, kanaele: Optional[Iterable[str]] = None,
+                   letzte_id: Optional[int] = None,
+                   abo: Optional[Abonnement] = None,
+                   getrennt: Optional[Callable[[], bool]] = None) -> Iterator[str]:
+        """
+        Generator im text/event-stream-Format (mit Heartbeat-Kommentaren)
+
+        abo: bereits angelegtes Abonnement (sonst wird eines angelegt)
+        getrennt: meldet getrennte Clients ohne auf den nächsten
+        Heartbeat zu warten (waitress.client_disconnected)
+        """
+        if abo is None:
+            abo = self.abonnieren(kanaele, letzte_id)
+        wartezeit = self.PRUEF_SEKUNDEN if getrennt else self.HEARTBEAT_SEKUNDEN
+        try:
+            yield f"retry: {self.RETRY_MS}\n\n"
+            naechster_heartbeat = time.monotonic() + self.HEARTBEAT_SEKUNDEN
+            while not abo.verloren:
+                if getrennt and getrennt():
+                    break
+                try:
+                    ereignis = abo.queue.get(timeout=wartezeit)
+                except queue.Empty:
+                    # Hält Proxys/NAT offen und erkennt getrennte Clients
+                    if time.monotonic() >= naechster_heartbeat:
+                        naechster_heartbeat = time.monotonic() + self.HEARTBEAT_SEKUNDEN
+                        yield f": heartbeat {int(time.time())}\n\n"
+                    continue
+                yield (
+                    f"id: {ereignis['id']}\n"
+                    f"event: {ereignis['kanal']}\n"
+                    f"data: {json.dumps(ereignis, default=str)}\n\n"
+                )
+        finally:
+            self.abmelden(abo)
+
+
+# Globaler Bus (pro Prozess)
+ereignis_bus = EreignisBus()
+
+
+# ============================================================================
+# SQLAlchemy-Events: Änderungen nach erfolgreichem Commit veröffentlichen
+# ============================================================================
+
+_PENDING_KEY = 'ereignis_bus_pending'
+
+
+def _vormerken(kanal: str, target, aktion: str):
+    session = object_session(target)
+    if session is None:
+        return
+    # Nur bereits geladene Werte lesen (kein Nachladen während des Flush)
+    identitaet = inspect(target).identity
+    daten = {
+        'typ': type(target).__name__,
+        'id': identitaet[0] if identitaet else target.__dict__.get('id'),
+        'aktion': aktion
+    }
+    status = target.__dict__.get('status')
+    if isinstance(status, str):
+        daten['status'] = status
+    session.info.setdefault(_PENDING_KEY, []).append((kanal, daten))
+
+
+def beobachten(model, kanal: str):
+    """Veröffentlicht Inserts/Updates/Deletes eines Models auf einem Kanal"""
+    for aktion, name in (('neu', 'after_insert'), ('geaendert', 'after_update'),
+                         ('geloescht', 'after_delete')):
+        def _listener(mapper, connection, target, aktion=aktion):
+            _vormerken(kanal, target, aktion)
+        event.listen(model, name, _listener)
+
+
+@event.listens_for(Session, 'after_commit')
+def _nach_commit(session):
+    pending = session.info.pop(_PENDING_KEY, None)
+    if not pending:
+        return
+    # Mehrfache Änderungen am selben Objekt nur einmal (mit letztem Stand) melden
+    letzte = {}
+    for kanal, daten in pending:
+        schluessel = (kanal, daten['typ'], daten['id'])
+        letzte.pop(schluessel, None)
+        letzte[schluessel] = (kanal, daten)
+    for kanal, daten in letzte.values():
+        ereignis_bus.veroeffentlichen(kanal, 'datensatz', daten)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _nach_rollback(session):
+    session.info.pop(_PENDING_KEY, None)
+
+
+def init_app(app):
+    """Registriert die beobachteten Models je Kanal"""
+    ereignis_bus.max_clients = app.config.get('EREIGNISSE_MAX_CLIENTS', EreignisBus.MAX_CLIENTS)
+
+    from app.models import (
+        KompressorBetrieb, WartelisteEintrag, BulkFuellvorgang, FlascheFuellvorgang,
+        Wartungsintervall, Wartung, Patronenwechsel, PatroneVorbereitung,
+        PatroneWechselProtokoll, Kunde, FuellManager, FuellVorgangErweitert
+    )
+
+    kanaele = {
+        'kompressor': [KompressorBetrieb],
+        'warteliste': [WartelisteEintrag],
+        'bulk': [BulkFuellvorgang, FlascheFuellvorgang],
+        'wartung': [Wartungsintervall, Wartung, Patronenwechsel,
+                    PatroneVorbereitung, PatroneWechselProtokoll],
+        'kunden': [Kunde],
+        'fuellmanager': [FuellManager, FuellVorgangErweitert],
+    }
+    for kanal, models in kanaele.items():
+        for model in models:
+            if model not in _registriert:
+                beobachten(model, kanal)
+                _registriert.add(model)
+
+
+# Models, deren Listener bereits registriert sind (create_app kann mehrfach laufen)
+_registriert = set()
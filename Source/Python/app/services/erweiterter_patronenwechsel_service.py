@@ -152,35 +152,7 @@ class ErweiterterPatronenwechselService:
         
         try:
             status = Patronenwechsel.get_patronenwechsel_status()
-            
-            # Nur die wichtigsten Infos für Dashboard
-            countdown_text = "Bereit"
-            countdown_class = "text-success"
-            countdown_icon = "✅"
-            
-            if status['wechsel_faellig']:
-                countdown_text = "WECHSEL FÄLLIG!"
-                countdown_class = "text-danger"
-                countdown_icon = "🚨"
-            elif status['warnung_aktiv']:
-                stunden_bis = status['stunden_bis_wechsel']
-                countdown_text = f"Wechsel in {stunden_bis:.1f}h"
-                countdown_class = "text-warning"
-                countdown_icon = "⚠️"
-            else:
-                stunden_bis = status['stunden_bis_wechsel']
-                countdown_text = f"Nächster Wechsel in {stunden_bis:.1f}h"
-                countdown_class = "text-success"
-                countdown_icon = "✅"
-            
-            return {
-                'countdown_text': countdown_text,
-                'countdown_class': countdown_class,
-                'countdown_icon': countdown_icon,
-                'stunden_bis_wechsel': status['stunden_bis_wechsel'],
-                'wechsel_faellig': status['wechsel_faellig'],
-                'warnung_aktiv': status['warnung_aktiv']
-            }
+            return ErweiterterPatronenwechselService.countdown_aus_status(status)
             
         except Exception as e:
             logger.error(f"FEHLER bei Dashboard-Status: {str(e)}")
@@ -194,6 +166,34 @@ class ErweiterterPatronenwechselService:
                 'error': str(e)
             }
     
+    @staticmethod
+    def countdown_aus_status(status: Dict[str, Any]) -> Dict[str, Any]:
+        """Countdown-Anzeige aus einem Patronenwechsel-Status (siehe Patronenwechsel.status_berechnen)"""
+        stunden_bis = status['stunden_bis_wechsel']
+        
+        if status['wechsel_faellig']:
+            countdown_text = "WECHSEL FÄLLIG!"
+            countdown_class = "text-danger"
+            countdown_icon = "🚨"
+        elif status['warnung_aktiv']:
+            countdown_text = f"Wechsel in {stunden_bis:.1f}h"
+            countdown_class = "text-warning"
+            countdown_icon = "⚠️"
+        else:
+            countdown_text = f"Nächster Wechsel in {stunden_bis:.1f}h"
+            countdown_class = "text-success"
+            countdown_icon = "✅"
+        
+        # Nur die wichtigsten Infos für Dashboard
+        return {
+            'countdown_text': countdown_text,
+            'countdown_class': countdown_class,
+            'countdown_icon': countdown_icon,
+            'stunden_bis_wechsel': stunden_bis,
+            'wechsel_faellig': status['wechsel_faellig'],
+            'warnung_aktiv': status['warnung_aktiv']
+        }
+    
     @staticmethod
     def get_wechsel_historie_erweitert(limit: int = 20) -> Dict[str, Any]:
         """
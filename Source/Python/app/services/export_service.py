@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+"""
+Export-Dienst für Kunden, Flaschen, Warteliste, Füllaufträge und Kompressorläufe
+
+- Zeilen werden spaltenweise per SELECT gelesen (keine ORM-Objekte) und
+  in Blöcken vom Cursor geholt (yield_per)
+- CSV wird blockweise als Generator gestreamt
+- XLSX entsteht im openpyxl write-only Modus in einer Temp-Datei und wird
+  anschließend in Blöcken ausgeliefert (Speicherbedarf unabhängig von der Größe)
+"""
+
+import csv
+import io
+import logging
+import os
+import tempfile
+from datetime import date, datetime, time, timedelta
+from typing import Any, Callable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import func, select
+
+from app import db
+from app.models.kunden import Kunde
+from app.models.flaschen import Flasche
+from app.models.warteliste import WartelisteEintrag
+from app.models.kompressor import KompressorBetrieb
+from app.models.fuellmanager import FuellManager
+
+logger = logging.getLogger(__name__)
+
+XLSX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+CSV_MIMETYPE = 'text/csv'  # Flask ergänzt charset=utf-8
+
+
+class ExportFormatNichtVerfuegbar(Exception):
+    """Exportformat benötigt ein nicht installiertes Paket (z.B. openpyxl)"""
+
+
+class ExportDefinition:
+    """
+    Beschreibt einen Export: Tabellenblatt, Spalten und Abfrage
+
+    spalten: Liste von (Überschrift, SQL-Ausdruck)
+    abfrage: Funktion, die das SELECT um Joins/Sortierung ergänzt
+    datum_spalte: Spalte für den optionalen Zeitraumfilter (von/bis)
+    """
+
+    def __init__(self, name: str, blatt: str, spalten: List[Tuple[str, Any]],
+                 abfrage: Optional[Callable] = None, datum_spalte=None):
+        self.name = name
+        self.blatt = blatt
+        self.spalten = spalten
+        self.abfrage = abfrage
+        self.datum_spalte = datum_spalte
+
+    @property
+    def ueberschriften(self) -> List[str]:
+        return [ueberschrift for ueberschrift, _ in self.spalten]
+
+    def select(self, von: Optional[date] = None, bis: Optional[date] = None):
+        stmt = select(*[ausdruck for _, ausdruck in self.spalten])
+        if self.abfrage:
+            stmt = self.abfrage(stmt)
+        if self.datum_spalte is not None:
+            if von:
+                stmt = stmt.where(self.datum_spalte >= datetime.combine(von, time.min))
+            if bis:
+                # bis einschließlich: alles vor dem Folgetag
+                stmt = stmt.where(self.datum_spalte < datetime.combine(bis + timedelta(days=1), time.min))
+        return stmt
+
+
+def _kunden_definition() -> ExportDefinition:
+    flaschen_anzahl = select(
+        Flasche.kunde_id, func.count(Flasche.id).label('anzahl')
+    ).group_by(Flasche.kunde_id).subquery()
+
+    return ExportDefinition(
+        'kunden', 'Alle Kunden',
+        [
+            ('Mitgliedsnummer', Kunde.mitgliedsnummer),
+            ('Vorname', Kunde.vorname),
+            ('Nachname', Kunde.nachname),
+            ('Firma', Kunde.firma),
+            ('Telefon', Kunde.telefon),
+            ('E-Mail', Kunde.email),
+            ('Externe Nummer', Kunde.externe_kundennummer),
+            ('Mitglied seit', Kunde.mitglied_seit),
+            ('Aktiv', Kunde.ist_aktiv),
+            ('Anzahl Flaschen', func.coalesce(flaschen_anzahl.c.anzahl, 0)),
+            ('Erstellt am', Kunde.erstellt_am),
+        ],
+        abfrage=lambda stmt: stmt.select_from(Kunde).outerjoin(
+            flaschen_anzahl, flaschen_anzahl.c.kunde_id == Kunde.id
+        ).order_by(Kunde.id),
+        datum_spalte=Kunde.erstellt_am
+    )
+
+
+def _flaschen_definition() -> ExportDefinition:
+    return ExportDefinition(
+        'flaschen', 'Flaschen',
+        [
+            ('Flaschennummer', Flasche.flasche_nummer),
+            ('Externe Nummer', Flasche.externe_flasche_nummer),
+            ('Barcode', Flasche.barcode),
+            ('Mitgliedsnummer', Kunde.mitgliedsnummer),
+            ('Vorname', Kunde.vorname),
+            ('Nachname', Kunde.nachname),
+            ('Größe (L)', Flasche.groesse_liter),
+            ('Typ', Flasche.flaschen_typ),
+            ('Hersteller', Flasche.hersteller),
+            ('Seriennummer', Flasche.seriennummer),
+            ('Max. Druck (bar)', Flasche.max_druck_bar),
+            ('Letztes Prüfdatum', Flasche.pruef_datum),
+            ('Nächste Prüfung', Flasche.naechste_pruefung),
+            ('Aktiv', Flasche.ist_aktiv),
+            ('Notizen', Flasche.notizen),
+            ('Erstellt am', Flasche.erstellt_am),
+        ],
+        abfrage=lambda stmt: stmt.select_from(Flasche).outerjoin(
+            Kunde, Kunde.id == Flasche.kunde_id
+        ).order_by(Flasche.id),
+        datum_spalte=Flasche.erstellt_am
+    )
+
+
+def _warteliste_definition() -> ExportDefinition:
+    return ExportDefinition(
+        'warteliste', 'Warteliste',
+        [
+            ('Annahme', WartelisteEintrag.annahme_datum),
+            ('Flaschennummer', Flasche.flasche_nummer),
+            ('Mitgliedsnummer', Kunde.mitgliedsnummer),
+            ('Vorname', Kunde.vorname),
+            ('Nachname', Kunde.nachname),
+            ('Gewünschter Druck (bar)', WartelisteEintrag.gewuenschter_druck),
+            ('Priorität', WartelisteEintrag.prioritaet),
+            ('Status', WartelisteEintrag.status),
+            ('Füller', WartelisteEintrag.fueller),
+            ('Luftgemisch', WartelisteEintrag.luftgemisch),
+            ('Füllstart', WartelisteEintrag.fuell_start),
+            ('Füllende', WartelisteEintrag.fuell_ende),
+            ('Erreichter Druck (bar)', WartelisteEintrag.erreichter_druck),
+            ('Besonderheiten', WartelisteEintrag.besonderheiten),
+            ('Notizen', WartelisteEintrag.notizen),
+        ],
+        abfrage=lambda stmt: stmt.select_from(WartelisteEintrag).outerjoin(
+            Flasche, Flasche.id == WartelisteEintrag.flasche_id
+        ).outerjoin(
+            Kunde, Kunde.id == Flasche.kunde_id
+        ).order_by(WartelisteEintrag.annahme_datum, WartelisteEintrag.id),
+        datum_spalte=WartelisteEintrag.annahme_datum
+    )
+
+
+def _fuellauftraege_definition() -> ExportDefinition:
+    return ExportDefinition(
+        'fuellauftraege', 'Füllaufträge',
+        [
+            ('Auftragsnummer', FuellManager.auftragsnummer),
+            ('Status', FuellManager.status),
+            ('Mitgliedsnummer', Kunde.mitgliedsnummer),
+            ('Vorname', Kunde.vorname),
+            ('Nachname', Kunde.nachname),
+            ('Flaschennummer', Flasche.flasche_nummer),
+            ('Annahme', FuellManager.annahme_zeit),
+            ('Füllstart', FuellManager.fuellstart_zeit),
+            ('Füllende', FuellManager.fuellende_zeit),
+            ('Übergabe', FuellManager.uebergabe_zeit),
+            ('Restdruck (bar)', FuellManager.restdruck_bar),
+            ('Zieldruck (bar)', FuellManager.zieldruck_bar),
+            ('Enddruck (bar)', FuellManager.tatsaechlicher_enddruck),
+            ('O2 (%)', FuellManager.sauerstoff_prozent),
+            ('He (%)', FuellManager.helium_prozent),
+            ('Gesamtpreis (€)', FuellManager.gesamtpreis),
+            ('Bezahlt', FuellManager.bezahlt),
+        ],
+        abfrage=lambda stmt: stmt.select_from(FuellManager).outerjoin(
+            Kunde, Kunde.id == FuellManager.kunde_id
+        ).outerjoin(
+            Flasche, Flasche.id == FuellManager.flasche_id
+        ).order_by(FuellManager.annahme_zeit, FuellManager.id),
+        datum_spalte=FuellManager.annahme_zeit
+    )
+
+
+def _kompressor_definition() -> ExportDefinition:
+    return ExportDefinition(
+        'kompressor', 'Kompressorläufe',
+        [
+            ('Start', KompressorBetrieb.start_zeit),
+            ('Ende', KompressorBetrieb.end_zeit),
+            ('Dauer (min)', KompressorBetrieb.betriebsdauer_minuten),
+            ('Füller', KompressorBetrieb.fueller),
+            ('Öl getestet', KompressorBetrieb.oel_getestet),
+            ('Öltest-Ergebnis', KompressorBetrieb.oel_test_ergebnis),
+            ('Öl-Tester', KompressorBetrieb.oel_tester),
+            ('Status', KompressorBetrieb.status),
+            ('Notizen', KompressorBetrieb.notizen),
+        ],
+        abfrage=lambda stmt: stmt.order_by(KompressorBetrieb.start_zeit, KompressorBetrieb.id),
+        datum_spalte=KompressorBetrieb.start_zeit
+    )
+
+
+_DEFINITIONEN = {
+    'kunden': _kunden_definition,
+    'flaschen': _flaschen_definition,
+    'warteliste': _warteliste_definition,
+    'fuellauftraege': _fuellauftraege_definition,
+    'kompressor': _kompressor_definition,
+}
+
+
+class ExportService:
+    """Streamt Exporte als CSV oder XLSX"""
+
+    # Zeilen pro Cursor-Abruf bzw. CSV-Block
+    BLOCK_GROESSE = 500
+
+    # Lesepuffer beim Ausliefern der XLSX-Datei
+    DATEI_BLOCK_BYTES = 64 * 1024
+
+    ARTEN = tuple(_DEFINITIONEN)
+    FORMATE = ('xlsx', 'csv')
+
+    @staticmethod
+    def definition(art: str) -> ExportDefinition:
+        if art not in _DEFINITIONEN:
+            raise ValueError(f'Unbekannter Export: {art} (erlaubt: {", ".join(ExportService.ARTEN)})')
+        return _DEFINITIONEN[art]()
+
+    @staticmethod
+    def _zelle(wert):
+        """Einheitliche Darstellung wie in den bisherigen Excel-Exporten"""
+        if wert is None:
+            return ''
+        if isinstance(wert, bool):
+            return 'Ja' if wert else 'Nein'
+        if isinstance(wert, datetime):
+            return wert.strftime('%d.%m.%Y %H:%M')
+        if isinstance(wert, date):
+            return wert.strftime('%d.%m.%Y')
+        return wert
+
+    @classmethod
+    def zeilen(cls, definition: ExportDefinition, von: Optional[date] = None,
+               bis: Optional[date] = None) -> Iterator[List[Any]]:
+        """Liest die Zeilen blockweise vom Cursor statt alles zu laden"""
+        stmt = definition.select(von, bis).execution_options(yield_per=cls.BLOCK_GROESSE)
+        ergebnis = db.session.execute(stmt)
+        try:
+            for zeile in ergebnis:
+                yield [cls._zelle(wert) for wert in zeile]
+        finally:
+            ergebnis.close()
+
+    @classmethod
+    def csv_stream(cls, definition: ExportDefinition, von: Optional[date] = None,
+                   bis: Optional[date] = None) -> Iterator[str]:
+        """CSV (Semikolon, UTF-8 mit BOM für Excel) in Blöcken"""
+        puffer = io.StringIO()
+        writer = csv.writer(puffer, delimiter=';', quoting=csv.QUOTE_MINIMAL)
+
+        puffer.write('\ufeff')
+        writer.writerow(definition.ueberschriften)
+
+        for i, zeile in enumerate(cls.zeilen(definition, von, bis), start=1):
+            writer.writerow(zeile)
+            if i % cls.BLOCK_GROESSE == 0:
+                yield puffer.getvalue()
+                puffer.seek(0)
+                puffer.truncate(0)
+
+        rest = puffer.getvalue()
+        if rest:
+            yield rest
+
+    @classmethod
+    def xlsx_datei(cls, definition: ExportDefinition, von: Optional[date] = None,
+                   bis: Optional[date] = None) -> str:
+        """
+        Schreibt die XLSX-Datei im write-only Modus und gibt den Pfad zurück
+
+        Der Aufrufer ist für das Löschen zuständig (siehe datei_stream).
+        """
+        try:
+            from openpyxl import Workbook
+            from openpyxl.cell import WriteOnlyCell
+            from openpyxl.styles import Font
+        except ImportError:
+            raise ExportFormatNichtVerfuegbar('Excel-Export benötigt openpyxl: pip install openpyxl')
+
+        workbook = Workbook(write_only=True)
+        blatt = workbook.create_sheet(definition.blatt[:31])
+
+        kopf = []
+        for ueberschrift in definition.ueberschriften:
+            zelle = WriteOnlyCell(blatt, value=ueberschrift)
+            zelle.font = Font(bold=True)
+            kopf.append(zelle)
+        blatt.append(kopf)
+
+        for zeile in cls.zeilen(definition, von, bis):
+            blatt.append(zeile)
+
+        fd, pfad = tempfile.mkstemp(prefix=f'export_{definition.name}_', suffix='.xlsx')
+        os.close(fd)
+        try:
+            workbook.save(pfad)
+        except Exception:
+            os.remove(pfad)
+            raise
+        return pfad
+
+    @classmethod
+    def datei_stream(cls, pfad: str) -> Iterator[bytes]:
+        """Liefert eine Datei blockweise aus und löscht sie danach"""
+        try:
+            with open(pfad, 'rb') as datei:
+                while True:
+                    block = datei.read(cls.DATEI_BLOCK_BYTES)
+                    if not block:
+                        break
+                    yield block
+        finally:
+            try:
+                os.remove(pfad)
+            except OSError as e:
+                logger.warning(f"Export-Datei {pfad} konnte nicht gelöscht werden: {e}")
+
+    @staticmethod
+    def dateiname(definition: ExportDefinition, format: str) -> str:
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M')
+        return f"{definition.name.capitalize()}_{timestamp}.{format}"
@@ -4,8 +4,10 @@
 from datetime import datetime, timedelta, date
 from typing import Dict, Any, Optional, List
 import logging
+from sqlalchemy.orm import joinedload
 from app import db
 from app.models import Flasche, Kunde
+from app.services.statistik_service import statistik_lesen
 
 logger = logging.getLogger(__name__)
 
@@ -490,53 +492,16 @@ class FlaschenService:
     @staticmethod
     def get_flaschen_statistiken() -> Dict[str, Any]:
         """
-        Gibt umfassende Flaschen-Statistiken zurück
+        Gibt umfassende Flaschen-Statistiken zurück (vorberechneter Snapshot)
         
         Returns:
             Dict mit Statistiken
         """
         
         try:
-            stats = Flasche.get_flaschen_statistiken()
-            
-            # Zusätzliche Berechnungen
-            # Top-Besitzer nach Flaschen-Anzahl
-            top_besitzer = db.session.query(
-                Kunde.vorname,
-                Kunde.nachname,
-                Kunde.mitgliedsnummer,
-                db.func.count(Flasche.id).label('anzahl_flaschen')
-            ).join(
-                Flasche, Kunde.id == Flasche.kunde_id
-            ).filter(
-                Flasche.ist_aktiv == True
-            ).group_by(
-                Kunde.id
-            ).order_by(
-                db.func.count(Flasche.id).desc()
-            ).limit(5).all()
-            
-            # Flaschen nach Alter (basierend auf Prüfdatum)
-            heute = datetime.utcnow().date()
-            sehr_alte_flaschen = Flasche.query.filter(
-                Flasche.pruef_datum < (heute - timedelta(days=10*365)),  # Älter als 10 Jahre
-                Flasche.ist_aktiv == True
-            ).count()
-            
-            stats['top_besitzer'] = [
-                {
-                    'name': f"{besitzer[0]} {besitzer[1]}",
-                    'mitgliedsnummer': besitzer[2],
-                    'anzahl_flaschen': besitzer[3]
-                }
-                for besitzer in top_besitzer
-            ]
-            
-            stats['sehr_alte_flaschen'] = sehr_alte_flaschen
-            
             return {
                 'success': True,
-                'statistiken': stats
+                'statistiken': statistik_lesen('flaschen_uebersicht')
             }
             
         except Exception as e:
@@ -546,6 +511,48 @@ class FlaschenService:
                 'error': str(e)
             }
     
+    @staticmethod
+    def berechne_flaschen_uebersicht() -> Dict[str, Any]:
+        """Berechnet Flaschen-Statistiken inkl. Top-Besitzer und sehr alter Flaschen"""
+        stats = Flasche.get_flaschen_statistiken()
+        
+        # Zusätzliche Berechnungen
+        # Top-Besitzer nach Flaschen-Anzahl
+        top_besitzer = db.session.query(
+            Kunde.vorname,
+            Kunde.nachname,
+            Kunde.mitgliedsnummer,
+            db.func.count(Flasche.id).label('anzahl_flaschen')
+        ).join(
+            Flasche, Kunde.id == Flasche.kunde_id
+        ).filter(
+            Flasche.ist_aktiv == True
+        ).group_by(
+            Kunde.id
+        ).order_by(
+            db.func.count(Flasche.id).desc()
+        ).limit(5).all()
+        
+        # Flaschen nach Alter (basierend auf Prüfdatum)
+        heute = datetime.utcnow().date()
+        sehr_alte_flaschen = Flasche.query.filter(
+            Flasche.pruef_datum < (heute - timedelta(days=10*365)),  # Älter als 10 Jahre
+            Flasche.ist_aktiv == True
+        ).count()
+        
+        stats['top_besitzer'] = [
+            {
+                'name': f"{besitzer[0]} {besitzer[1]}",
+                'mitgliedsnummer': besitzer[2],
+                'anzahl_flaschen': besitzer[3]
+            }
+            for besitzer in top_besitzer
+        ]
+        
+        stats['sehr_alte_flaschen'] = sehr_alte_flaschen
+        
+        return stats
+    
     @staticmethod
     def flasche_besitzer_wechseln(flasche_id: int, neuer_kunde_id: int, 
                                  grund: str = None) -> Dict[str, Any]:
@@ -784,6 +791,35 @@ class FlaschenScanService:
     Service für Barcode-Scanning und Flaschen-Identifikation
     """
     
+    @staticmethod
+    def flaschen_nach_barcodes(barcodes: List[str]) -> Dict[str, Flasche]:
+        """
+        Löst mehrere Barcodes mit einer Abfrage auf
+        
+        Ein IN-Query über den (eindeutigen, indizierten) Barcode inkl. Besitzer,
+        statt einer Abfrage pro Flasche und einer weiteren pro Kunde.
+        
+        Returns:
+            Dict Barcode -> Flasche (nur gefundene)
+        """
+        barcodes = list(dict.fromkeys(b.strip() for b in barcodes if b and b.strip()))
+        if not barcodes:
+            return {}
+        
+        flaschen = Flasche.query.options(joinedload(Flasche.besitzer)).filter(
+            Flasche.barcode.in_(barcodes)
+        ).all()
+        return {flasche.barcode: flasche for flasche in flaschen}
+    
+    @staticmethod
+    def _scan_ergebnis(flasche: Flasche) -> Dict[str, Any]:
+        return {
+            'found': True,
+            'flasche': flasche.to_dict(include_besitzer=True),
+            'kann_gefuellt_werden': flasche.ist_fuellbereit,
+            'warnungen': [] if flasche.ist_fuellbereit else [flasche.pruefung_status_text]
+        }
+    
     @staticmethod
     def flasche_by_barcode_finden(barcode: str) -> Dict[str, Any]:
         """
@@ -797,7 +833,7 @@ class FlaschenScanService:
         """
         
         try:
-            flasche = Flasche.query.filter_by(barcode=barcode.strip()).first()
+            flasche = FlaschenScanService.flaschen_nach_barcodes([barcode]).get(barcode.strip())
             
             if not flasche:
                 return {
@@ -805,12 +841,7 @@ class FlaschenScanService:
                     'error': f'Keine Flasche mit Barcode {barcode} gefunden'
                 }
             
-            return {
-                'found': True,
-                'flasche': flasche.to_dict(include_besitzer=True),
-                'kann_gefuellt_werden': flasche.ist_fuellbereit,
-                'warnungen': [] if flasche.ist_fuellbereit else [flasche.pruefung_status_text]
-            }
+            return FlaschenScanService._scan_ergebnis(flasche)
             
         except Exception as e:
             logger.error(f"Fehler bei Barcode-Suche: {str(e)}")
@@ -822,7 +853,7 @@ class FlaschenScanService:
     @staticmethod
     def mehrere_flaschen_scannen(barcodes: List[str]) -> Dict[str, Any]:
         """
-        Verarbeitet mehrere gescannte Barcodes
+        Verarbeitet mehrere gescannte Barcodes (eine Abfrage für alle)
         
         Args:
             barcodes: Liste von Barcodes
@@ -836,10 +867,13 @@ class FlaschenScanService:
             nicht_gefundene = []
             nicht_fuellbar = []
             
+            flaschen = FlaschenScanService.flaschen_nach_barcodes(barcodes)
+            
             for barcode in barcodes:
-                result = FlaschenScanService.flasche_by_barcode_finden(barcode)
+                flasche = flaschen.get((barcode or '').strip())
                 
-                if result['found']:
+                if flasche:
+                    result = FlaschenScanService._scan_ergebnis(flasche)
                     if result['kann_gefuellt_werden']:
                         gefundene_flaschen.append(result['flasche'])
                     else:
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Index-Audit für die häufigsten Abfragen
+
+- Register der heißen Abfragen (gleiche Filter/Sortierung wie in Routes/Services)
+- EXPLAIN QUERY PLAN je Abfrage, vollständige Tabellen-Scans werden markiert
+- Fehlende Model-Indizes auf bestehenden Datenbanken anlegen
+- CLI: `flask index-audit` (Exit-Code 1 bei Full Scans)
+"""
+
+import logging
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, List, Tuple
+
+from sqlalchemy import text
+
+from app import db
+
+logger = logging.getLogger(__name__)
+
+
+def _hot_queries() -> List[Tuple[str, Callable[[], Any]]]:
+    """Name -> Abfrage (wie sie die Anwendung stellt, mit Beispielwerten)"""
+    from app.models import (
+        Flasche, WartelisteEintrag, KompressorBetrieb, Patronenwechsel,
+        FuellManager, PrintJob, FlascheFuellvorgang
+    )
+
+    heute = date.today()
+    heute_start = datetime.combine(heute, datetime.min.time())
+
+    return [
+        # Flaschen
+        ('flaschen_eines_kunden', lambda: Flasche.query.filter(
+            Flasche.kunde_id == 1, Flasche.ist_aktiv == True
+        )),
+        ('flaschen_pruefung_faellig', lambda: Flasche.query.filter(
+            Flasche.ist_aktiv == True, Flasche.naechste_pruefung <= heute
+        )),
+        ('flaschen_pruefung_bald_faellig', lambda: Flasche.query.filter(
+            Flasche.ist_aktiv == True,
+            Flasche.naechste_pruefung.between(heute, heute + timedelta(days=30))
+        )),
+        ('flaschen_vorgemerkt', lambda: Flasche.query.filter(
+            Flasche.ist_zum_fuellen_vorgemerkt == True, Flasche.ist_aktiv == True
+        )),
+        # Warteliste
+        ('warteliste_wartend', lambda: WartelisteEintrag.query.filter_by(
+            status='wartend'
+        ).order_by(WartelisteEintrag.annahme_datum.asc())),
+        ('warteliste_heute_angenommen', lambda: WartelisteEintrag.query.filter(
+            WartelisteEintrag.status == 'wartend', WartelisteEintrag.annahme_datum == heute
+        )),
+        ('warteliste_archiv', lambda: WartelisteEintrag.query.filter(
+            WartelisteEintrag.status.in_(['gefuellt', 'abgebrochen']),
+            WartelisteEintrag.fuell_ende >= heute - timedelta(days=30)
+        ).order_by(WartelisteEintrag.fuell_ende.desc())),
+        ('warteliste_flasche_bereits_wartend', lambda: WartelisteEintrag.query.filter_by(
+            flasche_id=1, status='wartend'
+        )),
+        # Kompressor
+        ('kompressor_laufend', lambda: KompressorBetrieb.query.filter_by(status='laufend')),
+        ('kompressor_letzte_starts', lambda: KompressorBetrieb.query.order_by(
+            KompressorBetrieb.start_zeit.desc()
+        ).limit(10)),
+        ('kompressor_starts_seit', lambda: KompressorBetrieb.query.filter(
+            KompressorBetrieb.start_zeit >= heute - timedelta(days=30)
+        )),
+        # Patronenwechsel
+        ('patronenwechsel_letzter', lambda: Patronenwechsel.query.order_by(
+            Patronenwechsel.wechsel_datum.desc()
+        ).limit(1)),
+        # Füllmanager
+        ('fuellmanager_aktiv', lambda: FuellManager.query.filter(
+            FuellManager.status.in_(['angenommen', 'in_fuellung'])
+        ).order_by(FuellManager.erstellt_am.desc())),
+        ('fuellmanager_heute_abgeschlossen', lambda: FuellManager.query.filter(
+            FuellManager.status == 'abgeschlossen', FuellManager.erstellt_am >= heute_start
+        )),
+        # Druckaufträge
+        ('print_jobs_pending', lambda: PrintJob.query.filter_by(
+            status='pending'
+        ).order_by(PrintJob.erstellt_am.asc())),
+        ('print_jobs_patronenwechsel', lambda: PrintJob.query.filter_by(
+            patronenwechsel_id=1
+        ).order_by(PrintJob.erstellt_am.desc())),
+        # Bulk-Füllung
+        ('bulk_flaschen_eines_vorgangs', lambda: FlascheFuellvorgang.query.filter(
+            FlascheFuellvorgang.bulk_fuellvorgang_id == 1,
+            FlascheFuellvorgang.flasche_id.in_([1, 2, 3])
+        )),
+        ('bulk_vorgaenge_einer_flasche', lambda: FlascheFuellvorgang.query.filter(
+            FlascheFuellvorgang.flasche_id == 1
+        )),
+    ]
+
+
+def _ist_full_scan(detail: str) -> bool:
+    """'SCAN flaschen' (ältere SQLite-Versionen: 'SCAN TABLE flaschen') ohne Index"""
+    return detail.startswith('SCAN') and 'USING' not in detail
+
+
+def abfrageplan(abfrage) -> List[str]:
+    """EXPLAIN QUERY PLAN für eine ORM-Abfrage"""
+    statement = abfrage.statement if hasattr(abfrage, 'statement') else abfrage
+    sql = str(statement.compile(db.engine, compile_kwargs={'literal_binds': True}))
+    zeilen = db.session.execute(text(f'EXPLAIN QUERY PLAN {sql}')).fetchall()
+    return [zeile[-1] for zeile in zeilen]
+
+
+def pruefen() -> List[Dict[str, Any]]:
+    """
+    Prüft die Abfragepläne aller registrierten Abfragen
+
+    Returns:
+        Liste mit Name, Plan, full_scan (Tabellen-Scan ohne Index) und
+        temp_sortierung (ORDER BY nicht über einen Index)
+    """
+    ergebnisse = []
+    for name, abfrage in _hot_queries():
+        try:
+            plan = abfrageplan(abfrage())
+        except Exception as e:
+            ergebnisse.append({'name': name, 'fehler': str(e), 'plan': [],
+                               'full_scan': False, 'temp_sortierung': False})
+            continue
+
+        ergebnisse.append({
+            'name': name,
+            'plan': plan,
+            'full_scan': any(_ist_full_scan(detail) for detail in plan),
+            'temp_sortierung': any('TEMP B-TREE' in detail for detail in plan)
+        })
+    return ergebnisse
+
+
+def indizes_einrichten():
+    """Legt die in den Models deklarierten Indizes an, falls sie fehlen (idempotent)"""
+    from app.models import (
+        Flasche, WartelisteEintrag, KompressorBetrieb, Patronenwechsel,
+        FuellManager, PrintJob, FlascheFuellvorgang
+    )
+
+    for model in (Flasche, WartelisteEintrag, KompressorBetrieb, Patronenwechsel,
+                  FuellManager, PrintJob, FlascheFuellvorgang):
+        for index in model.__table__.indexes:
+            index.create(db.engine, checkfirst=True)
+
+
+def init_app(app):
+    """CLI-Befehl für das Index-Audit registrieren"""
+
+    @app.cli.command('index-audit')
+    def index_audit_befehl():
+        """EXPLAIN QUERY PLAN für die häufigsten Abfragen, Full Scans markieren"""
+        ergebnisse = pruefen()
+        for ergebnis in ergebnisse:
+            if ergebnis.get('fehler'):
+                markierung = 'FEHLER'
+            elif ergebnis['full_scan']:
+                markierung = 'FULL SCAN'
+            elif ergebnis['temp_sortierung']:
+                markierung = 'SORTIERUNG'
+            else:
+                markierung = 'OK'
+            print(f"[{markierung:10}] {ergebnis['name']}")
+            for detail in ergebnis['plan']:
+                print(f"               {detail}")
+            if ergebnis.get('fehler'):
+                print(f"               {ergebnis['fehler']}")
+
+        full_scans = [e['name'] for e in ergebnisse if e['full_scan']]
+        if full_scans:
+            print(f"\n{len(full_scans)} Abfrage(n) ohne Index: {', '.join(full_scans)}")
+            raise SystemExit(1)
+        print(f"\nAlle {len(ergebnisse)} Abfragen nutzen einen Index.")
@@ -5,17 +5,17 @@
 from app import db
 from app.models.kunden import Kunde
 from app.models.flaschen import Flasche
+from app.services.kunden_suchindex import kunden_suchindex
 from datetime import datetime, timedelta
 from sqlalchemy import or_, and_, func
 import re
-from difflib import SequenceMatcher
 
 class IntelligenterKundenService:
     """
     Erweiterter Service für intelligente Kundensuche und -verwaltung
     
     Features:
-    - Fuzzy-Suche mit Tippfehler-Toleranz
+    - Fuzzy-Suche mit Tippfehler-Toleranz (über KundenSuchIndex)
     - Priorisierung nach Aktivität
     - Quick-Create für schnelle Kundenanlage
     - Duplikat-Erkennung
@@ -39,75 +39,28 @@ class IntelligenterKundenService:
             return []
             
         suchbegriff = suchbegriff.strip().lower()
-        alle_kunden = Kunde.query.filter_by(ist_aktiv=True).all()
         
-        ergebnisse = []
+        # Kandidaten und Scores aus dem In-Memory Suchindex
+        treffer = kunden_suchindex.suchen(suchbegriff, limit=limit, min_score=min_score)
+        if not treffer:
+            return []
         
-        for kunde in alle_kunden:
-            # Berechne Ähnlichkeits-Scores für verschiedene Felder
-            scores = []
-            
-            # Vollname
-            vollname = f"{kunde.vorname} {kunde.nachname or ''}".lower().strip()
-            scores.append(SequenceMatcher(None, suchbegriff, vollname).ratio())
-            
-            # Nur Vorname
-            scores.append(SequenceMatcher(None, suchbegriff, kunde.vorname.lower()).ratio())
-            
-            # Nur Nachname
-            if kunde.nachname:
-                scores.append(SequenceMatcher(None, suchbegriff, kunde.nachname.lower()).ratio())
-            
-            # Mitgliedsnummer
-            if kunde.mitgliedsnummer:
-                scores.append(SequenceMatcher(None, suchbegriff, kunde.mitgliedsnummer.lower()).ratio())
-            
-            # Externe Nummer
-            if kunde.externe_kundennummer:
-                scores.append(SequenceMatcher(None, suchbegriff, kunde.externe_kundennummer.lower()).ratio())
-            
-            # Telefon (ohne Formatierung)
-            if kunde.telefon:
-                telefon_clean = re.sub(r'[^\d]', '', kunde.telefon)
-                suchbegriff_clean = re.sub(r'[^\d]', '', suchbegriff)
-                if suchbegriff_clean:
-                    scores.append(SequenceMatcher(None, suchbegriff_clean, telefon_clean).ratio())
-            
-            # Email
-            if kunde.email:
-                scores.append(SequenceMatcher(None, suchbegriff, kunde.email.lower()).ratio())
-            
-            # Firma
-            if kunde.firma:
-                scores.append(SequenceMatcher(None, suchbegriff, kunde.firma.lower()).ratio() * 0.8)  # Etwas niedriger gewichtet
-            
-            # Höchster Score zählt
-            max_score = max(scores) if scores else 0
-            
-            # Bonus für kürzlich aktive Kunden
-            if hasattr(kunde, 'letzter_besuch') and kunde.letzter_besuch:
-                tage_seit_besuch = (datetime.utcnow() - kunde.letzter_besuch).days
-                if tage_seit_besuch < 30:
-                    max_score += 0.1  # 10% Bonus für Aktivität in letzten 30 Tagen
-                elif tage_seit_besuch < 90:
-                    max_score += 0.05  # 5% Bonus für Aktivität in letzten 90 Tagen
-            
-            # Bonus für Stammkunden
-            if hasattr(kunde, 'stammkunde') and kunde.stammkunde:
-                max_score += 0.05
-            
-            if max_score >= min_score:
-                ergebnisse.append({
-                    'kunde': kunde,
-                    'score': min(max_score, 1.0),  # Cap bei 1.0
-                    'match_type': IntelligenterKundenService._bestimme_match_typ(kunde, suchbegriff, scores)
-                })
+        # Nur die Treffer aus der Datenbank laden (eine Abfrage)
+        kunden = Kunde.query.filter(Kunde.id.in_([t['kunde_id'] for t in treffer])).all()
+        kunden_nach_id = {kunde.id: kunde for kunde in kunden}
         
-        # Sortiere nach Score (höchste zuerst)
-        ergebnisse.sort(key=lambda x: x['score'], reverse=True)
+        ergebnisse = []
+        for t in treffer:
+            kunde = kunden_nach_id.get(t['kunde_id'])
+            if not kunde or not kunde.ist_aktiv:
+                continue
+            ergebnisse.append({
+                'kunde': kunde,
+                'score': t['score'],
+                'match_type': IntelligenterKundenService._bestimme_match_typ(kunde, suchbegriff, [t['score']])
+            })
         
-        # Limitiere Ergebnisse
-        return ergebnisse[:limit]
+        return ergebnisse
     
     @staticmethod
     def _bestimme_match_typ(kunde, suchbegriff, scores):
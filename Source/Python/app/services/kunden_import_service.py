@@ -0,0 +1,410 @@
+# Kunden-Import Service für WartungsManager
+# Mengenbasierter CSV-Import mit gebündelter Duplikat-Erkennung
+
+from datetime import datetime
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Callable, Tuple
+import csv
+import io
+import os
+import threading
+import uuid
+import logging
+from app import db
+from app.models.kunden import Kunde
+
+logger = logging.getLogger(__name__)
+
+# Felder, die aus der CSV übernommen werden (Zielspalten im Kunden-Model)
+IMPORT_FELDER = [
+    'vorname', 'nachname', 'telefon', 'email', 'adresse',
+    'externe_kundennummer', 'externe_system', 'mitgliedschaft_typ', 'notizen'
+]
+
+# Mögliche CSV-Trennzeichen und Größe der Probe für die Dialekt-Erkennung
+CSV_TRENNZEICHEN = ';,\t'
+CSV_PROBE_BYTES = 8 * 1024
+
+
+def csv_oeffnen(binaer_stream) -> Tuple[List[str], Iterator[Dict[str, str]]]:
+    """
+    Öffnet eine CSV-Datei als Zeilen-Generator
+
+    Das Trennzeichen wird aus den ersten KB erkannt, danach wird die Datei
+    genau einmal zeilenweise gelesen (konstanter Speicherbedarf).
+
+    Args:
+        binaer_stream: Binärer, seekbarer Datei-Stream (Upload oder Datei)
+
+    Returns:
+        (Spaltenüberschriften, Generator über die Zeilen)
+
+    Raises:
+        ValueError: wenn kein CSV-Format erkannt wurde
+    """
+    text = io.TextIOWrapper(binaer_stream, encoding='utf-8-sig', errors='ignore', newline='')
+    probe = text.read(CSV_PROBE_BYTES)
+    text.seek(0)
+
+    try:
+        trennzeichen = csv.Sniffer().sniff(probe, delimiters=CSV_TRENNZEICHEN).delimiter
+    except csv.Error:
+        # Fallback: häufigstes Trennzeichen in der Kopfzeile
+        kopfzeile = probe.splitlines()[0] if probe else ''
+        trennzeichen = max(CSV_TRENNZEICHEN, key=kopfzeile.count)
+
+    reader = csv.DictReader(text, delimiter=trennzeichen)
+    headers = reader.fieldnames or []
+    if len(headers) <= 1:
+        raise ValueError('CSV-Format nicht erkannt. Verwenden Sie Semikolon (;) als Trenner.')
+
+    return headers, iter(reader)
+
+
+def spalten_zuordnen(headers: List[str], column_mapping: Dict[str, List[str]]) -> Dict[str, str]:
+    """Ordnet CSV-Spalten automatisch den Kunden-Feldern zu"""
+    mapped_columns = {}
+    available_columns = [col.lower().strip() for col in headers]
+
+    for target_col, possible_names in column_mapping.items():
+        for possible_name in possible_names:
+            if possible_name.lower() in available_columns:
+                mapped_columns[target_col] = headers[available_columns.index(possible_name.lower())]
+                break
+
+    return mapped_columns
+
+
+class KundenImportService:
+    """
+    Service für Massen-Importe von Kunden
+
+    Funktionen:
+    - Duplikat-Erkennung über vorab geladene Hash-Sets (eine Abfrage)
+    - Mitgliedsnummern aus einem reservierten Block pro Chunk
+    - Einfügen per bulk_insert_mappings in Chunks
+    - Fortschrittsmeldung pro Chunk
+    """
+
+    CHUNK_GROESSE = 1000
+
+    @staticmethod
+    def _zeile_extrahieren(row: Dict[str, Any], mapped_columns: Dict[str, str]) -> Dict[str, str]:
+        kunde_data = {}
+        for target_col, source_col in mapped_columns.items():
+            value = row.get(source_col, '') or ''
+            kunde_data[target_col] = str(value).strip()
+        return kunde_data
+
+    @staticmethod
+    def _fehler(ergebnis: Dict[str, Any], meldung: str):
+        ergebnis['error_count'] += 1
+        if len(ergebnis['errors']) < 10:  # Nur erste 10 Fehler anzeigen
+            ergebnis['errors'].append(meldung)
+
+    @staticmethod
+    def _bestehende_schluessel_laden():
+        """Lädt externe Kundennummern und E-Mails aller Kunden in einer Abfrage"""
+        nach_externer_nummer = {}
+        nach_email = {}
+
+        for kunde_id, externe_nummer, email in db.session.query(
+            Kunde.id, Kunde.externe_kundennummer, Kunde.email
+        ):
+            if externe_nummer:
+                nach_externer_nummer.setdefault(externe_nummer, kunde_id)
+            if email:
+                nach_email.setdefault(email, kunde_id)
+
+        return nach_externer_nummer, nach_email
+
+    @staticmethod
+    def _bestehende_id(kunde_data: Dict[str, str], nach_externer_nummer: Dict[str, int],
+                       nach_email: Dict[str, int]) -> Optional[int]:
+        """ID des passenden Kunden (-1 = Duplikat innerhalb der Datei) oder None"""
+        externe_nummer = kunde_data.get('externe_kundennummer') or None
+        email = kunde_data.get('email') or None
+        existing_id = None
+        if externe_nummer:
+            existing_id = nach_externer_nummer.get(externe_nummer)
+        if existing_id is None and email:
+            existing_id = nach_email.get(email)
+        return existing_id
+
+    @staticmethod
+    def _als_gelesen_merken(kunde_data: Dict[str, str], nach_externer_nummer: Dict[str, int],
+                            nach_email: Dict[str, int]):
+        """Neue Zeile merken, damit spätere Zeilen mit gleichen Schlüsseln als Duplikat gelten"""
+        if kunde_data.get('externe_kundennummer'):
+            nach_externer_nummer[kunde_data['externe_kundennummer']] = -1
+        if kunde_data.get('email'):
+            nach_email[kunde_data['email']] = -1
+
+    @staticmethod
+    def vorschau(rows: Iterable[Dict[str, Any]], mapped_columns: Dict[str, str],
+                 max_zeilen: int = 10) -> Dict[str, Any]:
+        """
+        Vorschau ohne Schreibzugriff: erste Zeilen plus Zählung mit derselben
+        Duplikat-Erkennung wie import_ausfuehren (nur lesend)
+
+        Returns:
+            Dict mit data (erste max_zeilen Zeilen), total_rows, neue_kunden,
+            duplikate und ohne_vorname
+        """
+        nach_externer_nummer, nach_email = KundenImportService._bestehende_schluessel_laden()
+        ergebnis = {'data': [], 'total_rows': 0, 'neue_kunden': 0, 'duplikate': 0, 'ohne_vorname': 0}
+
+        for row in rows:
+            ergebnis['total_rows'] += 1
+            kunde_data = KundenImportService._zeile_extrahieren(row, mapped_columns)
+            if len(ergebnis['data']) < max_zeilen:
+                ergebnis['data'].append(kunde_data)
+
+            if not kunde_data.get('vorname'):
+                ergebnis['ohne_vorname'] += 1
+            elif KundenImportService._bestehende_id(kunde_data, nach_externer_nummer, nach_email) is not None:
+                ergebnis['duplikate'] += 1
+            else:
+                ergebnis['neue_kunden'] += 1
+                KundenImportService._als_gelesen_merken(kunde_data, nach_externer_nummer, nach_email)
+
+        return ergebnis
+
+    @staticmethod
+    def import_ausfuehren(rows: Iterable[Dict[str, Any]], mapped_columns: Dict[str, str],
+                          skip_duplicates: bool = True, update_existing: bool = False,
+                          chunk_groesse: Optional[int] = None,
+                          fortschritt: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """
+        Importiert Kunden aus CSV-Zeilen
+
+        Args:
+            rows: Iterable von CSV-Zeilen (dict, z.B. aus csv.DictReader)
+            mapped_columns: Zielspalte -> CSV-Spalte
+            skip_duplicates: Vorhandene Kunden überspringen
+            update_existing: Vorhandene Kunden aktualisieren (wenn nicht übersprungen)
+            chunk_groesse: Zeilen pro Chunk
+            fortschritt: Callback, wird nach jedem Chunk mit dem Zwischenstand aufgerufen
+
+        Returns:
+            Dict mit Import-Ergebnis (Zähler und erste Fehler)
+        """
+        chunk_groesse = chunk_groesse or KundenImportService.CHUNK_GROESSE
+        nach_externer_nummer, nach_email = KundenImportService._bestehende_schluessel_laden()
+
+        ergebnis = {
+            'imported_count': 0,
+            'skipped_count': 0,
+            'error_count': 0,
+            'total_processed': 0,
+            'chunks': 0,
+            'errors': []
+        }
+
+        neue_kunden = []
+        aktualisierungen = {}
+
+        def chunk_schreiben():
+            jetzt = datetime.utcnow()
+
+            if neue_kunden:
+                nummern = Kunde.reserviere_mitgliedsnummern(len(neue_kunden))
+                for mapping, nummer in zip(neue_kunden, nummern):
+                    mapping['mitgliedsnummer'] = nummer
+                    mapping['erstellt_am'] = jetzt
+                    mapping['updated_at'] = jetzt
+                db.session.bulk_insert_mappings(Kunde, neue_kunden)
+
+            if aktualisierungen:
+                for mapping in aktualisierungen.values():
+                    mapping['updated_at'] = jetzt
+                db.session.bulk_update_mappings(Kunde, list(aktualisierungen.values()))
+
+            # Flush, damit der nächste Nummernblock die eingefügten Kunden sieht
+            db.session.flush()
+            neue_kunden.clear()
+            aktualisierungen.clear()
+
+            ergebnis['chunks'] += 1
+            logger.info(
+                f"Kunden-Import Chunk {ergebnis['chunks']}: "
+                f"{ergebnis['total_processed']} Zeilen verarbeitet, "
+                f"{ergebnis['imported_count']} importiert"
+            )
+            if fortschritt:
+                fortschritt(dict(ergebnis, errors=list(ergebnis['errors'])))
+
+        for i, row in enumerate(rows):
+            ergebnis['total_processed'] += 1
+            zeile = i + 2  # Kopfzeile + 1-basiert
+
+            try:
+                kunde_data = KundenImportService._zeile_extrahieren(row, mapped_columns)
+
+                # Pflichtfeld prüfen
+                if not kunde_data.get('vorname'):
+                    KundenImportService._fehler(ergebnis, f'Zeile {zeile}: Vorname fehlt')
+                    continue
+
+                # Duplikat-Prüfung gegen Datenbank und bereits gelesene Zeilen
+                externe_nummer = kunde_data.get('externe_kundennummer') or None
+                email = kunde_data.get('email') or None
+                existing_id = KundenImportService._bestehende_id(kunde_data, nach_externer_nummer, nach_email)
+
+                if existing_id is not None:
+                    # -1 = Duplikat innerhalb der Datei
+                    if existing_id < 0 or skip_duplicates or not update_existing:
+                        ergebnis['skipped_count'] += 1
+                        continue
+
+                    # Vorhandenen Kunden aktualisieren (Vorname nicht überschreiben)
+                    mapping = aktualisierungen.setdefault(existing_id, {'id': existing_id})
+                    for field, value in kunde_data.items():
+                        if value and field != 'vorname' and field in IMPORT_FELDER:
+                            mapping[field] = value
+                    ergebnis['imported_count'] += 1
+                else:
+                    neue_kunden.append({
+                        'vorname': kunde_data['vorname'],
+                        'nachname': kunde_data.get('nachname') or '',
+                        'telefon': kunde_data.get('telefon') or None,
+                        'email': email,
+                        'adresse': kunde_data.get('adresse') or None,
+                        'externe_kundennummer': externe_nummer,
+                        'externe_system': kunde_data.get('externe_system') or 'Import',
+                        'mitgliedschaft_typ': kunde_data.get('mitgliedschaft_typ') or 'Standard',
+                        'notizen': kunde_data.get('notizen') or None,
+                        'ist_aktiv': True
+                    })
+                    # Auch Duplikate innerhalb der Datei erkennen
+                    KundenImportService._als_gelesen_merken(kunde_data, nach_externer_nummer, nach_email)
+                    ergebnis['imported_count'] += 1
+
+            except Exception as e:
+                KundenImportService._fehler(ergebnis, f'Zeile {zeile}: {str(e)}')
+
+            if len(neue_kunden) + len(aktualisierungen) >= chunk_groesse:
+                chunk_schreiben()
+
+        if neue_kunden or aktualisierungen or ergebnis['chunks'] == 0:
+            chunk_schreiben()
+
+        from app.services.statistik_service import veraltet_markieren, familien_fuer_model
+        veraltet_markieren(familien_fuer_model('Kunde'))
+        db.session.commit()
+
+        # Bulk-Operationen umgehen die ORM-Events -> Suchindex neu aufbauen lassen
+        # und offene Seiten einmalig über den Import informieren
+        from app.services.kunden_suchindex import kunden_suchindex
+        from app.services.ereignis_bus import ereignis_bus
+        kunden_suchindex.leeren()
+        ereignis_bus.veroeffentlichen('kunden', 'import', {
+            'imported_count': ergebnis['imported_count'],
+            'skipped_count': ergebnis['skipped_count']
+        })
+
+        return ergebnis
+
+
+class KundenImportJobs:
+    """
+    Hintergrund-Jobs für große Kunden-Importe
+
+    Der Upload wird in eine temporäre Datei gestreamt, ein Worker-Thread
+    parst sie zeilenweise und meldet den Fortschritt pro Chunk. Der Status
+    liegt im Speicher des Prozesses (ein Job ist nur in dem Worker-Prozess
+    sichtbar, der ihn gestartet hat).
+    """
+
+    MAX_JOBS = 20
+
+    _jobs: Dict[str, Dict[str, Any]] = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def starten(cls, app, pfad: str, column_mapping: Dict[str, List[str]],
+                skip_duplicates: bool = True, update_existing: bool = False) -> Dict[str, Any]:
+        """
+        Startet einen Import-Job für eine bereits gespeicherte CSV-Datei
+
+        Die Datei wird nach dem Import gelöscht.
+        """
+        job = {
+            'id': uuid.uuid4().hex,
+            'status': 'wartend',
+            'erstellt_am': datetime.utcnow().isoformat(),
+            'gestartet_am': None,
+            'beendet_am': None,
+            'fortschritt': None,
+            'result': None,
+            'error': None
+        }
+
+        with cls._lock:
+            cls._jobs[job['id']] = job
+            cls._aufraeumen()
+
+        thread = threading.Thread(
+            target=cls._ausfuehren,
+            args=(app, job, pfad, column_mapping, skip_duplicates, update_existing),
+            name=f"kunden-import-{job['id'][:8]}",
+            daemon=True
+        )
+        thread.start()
+        return dict(job)
+
+    @classmethod
+    def status(cls, job_id: str) -> Optional[Dict[str, Any]]:
+        with cls._lock:
+            job = cls._jobs.get(job_id)
+            return dict(job) if job else None
+
+    @classmethod
+    def _aufraeumen(cls):
+        """Entfernt die ältesten abgeschlossenen Jobs (Lock muss gehalten werden)"""
+        abgeschlossen = [j for j in cls._jobs.values() if j['status'] in ('fertig', 'fehler')]
+        for job in abgeschlossen[:max(0, len(cls._jobs) - cls.MAX_JOBS)]:
+            del cls._jobs[job['id']]
+
+    @classmethod
+    def _aktualisieren(cls, job: Dict[str, Any], **werte):
+        with cls._lock:
+            job.update(werte)
+
+    @classmethod
+    def _ausfuehren(cls, app, job, pfad, column_mapping, skip_duplicates, update_existing):
+        with app.app_context():
+            cls._aktualisieren(job, status='laeuft', gestartet_am=datetime.utcnow().isoformat())
+            try:
+                with open(pfad, 'rb') as datei:
+                    headers, rows = csv_oeffnen(datei)
+                    mapped_columns = spalten_zuordnen(headers, column_mapping)
+                    if 'vorname' not in mapped_columns:
+                        raise ValueError('Spalte "vorname" nicht gefunden. Diese ist erforderlich.')
+
+                    result = KundenImportService.import_ausfuehren(
+                        rows,
+                        mapped_columns,
+                        skip_duplicates=skip_duplicates,
+                        update_existing=update_existing,
+                        fortschritt=lambda stand: cls._aktualisieren(job, fortschritt=stand)
+                    )
+
+                cls._aktualisieren(
+                    job, status='fertig', result=result, fortschritt=result,
+                    beendet_am=datetime.utcnow().isoformat()
+                )
+                logger.info(f"Kunden-Import-Job {job['id']} fertig: {result['imported_count']} importiert")
+
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"Kunden-Import-Job {job['id']} fehlgeschlagen: {str(e)}")
+                cls._aktualisieren(
+                    job, status='fehler', error=str(e),
+                    beendet_am=datetime.utcnow().isoformat()
+                )
+            finally:
+                db.session.remove()
+                try:
+                    os.remove(pfad)
+                except OSError:
+                    pass
@@ -6,6 +6,7 @@ from typing import Dict, Any, Optional, List
 import logging
 from app import db
 from app.models import Kunde, Flasche
+from app.services.statistik_service import statistik_lesen
 
 logger = logging.getLogger(__name__)
 
@@ -66,6 +67,8 @@ class KundenService:
                     'success': False,
                     'error': f'Mitgliedsnummer {neue_mitgliedsnummer} bereits vergeben'
                 }
+            if daten.get('mitgliedsnummer'):
+                Kunde.mitgliedsnummer_uebernehmen(neue_mitgliedsnummer)
             
             neuer_kunde = Kunde(
                 mitgliedsnummer=neue_mitgliedsnummer,
@@ -102,12 +105,13 @@ class KundenService:
             }
     
     @staticmethod
-    def kunde_suchen(suchbegriff: str) -> Dict[str, Any]:
+    def kunde_suchen(suchbegriff: str, limit: Optional[int] = None) -> Dict[str, Any]:
         """
         Sucht Kunden nach verschiedenen Kriterien
         
         Args:
             suchbegriff: Suchtext (Name, Mitgliedsnummer, Email, etc.)
+            limit: Maximale Anzahl Treffer (None = alle)
         
         Returns:
             Dict mit Suchergebnissen
@@ -121,13 +125,24 @@ class KundenService:
                     'kunden': []
                 }
             
-            kunden = Kunde.suche_kunde(suchbegriff.strip())
+            kunden = Kunde.suche_kunde(suchbegriff.strip(), limit=limit)
+            
+            # Flaschen (gesamt/aktiv) aller Treffer in einer gruppierten Abfrage
+            flaschen_zahlen = {
+                kunde_id: (gesamt, aktiv or 0)
+                for kunde_id, gesamt, aktiv in db.session.query(
+                    Flasche.kunde_id,
+                    db.func.count(Flasche.id),
+                    db.func.sum(db.case((Flasche.ist_aktiv == True, 1), else_=0))
+                ).filter(Flasche.kunde_id.in_([k.id for k in kunden])).group_by(Flasche.kunde_id)
+            } if kunden else {}
             
             kunden_data = []
             for kunde in kunden:
-                kunde_dict = kunde.to_dict()
+                gesamt, aktiv = flaschen_zahlen.get(kunde.id, (0, 0))
+                kunde_dict = kunde.to_dict(anzahl_flaschen=gesamt)
                 # Zusätzliche Informationen für Suchresultate
-                kunde_dict['anzahl_aktive_flaschen'] = kunde.aktive_flaschen.count()
+                kunde_dict['anzahl_aktive_flaschen'] = aktiv
                 kunden_data.append(kunde_dict)
             
             logger.info(f"Kundensuche '{suchbegriff}': {len(kunden)} Ergebnisse")
@@ -365,64 +380,16 @@ class KundenService:
     @staticmethod
     def get_kunden_statistiken() -> Dict[str, Any]:
         """
-        Gibt umfassende Kunden-Statistiken zurück
+        Gibt umfassende Kunden-Statistiken zurück (vorberechneter Snapshot)
         
         Returns:
             Dict mit Statistiken
         """
         
         try:
-            stats = Kunde.get_kunden_statistiken()
-            
-            # Zusätzliche Berechnungen
-            heute = datetime.utcnow().date()
-            
-            # Top-Kunden nach Flaschen-Anzahl
-            top_kunden = db.session.query(
-                Kunde.vorname,
-                Kunde.nachname,
-                Kunde.mitgliedsnummer,
-                db.func.count(Flasche.id).label('anzahl_flaschen')
-            ).join(
-                Flasche, Kunde.id == Flasche.kunde_id
-            ).filter(
-                Kunde.ist_aktiv == True,
-                Flasche.ist_aktiv == True
-            ).group_by(
-                Kunde.id
-            ).order_by(
-                db.func.count(Flasche.id).desc()
-            ).limit(5).all()
-            
-            # Neueste Mitglieder
-            neue_mitglieder = Kunde.query.filter_by(
-                ist_aktiv=True
-            ).order_by(
-                Kunde.mitglied_seit.desc()
-            ).limit(5).all()
-            
-            stats['top_kunden_nach_flaschen'] = [
-                {
-                    'name': f"{kunde[0]} {kunde[1]}",
-                    'mitgliedsnummer': kunde[2],
-                    'anzahl_flaschen': kunde[3]
-                }
-                for kunde in top_kunden
-            ]
-            
-            stats['neueste_mitglieder'] = [
-                {
-                    'name': kunde.vollname,
-                    'mitgliedsnummer': kunde.mitgliedsnummer,
-                    'mitglied_seit': kunde.mitglied_seit.isoformat(),
-                    'tage_mitglied': (heute - kunde.mitglied_seit).days
-                }
-                for kunde in neue_mitglieder
-            ]
-            
             return {
                 'success': True,
-                'statistiken': stats
+                'statistiken': statistik_lesen('kunden_uebersicht')
             }
             
         except Exception as e:
@@ -432,6 +399,59 @@ class KundenService:
                 'error': str(e)
             }
     
+    @staticmethod
+    def berechne_kunden_uebersicht() -> Dict[str, Any]:
+        """Berechnet Kunden-Statistiken inkl. Top-Kunden und neuester Mitglieder"""
+        stats = Kunde.get_kunden_statistiken()
+        
+        # Zusätzliche Berechnungen
+        heute = datetime.utcnow().date()
+        
+        # Top-Kunden nach Flaschen-Anzahl
+        top_kunden = db.session.query(
+            Kunde.vorname,
+            Kunde.nachname,
+            Kunde.mitgliedsnummer,
+            db.func.count(Flasche.id).label('anzahl_flaschen')
+        ).join(
+            Flasche, Kunde.id == Flasche.kunde_id
+        ).filter(
+            Kunde.ist_aktiv == True,
+            Flasche.ist_aktiv == True
+        ).group_by(
+            Kunde.id
+        ).order_by(
+            db.func.count(Flasche.id).desc()
+        ).limit(5).all()
+        
+        # Neueste Mitglieder
+        neue_mitglieder = Kunde.query.filter_by(
+            ist_aktiv=True
+        ).order_by(
+            Kunde.mitglied_seit.desc()
+        ).limit(5).all()
+        
+        stats['top_kunden_nach_flaschen'] = [
+            {
+                'name': f"{kunde[0]} {kunde[1]}",
+                'mitgliedsnummer': kunde[2],
+                'anzahl_flaschen': kunde[3]
+            }
+            for kunde in top_kunden
+        ]
+        
+        stats['neueste_mitglieder'] = [
+            {
+                'name': kunde.vollname,
+                'mitgliedsnummer': kunde.mitgliedsnummer,
+                'mitglied_seit': kunde.mitglied_seit.isoformat(),
+                'tage_mitglied': (heute - kunde.mitglied_seit).days
+            }
+            for kunde in neue_mitglieder
+        ]
+        
+        return stats
+    
     @staticmethod
     def quick_kundenanlage_fuer_fuellung(vorname: str, nachname: str, 
                                         telefon: str = None, email: str = None) -> Dict[str, Any]:
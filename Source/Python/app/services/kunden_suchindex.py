@@ -0,0 +1,389 @@
+# In-Memory Suchindex für die intelligente Kundensuche
+# Trigramm- und Kölner-Phonetik-Index über alle aktiven Kunden
+
+import re
+import threading
+import time
+import logging
+from collections import defaultdict
+from datetime import datetime
+from difflib import SequenceMatcher
+from typing import Dict, Any, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from app.models.kunden import Kunde
+
+logger = logging.getLogger(__name__)
+
+_UMLAUTE = str.maketrans({'ä': 'a', 'ö': 'o', 'ü': 'u', 'ß': 's'})
+
+
+def koelner_phonetik(wort: str) -> str:
+    """
+    Berechnet den Kölner-Phonetik-Code eines Wortes
+
+    "Meier", "Maier" und "Meyer" ergeben z.B. alle den Code "67".
+    """
+    wort = re.sub(r'[^a-z]', '', (wort or '').lower().translate(_UMLAUTE))
+    codes = []
+
+    for i, c in enumerate(wort):
+        vor = wort[i - 1] if i > 0 else ''
+        nach = wort[i + 1] if i + 1 < len(wort) else ''
+
+        if c in 'aeijouy':
+            code = '0'
+        elif c == 'h':
+            code = ''
+        elif c == 'b':
+            code = '1'
+        elif c == 'p':
+            code = '3' if nach == 'h' else '1'
+        elif c in 'dt':
+            code = '8' if nach and nach in 'csz' else '2'
+        elif c in 'fvw':
+            code = '3'
+        elif c in 'gkq':
+            code = '4'
+        elif c == 'c':
+            if i == 0:
+                code = '4' if nach and nach in 'ahkloqrux' else '8'
+            elif vor in 'sz':
+                code = '8'
+            else:
+                code = '4' if nach and nach in 'ahkoqux' else '8'
+        elif c == 'x':
+            code = '8' if vor and vor in 'ckq' else '48'
+        elif c == 'l':
+            code = '5'
+        elif c in 'mn':
+            code = '6'
+        elif c == 'r':
+            code = '7'
+        else:  # s, z
+            code = '8'
+        codes.append(code)
+
+    # Doppelte Ziffern zusammenfassen, Nullen nur am Anfang behalten
+    ergebnis = ''
+    for ziffer in ''.join(codes):
+        if not ergebnis or ergebnis[-1] != ziffer:
+            ergebnis += ziffer
+    return ergebnis[:1] + ergebnis[1:].replace('0', '')
+
+
+def _trigramme(text: str) -> set:
+    """Zerlegt einen Text in Trigramme (mit Leerzeichen-Padding)"""
+    text = f" {text} "
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _nur_ziffern(text: str) -> str:
+    return re.sub(r'[^\d]', '', text or '')
+
+
+class KundenSuchIndex:
+    """
+    In-Memory Index für die Fuzzy-Kundensuche
+
+    Hält pro aktivem Kunden die normalisierten Suchfelder vor und
+    indiziert sie über Trigramme sowie Kölner Phonetik (Namen).
+    Eine Suche bewertet nur noch die wenigen Kandidaten aus dem Index
+    mit SequenceMatcher statt die ganze Kundentabelle.
+    """
+
+    # Index wird periodisch neu aufgebaut, damit Änderungen aus
+    # anderen Prozessen (mehrere Worker) nicht dauerhaft fehlen
+    RESYNC_SEKUNDEN = 300
+
+    # Anzahl Kandidaten, die mit SequenceMatcher bewertet werden
+    MAX_KANDIDATEN = 60
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._eintraege: Dict[int, Dict[str, Any]] = {}
+        self._trigramme: Dict[str, set] = defaultdict(set)
+        self._phonetik: Dict[str, set] = defaultdict(set)
+        self._praefixe: Dict[str, set] = defaultdict(set)
+        self._aufgebaut_am: Optional[float] = None
+
+    # ------------------------------------------------------------------
+    # Aufbau und Pflege
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _eintrag_aus_kunde(kunde) -> Dict[str, Any]:
+        """Erstellt den Index-Eintrag (Snapshot) für einen Kunden"""
+        vorname = (kunde.vorname or '').lower()
+        nachname = (kunde.nachname or '').lower()
+
+        # Gleiche Felder und Gewichte wie die bisherige Vollsuche
+        felder = [
+            (f"{kunde.vorname} {kunde.nachname or ''}".lower().strip(), 1.0),
+            (vorname, 1.0),
+        ]
+        if kunde.nachname:
+            felder.append((nachname, 1.0))
+        if kunde.mitgliedsnummer:
+            felder.append((kunde.mitgliedsnummer.lower(), 1.0))
+        if kunde.externe_kundennummer:
+            felder.append((kunde.externe_kundennummer.lower(), 1.0))
+        if kunde.email:
+            felder.append((kunde.email.lower(), 1.0))
+        if kunde.firma:
+            felder.append((kunde.firma.lower(), 0.8))
+
+        return {
+            'id': kunde.id,
+            'felder': felder,
+            'telefon': _nur_ziffern(kunde.telefon) if kunde.telefon else '',
+            'namen': [n for n in re.split(r'[\s\-]+', f"{vorname} {nachname}") if n],
+            'letzter_besuch': getattr(kunde, 'letzter_besuch', None),
+            'stammkunde': bool(getattr(kunde, 'stammkunde', False)),
+            'ist_aktiv': kunde.ist_aktiv is not False
+        }
+
+    @staticmethod
+    def _schluessel(eintrag: Dict[str, Any]):
+        """Liefert Trigramme, Präfixe und Phonetik-Codes eines Eintrags"""
+        trigramme, praefixe, codes = set(), set(), set()
+
+        for wert, _ in eintrag['felder']:
+            trigramme |= _trigramme(wert)
+            for token in wert.split():
+                praefixe.add(token[:1])
+                praefixe.add(token[:2])
+        if eintrag['telefon']:
+            trigramme |= _trigramme(eintrag['telefon'])
+
+        for name in eintrag['namen']:
+            code = koelner_phonetik(name)
+            if code:
+                codes.add(code)
+
+        return trigramme, praefixe, codes
+
+    def _hinzufuegen(self, eintrag: Dict[str, Any]):
+        kunde_id = eintrag['id']
+        self._eintraege[kunde_id] = eintrag
+
+        trigramme, praefixe, codes = self._schluessel(eintrag)
+        for tri in trigramme:
+            self._trigramme[tri].add(kunde_id)
+        for praefix in praefixe:
+            self._praefixe[praefix].add(kunde_id)
+        for code in codes:
+            self._phonetik[code].add(kunde_id)
+
+    def _entfernen(self, kunde_id: int):
+        eintrag = self._eintraege.pop(kunde_id, None)
+        if not eintrag:
+            return
+
+        trigramme, praefixe, codes = self._schluessel(eintrag)
+        for index, schluessel_menge in ((self._trigramme, trigramme),
+                                        (self._praefixe, praefixe),
+                                        (self._phonetik, codes)):
+            for schluessel in schluessel_menge:
+                ids = index.get(schluessel)
+                if ids is None:
+                    continue
+                ids.discard(kunde_id)
+                if not ids:
+                    del index[schluessel]
+
+    def aufbauen(self):
+        """Baut den Index aus allen aktiven Kunden komplett neu auf"""
+        start = time.perf_counter()
+        kunden = Kunde.query.filter_by(ist_aktiv=True).all()
+        eintraege = [self._eintrag_aus_kunde(k) for k in kunden]
+
+        with self._lock:
+            self._eintraege = {}
+            self._trigramme = defaultdict(set)
+            self._phonetik = defaultdict(set)
+            self._praefixe = defaultdict(set)
+            for eintrag in eintraege:
+                self._hinzufuegen(eintrag)
+            self._aufgebaut_am = time.monotonic()
+
+        logger.info(
+            f"Kunden-Suchindex aufgebaut: {len(eintraege)} Kunden "
+            f"in {(time.perf_counter() - start) * 1000:.1f} ms"
+        )
+
+    def aktualisieren(self, eintrag: Dict[str, Any]):
+        """Übernimmt einen geänderten oder neuen Kunden in den Index"""
+        with self._lock:
+            if self._aufgebaut_am is None:
+                return  # Wird beim ersten Aufbau ohnehin vollständig geladen
+            self._entfernen(eintrag['id'])
+            if eintrag['ist_aktiv']:
+                self._hinzufuegen(eintrag)
+
+    def entfernen(self, kunde_id: int):
+        """Entfernt einen gelöschten Kunden aus dem Index"""
+        with self._lock:
+            self._entfernen(kunde_id)
+
+    def leeren(self):
+        """Verwirft den Index (nächste Suche baut ihn neu auf)"""
+        with self._lock:
+            self._eintraege = {}
+            self._trigramme = defaultdict(set)
+            self._phonetik = defaultdict(set)
+            self._praefixe = defaultdict(set)
+            self._aufgebaut_am = None
+
+    def _sicherstellen(self):
+        if (self._aufgebaut_am is None or
+                time.monotonic() - self._aufgebaut_am > self.RESYNC_SEKUNDEN):
+            self.aufbauen()
+
+    # ------------------------------------------------------------------
+    # Suche
+    # ------------------------------------------------------------------
+
+    def _kandidaten(self, suchbegriff: str) -> List[int]:
+        """Ermittelt die vielversprechendsten Kunden-IDs aus dem Index"""
+        treffer = defaultdict(int)
+
+        if len(suchbegriff) < 3:
+            # Zu kurz für Trigramme: Präfix der Namens-/Nummern-Token
+            for kunde_id in self._praefixe.get(suchbegriff, ()):
+                treffer[kunde_id] += 1
+        else:
+            for tri in _trigramme(suchbegriff):
+                for kunde_id in self._trigramme.get(tri, ()):
+                    treffer[kunde_id] += 1
+
+        ziffern = _nur_ziffern(suchbegriff)
+        if len(ziffern) >= 3 and ziffern != suchbegriff:
+            for tri in _trigramme(ziffern):
+                for kunde_id in self._trigramme.get(tri, ()):
+                    treffer[kunde_id] += 1
+
+        # Phonetische Treffer bekommen einen festen Vorrang-Bonus,
+        # damit Schreibvarianten (Meier/Meyer) nicht herausfallen
+        for token in suchbegriff.split():
+            code = koelner_phonetik(token)
+            if code:
+                for kunde_id in self._phonetik.get(code, ()):
+                    treffer[kunde_id] += 3
+
+        sortiert = sorted(treffer.items(), key=lambda x: (-x[1], x[0]))
+        return [kunde_id for kunde_id, _ in sortiert[:self.MAX_KANDIDATEN]]
+
+    def _bewerten(self, eintrag: Dict[str, Any], suchbegriff: str,
+                  suchbegriff_ziffern: str) -> float:
+        """Höchster SequenceMatcher-Score über alle Felder (wie Vollsuche)"""
+        bester = 0.0
+
+        for wert, gewicht in eintrag['felder']:
+            matcher = SequenceMatcher(None, suchbegriff, wert)
+            # quick_ratio ist eine obere Schranke - spart ratio() meistens
+            if matcher.quick_ratio() * gewicht <= bester:
+                continue
+            bester = max(bester, matcher.ratio() * gewicht)
+
+        if eintrag['telefon'] and suchbegriff_ziffern:
+            matcher = SequenceMatcher(None, suchbegriff_ziffern, eintrag['telefon'])
+            if matcher.quick_ratio() > bester:
+                bester = max(bester, matcher.ratio())
+
+        return bester
+
+    @staticmethod
+    def _aktivitaets_bonus(eintrag: Dict[str, Any]) -> float:
+        bonus = 0.0
+        if eintrag['letzter_besuch']:
+            tage_seit_besuch = (datetime.utcnow() - eintrag['letzter_besuch']).days
+            if tage_seit_besuch < 30:
+                bonus += 0.1  # 10% Bonus für Aktivität in letzten 30 Tagen
+            elif tage_seit_besuch < 90:
+                bonus += 0.05  # 5% Bonus für Aktivität in letzten 90 Tagen
+        if eintrag['stammkunde']:
+            bonus += 0.05
+        return bonus
+
+    def suchen(self, suchbegriff: str, limit: int = 10,
+               min_score: float = 0.5) -> List[Dict[str, Any]]:
+        """
+        Sucht im Index und gibt [{'kunde_id', 'score'}] sortiert zurück
+
+        Die Scores entsprechen der bisherigen Vollsuche (bester Feld-Score
+        plus Aktivitäts-Bonus, gedeckelt bei 1.0).
+        """
+        suchbegriff = (suchbegriff or '').strip().lower()
+        if not suchbegriff:
+            return []
+
+        self._sicherstellen()
+        suchbegriff_ziffern = _nur_ziffern(suchbegriff)
+
+        ergebnisse = []
+        with self._lock:
+            for kunde_id in self._kandidaten(suchbegriff):
+                eintrag = self._eintraege.get(kunde_id)
+                if not eintrag:
+                    continue
+                score = self._bewerten(eintrag, suchbegriff, suchbegriff_ziffern)
+                score += self._aktivitaets_bonus(eintrag)
+                if score >= min_score:
+                    ergebnisse.append({'kunde_id': kunde_id, 'score': min(score, 1.0)})
+
+        ergebnisse.sort(key=lambda x: x['score'], reverse=True)
+        return ergebnisse[:limit]
+
+    @property
+    def anzahl(self) -> int:
+        return len(self._eintraege)
+
+
+# Globaler Index (pro Prozess)
+kunden_suchindex = KundenSuchIndex()
+
+
+# ============================================================================
+# SQLAlchemy-Events: Index nach erfolgreichem Commit aktualisieren
+# ============================================================================
+
+_PENDING_KEY = 'kunden_suchindex_pending'
+
+
+def _vormerken(target, loeschen=False):
+    session = object_session(target)
+    if session is None:
+        return
+    pending = session.info.setdefault(_PENDING_KEY, {})
+    pending[target.id] = None if loeschen else KundenSuchIndex._eintrag_aus_kunde(target)
+
+
+@event.listens_for(Kunde, 'after_insert')
+@event.listens_for(Kunde, 'after_update')
+def _kunde_geaendert(mapper, connection, target):
+    _vormerken(target)
+
+
+@event.listens_for(Kunde, 'after_delete')
+def _kunde_geloescht(mapper, connection, target):
+    _vormerken(target, loeschen=True)
+
+
+@event.listens_for(Session, 'after_commit')
+def _nach_commit(session):
+    pending = session.info.pop(_PENDING_KEY, None)
+    if not pending:
+        return
+    for kunde_id, eintrag in pending.items():
+        if eintrag is None:
+            kunden_suchindex.entfernen(kunde_id)
+        else:
+            kunden_suchindex.aktualisieren(eintrag)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _nach_rollback(session):
+    session.info.pop(_PENDING_KEY, None)
@@ -20,6 +20,9 @@ class PatroneEinkaufService:
     - Lagerbestand überwachen
     """
     
+    # Unter diesem Anteil (Prozent der Einkaufsmenge) gilt ein Bestand als niedrig
+    NIEDRIG_PROZENT = 20
+    
     @staticmethod
     def neuen_einkauf_einbuchen(eingekauft_von: str,
                                lieferant: str,
@@ -381,39 +384,63 @@ class PatroneEinkaufService:
                 'error': str(e)
             }
     
+    @staticmethod
+    def _lager_spalten():
+        """SQL-Ausdrücke für verbleibende Menge und Prozent (wie verbleibende_menge_berechnet)"""
+        verbleibend = db.func.coalesce(
+            PatroneEinkauf.verbleibende_menge,
+            PatroneEinkauf.menge - PatroneEinkauf.verbraucht_menge
+        )
+        prozent = verbleibend * 100.0 / db.func.nullif(PatroneEinkauf.menge, 0)
+        return verbleibend, prozent
+    
     @staticmethod
     def get_lagerbestand() -> Dict[str, Any]:
         """
-        Gibt aktuellen Lagerbestand zurück
+        Gibt aktuellen Lagerbestand zurück (Positionen mit Bestand, nach Typ)
+        
+        Verbleibende Menge, Prozent und Niedrig-Kennzeichen (< NIEDRIG_PROZENT)
+        rechnet die Datenbank; geliefert werden nur die angezeigten Felder.
         
         Returns:
             Dict mit Lagerbestand-Informationen
         """
         
         try:
-            einkäufe = PatroneEinkauf.query.filter_by(ist_aktiv=True).all()
+            verbleibend, prozent = PatroneEinkaufService._lager_spalten()
+            zeilen = db.session.query(
+                PatroneEinkauf.id,
+                PatroneEinkauf.produkt_typ,
+                PatroneEinkauf.produkt_name,
+                PatroneEinkauf.lieferant,
+                PatroneEinkauf.einheit,
+                verbleibend.label('verbleibend'),
+                prozent.label('prozent'),
+                (prozent < PatroneEinkaufService.NIEDRIG_PROZENT).label('niedrig')
+            ).filter(
+                PatroneEinkauf.ist_aktiv == True,
+                verbleibend > 0  # Nur Artikel mit Bestand
+            ).order_by(
+                PatroneEinkauf.produkt_typ, PatroneEinkauf.einkauf_datum
+            ).all()
             
             # Gruppierung nach Produkt-Typ
             lagerbestand = {}
-            for einkauf in einkäufe:
-                typ = einkauf.produkt_typ
-                if typ not in lagerbestand:
-                    lagerbestand[typ] = []
-                
-                verbleibend = einkauf.verbleibende_menge_berechnet
-                if verbleibend > 0:  # Nur Artikel mit Bestand
-                    lagerbestand[typ].append({
-                        'einkauf': einkauf.to_dict(),
-                        'verbleibende_menge': verbleibend,
-                        'prozent_verbleibend': (verbleibend / einkauf.menge) * 100
-                    })
-            
-            # Niedrige Bestände ermitteln (< 20%)
             niedrige_bestaende = []
-            for typ, artikel in lagerbestand.items():
-                for artikel_info in artikel:
-                    if artikel_info['prozent_verbleibend'] < 20:
-                        niedrige_bestaende.append(artikel_info)
+            for zeile in zeilen:
+                artikel_info = {
+                    'einkauf': {
+                        'id': zeile.id,
+                        'produkt_name': zeile.produkt_name,
+                        'lieferant': zeile.lieferant,
+                        'einheit': zeile.einheit
+                    },
+                    'verbleibende_menge': zeile.verbleibend,
+                    'prozent_verbleibend': zeile.prozent or 0
+                }
+                lagerbestand.setdefault(zeile.produkt_typ, []).append(artikel_info)
+                if zeile.niedrig:
+                    niedrige_bestaende.append(artikel_info)
             
             return {
                 'success': True,
@@ -430,6 +457,56 @@ class PatroneEinkaufService:
                 'lagerbestand_nach_typ': {}
             }
     
+    @staticmethod
+    def berechne_lagerbestand_uebersicht() -> Dict[str, Any]:
+        """
+        Lagerbestand je Produkt-Typ in einer Aggregat-Abfrage
+        
+        Positionen mit Bestand, Summe der verbleibenden Menge und Anzahl
+        niedriger Bestände; Grundlage für die Wartungs-Übersicht.
+        """
+        verbleibend, prozent = PatroneEinkaufService._lager_spalten()
+        hat_bestand = verbleibend > 0
+        zeilen = db.session.query(
+            PatroneEinkauf.produkt_typ,
+            db.func.count(db.case((hat_bestand, 1))).label('positionen'),
+            db.func.coalesce(db.func.sum(db.case((hat_bestand, verbleibend))), 0).label('verbleibend'),
+            db.func.count(db.case((db.and_(hat_bestand, prozent < PatroneEinkaufService.NIEDRIG_PROZENT), 1))).label('niedrig')
+        ).filter(
+            PatroneEinkauf.ist_aktiv == True
+        ).group_by(
+            PatroneEinkauf.produkt_typ
+        ).having(
+            db.func.count(db.case((hat_bestand, 1))) > 0
+        ).all()
+        
+        return {
+            'success': True,
+            'lagerbestand_nach_typ': {
+                zeile.produkt_typ: {
+                    'positionen': zeile.positionen,
+                    'verbleibend': zeile.verbleibend,
+                    'niedrig': zeile.niedrig
+                }
+                for zeile in zeilen
+            },
+            'warnung_anzahl': sum(zeile.niedrig for zeile in zeilen)
+        }
+    
+    @staticmethod
+    def get_lagerbestand_uebersicht() -> Dict[str, Any]:
+        """Lagerbestand je Typ aus dem Statistik-Snapshot (bei Einkauf/Verbrauch neu berechnet)"""
+        try:
+            from app.services.statistik_service import statistik_lesen
+            return statistik_lesen('lagerbestand')
+        except Exception as e:
+            logger.error(f"FEHLER bei Lagerbestand-Übersicht: {str(e)}")
+            return {
+                'success': False,
+                'error': str(e),
+                'lagerbestand_nach_typ': {}
+            }
+    
     @staticmethod
     def get_einkaufs_historie(limit: int = 50) -> Dict[str, Any]:
         """
@@ -7,6 +7,7 @@ from typing import Dict, Any, Optional, List
 import qrcode
 from io import BytesIO
 import json
+import textwrap
 
 try:
     from escpos.printer import Usb, Serial, Network, Dummy
@@ -32,7 +33,7 @@ class PrintService:
     - ESC/POS Thermodrucker (USB, Serial, Network)
     - 62mm Etikettenformat
     - QR-Code Integration
-    - Druckwarteschlange für Offline-Betrieb
+    - Druckwarteschlange für Offline-Betrieb (Druck-Worker im Hintergrund)
     - Wiederholungsdrucke
     """
     
@@ -63,44 +64,7 @@ class PrintService:
             return Dummy()
         
         try:
-            verbindung = drucker_config.get_verbindung_dict()
-            
-            if drucker_config.interface_typ == 'usb':
-                # USB-Drucker
-                vendor_id = verbindung.get('vendor_id', 0x04b8)  # Epson Standard
-                product_id = verbindung.get('product_id', 0x0202)
-                
-                printer_instance = Usb(
-                    idVendor=vendor_id,
-                    idProduct=product_id,
-                    profile=verbindung.get('profile', 'default')
-                )
-                
-            elif drucker_config.interface_typ == 'serial':
-                # Serial-Drucker
-                port = verbindung.get('port', '/dev/ttyUSB0')
-                baudrate = verbindung.get('baudrate', 9600)
-                
-                printer_instance = Serial(
-                    devfile=port,
-                    baudrate=baudrate,
-                    profile=verbindung.get('profile', 'default')
-                )
-                
-            elif drucker_config.interface_typ == 'network':
-                # Netzwerk-Drucker
-                host = verbindung.get('host', '192.168.1.100')
-                port = verbindung.get('port', 9100)
-                
-                printer_instance = Network(
-                    host=host,
-                    port=port,
-                    profile=verbindung.get('profile', 'default')
-                )
-                
-            else:
-                logger.error(f"Unbekannter Interface-Typ: {drucker_config.interface_typ}")
-                return Dummy()
+            printer_instance = self.verbindung_oeffnen(drucker_config)
             
             # Status loggen
             PrinterStatus.log_status(
@@ -123,6 +87,58 @@ class PrintService:
             
             return Dummy()  # Fallback für Development
     
+    def verbindung_oeffnen(self, drucker_config: PrinterKonfiguration):
+        """
+        Öffnet die ESC/POS-Verbindung zu einem Drucker (ohne Fallback)
+        
+        Args:
+            drucker_config: Drucker-Konfiguration
+        
+        Returns:
+            ESC/POS Printer-Instanz
+        
+        Raises:
+            ValueError: bei unbekanntem Interface-Typ
+            Exception: Verbindungsfehler der ESC/POS-Bibliothek
+        """
+        
+        verbindung = drucker_config.get_verbindung_dict()
+        
+        if drucker_config.interface_typ == 'usb':
+            # USB-Drucker
+            vendor_id = verbindung.get('vendor_id', 0x04b8)  # Epson Standard
+            product_id = verbindung.get('product_id', 0x0202)
+            
+            return Usb(
+                idVendor=vendor_id,
+                idProduct=product_id,
+                profile=verbindung.get('profile', 'default')
+            )
+            
+        elif drucker_config.interface_typ == 'serial':
+            # Serial-Drucker
+            port = verbindung.get('port', '/dev/ttyUSB0')
+            baudrate = verbindung.get('baudrate', 9600)
+            
+            return Serial(
+                devfile=port,
+                baudrate=baudrate,
+                profile=verbindung.get('profile', 'default')
+            )
+            
+        elif drucker_config.interface_typ == 'network':
+            # Netzwerk-Drucker
+            host = verbindung.get('host', '192.168.1.100')
+            port = verbindung.get('port', 9100)
+            
+            return Network(
+                host=host,
+                port=port,
+                profile=verbindung.get('profile', 'default')
+            )
+        
+        raise ValueError(f"Unbekannter Interface-Typ: {drucker_config.interface_typ}")
+    
     def test_printer_connection(self, drucker_config: PrinterKonfiguration = None) -> Dict[str, Any]:
         """
         Testet Drucker-Verbindung
@@ -225,11 +241,91 @@ class PrintService:
             logger.error(f"QR-Code Generierung fehlgeschlagen: {str(e)}")
             return b''
     
+    def etikett_zeilen(self, etikett_daten: Dict[str, Any], breite: int = 42) -> List[str]:
+        """
+        Textzeilen eines Patronenwechsel-Etiketts (ohne Titel und QR-Code)
+        
+        Args:
+            etikett_daten: Etikett-Daten des Druckjobs
+            breite: Zeichen pro Zeile des Druckers
+        
+        Returns:
+            Liste von Zeilen, auf die Druckbreite umbrochen
+        """
+        
+        zeilen = []
+        
+        try:
+            datum = datetime.fromisoformat(etikett_daten['wechsel_datum']).strftime('%d.%m.%Y %H:%M')
+        except (KeyError, TypeError, ValueError):
+            datum = '-'
+        zeilen.append(f"Datum: {datum}")
+        zeilen.append(f"Betriebsstunden: {etikett_daten.get('betriebsstunden') or 0}h")
+        zeilen.append(f"Durchgeführt von: {etikett_daten.get('durchgefuehrt_von') or '-'}")
+        zeilen.append('-' * breite)
+        
+        for schluessel, bezeichnung in (('molekularsieb_1', 'Molekularsieb 1'),
+                                        ('molekularsieb_2', 'Molekularsieb 2'),
+                                        ('kohle_filter', 'Kohlefilter')):
+            patrone = etikett_daten.get(schluessel) or {}
+            if patrone.get('gewechselt'):
+                zeilen.append(f"{bezeichnung}: Charge {patrone.get('charge') or '-'}")
+        
+        if etikett_daten.get('naechster_wechsel_bei'):
+            zeilen.append('-' * breite)
+            zeilen.append(f"Nächster Wechsel bei: {etikett_daten['naechster_wechsel_bei']}h")
+        
+        if etikett_daten.get('notizen'):
+            zeilen.append(f"Notiz: {etikett_daten['notizen']}")
+        
+        umbrochen = []
+        for zeile in zeilen:
+            umbrochen.extend(textwrap.wrap(zeile, breite) or [''])
+        return umbrochen
+    
+    def etikett_drucken(self, printer_instance, job: PrintJob,
+                        drucker_config: Optional[PrinterKonfiguration] = None):
+        """
+        Gibt das Etikett eines Druckjobs auf einer offenen Verbindung aus
+        
+        Args:
+            printer_instance: ESC/POS Printer-Instanz (None = Druck simulieren)
+            job: Druckjob mit Etikett-Daten
+            drucker_config: Drucker-Konfiguration (für die Zeilenbreite)
+        
+        Raises:
+            Exception: Schreibfehler der ESC/POS-Bibliothek
+        """
+        
+        etikett_daten = job.get_etikett_daten_dict()
+        breite = drucker_config.max_zeichen_pro_zeile if drucker_config else 42
+        zeilen = self.etikett_zeilen(etikett_daten, breite)
+        
+        if printer_instance is None:
+            logger.info(f"Patronenwechsel-Etikett simuliert: Job {job.id} ({len(zeilen)} Zeilen)")
+            return
+        
+        printer_instance.set(align='center', bold=True, double_height=True)
+        printer_instance.text("PATRONENWECHSEL\n")
+        printer_instance.set(align='left', bold=False, double_height=False)
+        printer_instance.text("\n".join(zeilen) + "\n")
+        
+        if etikett_daten.get('qr_code_url'):
+            printer_instance.set(align='center')
+            printer_instance.qr(etikett_daten['qr_code_url'], size=4)
+        
+        printer_instance.text("\n" * 2)  # Feed
+        printer_instance.cut()
+    
     def create_and_print_patronenwechsel_etikett(self, patronenwechsel_id: int, 
                                                erstellt_von: str,
                                                drucker_id: int = None) -> Dict[str, Any]:
         """
-        Erstellt Druckjob und druckt Patronenwechsel-Etikett direkt
+        Erstellt Druckjob für ein Patronenwechsel-Etikett
+        
+        Gedruckt wird im Hintergrund vom Druck-Worker (siehe druck_worker.py);
+        der Aufruf kehrt sofort zurück, auch wenn der Drucker langsam oder
+        gerade nicht erreichbar ist.
         
         Args:
             patronenwechsel_id: ID des Patronenwechsels
@@ -240,25 +336,26 @@ class PrintService:
             Dict mit Ergebnis
         """
         
+        from app.services.druck_worker import druck_worker
+        
         try:
-            # Druckjob erstellen
+            # Druckjob erstellen (status 'pending')
             job = PrintJob.create_patronenwechsel_job(
                 patronenwechsel_id=patronenwechsel_id,
                 erstellt_von=erstellt_von,
                 drucker_id=drucker_id
             )
             
-            # TODO: Hier würde das tatsächliche Drucken implementiert
-            # Für jetzt simulieren wir erfolgreichen Druck
-            job.mark_as_success()
+            druck_worker.anstossen()
             
-            logger.info(f"Patronenwechsel-Etikett simuliert: Job {job.id}")
+            logger.info(f"Patronenwechsel-Etikett in Druckwarteschlange: Job {job.id}")
             
             return {
                 'success': True,
-                'message': 'Etikett erfolgreich erstellt (Druck simuliert)',
+                'message': 'Etikett an Druckwarteschlange übergeben',
                 'job_id': job.id,
-                'gedruckt_am': datetime.utcnow().isoformat()
+                'status': job.status,
+                'erstellt_am': job.erstellt_am.isoformat()
             }
             
         except Exception as e:
@@ -269,6 +366,142 @@ class PrintService:
                 'success': False,
                 'error': error_msg
             }
+    
+    def reprint_job(self, job_id: int, angefordert_von: str) -> Dict[str, Any]:
+        """
+        Stellt einen bestehenden Druckjob erneut in die Warteschlange
+        
+        Args:
+            job_id: ID des Druckjobs
+            angefordert_von: Wer den Wiederholungsdruck angefordert hat
+        
+        Returns:
+            Dict mit Ergebnis
+        """
+        
+        from app.services.druck_worker import druck_worker
+        
+        try:
+            job = db.session.get(PrintJob, job_id)
+            if not job:
+                return {
+                    'success': False,
+                    'error': f'Druckjob {job_id} nicht gefunden'
+                }
+            
+            if job.status in ('pending', 'printing'):
+                return {
+                    'success': True,
+                    'message': 'Druckjob ist bereits in der Warteschlange',
+                    'job_id': job.id,
+                    'status': job.status
+                }
+            
+            job.status = 'pending'
+            job.druckversuche = 0
+            job.fehler_nachricht = None
+            job.wiederholungsdrucke += 1
+            db.session.commit()
+            
+            druck_worker.anstossen()
+            
+            logger.info(f"Wiederholungsdruck für Job {job.id} angefordert von {angefordert_von}")
+            
+            return {
+                'success': True,
+                'message': 'Wiederholungsdruck an Druckwarteschlange übergeben',
+                'job_id': job.id,
+                'status': job.status,
+                'wiederholungsdrucke': job.wiederholungsdrucke
+            }
+            
+        except Exception as e:
+            db.session.rollback()
+            error_msg = f"Wiederholungsdruck fehlgeschlagen: {str(e)}"
+            logger.error(error_msg)
+            
+            return {
+                'success': False,
+                'error': error_msg
+            }
+    
+    def process_print_queue(self) -> Dict[str, Any]:
+        """
+        Weckt den Druck-Worker für die Warteschlange
+        
+        Returns:
+            Dict mit Anzahl wartender Jobs
+        """
+        
+        from app.services.druck_worker import druck_worker
+        
+        try:
+            wartend = PrintJob.query.filter_by(status='pending').count()
+            druck_worker.anstossen()
+            
+            return {
+                'success': True,
+                'message': 'Druck-Worker angestoßen',
+                'wartende_jobs': wartend,
+                'verarbeitet': 0
+            }
+            
+        except Exception as e:
+            return {
+                'success': False,
+                'error': f"Warteschlange nicht verfügbar: {str(e)}"
+            }
+    
+    def get_printer_status(self, drucker_id: int = None) -> Dict[str, Any]:
+        """
+        Status der Drucker aus Sicht des Druck-Workers
+        
+        Args:
+            drucker_id: Nur diesen Drucker (optional)
+        
+        Returns:
+            Dict mit Worker-Status und letztem Status-Log je Drucker
+        """
+        
+        from app.services.druck_worker import druck_worker
+        
+        try:
+            abfrage = PrinterKonfiguration.query.filter_by(ist_aktiv=True)
+            if drucker_id:
+                abfrage = PrinterKonfiguration.query.filter_by(id=drucker_id)
+            
+            drucker = []
+            for d in abfrage.all():
+                letzter = PrinterStatus.query.filter_by(drucker_id=d.id).order_by(
+                    PrinterStatus.zeitpunkt.desc()
+                ).first()
+                drucker.append({
+                    'id': d.id,
+                    'name': d.name,
+                    'status': letzter.status if letzter else 'unbekannt',
+                    'nachricht': letzter.nachricht if letzter else None,
+                    'zeitpunkt': letzter.zeitpunkt.isoformat() if letzter else None
+                })
+            
+            if drucker_id and not drucker:
+                return {
+                    'success': False,
+                    'error': f'Drucker {drucker_id} nicht gefunden'
+                }
+            
+            return {
+                'success': True,
+                'escpos_verfuegbar': ESCPOS_AVAILABLE,
+                'worker': druck_worker.status(),
+                'wartende_jobs': PrintJob.query.filter_by(status='pending').count(),
+                'drucker': drucker
+            }
+            
+        except Exception as e:
+            return {
+                'success': False,
+                'error': f"Drucker-Status nicht verfügbar: {str(e)}"
+            }
 
 # Globale Service-Instanz
 print_service = PrintService()
@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""
+Gemeinsamer Shelly-Client für WartungsManager
+
+- Keep-Alive Session-Pool pro Gerät (keine neue TCP-Verbindung pro Aufruf)
+- Zusammenfassen gleichzeitiger Status-Abfragen auf eine HTTP-Anfrage
+- Leistungsschalter (Circuit Breaker): offline Geräte schlagen sofort fehl
+- Schaltbefehle laufen im Hintergrund, Ergebnis per Auftrags-Status
+"""
+
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+
+class ShellyNichtErreichbar(Exception):
+    """Gerät antwortet nicht oder Leistungsschalter ist offen"""
+
+
+class ShellyAntwortFehler(ShellyNichtErreichbar):
+    """Gerät erreichbar, Antwort aber unbrauchbar (HTTP-Fehler, kein JSON)"""
+
+    def __init__(self, meldung: str, status_code: Optional[int] = None):
+        super().__init__(meldung)
+        self.status_code = status_code
+
+
+class ShellyAnmeldungFehlgeschlagen(ShellyAntwortFehler):
+    """Gerät lehnt die Zugangsdaten ab (HTTP 401/403)"""
+
+
+class Leistungsschalter:
+    """
+    Circuit Breaker für ein einzelnes Gerät
+
+    geschlossen -> nach FEHLER_SCHWELLE Fehlern offen
+    offen       -> Aufrufe schlagen sofort fehl, nach OFFEN_SEKUNDEN halboffen
+    halboffen   -> genau ein Probe-Aufruf; Erfolg schließt, Fehler öffnet erneut
+
+    Als Fehler zählen nur Verbindungsfehler und Timeouts; HTTP-Fehler
+    beweisen, dass das Gerät erreichbar ist.
+    """
+
+    FEHLER_SCHWELLE = 3
+    OFFEN_SEKUNDEN = 30.0
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.zustand = 'geschlossen'
+        self.fehler = 0
+        self.geoeffnet_um = 0.0
+        self._probe_laeuft = False
+        self.anmeldung_fehlgeschlagen = False
+
+    def darf_anfragen(self) -> bool:
+        with self._lock:
+            if self.zustand == 'geschlossen':
+                return True
+            if self.zustand == 'offen' and time.monotonic() - self.geoeffnet_um >= self.OFFEN_SEKUNDEN:
+                self.zustand = 'halboffen'
+            if self.zustand == 'halboffen' and not self._probe_laeuft:
+                self._probe_laeuft = True
+                return True
+            return False
+
+    def ist_blockiert(self) -> bool:
+        """True solange der Schalter offen ist und keine Probe ansteht"""
+        with self._lock:
+            return (self.zustand == 'offen'
+                    and time.monotonic() - self.geoeffnet_um < self.OFFEN_SEKUNDEN)
+
+    def erfolg(self, anmeldung_fehlgeschlagen: Optional[bool] = False):
+        """Gerät hat geantwortet (auch mit HTTP-Fehler); None lässt den Anmeldestatus unverändert"""
+        with self._lock:
+            self.zustand = 'geschlossen'
+            self.fehler = 0
+            self._probe_laeuft = False
+            if anmeldung_fehlgeschlagen is not None:
+                self.anmeldung_fehlgeschlagen = anmeldung_fehlgeschlagen
+
+    def fehlschlag(self):
+        with self._lock:
+            self.fehler += 1
+            self._probe_laeuft = False
+            if self.zustand == 'halboffen' or self.fehler >= self.FEHLER_SCHWELLE:
+                if self.zustand != 'offen':
+                    logger.warning("Shelly-Leistungsschalter geöffnet")
+                self.zustand = 'offen'
+                self.geoeffnet_um = time.monotonic()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'zustand': self.zustand, 'fehler': self.fehler,
+                'anmeldung_fehlgeschlagen': self.anmeldung_fehlgeschlagen}
+
+
+class ShellyClient:
+    """Thread-sicherer Client für alle Shelly-Zugriffe der Anwendung"""
+
+    # Kurze Timeouts: (Verbindungsaufbau, Antwort)
+    TIMEOUT = (1.5, 3.0)
+    POOL_GROESSE = 4
+    MAX_AUFTRAEGE = 100
+
+    # Pause zwischen AUS und EIN beim Neu-Synchronisieren des Relais
+    SYNC_PAUSE_SEKUNDEN = 0.5
+
+    def __init__(self, max_worker: int = 4):
+        self._lock = threading.Lock()
+        self._sessions: Dict[str, requests.Session] = {}
+        self._schalter: Dict[str, Leistungsschalter] = {}
+        self._laufend: Dict[Tuple[str, str], Future] = {}
+        self._auftraege: Dict[str, Dict[str, Any]] = {}
+        self._beobachter = []
+        self._executor = ThreadPoolExecutor(max_workers=max_worker, thread_name_prefix='shelly')
+
+    # ------------------------------------------------------------------
+    # Verbindungen
+    # ------------------------------------------------------------------
+
+    def _session(self, ip: str) -> requests.Session:
+        with self._lock:
+            session = self._sessions.get(ip)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.POOL_GROESSE, max_retries=0)
+                session.mount('http://', adapter)
+                self._sessions[ip] = session
+            return session
+
+    def leistungsschalter(self, ip: str) -> Leistungsschalter:
+        with self._lock:
+            if ip not in self._schalter:
+                self._schalter[ip] = Leistungsschalter()
+            return self._schalter[ip]
+
+    def anfrage(self, ip: str, pfad: str, methode: str = 'GET', params: Optional[Dict] = None,
+                json: Optional[Dict] = None, auth: Optional[Tuple[str, str]] = None,
+                timeout=None) -> Any:
+        """
+        Führt eine HTTP-Anfrage an ein Gerät aus und liefert die JSON-Antwort
+
+        Raises:
+            ShellyNichtErreichbar: Gerät offline oder Schalter offen
+            ShellyAnmeldungFehlgeschlagen: Zugangsdaten abgelehnt (HTTP 401/403)
+            ShellyAntwortFehler: sonstiger HTTP-Fehler oder ungültiges JSON
+        """
+        schalter = self.leistungsschalter(ip)
+        if not schalter.darf_anfragen():
+            raise ShellyNichtErreichbar(f"Shelly {ip} nicht erreichbar (Leistungsschalter offen)")
+
+        try:
+            response = self._session(ip).request(
+                methode, f'http://{ip}{pfad}', params=params, json=json,
+                auth=auth, timeout=timeout or self.TIMEOUT
+            )
+        except requests.RequestException as e:
+            schalter.fehlschlag()
+            raise ShellyNichtErreichbar(f"Shelly {ip}: {e}") from e
+
+        # Ab hier hat das Gerät geantwortet: Leistungsschalter bleibt geschlossen
+        if response.status_code in (401, 403):
+            if not schalter.anmeldung_fehlgeschlagen:
+                logger.warning(f"Shelly {ip}: Anmeldung fehlgeschlagen (HTTP {response.status_code})")
+            schalter.erfolg(anmeldung_fehlgeschlagen=True)
+            raise ShellyAnmeldungFehlgeschlagen(
+                f"Shelly {ip}: Anmeldung fehlgeschlagen (HTTP {response.status_code})", response.status_code
+            )
+        if response.status_code != 200:
+            schalter.erfolg(anmeldung_fehlgeschlagen=None)
+            raise ShellyAntwortFehler(f"Shelly {ip}: HTTP {response.status_code}", response.status_code)
+        schalter.erfolg()
+        try:
+            return response.json() if response.content else {}
+        except ValueError as e:
+            raise ShellyAntwortFehler(f"Shelly {ip}: ungültige Antwort ({e})", response.status_code) from e
+
+    # ------------------------------------------------------------------
+    # Status (zusammengefasst)
+    # ------------------------------------------------------------------
+
+    def status(self, ip: str, pfad: str = '/rpc/Shelly.GetStatus', **kwargs) -> Any:
+        """
+        Status-Abfrage; gleichzeitige Aufrufer für dasselbe Gerät und denselben
+        Pfad teilen sich eine einzige HTTP-Anfrage
+        """
+        schluessel = (ip, pfad)
+        with self._lock:
+            future = self._laufend.get(schluessel)
+            eigene_anfrage = future is None
+            if eigene_anfrage:
+                future = Future()
+                self._laufend[schluessel] = future
+
+        if not eigene_anfrage:
+            return future.result()
+
+        try:
+            daten = self.anfrage(ip, pfad, **kwargs)
+            future.set_result(daten)
+            return daten
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._laufend.pop(schluessel, None)
+
+    # ------------------------------------------------------------------
+    # Schalten
+    # ------------------------------------------------------------------
+
+    def schalten(self, ip: str, an: bool, neu_synchronisieren: bool = False,
+                 switch_id: int = 0) -> Dict[str, Any]:
+        """
+        Schaltet das Relais (Gen2 RPC) synchron
+
+        neu_synchronisieren: erst AUS, kurze Pause, dann EIN (Workaround für
+        Plugs, deren Relais-Zustand nicht mit der Anzeige übereinstimmt)
+        """
+        if an and neu_synchronisieren:
+            try:
+                self.anfrage(ip, '/rpc/Switch.Set', params={'id': switch_id, 'on': 'false'})
+            except ShellyNichtErreichbar as e:
+                logger.warning(f"Neu-Synchronisieren (AUS) fehlgeschlagen: {e}")
+            time.sleep(self.SYNC_PAUSE_SEKUNDEN)
+
+        return self.anfrage(ip, '/rpc/Switch.Set', params={'id': switch_id, 'on': 'true' if an else 'false'})
+
+    def schalten_im_hintergrund(self, ip: str, an: bool, neu_synchronisieren: bool = False,
+                                switch_id: int = 0) -> Dict[str, Any]:
+        """Startet einen Schaltauftrag außerhalb des Request-Threads"""
+        mit_sync = an and neu_synchronisieren
+        return self.auftrag_starten(
+            ip, 'on' if an else 'off', self.schalten, ip, an, neu_synchronisieren, switch_id,
+            max_anfragen=2 if mit_sync else 1, pausen=self.SYNC_PAUSE_SEKUNDEN if mit_sync else 0.0
+        )
+
+    def max_dauer(self, anfragen: int = 1, pausen: float = 0.0) -> float:
+        """Höchstdauer eines Auftrags: alle Anfragen laufen in den Timeout, plus Pausen"""
+        return round(anfragen * sum(self.TIMEOUT) + pausen, 1)
+
+    def auftrag_starten(self, ip: str, aktion: str, funktion: Callable, *args,
+                        max_anfragen: int = 1, pausen: float = 0.0) -> Dict[str, Any]:
+        """
+        Führt funktion(*args) im Shelly-Worker aus
+
+        max_anfragen/pausen: HTTP-Anfragen und Pausen von funktion im ungünstigsten
+        Fall; daraus ergibt sich 'max_dauer_sekunden' (Wartezeit der Oberfläche)
+
+        Returns:
+            Auftrags-Dict; Fortschritt über auftrag_status(auftrag_id)
+        """
+        auftrag_id = uuid.uuid4().hex
+        auftrag = {
+            'auftrag_id': auftrag_id,
+            'ip': ip,
+            'aktion': aktion,
+            'status': 'wartend',
+            'max_dauer_sekunden': self.max_dauer(max_anfragen, pausen),
+            'erstellt_am': datetime.now().isoformat(),
+            'beendet_am': None,
+            'antwort': None,
+            'error': None
+        }
+
+        with self._lock:
+            self._auftraege[auftrag_id] = auftrag
+            # Älteste abgeschlossene Aufträge verwerfen
+            while len(self._auftraege) > self.MAX_AUFTRAEGE:
+                alt = next((k for k, a in self._auftraege.items()
+                            if a['status'] in ('fertig', 'fehler')), None)
+                if alt is None:
+                    break
+                del self._auftraege[alt]
+
+        self._executor.submit(self._auftrag_ausfuehren, auftrag, funktion, args)
+        return dict(auftrag)
+
+    def _auftrag_ausfuehren(self, auftrag: Dict[str, Any], funktion: Callable, args: tuple):
+        auftrag['status'] = 'laeuft'
+        try:
+            auftrag['antwort'] = funktion(*args)
+            auftrag['status'] = 'fertig'
+            logger.info(f"Shelly-Auftrag {auftrag['aktion']} für {auftrag['ip']} ausgeführt")
+        except Exception as e:
+            auftrag['error'] = str(e)
+            auftrag['status'] = 'fehler'
+            logger.error(f"Shelly-Auftrag {auftrag['aktion']} für {auftrag['ip']} fehlgeschlagen: {e}")
+        finally:
+            auftrag['beendet_am'] = datetime.now().isoformat()
+
+        for beobachter in list(self._beobachter):
+            try:
+                beobachter(dict(auftrag))
+            except Exception as e:
+                logger.error(f"Auftrags-Beobachter fehlgeschlagen: {e}")
+
+    def beobachter_hinzufuegen(self, callback: Callable[[Dict[str, Any]], None]):
+        """Registriert einen Callback, der nach jedem abgeschlossenen Auftrag läuft"""
+        if callback not in self._beobachter:
+            self._beobachter.append(callback)
+
+    def auftrag_status(self, auftrag_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            auftrag = self._auftraege.get(auftrag_id)
+            return dict(auftrag) if auftrag else None
+
+    def geraete_zustand(self) -> Dict[str, Any]:
+        """Leistungsschalter-Zustand aller bisher angesprochenen Geräte"""
+        with self._lock:
+            return {ip: s.to_dict() for ip, s in self._schalter.items()}
+
+
+# Globale Instanz (eine Session pro Gerät für die ganze Anwendung)
+shelly_client = ShellyClient()
+
+# Erstellt von Hans Hahn - Alle Rechte vorbehalten
@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+"""
+Shelly-Netzwerksuche für WartungsManager (asyncio)
+
+- TCP-Vorfilter: paralleler Verbindungsaufbau auf Port 80 für das ganze /24,
+  tote Adressen kosten nur einen Connect-Timeout
+- HTTP-Proben nur auf offenen Hosts, Gen1 (/shelly) und Gen2 (/rpc) parallel
+- Persistenter MAC->IP-Cache: bekannte Geräte werden zuerst direkt geprüft
+- Ein vollständiger Scan dauert damit etwa Connect- plus HTTP-Timeout,
+  unabhängig von der Anzahl der Adressen
+"""
+
+import asyncio
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Liegt neben shelly_devices.json (app.root_path)
+CACHE_DATEI = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'shelly_discovery_cache.json')
+
+
+class _HttpFehler(Exception):
+    """Keine gültige HTTP/JSON-Antwort"""
+
+
+async def _tcp_offen(ip: str, port: int, timeout: float) -> bool:
+    """True wenn der Port eine Verbindung annimmt"""
+    try:
+        _, writer = await asyncio.wait_for(asyncio.open_connection(ip, port), timeout)
+    except (OSError, asyncio.TimeoutError):
+        return False
+    writer.close()
+    try:
+        await writer.wait_closed()
+    except OSError:
+        pass
+    return True
+
+
+def _chunked_dekodieren(daten: bytes) -> bytes:
+    ergebnis = b''
+    while daten:
+        zeile, _, rest = daten.partition(b'\r\n')
+        laenge = int(zeile.split(b';')[0].strip() or b'0', 16)
+        if laenge == 0:
+            break
+        ergebnis += rest[:laenge]
+        daten = rest[laenge + 2:]
+    return ergebnis
+
+
+async def _http_json(ip: str, port: int, pfad: str, timeout: float,
+                     nutzdaten: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Minimaler HTTP/1.1-Aufruf (GET oder POST mit JSON), liefert das JSON der Antwort"""
+    async def anfrage():
+        reader, writer = await asyncio.open_connection(ip, port)
+        try:
+            if nutzdaten is None:
+                kopf = f'GET {pfad} HTTP/1.1\r\nHost: {ip}\r\nAccept: application/json\r\nConnection: close\r\n\r\n'
+                writer.write(kopf.encode())
+            else:
+                inhalt = json.dumps(nutzdaten).encode()
+                kopf = (f'POST {pfad} HTTP/1.1\r\nHost: {ip}\r\nContent-Type: application/json\r\n'
+                        f'Content-Length: {len(inhalt)}\r\nConnection: close\r\n\r\n')
+                writer.write(kopf.encode() + inhalt)
+            await writer.drain()
+            return await reader.read(-1)
+        finally:
+            writer.close()
+
+    try:
+        antwort = await asyncio.wait_for(anfrage(), timeout)
+    except (OSError, asyncio.TimeoutError) as e:
+        raise _HttpFehler(str(e) or 'Timeout')
+
+    kopf, _, inhalt = antwort.partition(b'\r\n\r\n')
+    zeilen = kopf.decode('latin-1').split('\r\n')
+    teile = zeilen[0].split(' ')
+    if len(teile) < 2 or teile[1] != '200':
+        raise _HttpFehler(zeilen[0])
+    if any(z.lower().replace(' ', '') == 'transfer-encoding:chunked' for z in zeilen[1:]):
+        inhalt = _chunked_dekodieren(inhalt)
+    try:
+        daten = json.loads(inhalt.decode('utf-8'))
+    except ValueError:
+        raise _HttpFehler('Keine JSON-Antwort')
+    if not isinstance(daten, dict):
+        raise _HttpFehler('Unerwartete JSON-Antwort')
+    return daten
+
+
+def _geraet_gen1(ip: str, port: int, daten: Dict[str, Any]) -> Dict[str, Any]:
+    typ = daten.get('type') or 'Shelly Gen1'
+    return {
+        'ip': ip,
+        'port': port,
+        'name': daten.get('name') or daten.get('hostname') or f'{typ}-{ip.split(".")[-1]}',
+        'model': typ,
+        'mac': daten.get('mac', 'Unknown'),
+        'gen': 1,
+        'online': True,
+        'type': typ,
+        'endpoint': '/shelly',
+        'firmware': daten.get('fw', 'Unknown'),
+        'relay_count': daten.get('num_outputs', 1),
+        'has_power_meter': bool(daten.get('num_meters'))
+    }
+
+
+def _geraet_gen2(ip: str, port: int, daten: Dict[str, Any]) -> Dict[str, Any]:
+    modell = daten.get('model') or daten.get('app') or 'Shelly Plus'
+    return {
+        'ip': ip,
+        'port': port,
+        'name': daten.get('name') or daten.get('id') or f'{modell}-{ip.split(".")[-1]}',
+        'model': modell,
+        'mac': daten.get('mac', 'Unknown'),
+        'gen': 2,
+        'online': True,
+        'type': 'Shelly Plus/Pro',
+        'endpoint': '/rpc/Shelly.GetDeviceInfo',
+        'firmware': daten.get('ver', daten.get('fw_id', 'Unknown')),
+        'relay_count': 1,
+        'has_power_meter': False
+    }
+
+
+async def _proben(ip: str, port: int, timeout: float) -> Optional[Dict[str, Any]]:
+    """Gen1- und Gen2-Probe gleichzeitig, danach Relais/Messung aus dem Status"""
+    gen1, gen2 = await asyncio.gather(
+        _http_json(ip, port, '/shelly', timeout),
+        _http_json(ip, port, '/rpc', timeout, {'id': 1, 'method': 'Shelly.GetDeviceInfo'}),
+        return_exceptions=True
+    )
+
+    # Gen2-Geräte beantworten auch /shelly (mit 'gen': 2), deshalb Gen2 zuerst
+    if isinstance(gen2, dict) and isinstance(gen2.get('result'), dict):
+        geraet = _geraet_gen2(ip, port, gen2['result'])
+        try:
+            status = await _http_json(ip, port, '/rpc', timeout, {'id': 2, 'method': 'Shelly.GetStatus'})
+            status = status.get('result', {})
+            geraet['relay_count'] = sum(1 for schluessel in status if schluessel.startswith('switch:')) or 1
+            geraet['has_power_meter'] = 'apower' in status.get('switch:0', {})
+        except _HttpFehler:
+            pass
+        return geraet
+    if isinstance(gen1, dict) and (gen1.get('gen') or 1) >= 2:
+        return _geraet_gen2(ip, port, gen1)
+    if isinstance(gen1, dict) and 'type' in gen1:
+        return _geraet_gen1(ip, port, gen1)
+    return None
+
+
+class ShellyDiscovery:
+    """Netzwerksuche mit TCP-Vorfilter, parallelen Proben und MAC->IP-Cache"""
+
+    CONNECT_TIMEOUT = 0.5
+    HTTP_TIMEOUT = 1.5
+    # Gleichzeitig offene Verbindungen (Windows: select() erlaubt max. 512 Sockets)
+    MAX_VERBINDUNGEN = 256
+
+    def __init__(self, cache_datei: str = CACHE_DATEI):
+        self.cache_datei = cache_datei
+        self._lock = threading.Lock()
+        self._cache: Optional[Dict[str, Dict[str, Any]]] = None
+
+    # ------------------------------------------------------------------
+    # Cache (MAC -> letzte IP und Geräteinfo)
+    # ------------------------------------------------------------------
+
+    def _datei_lesen(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            if os.path.exists(self.cache_datei):
+                with open(self.cache_datei, 'r', encoding='utf-8') as f:
+                    daten = json.load(f)
+                    return daten if isinstance(daten, dict) else {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"Shelly-Discovery-Cache nicht lesbar: {e}")
+        return {}
+
+    def cache(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            if self._cache is None:
+                self._cache = self._datei_lesen()
+            return dict(self._cache)
+
+    def merken(self, geraete: Iterable[Dict[str, Any]]):
+        """
+        Gefundene Geräte in den MAC->IP-Cache übernehmen (auch aus mDNS)
+
+        Mehrere Worker-Prozesse schreiben dieselbe Datei: vor dem Schreiben
+        wird der Stand auf der Platte eingelesen und je MAC der zuletzt
+        gesehene Eintrag behalten; geschrieben wird über eine eigene
+        temporäre Datei je Aufruf und os.replace().
+        """
+        self.cache()
+        with self._lock:
+            jetzt = datetime.now().isoformat()
+            for geraet in geraete:
+                mac = geraet.get('mac')
+                if not mac or mac == 'Unknown':
+                    continue
+                self._cache[mac] = {'ip': geraet['ip'], 'port': geraet.get('port', 80),
+                                    'zuletzt_gesehen': jetzt, 'geraet': geraet}
+
+            zusammen = self._datei_lesen()
+            for mac, eintrag in self._cache.items():
+                if eintrag.get('zuletzt_gesehen', '') >= zusammen.get(mac, {}).get('zuletzt_gesehen', ''):
+                    zusammen[mac] = eintrag
+            self._cache = zusammen
+
+            tmp = None
+            try:
+                with tempfile.NamedTemporaryFile('w', encoding='utf-8', suffix='.tmp', delete=False,
+                                                 dir=os.path.dirname(self.cache_datei) or '.',
+                                                 prefix='.shelly_discovery_cache.') as f:
+                    tmp = f.name
+                    json.dump(self._cache, f, indent=2, ensure_ascii=False)
+                os.replace(tmp, self.cache_datei)
+            except OSError as e:
+                logger.warning(f"Shelly-Discovery-Cache nicht speicherbar: {e}")
+                if tmp and os.path.exists(tmp):
+                    os.remove(tmp)
+
+    def bekannte_geraete(self) -> List[Dict[str, Any]]:
+        """Geräte aus dem Cache (ohne Netzwerkzugriff)"""
+        return [dict(eintrag['geraet'], online=None) for eintrag in self.cache().values()]
+
+    # ------------------------------------------------------------------
+    # Scan
+    # ------------------------------------------------------------------
+
+    async def _host_pruefen(self, ip: str, ports: Tuple[int, ...], grenze: asyncio.Semaphore,
+                            timeout: float, vorfilter: bool = True) -> Optional[Dict[str, Any]]:
+        for port in ports:
+            async with grenze:
+                if vorfilter and not await _tcp_offen(ip, port, self.CONNECT_TIMEOUT):
+                    continue
+                geraet = await _proben(ip, port, timeout)
+            if geraet:
+                return geraet
+        return None
+
+    async def _scannen(self, netzwerk: Optional[str], ips: List[str], ports: Tuple[int, ...],
+                       vollstaendig: bool, bereich: Tuple[int, int], timeout: float, statistik: Dict[str, Any]) -> List[Dict[str, Any]]:
+        grenze = asyncio.Semaphore(self.MAX_VERBINDUNGEN)
+        gefunden: Dict[str, Dict[str, Any]] = {}
+
+        # 1. Bekannte Geräte und explizite IPs direkt prüfen (ohne Vorfilter)
+        bekannt = {eintrag['ip']: mac for mac, eintrag in self.cache().items()}
+        direkt = list(dict.fromkeys(list(bekannt) + list(ips)))
+        ergebnisse = await asyncio.gather(*(self._host_pruefen(ip, ports, grenze, timeout, vorfilter=False) for ip in direkt))
+        for ip, geraet in zip(direkt, ergebnisse):
+            if geraet:
+                gefunden[ip] = geraet
+        statistik['bekannt_geprueft'] = len(direkt)
+        statistik['bekannt_bestaetigt'] = len(gefunden)
+        statistik['scanned'] = len(direkt)
+
+        # 2. Subnetz-Sweep: TCP-Vorfilter, Proben nur auf offenen Hosts
+        if vollstaendig and netzwerk:
+            rest = [f'{netzwerk}.{i}' for i in range(bereich[0], bereich[1] + 1) if f'{netzwerk}.{i}' not in gefunden]
+            ergebnisse = await asyncio.gather(*(self._host_pruefen(ip, ports, grenze, timeout) for ip in rest))
+            for ip, geraet in zip(rest, ergebnisse):
+                if geraet:
+                    gefunden[ip] = geraet
+            statistik['scanned'] += len(rest)
+
+        return sorted(gefunden.values(), key=lambda g: tuple(int(t) if t.isdigit() else 0 for t in g['ip'].split('.')))
+
+    def scannen(self, netzwerk: Optional[str] = None, ips: Iterable[str] = (), ports: Iterable[int] = (80,),
+                vollstaendig: bool = True, bereich: Tuple[int, int] = (1, 254),
+                timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Sucht Shelly-Geräte (blockierend, eigene Event-Loop)
+
+        Args:
+            netzwerk: /24-Präfix wie '192.168.0' (None = nur bekannte/angegebene IPs)
+            ips: zusätzlich direkt zu prüfende Adressen
+            ports: HTTP-Ports der Geräte
+            vollstaendig: False = nur Cache und ips prüfen, kein Sweep
+            bereich: letzte Stelle der Adressen im Sweep (von, bis)
+            timeout: HTTP-Timeout in Sekunden (Standard HTTP_TIMEOUT)
+
+        Returns:
+            {'geraete': [...], 'stats': {...}}
+        """
+        statistik = {'total_ips': bereich[1] - bereich[0] + 1 if vollstaendig and netzwerk else 0, 'scanned': 0}
+        start = time.monotonic()
+
+        geraete = asyncio.run(self._scannen(
+            netzwerk, list(ips), tuple(ports), vollstaendig, tuple(bereich), float(timeout or self.HTTP_TIMEOUT), statistik
+        ))
+        self.merken(geraete)
+
+        statistik['found'] = len(geraete)
+        statistik['dauer_sekunden'] = round(time.monotonic() - start, 2)
+        logger.info(f"Shelly-Suche {netzwerk or '-'}: {len(geraete)} Geräte in {statistik['dauer_sekunden']}s")
+        return {'geraete': geraete, 'stats': statistik}
+
+    def pruefen(self, ip: str, port: int = 80, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Einzelne Adresse prüfen"""
+        return asyncio.run(_proben(ip, port, timeout or self.HTTP_TIMEOUT))
+
+
+shelly_discovery = ShellyDiscovery()
@@ -4,12 +4,13 @@ Shelly Integration Service für WartungsManager
 Universelle API-Lösung für verschiedene Shelly-Modelle
 """
 
-import requests
 import logging
 from typing import Optional, Dict, Any
 import json
 from datetime import datetime
 
+from app.services.shelly_client import shelly_client, ShellyNichtErreichbar
+
 class ShellyController:
     """Universeller Shelly-Controller"""
     
@@ -35,44 +36,41 @@ class ShellyController:
             return None
             
         try:
-            url = f"http://{self.config['ip_address']}/status"
+            # Gen1 (/status) und Gen2 (RPC) über den gemeinsamen Client
+            if self.config['model'].startswith('ShellyPlus'):
+                data = shelly_client.status(self.config['ip_address'], auth=self._auth())
+            else:
+                data = shelly_client.status(self.config['ip_address'], '/status', auth=self._auth())
             
-            response = requests.get(
-                url,
-                auth=(self.config.get('username'), self.config.get('password')),
-                timeout=10
-            )
+            # Universelle Status-Auswertung
+            status_info = {
+                'online': True,
+                'timestamp': datetime.now().isoformat(),
+                'model': self.config['model'],
+                'ip': self.config['ip_address']
+            }
             
-            if response.status_code == 200:
-                data = response.json()
-                
-                # Universelle Status-Auswertung
-                status_info = {
-                    'online': True,
-                    'timestamp': datetime.now().isoformat(),
-                    'model': self.config['model'],
-                    'ip': self.config['ip_address']
-                }
+            # Modell-spezifische Status-Extraktion
+            if self.config['model'].startswith('Shelly1'):
+                status_info['relay_on'] = data.get('relays', [{}])[0].get('ison', False)
+                status_info['power'] = data.get('meters', [{}])[0].get('power', 0)
                 
-                # Modell-spezifische Status-Extraktion
-                if self.config['model'].startswith('Shelly1'):
-                    status_info['relay_on'] = data.get('relays', [{}])[0].get('ison', False)
-                    status_info['power'] = data.get('meters', [{}])[0].get('power', 0)
-                    
-                elif self.config['model'].startswith('ShellyPlus'):
-                    status_info['relay_on'] = data.get('switch:0', {}).get('output', False)
-                    status_info['power'] = data.get('switch:0', {}).get('apower', 0)
-                    
-                return status_info
+            elif self.config['model'].startswith('ShellyPlus'):
+                status_info['relay_on'] = data.get('switch:0', {}).get('output', False)
+                status_info['power'] = data.get('switch:0', {}).get('apower', 0)
                 
-            else:
-                self.logger.error(f"HTTP {response.status_code}: {response.text}")
-                return None
+            return status_info
                 
-        except Exception as e:
+        except ShellyNichtErreichbar as e:
             self.logger.error(f"Fehler beim Status-Abruf: {e}")
             return {'online': False, 'error': str(e)}
     
+    def _auth(self):
+        """HTTP-Auth nur wenn ein Benutzername konfiguriert ist"""
+        if self.config.get('username'):
+            return (self.config.get('username'), self.config.get('password'))
+        return None
+    
     def turn_on(self) -> bool:
         """Shelly einschalten"""
         return self._switch_relay(True)
@@ -90,34 +88,23 @@ class ShellyController:
         try:
             # Modell-spezifische URLs
             if self.config['model'].startswith('Shelly1'):
-                url = f"http://{self.config['ip_address']}/relay/0"
+                pfad = '/relay/0'
                 params = {'turn': 'on' if state else 'off'}
                 
             elif self.config['model'].startswith('ShellyPlus'):
-                url = f"http://{self.config['ip_address']}/rpc/Switch.Set"
-                params = {'id': 0, 'on': state}
+                pfad = '/rpc/Switch.Set'
+                params = {'id': 0, 'on': 'true' if state else 'false'}
                 
             else:
                 self.logger.error(f"Unbekanntes Shelly-Modell: {self.config['model']}")
                 return False
             
-            response = requests.get(
-                url,
-                params=params,
-                auth=(self.config.get('username'), self.config.get('password')),
-                timeout=10
-            )
+            shelly_client.anfrage(self.config['ip_address'], pfad, params=params, auth=self._auth())
             
-            success = response.status_code == 200
+            self.logger.info(f"Shelly {'eingeschaltet' if state else 'ausgeschaltet'}")
+            return True
             
-            if success:
-                self.logger.info(f"Shelly {'eingeschaltet' if state else 'ausgeschaltet'}")
-            else:
-                self.logger.error(f"Schaltfehler: HTTP {response.status_code}")
-                
-            return success
-            
-        except Exception as e:
+        except ShellyNichtErreichbar as e:
             self.logger.error(f"Fehler beim Schalten: {e}")
             return False
 
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Shelly-Erkennung über mDNS/Zeroconf für WartungsManager
+
+Shelly-Geräte melden sich selbst per Multicast-DNS an (Gen2: _shelly._tcp,
+Gen1 und Gen2: _http._tcp mit Instanzname shelly<modell>-<mac>). Der
+ServiceBrowser fragt diese Dienste per Multicast an (mit wachsendem Abstand)
+und hört die Ankündigungen mit; die Registry hält eine Live-Liste der
+Geräte - neue Steckdosen erscheinen sofort, ohne HTTP-Sweep. Der Sweep
+(shelly_discovery) bleibt als Fallback, z.B. wenn Multicast im WLAN
+gefiltert wird oder python-zeroconf nicht installiert ist.
+"""
+
+import logging
+import threading
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+try:
+    from zeroconf import Zeroconf, ServiceBrowser, ServiceStateChange
+    ZEROCONF_AVAILABLE = True
+except ImportError:
+    ZEROCONF_AVAILABLE = False
+    logging.info("python-zeroconf nicht installiert. Shelly-mDNS-Erkennung deaktiviert.")
+
+from app.services.shelly_discovery import shelly_discovery
+from app.services.ereignis_bus import ereignis_bus
+
+logger = logging.getLogger(__name__)
+
+SERVICE_TYPEN = ['_shelly._tcp.local.', '_http._tcp.local.']
+
+
+def _text(wert) -> str:
+    if isinstance(wert, bytes):
+        return wert.decode('utf-8', 'replace')
+    return wert or ''
+
+
+def geraet_aus_dienst(name: str, service_typ: str, adressen: List[str], port: int,
+                      eigenschaften: Optional[Dict[Any, Any]] = None) -> Optional[Dict[str, Any]]:
+    """
+    Wandelt eine mDNS-Dienstbeschreibung in einen Geräte-Eintrag um
+
+    Gleiches Format wie die HTTP-Suche (shelly_discovery), zusätzlich
+    'quelle': 'mdns'. Dienste, die kein Shelly sind, liefern None.
+    """
+    instanz = name[:-len(service_typ)].rstrip('.') if name.endswith(service_typ) else name.split('.')[0]
+    if not instanz.lower().startswith('shelly') or not adressen:
+        return None
+
+    txt = {_text(k): _text(v) for k, v in (eigenschaften or {}).items()}
+    gen = int(txt['gen']) if txt.get('gen', '').isdigit() else (2 if service_typ.startswith('_shelly') else 1)
+
+    # Instanzname: shellyplus1pm-a8032ab12345 / shelly1pm-C45BBE6B1234
+    praefix, _, kennung = instanz.rpartition('-')
+    mac = kennung.upper() if len(kennung) == 12 and all(c in '0123456789abcdefABCDEF' for c in kennung) else 'Unknown'
+    modell = txt.get('app') or praefix or instanz
+
+    return {
+        'ip': adressen[0],
+        'port': port or 80,
+        'name': instanz,
+        'model': modell,
+        'mac': mac,
+        'gen': gen,
+        'online': True,
+        'type': 'Shelly Plus/Pro' if gen >= 2 else modell,
+        'endpoint': 'mdns',
+        'firmware': txt.get('ver', 'Unknown'),
+        'quelle': 'mdns'
+    }
+
+
+class ShellyMdnsRegistry:
+    """Live-Registry der per mDNS angekündigten Shelly-Geräte (pro Prozess)"""
+
+    AUFLOESEN_TIMEOUT_MS = 3000
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._geraete: Dict[str, Dict[str, Any]] = {}
+        self._zeroconf = None
+        self._browser = None
+
+    @property
+    def aktiv(self) -> bool:
+        return self._browser is not None
+
+    def init_app(self, app):
+        """Startet den Listener, sofern SHELLY_MDNS aktiv und zeroconf installiert ist"""
+        if not app.config.get('SHELLY_MDNS', True):
+            return
+        self.starten(app.config.get('SHELLY_MDNS_INTERFACES') or None)
+
+    def starten(self, interfaces: Optional[Iterable[str]] = None) -> bool:
+        """
+        mDNS-Browser starten
+
+        Args:
+            interfaces: IP-Adressen der Netzwerkkarten (None = alle)
+        """
+        if not ZEROCONF_AVAILABLE:
+            return False
+        if self.aktiv:
+            return True
+        try:
+            if interfaces:
+                self._zeroconf = Zeroconf(interfaces=list(interfaces))
+            else:
+                self._zeroconf = Zeroconf()
+            self._browser = ServiceBrowser(self._zeroconf, SERVICE_TYPEN, handlers=[self._dienst_geaendert])
+            logger.info(f"Shelly-mDNS-Erkennung aktiv ({', '.join(SERVICE_TYPEN)})")
+            return True
+        except OSError as e:
+            logger.warning(f"Shelly-mDNS-Erkennung nicht möglich: {e}")
+            self.stoppen()
+            return False
+
+    def stoppen(self):
+        if self._browser is not None:
+            self._browser.cancel()
+            self._browser = None
+        if self._zeroconf is not None:
+            self._zeroconf.close()
+            self._zeroconf = None
+
+    def _dienst_geaendert(self, zeroconf, service_type: str, name: str, state_change):
+        if state_change is ServiceStateChange.Removed:
+            self._entfernt(name)
+            return
+
+        info = zeroconf.get_service_info(service_type, name, timeout=self.AUFLOESEN_TIMEOUT_MS)
+        if info is None:
+            return
+        geraet = geraet_aus_dienst(name, service_type, info.parsed_addresses(), info.port, info.properties)
+        if geraet:
+            self.aktualisieren(geraet, dienst=name)
+
+    def aktualisieren(self, geraet: Dict[str, Any], dienst: Optional[str] = None):
+        """Gerät eintragen; neue Geräte und IP-Wechsel werden gemeldet und gecacht"""
+        schluessel = geraet['mac'] if geraet['mac'] != 'Unknown' else geraet['name']
+        with self._lock:
+            vorher = self._geraete.get(schluessel)
+            eintrag = dict(vorher or {}, **geraet)
+            # Gen2-Geräte kündigen sich doppelt an; die _shelly._tcp-Angaben (gen, app) behalten
+            if vorher and vorher.get('gen', 1) > geraet['gen']:
+                eintrag.update(gen=vorher['gen'], model=vorher['model'], type=vorher['type'])
+            eintrag['dienste'] = sorted(set((vorher or {}).get('dienste', [])) | ({dienst} if dienst else set()))
+            eintrag['zuletzt_gesehen'] = datetime.now().isoformat()
+            self._geraete[schluessel] = eintrag
+            geaendert = vorher is None or not vorher.get('online') or vorher.get('ip') != eintrag['ip']
+
+        if geaendert:
+            logger.info(f"Shelly per mDNS: {eintrag['name']} auf {eintrag['ip']}")
+            shelly_discovery.merken([{k: v for k, v in eintrag.items() if k not in ('dienste', 'zuletzt_gesehen')}])
+            ereignis_bus.veroeffentlichen('shelly', 'geraet_gefunden', eintrag)
+
+    def _entfernt(self, dienst: str):
+        with self._lock:
+            for eintrag in self._geraete.values():
+                if dienst in eintrag.get('dienste', []):
+                    eintrag['dienste'] = [d for d in eintrag['dienste'] if d != dienst]
+                    if not eintrag['dienste'] and eintrag.get('online'):
+                        eintrag['online'] = False
+                        ereignis_bus.veroeffentlichen('shelly', 'geraet_abgemeldet', dict(eintrag))
+
+    def geraete(self, nur_online: bool = False) -> List[Dict[str, Any]]:
+        """Alle bekannten Geräte (Kopie), sortiert nach IP"""
+        with self._lock:
+            geraete = [dict(g) for g in self._geraete.values() if g.get('online') or not nur_online]
+        return sorted(geraete, key=lambda g: tuple(int(t) if t.isdigit() else 0 for t in g['ip'].split('.')))
+
+
+shelly_mdns = ShellyMdnsRegistry()
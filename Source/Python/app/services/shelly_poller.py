@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+Shelly-Telemetrie im Hintergrund für WartungsManager
+
+Ein einzelner Thread fragt jedes bekannte Shelly-Gerät im festen Takt ab
+und legt das Ergebnis als Snapshot im Speicher ab. API-Aufrufe lesen nur
+noch den Snapshot - egal wie viele Tablets die Status-Seite offen haben,
+das Gerät bekommt eine Anfrage pro Takt.
+
+Der Thread läuft nur im Prozess mit den Hintergrund-Diensten (init_app);
+andere Prozesse fragen ein Gerät höchstens einmal pro Takt direkt ab.
+Gen1-Geräte werden über /status abgefragt, Gen2 über Shelly.GetStatus -
+jeweils mit den konfigurierten Zugangsdaten. Unbekannte Geräte meldet
+/shelly (beantworten beide Generationen, ohne Anmeldung).
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+from app.services.shelly_client import shelly_client, ShellyNichtErreichbar, ShellyAnmeldungFehlgeschlagen
+from app.services.shelly_zeitreihe import shelly_zeitreihe
+from app.services.ereignis_bus import ereignis_bus
+
+logger = logging.getLogger(__name__)
+
+
+def _snapshot_aus_gen1_status(ip: str, daten: Dict[str, Any]) -> Dict[str, Any]:
+    """Wandelt eine /status-Antwort (Gen1) in einen Snapshot um"""
+    relay = (daten.get('relays') or [{}])[0]
+    meter = (daten.get('meters') or [{}])[0]
+    temperatur = daten.get('tmp', {}).get('tC', daten.get('temperature'))
+    return {
+        'ip': ip,
+        'online': True,
+        'output': relay.get('ison', False),
+        'apower': meter.get('power', 0),
+        'voltage': daten.get('voltage', 0),
+        'current': 0,
+        'temperature': {'tC': temperatur} if temperatur is not None else {},
+        'fw_id': daten.get('update', {}).get('old_version', '-'),
+        'error': None
+    }
+
+
+def _snapshot_aus_status(ip: str, daten: Dict[str, Any]) -> Dict[str, Any]:
+    """Wandelt eine Shelly.GetStatus-Antwort (Gen2) in einen Snapshot um"""
+    switch = daten.get('switch:0', {})
+    return {
+        'ip': ip,
+        'online': True,
+        'output': switch.get('output', False),
+        'apower': switch.get('apower', 0),
+        'voltage': switch.get('voltage', 0),
+        'current': switch.get('current', 0),
+        'temperature': switch.get('temperature', {}),
+        'fw_id': daten.get('sys', {}).get('fw_id', '-'),
+        'error': None
+    }
+
+
+class ShellyPoller:
+    """Fragt alle beobachteten Geräte zyklisch ab und hält den letzten Stand"""
+
+    # Standard wie Config.SHELLY_POLL_INTERVALL
+    INTERVALL_SEKUNDEN = 1.0
+
+    # Leistungsänderung, ab der ein Push-Ereignis verschickt wird
+    LEISTUNG_SCHWELLE_W = 5.0
+
+    # Dynamisch angemeldete Geräte ohne Abrufe werden nach dieser Zeit entfernt
+    INAKTIV_SEKUNDEN = 600.0
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshots: Dict[str, Dict[str, Any]] = {}
+        self._geraete: Dict[str, float] = {}  # ip -> letzter Abruf (monotonic)
+        self._konfiguriert = set()
+        self._zugang: Dict[str, Dict[str, Any]] = {}  # ip -> {'gen', 'auth'}
+        self._aktiv = False  # Thread nur nach init_app (Prozess mit Hintergrund-Diensten)
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._aufwecken = threading.Event()
+
+        # Nach Schaltaufträgen sofort neu abfragen
+        shelly_client.beobachter_hinzufuegen(lambda auftrag: self.aktualisieren(auftrag['ip']))
+
+    def init_app(self, app):
+        """Übernimmt die konfigurierten Geräte und startet den Thread"""
+        self.INTERVALL_SEKUNDEN = app.config.get('SHELLY_POLL_INTERVALL', self.INTERVALL_SEKUNDEN)
+        self._aktiv = True
+
+        # ip -> Generation (None = über /shelly ermitteln)
+        ips: Dict[str, Optional[int]] = {}
+        if os.environ.get('SHELLY_KOMPRESSOR_IP'):
+            ips[os.environ['SHELLY_KOMPRESSOR_IP']] = None
+
+        # Gleiche Modell-Regel wie ShellyController (Gen2 = ShellyPlus)
+        shelly_config = app.config.get('SHELLY_CONFIG', {})
+        if shelly_config.get('enabled') and shelly_config.get('ip_address'):
+            auth = None
+            if shelly_config.get('username'):
+                auth = (shelly_config['username'], shelly_config.get('password'))
+            gen = 2 if (shelly_config.get('model') or '').startswith('ShellyPlus') else 1
+            self._zugang_setzen(shelly_config['ip_address'], gen, auth)
+            ips[shelly_config['ip_address']] = gen
+
+        # Über /shelly/api/config gespeicherte Geräte
+        geraete_datei = os.path.join(app.root_path, 'shelly_devices.json')
+        try:
+            if os.path.exists(geraete_datei):
+                with open(geraete_datei, 'r') as f:
+                    for d in json.load(f):
+                        if d.get('ip') and ips.get(d['ip']) is None:
+                            ips[d['ip']] = d.get('gen')
+        except (OSError, ValueError, TypeError) as e:
+            logger.warning(f"Shelly-Geräteliste nicht lesbar: {e}")
+
+        for ip, gen in ips.items():
+            self.beobachten(ip, konfiguriert=True, gen=gen)
+
+    def beobachten(self, ip: str, konfiguriert: bool = False, gen: Optional[int] = None):
+        """Nimmt ein Gerät in den Abfragezyklus auf (startet den Thread bei Bedarf)"""
+        if gen:
+            self._zugang_setzen(ip, gen)
+        self._anmelden(ip, konfiguriert)
+        self._starten()
+
+    def _anmelden(self, ip: str, konfiguriert: bool = False):
+        with self._lock:
+            neu = ip not in self._geraete
+            self._geraete[ip] = time.monotonic()
+            if konfiguriert:
+                self._konfiguriert.add(ip)
+        if neu:
+            logger.info(f"Shelly-Poller beobachtet {ip}")
+
+    def _zugang_setzen(self, ip: str, gen: Optional[int], auth: Optional[Tuple[str, str]] = None):
+        with self._lock:
+            zugang = self._zugang.setdefault(ip, {'gen': None, 'auth': None})
+            zugang['gen'] = gen
+            if auth:
+                zugang['auth'] = auth
+
+    def _starten(self):
+        with self._lock:
+            if not self._aktiv or (self._thread and self._thread.is_alive()):
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._schleife, name='shelly-poller', daemon=True)
+            self._thread.start()
+
+    def stoppen(self):
+        self._stop.set()
+        self._aufwecken.set()
+
+    def _schleife(self):
+        while not self._stop.is_set():
+            start = time.monotonic()
+            for ip in self._faellige_geraete():
+                shelly_zeitreihe.erfassen(self.aktualisieren(ip))
+            shelly_zeitreihe.takt()
+
+            # Festes Raster; aktualisieren() außerhalb des Takts weckt nicht auf
+            self._aufwecken.wait(max(0.0, self.INTERVALL_SEKUNDEN - (time.monotonic() - start)))
+            self._aufwecken.clear()
+
+    def _faellige_geraete(self):
+        jetzt = time.monotonic()
+        with self._lock:
+            for ip, letzter_abruf in list(self._geraete.items()):
+                if ip not in self._konfiguriert and jetzt - letzter_abruf > self.INAKTIV_SEKUNDEN:
+                    del self._geraete[ip]
+                    self._snapshots.pop(ip, None)
+                    logger.info(f"Shelly-Poller: {ip} nicht mehr abgefragt (inaktiv)")
+            return list(self._geraete)
+
+    def _status_abfragen(self, ip: str) -> Dict[str, Any]:
+        """Status-Abfrage passend zur Generation des Geräts (Gen1: /status, Gen2: RPC)"""
+        with self._lock:
+            zugang = dict(self._zugang.get(ip) or {'gen': None, 'auth': None})
+
+        if not zugang['gen']:
+            geraet = shelly_client.status(ip, '/shelly')
+            zugang['gen'] = geraet.get('gen') or 1
+            self._zugang_setzen(ip, zugang['gen'])
+
+        if zugang['gen'] >= 2:
+            return _snapshot_aus_status(ip, shelly_client.status(ip, auth=zugang['auth']))
+        return _snapshot_aus_gen1_status(ip, shelly_client.status(ip, '/status', auth=zugang['auth']))
+
+    def aktualisieren(self, ip: str) -> Dict[str, Any]:
+        """Fragt ein Gerät sofort ab und ersetzt dessen Snapshot"""
+        try:
+            snapshot = self._status_abfragen(ip)
+        except ShellyNichtErreichbar as e:
+            with self._lock:
+                alt = self._snapshots.get(ip, {})
+            # Letzte Messwerte behalten, aber als offline markieren
+            snapshot = dict(alt, ip=ip, online=False, error=str(e),
+                            anmeldung_fehlgeschlagen=isinstance(e, ShellyAnmeldungFehlgeschlagen))
+
+        snapshot['zeitpunkt'] = time.monotonic()
+        snapshot['aktualisiert_am'] = datetime.now().isoformat()
+        with self._lock:
+            vorher = self._snapshots.get(ip)
+            self._snapshots[ip] = snapshot
+
+        if self._hat_sich_geaendert(vorher, snapshot):
+            ereignis_bus.veroeffentlichen(
+                'kompressor', 'shelly', {k: v for k, v in snapshot.items() if k != 'zeitpunkt'}
+            )
+        return snapshot
+
+    @classmethod
+    def _hat_sich_geaendert(cls, vorher: Optional[Dict[str, Any]], nachher: Dict[str, Any]) -> bool:
+        """Relevante Änderung für Push-Clients (Schaltzustand, Erreichbarkeit, Leistung)"""
+        if vorher is None:
+            return True
+        if vorher.get('online') != nachher.get('online') or vorher.get('output') != nachher.get('output'):
+            return True
+        return abs((nachher.get('apower') or 0) - (vorher.get('apower') or 0)) >= cls.LEISTUNG_SCHWELLE_W
+
+    def snapshot(self, ip: str) -> Dict[str, Any]:
+        """
+        Letzter Stand eines Geräts mit Alter in Sekunden
+
+        Unbekannte Geräte werden angemeldet (ohne den Thread zu starten) und
+        direkt abgefragt. Ohne laufenden Thread (Prozess ohne Hintergrund-
+        Dienste) wird ein Snapshot abgefragt, sobald er älter als ein Takt ist.
+        """
+        with self._lock:
+            snapshot = self._snapshots.get(ip)
+            if ip in self._geraete:
+                self._geraete[ip] = time.monotonic()
+            thread_laeuft = self._thread is not None and self._thread.is_alive()
+
+        if snapshot is None:
+            self._anmelden(ip)
+            snapshot = self.aktualisieren(ip)
+        elif not thread_laeuft and time.monotonic() - snapshot['zeitpunkt'] >= self.INTERVALL_SEKUNDEN:
+            snapshot = self.aktualisieren(ip)
+
+        ergebnis = {k: v for k, v in snapshot.items() if k != 'zeitpunkt'}
+        ergebnis['alter_sekunden'] = round(time.monotonic() - snapshot['zeitpunkt'], 3)
+        return ergebnis
+
+    def alle_snapshots(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            ips = list(self._snapshots)
+        return {ip: self.snapshot(ip) for ip in ips}
+
+
+# Globale Instanz (ein Poller-Thread pro Prozess)
+shelly_poller = ShellyPoller()
+
+# Erstellt von Hans Hahn - Alle Rechte vorbehalten
@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""
+Zeitreihen-Speicher für Shelly-Messwerte (Leistung, Spannung, Temperatur)
+
+- Rohwerte im Takt des Pollers, gepuffert und als Batch geschrieben
+- Verdichtung auf Minuten- und Stundenwerte (idempotent, per UPSERT)
+- Aufbewahrungsfristen je Auflösung
+- Bereichsabfragen mit automatischer Wahl der Auflösung
+"""
+
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import text
+
+from app import db
+from app.models.shelly_messwerte import ShellyMesswert, ShellyMesswertAggregat
+
+logger = logging.getLogger(__name__)
+
+# SQLAlchemy speichert DateTime in SQLite immer mit Mikrosekunden
+_SQLITE_MINUTE = '%Y-%m-%d %H:%M:00.000000'
+_SQLITE_STUNDE = '%Y-%m-%d %H:00:00.000000'
+
+_MINUTEN_VERDICHTEN = text(f"""
+    INSERT INTO shelly_messwerte_aggregat
+        (ip, aufloesung, zeitpunkt, anzahl, apower_mittel, apower_min, apower_max,
+         voltage_mittel, temperatur_mittel, temperatur_max, ein_anteil)
+    SELECT ip, '1m', strftime('{_SQLITE_MINUTE}', zeitpunkt) AS fenster, count(*),
+           avg(apower), min(apower), max(apower),
+           avg(voltage), avg(temperatur), max(temperatur), avg(output)
+    FROM shelly_messwerte
+    WHERE zeitpunkt >= :von AND zeitpunkt < :bis
+    GROUP BY ip, fenster
+    ON CONFLICT (ip, aufloesung, zeitpunkt) DO UPDATE SET
+        anzahl = excluded.anzahl,
+        apower_mittel = excluded.apower_mittel,
+        apower_min = excluded.apower_min,
+        apower_max = excluded.apower_max,
+        voltage_mittel = excluded.voltage_mittel,
+        temperatur_mittel = excluded.temperatur_mittel,
+        temperatur_max = excluded.temperatur_max,
+        ein_anteil = excluded.ein_anteil
+""")
+
+# Stundenwerte aus Minutenwerten, gewichtet mit der Anzahl der Rohwerte
+_STUNDEN_VERDICHTEN = text(f"""
+    INSERT INTO shelly_messwerte_aggregat
+        (ip, aufloesung, zeitpunkt, anzahl, apower_mittel, apower_min, apower_max,
+         voltage_mittel, temperatur_mittel, temperatur_max, ein_anteil)
+    SELECT ip, '1h', strftime('{_SQLITE_STUNDE}', zeitpunkt) AS fenster, sum(anzahl),
+           sum(apower_mittel * anzahl) / sum(anzahl), min(apower_min), max(apower_max),
+           sum(voltage_mittel * anzahl) / sum(anzahl),
+           sum(temperatur_mittel * anzahl) / sum(anzahl), max(temperatur_max),
+           sum(ein_anteil * anzahl) / sum(anzahl)
+    FROM shelly_messwerte_aggregat
+    WHERE aufloesung = '1m' AND zeitpunkt >= :von AND zeitpunkt < :bis
+    GROUP BY ip, fenster
+    ON CONFLICT (ip, aufloesung, zeitpunkt) DO UPDATE SET
+        anzahl = excluded.anzahl,
+        apower_mittel = excluded.apower_mittel,
+        apower_min = excluded.apower_min,
+        apower_max = excluded.apower_max,
+        voltage_mittel = excluded.voltage_mittel,
+        temperatur_mittel = excluded.temperatur_mittel,
+        temperatur_max = excluded.temperatur_max,
+        ein_anteil = excluded.ein_anteil
+""")
+
+
+def _fenster_start(zeitpunkt: datetime, aufloesung: str) -> datetime:
+    if aufloesung == '1h':
+        return zeitpunkt.replace(minute=0, second=0, microsecond=0)
+    return zeitpunkt.replace(second=0, microsecond=0)
+
+
+class ShellyZeitreihe:
+    """Puffert, verdichtet und bereinigt die Shelly-Messwerte"""
+
+    # Rohwerte werden gesammelt und spätestens nach so vielen Sekunden geschrieben
+    SCHREIB_INTERVALL_SEKUNDEN = 30.0
+    MAX_PUFFER = 500
+
+    VERDICHTUNG_SEKUNDEN = 60.0
+    BEREINIGUNG_SEKUNDEN = 3600.0
+
+    # Aufbewahrung je Auflösung
+    AUFBEWAHRUNG = {
+        'roh': timedelta(days=2),
+        '1m': timedelta(days=30),
+        '1h': timedelta(days=5 * 365),
+    }
+
+    # Bereichsabfragen: bis zu dieser Spanne wird die jeweilige Auflösung genutzt
+    ROH_BIS = timedelta(hours=2)
+    MINUTEN_BIS = timedelta(days=3)
+
+    def __init__(self):
+        self.app = None
+        self._lock = threading.Lock()
+        self._puffer: List[Dict[str, Any]] = []
+        self._im_schreiben: List[Dict[str, Any]] = []  # entnommen, noch nicht committet
+        self._letztes_schreiben = time.monotonic()
+        self._letzte_verdichtung = 0.0
+        self._letzte_bereinigung = 0.0
+
+    def init_app(self, app):
+        """
+        Aktiviert die Aufzeichnung (nur im Prozess mit den Hintergrund-Diensten)
+
+        Die Tabellen kommen aus Migration 0015_shelly_messwerte; das Anlegen
+        hier ist der Fallback für Datenbanken ohne `flask db upgrade`.
+        """
+        self.app = app
+        with app.app_context():
+            ShellyMesswert.__table__.create(db.engine, checkfirst=True)
+            ShellyMesswertAggregat.__table__.create(db.engine, checkfirst=True)
+
+    # ------------------------------------------------------------------
+    # Aufzeichnung (läuft im Poller-Thread)
+    # ------------------------------------------------------------------
+
+    def erfassen(self, snapshot: Dict[str, Any]):
+        """Übernimmt einen Poller-Snapshot in den Schreibpuffer"""
+        if self.app is None or not snapshot.get('online'):
+            return
+
+        temperatur = snapshot.get('temperature') or {}
+        with self._lock:
+            self._puffer.append({
+                'ip': snapshot['ip'],
+                'zeitpunkt': datetime.utcnow(),
+                'apower': snapshot.get('apower'),
+                'voltage': snapshot.get('voltage'),
+                'temperatur': temperatur.get('tC') if isinstance(temperatur, dict) else temperatur,
+                'output': bool(snapshot.get('output'))
+            })
+
+    def takt(self):
+        """Schreiben, Verdichten und Bereinigen, sobald jeweils fällig"""
+        if self.app is None:
+            return
+
+        jetzt = time.monotonic()
+        with self.app.app_context():
+            try:
+                if (len(self._puffer) >= self.MAX_PUFFER
+                        or jetzt - self._letztes_schreiben >= self.SCHREIB_INTERVALL_SEKUNDEN):
+                    self.puffer_schreiben()
+                if jetzt - self._letzte_verdichtung >= self.VERDICHTUNG_SEKUNDEN:
+                    self._letzte_verdichtung = jetzt
+                    self.verdichten()
+                if jetzt - self._letzte_bereinigung >= self.BEREINIGUNG_SEKUNDEN:
+                    self._letzte_bereinigung = jetzt
+                    self.bereinigen()
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"Shelly-Zeitreihe: Wartung fehlgeschlagen: {e}")
+            finally:
+                db.session.remove()
+
+    def puffer_schreiben(self) -> int:
+        """Schreibt alle gepufferten Rohwerte in einem Batch"""
+        with self._lock:
+            zeilen, self._puffer = self._puffer, []
+            self._im_schreiben = zeilen
+            self._letztes_schreiben = time.monotonic()
+
+        try:
+            if zeilen:
+                db.session.execute(ShellyMesswert.__table__.insert(), zeilen)
+                db.session.commit()
+        finally:
+            with self._lock:
+                self._im_schreiben = []
+        return len(zeilen)
+
+    def _gepufferte_werte(self, ip: str, von: datetime, bis: datetime) -> List[Dict[str, Any]]:
+        """Noch nicht geschriebene Rohwerte eines Geräts (Kopie, ohne DB-Zugriff)"""
+        with self._lock:
+            zeilen = self._im_schreiben + self._puffer
+        return [
+            {
+                'zeitpunkt': z['zeitpunkt'].isoformat(),
+                'apower': z['apower'],
+                'voltage': z['voltage'],
+                'temperatur': z['temperatur'],
+                'output': z['output']
+            }
+            for z in zeilen
+            if z['ip'] == ip and von <= z['zeitpunkt'] < bis
+        ]
+
+    def verdichten(self):
+        """
+        Verdichtet Rohwerte zu Minutenwerten und diese zu Stundenwerten
+
+        Die letzten Fenster werden jeweils neu berechnet, damit verspätet
+        geschriebene Rohwerte (Puffer) noch eingehen.
+        """
+        jetzt = datetime.utcnow()
+        for aufloesung, sql, quelle_filter in (
+            ('1m', _MINUTEN_VERDICHTEN, None),
+            ('1h', _STUNDEN_VERDICHTEN, '1m'),
+        ):
+            schritt = timedelta(hours=1) if aufloesung == '1h' else timedelta(minutes=1)
+            letztes = db.session.query(db.func.max(ShellyMesswertAggregat.zeitpunkt)).filter(
+                ShellyMesswertAggregat.aufloesung == aufloesung
+            ).scalar()
+
+            if letztes is None:
+                # Erster Lauf: alles Vorhandene aus der Quelle verdichten
+                if quelle_filter:
+                    letztes = db.session.query(db.func.min(ShellyMesswertAggregat.zeitpunkt)).filter(
+                        ShellyMesswertAggregat.aufloesung == quelle_filter
+                    ).scalar()
+                else:
+                    letztes = db.session.query(db.func.min(ShellyMesswert.zeitpunkt)).scalar()
+                if letztes is None:
+                    continue
+
+            von = _fenster_start(letztes, aufloesung) - schritt
+            bis = _fenster_start(jetzt, aufloesung) + schritt  # laufendes Fenster eingeschlossen
+            db.session.execute(sql, {'von': von, 'bis': bis})
+
+        db.session.commit()
+
+    def bereinigen(self):
+        """Löscht Werte außerhalb der Aufbewahrungsfristen"""
+        jetzt = datetime.utcnow()
+        geloescht = ShellyMesswert.query.filter(
+            ShellyMesswert.zeitpunkt < jetzt - self.AUFBEWAHRUNG['roh']
+        ).delete(synchronize_session=False)
+
+        for aufloesung in ('1m', '1h'):
+            geloescht += ShellyMesswertAggregat.query.filter(
+                ShellyMesswertAggregat.aufloesung == aufloesung,
+                ShellyMesswertAggregat.zeitpunkt < jetzt - self.AUFBEWAHRUNG[aufloesung]
+            ).delete(synchronize_session=False)
+
+        db.session.commit()
+        if geloescht:
+            logger.info(f"Shelly-Zeitreihe: {geloescht} alte Messwerte gelöscht")
+
+    # ------------------------------------------------------------------
+    # Abfragen
+    # ------------------------------------------------------------------
+
+    def abfragen(self, ip: str, von: datetime, bis: datetime,
+                 aufloesung: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Messwerte eines Geräts im Zeitraum [von, bis)
+
+        Args:
+            aufloesung: 'roh', '1m', '1h' oder None (automatisch nach Spanne)
+        """
+        if aufloesung is None:
+            spanne = bis - von
+            if spanne <= self.ROH_BIS:
+                aufloesung = 'roh'
+            elif spanne <= self.MINUTEN_BIS:
+                aufloesung = '1m'
+            else:
+                aufloesung = '1h'
+
+        if aufloesung == 'roh':
+            # Puffer vor der DB lesen: nur der Poller-Thread schreibt, die Anfrage
+            # mischt gespeicherte Werte mit einer Kopie der noch offenen
+            gepuffert = self._gepufferte_werte(ip, von, bis)
+            werte = [w.to_dict() for w in ShellyMesswert.query.filter(
+                ShellyMesswert.ip == ip,
+                ShellyMesswert.zeitpunkt >= von,
+                ShellyMesswert.zeitpunkt < bis
+            ).order_by(ShellyMesswert.zeitpunkt).all()]
+            # Zwischenzeitlich committete Pufferwerte nicht doppelt liefern
+            gespeichert = {w['zeitpunkt'] for w in werte}
+            werte += [w for w in gepuffert if w['zeitpunkt'] not in gespeichert]
+        elif aufloesung in ('1m', '1h'):
+            werte = ShellyMesswertAggregat.query.filter(
+                ShellyMesswertAggregat.ip == ip,
+                ShellyMesswertAggregat.aufloesung == aufloesung,
+                ShellyMesswertAggregat.zeitpunkt >= _fenster_start(von, aufloesung),
+                ShellyMesswertAggregat.zeitpunkt < bis
+            ).order_by(ShellyMesswertAggregat.zeitpunkt).all()
+            werte = [w.to_dict() for w in werte]
+        else:
+            raise ValueError(f"Unbekannte Auflösung: {aufloesung}")
+
+        return {
+            'ip': ip,
+            'von': von.isoformat(),
+            'bis': bis.isoformat(),
+            'aufloesung': aufloesung,
+            'werte': werte
+        }
+
+    def betrieb_auswerten(self, ip: str, betrieb) -> Dict[str, Any]:
+        """
+        Leistungsverlauf eines KompressorBetrieb-Zyklus mit Kennzahlen
+
+        Laufende Zyklen werden bis jetzt ausgewertet.
+        """
+        von = betrieb.start_zeit
+        bis = betrieb.end_zeit or datetime.utcnow()
+        verlauf = self.abfragen(ip, von, bis)
+
+        leistungen = [w['apower'] for w in verlauf['werte'] if w['apower'] is not None]
+        mittel = sum(leistungen) / len(leistungen) if leistungen else None
+        dauer_stunden = (bis - von).total_seconds() / 3600.0
+
+        verlauf['betrieb_id'] = betrieb.id
+        verlauf['kennzahlen'] = {
+            'messwerte': len(leistungen),
+            'leistung_mittel_w': round(mittel, 1) if mittel is not None else None,
+            'leistung_max_w': max(leistungen) if leistungen else None,
+            'energie_wh': round(mittel * dauer_stunden, 1) if mittel is not None else None
+        }
+        return verlauf
+
+
+# Globale Instanz (vom Shelly-Poller gespeist)
+shelly_zeitreihe = ShellyZeitreihe()
+
+# Erstellt von Hans Hahn - Alle Rechte vorbehalten
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Statistik-Snapshots für Dashboard und /statistiken-Routen
+
+- Jede Kennzahlen-Familie (flaschen, kunden, warteliste, bulk, kompressor, ...)
+  wird einmal berechnet und als Zeile in statistik_snapshots abgelegt
+- Lesen ist ein Primärschlüssel-Zugriff auf diese Zeile
+- Inserts/Updates/Deletes der beteiligten Models markieren die betroffenen
+  Familien im selben Flush als veraltet (auch über mehrere Worker-Prozesse)
+- statistiken_neu_aufbauen() bzw. `flask statistiken-neu-aufbauen` berechnet alles neu
+"""
+
+import itertools
+import json
+import logging
+from datetime import datetime, time, timedelta
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import event, insert, select, update
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from app import db
+from app.models.statistik_snapshot import StatistikSnapshot
+
+logger = logging.getLogger(__name__)
+
+_tabelle = StatistikSnapshot.__table__
+
+
+def _familien() -> Dict[str, Tuple[Callable[[], Dict[str, Any]], Tuple[str, ...]]]:
+    """Familie -> (Berechnung, Namen der Models, deren Änderungen sie veralten lassen)"""
+    from app.models import Flasche, Kunde, WartelisteEintrag, BulkFuellvorgang, KompressorBetrieb
+    from app.services.flaschen_service import FlaschenService
+    from app.services.kunden_service import KundenService
+    from app.services.patrone_einkauf_service import PatroneEinkaufService
+
+    return {
+        'flaschen': (Flasche.berechne_flaschen_statistiken, ('Flasche',)),
+        'flaschen_uebersicht': (FlaschenService.berechne_flaschen_uebersicht, ('Flasche', 'Kunde')),
+        'kunden': (Kunde.berechne_kunden_statistiken, ('Kunde', 'Flasche')),
+        'kunden_uebersicht': (KundenService.berechne_kunden_uebersicht, ('Kunde', 'Flasche')),
+        'warteliste': (WartelisteEintrag.berechne_warteliste_statistiken,
+                       ('WartelisteEintrag', 'Flasche', 'Kunde')),
+        'bulk': (BulkFuellvorgang.berechne_statistiken, ('BulkFuellvorgang',)),
+        'kompressor': (KompressorBetrieb.berechne_kompressor_statistiken, ('KompressorBetrieb',)),
+        'lagerbestand': (PatroneEinkaufService.berechne_lagerbestand_uebersicht, ('PatroneEinkauf',)),
+    }
+
+
+# Model-Name -> betroffene Familien (wird beim ersten Flush aufgebaut)
+_familien_nach_model: Optional[Dict[str, set]] = None
+
+# Tabelle fehlt (alte Datenbank ohne einrichten()) -> Markieren überspringen
+_tabelle_fehlt = False
+
+# Session hat in der laufenden Transaktion geschrieben (hält die SQLite-Schreibsperre)
+_GESCHRIEBEN_KEY = 'statistik_session_geschrieben'
+
+
+def familien_fuer_model(model_name: str) -> set:
+    """Familien, die von Änderungen an einem Model betroffen sind"""
+    global _familien_nach_model
+    if _familien_nach_model is None:
+        zuordnung = {}
+        for familie, (_, models) in _familien().items():
+            for name in models:
+                zuordnung.setdefault(name, set()).add(familie)
+        _familien_nach_model = zuordnung
+    return _familien_nach_model.get(model_name, set())
+
+
+def _gueltig_bis() -> datetime:
+    """Nächste Mitternacht (lokal bzw. UTC, je nachdem was früher kommt)"""
+    jetzt = datetime.now()
+    lokal = datetime.combine(jetzt.date() + timedelta(days=1), time.min)
+    utc_jetzt = datetime.utcnow()
+    utc = jetzt + (datetime.combine(utc_jetzt.date() + timedelta(days=1), time.min) - utc_jetzt)
+    return min(lokal, utc)
+
+
+def veraltet_markieren(familien: Iterable[str], connection=None):
+    """
+    Markiert Familien als veraltet
+
+    Für Bulk-Operationen ohne ORM-Events (z.B. CSV-Import) aufrufen, bevor
+    committet wird.
+    """
+    global _tabelle_fehlt
+    familien = list(familien)
+    if not familien or _tabelle_fehlt:
+        return
+    stmt = update(_tabelle).where(_tabelle.c.familie.in_(familien)).values(
+        veraltet=True, version=_tabelle.c.version + 1
+    )
+    try:
+        if connection is not None:
+            connection.execute(stmt)
+        else:
+            db.session.execute(stmt)
+    except OperationalError as e:
+        if 'no such table' not in str(e):
+            raise
+        _tabelle_fehlt = True
+        logger.warning(f"Statistik-Snapshots nicht verfügbar: {e}")
+
+
+def _zeile_anlegen(familie: str, connection) -> int:
+    """
+    Legt die Zeile einer Familie als veraltet an (falls sie fehlt) und liefert ihre Version
+
+    Die Zeile muss vor dem Berechnen existieren: erst dann erhöhen Commits
+    anderer Sessions ihre Version, und ein während der Berechnung veraltetes
+    Ergebnis scheitert beim versionsgeprüften UPDATE.
+    """
+    connection.execute(
+        insert(_tabelle).prefix_with('OR IGNORE').values(familie=familie, version=0, veraltet=True)
+    )
+    return connection.execute(
+        select(_tabelle.c.version).where(_tabelle.c.familie == familie)
+    ).scalar()
+
+
+def _berechnen_und_speichern(familie: str, gelesene_version: Optional[int]) -> Dict[str, Any]:
+    berechnung, _ = _familien()[familie]
+
+    # Eigene Verbindung: das Speichern darf die Transaktion des Aufrufers nicht committen.
+    # Hat die eigene Session bereits geschrieben, würde die Verbindung nur auf deren
+    # Sperre warten (und evtl. nicht committete Werte speichern) -> nicht speichern.
+    if db.session.info.get(_GESCHRIEBEN_KEY):
+        return berechnung()
+
+    if gelesene_version is None:
+        try:
+            with db.engine.begin() as connection:
+                gelesene_version = _zeile_anlegen(familie, connection)
+        except OperationalError as e:
+            logger.debug(f"Statistik-Snapshot {familie} nicht angelegt: {e}")
+            return berechnung()
+
+    daten = berechnung()
+    werte = {
+        'daten': json.dumps(daten, default=str),
+        'veraltet': False,
+        'berechnet_am': datetime.now(),
+        'gueltig_bis': _gueltig_bis()
+    }
+
+    # Nur übernehmen, wenn seit dem Lesen niemand die Familie als veraltet markiert hat
+    try:
+        with db.engine.begin() as connection:
+            connection.execute(
+                update(_tabelle).where(
+                    _tabelle.c.familie == familie, _tabelle.c.version == gelesene_version
+                ).values(**werte)
+            )
+    except OperationalError as e:
+        # z.B. Datenbank gerade gesperrt: Werte trotzdem ausliefern
+        logger.debug(f"Statistik-Snapshot {familie} nicht gespeichert: {e}")
+
+    return daten
+
+
+def statistik_lesen(familie: str) -> Dict[str, Any]:
+    """Liefert die Statistik einer Familie (ein Zeilen-Zugriff, bei Bedarf neu berechnet)"""
+    if _tabelle_fehlt:
+        return _familien()[familie][0]()
+
+    try:
+        zeile = db.session.execute(
+            select(_tabelle.c.daten, _tabelle.c.version, _tabelle.c.veraltet, _tabelle.c.gueltig_bis)
+            .where(_tabelle.c.familie == familie)
+        ).first()
+    except OperationalError:
+        return _familien()[familie][0]()
+
+    if zeile and not zeile.veraltet and zeile.gueltig_bis and zeile.gueltig_bis > datetime.now():
+        return json.loads(zeile.daten)
+
+    return _berechnen_und_speichern(familie, zeile.version if zeile else None)
+
+
+def statistiken_neu_aufbauen() -> Dict[str, Any]:
+    """Berechnet alle Familien neu (Vollaufbau)"""
+    ergebnis = {}
+    for familie in _familien():
+        veraltet_markieren([familie])
+        db.session.commit()
+        zeile = db.session.execute(
+            select(_tabelle.c.version).where(_tabelle.c.familie == familie)
+        ).first()
+        _berechnen_und_speichern(familie, zeile.version if zeile else None)
+        ergebnis[familie] = datetime.now().isoformat()
+    return ergebnis
+
+
+# ============================================================================
+# SQLAlchemy-Events: betroffene Familien im selben Flush als veraltet markieren
+# ============================================================================
+
+@event.listens_for(Session, 'after_flush')
+def _nach_flush(session, flush_context):
+    session.info[_GESCHRIEBEN_KEY] = True
+    familien = set()
+    for objekt in itertools.chain(session.new, session.deleted, session.dirty):
+        if isinstance(objekt, StatistikSnapshot):
+            continue
+        if objekt in session.dirty and not session.is_modified(objekt, include_collections=False):
+            continue
+        familien.update(familien_fuer_model(type(objekt).__name__))
+    if familien:
+        veraltet_markieren(familien, connection=session.connection())
+
+
+@event.listens_for(Session, 'after_commit')
+@event.listens_for(Session, 'after_rollback')
+def _transaktion_beendet(session):
+    session.info.pop(_GESCHRIEBEN_KEY, None)
+
+
+def init_app(app):
+    """CLI-Befehl für den Vollaufbau registrieren"""
+
+    @app.cli.command('statistiken-neu-aufbauen')
+    def statistiken_neu_aufbauen_befehl():
+        """Alle Statistik-Snapshots neu berechnen"""
+        StatistikSnapshot.einrichten()
+        for familie, zeit in statistiken_neu_aufbauen().items():
+            print(f"{familie}: neu berechnet ({zeit})")
@@ -0,0 +1,214 @@
+# Volltext-Suche für Kunden und Flaschen (SQLite FTS5)
+# Ersetzt die LIKE '%...%'-Ketten durch indizierte Präfix-Suche mit Ranking
+
+import re
+import logging
+from typing import List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from app import db
+
+logger = logging.getLogger(__name__)
+
+# Spalten der FTS5-Tabellen mit bm25-Gewichtung (Reihenfolge = Tabellenspalten)
+KUNDEN_SPALTEN = [
+    ('vorname', 10.0),
+    ('nachname', 10.0),
+    ('firma', 5.0),
+    ('email', 2.0),
+    ('mitgliedsnummer', 8.0),
+    ('externe_kundennummer', 8.0),
+    ('telefon', 3.0),
+]
+
+FLASCHEN_SPALTEN = [
+    ('flasche_nummer', 10.0),
+    ('externe_flasche_nummer', 8.0),
+    ('barcode', 10.0),
+    ('seriennummer', 6.0),
+]
+
+
+def _trigger_sql(tabelle: str, fts: str, spalten: List[str]) -> List[str]:
+    """Erzeugt die Sync-Trigger für eine External-Content FTS5-Tabelle"""
+    spalten_liste = ', '.join(spalten)
+    neu = ', '.join(f'new.{s}' for s in spalten)
+    alt = ', '.join(f'old.{s}' for s in spalten)
+
+    return [
+        f"""CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {tabelle} BEGIN
+            INSERT INTO {fts}(rowid, {spalten_liste}) VALUES (new.id, {neu});
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {tabelle} BEGIN
+            INSERT INTO {fts}({fts}, rowid, {spalten_liste}) VALUES ('delete', old.id, {alt});
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {spalten_liste} ON {tabelle} BEGIN
+            INSERT INTO {fts}({fts}, rowid, {spalten_liste}) VALUES ('delete', old.id, {alt});
+            INSERT INTO {fts}(rowid, {spalten_liste}) VALUES (new.id, {neu});
+        END""",
+    ]
+
+
+class VolltextSuche:
+    """
+    FTS5-Volltextindex über Kunden und Flaschen
+
+    - kunden_fts / flaschen_fts als External-Content-Tabellen
+    - Synchronisation über SQLite-Trigger (greift auch bei Bulk-Inserts)
+    - Präfix-Suche ("mei" findet "Meier") mit bm25-Ranking
+    - Fallback auf LIKE-Suche, wenn FTS5 nicht verfügbar ist
+    """
+
+    # None = noch nicht geprüft, True/False = Ergebnis der Einrichtung
+    _verfuegbar: Optional[bool] = None
+
+    # Obergrenze für Besitzer-Treffer bei der Flaschensuche
+    MAX_BESITZER_TREFFER = 500
+
+    @classmethod
+    def einrichten(cls, neu_aufbauen: bool = False) -> bool:
+        """
+        Legt FTS5-Tabellen und Trigger an (idempotent)
+
+        Das Schema kommt aus Migration 0013_volltext_suche; hier nur als
+        Fallback für Datenbanken ohne `flask db upgrade` bzw. nach db.create_all.
+
+        Returns:
+            True wenn die Volltextsuche nutzbar ist
+        """
+        if db.engine.dialect.name != 'sqlite':
+            cls._verfuegbar = False
+            return False
+
+        try:
+            with db.engine.begin() as conn:
+                vorhanden = {row[0] for row in conn.execute(text(
+                    "SELECT name FROM sqlite_master WHERE type = 'table'"
+                ))}
+
+                # Basistabellen fehlen noch (z.B. vor db.create_all)
+                if 'kunden' not in vorhanden or 'flaschen' not in vorhanden:
+                    return False
+
+                for tabelle, fts, spalten in (
+                    ('kunden', 'kunden_fts', [s for s, _ in KUNDEN_SPALTEN]),
+                    ('flaschen', 'flaschen_fts', [s for s, _ in FLASCHEN_SPALTEN]),
+                ):
+                    neu = fts not in vorhanden
+                    if neu:
+                        conn.execute(text(
+                            f"CREATE VIRTUAL TABLE {fts} USING fts5("
+                            f"{', '.join(spalten)}, "
+                            f"content='{tabelle}', content_rowid='id', "
+                            f"tokenize=\"unicode61 remove_diacritics 2\")"
+                        ))
+                    for sql in _trigger_sql(tabelle, fts, spalten):
+                        conn.execute(text(sql))
+                    if neu or neu_aufbauen:
+                        conn.execute(text(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')"))
+                        logger.info(f"Volltextindex {fts} aufgebaut")
+
+            cls._verfuegbar = True
+
+        except OperationalError as e:
+            # SQLite ohne FTS5-Unterstützung
+            logger.warning(f"FTS5-Volltextsuche nicht verfügbar: {e}")
+            cls._verfuegbar = False
+
+        return cls._verfuegbar
+
+    @classmethod
+    def ist_verfuegbar(cls) -> bool:
+        if cls._verfuegbar is None:
+            cls.einrichten()
+        return bool(cls._verfuegbar)
+
+    @staticmethod
+    def fts_ausdruck(suchbegriff: str) -> Optional[str]:
+        """
+        Wandelt eine Benutzereingabe in einen FTS5-MATCH-Ausdruck um
+
+        "Max Mus" -> '"max"* "mus"*' (alle Token als Präfix, UND-verknüpft)
+        """
+        tokens = re.findall(r'\w+', (suchbegriff or '').lower())
+        if not tokens:
+            return None
+        return ' '.join(f'"{token}"*' for token in tokens)
+
+    @classmethod
+    def _ids_suchen(cls, fts: str, spalten, suchbegriff: str,
+                    limit: Optional[int]) -> Optional[List[int]]:
+        ausdruck = cls.fts_ausdruck(suchbegriff)
+        if ausdruck is None:
+            return []
+
+        gewichte = ', '.join(str(g) for _, g in spalten)
+        sql = (
+            f"SELECT rowid FROM {fts} WHERE {fts} MATCH :ausdruck "
+            f"ORDER BY bm25({fts}, {gewichte})"
+        )
+        if limit:
+            sql += " LIMIT :limit"
+
+        try:
+            return [row[0] for row in db.session.execute(
+                text(sql), {'ausdruck': ausdruck, 'limit': limit}
+            )]
+        except OperationalError as e:
+            logger.warning(f"FTS5-Abfrage auf {fts} fehlgeschlagen: {e}")
+            return None
+
+    @classmethod
+    def kunden_ids_suchen(cls, suchbegriff: str, limit: Optional[int] = None) -> Optional[List[int]]:
+        """
+        Kunden-IDs nach Relevanz sortiert
+
+        Returns:
+            Liste von IDs oder None, wenn FTS5 nicht nutzbar ist
+        """
+        if not cls.ist_verfuegbar():
+            return None
+        return cls._ids_suchen('kunden_fts', KUNDEN_SPALTEN, suchbegriff, limit)
+
+    @classmethod
+    def flaschen_ids_suchen(cls, suchbegriff: str, limit: Optional[int] = None) -> Optional[List[int]]:
+        """
+        Flaschen-IDs nach Relevanz sortiert
+
+        Direkte Treffer (Nummer, Barcode, Seriennummer) kommen vor
+        Flaschen, die nur über den Besitzernamen gefunden wurden.
+
+        Returns:
+            Liste von IDs oder None, wenn FTS5 nicht nutzbar ist
+        """
+        if not cls.ist_verfuegbar():
+            return None
+
+        flaschen_ids = cls._ids_suchen('flaschen_fts', FLASCHEN_SPALTEN, suchbegriff, limit)
+        kunden_ids = cls._ids_suchen('kunden_fts', KUNDEN_SPALTEN, suchbegriff, cls.MAX_BESITZER_TREFFER)
+        if flaschen_ids is None or kunden_ids is None:
+            return None
+
+        if kunden_ids and (not limit or len(flaschen_ids) < limit):
+            from app.models.flaschen import Flasche
+
+            rang = {kunde_id: i for i, kunde_id in enumerate(kunden_ids)}
+            besitzer_treffer = db.session.query(Flasche.id, Flasche.kunde_id).filter(
+                Flasche.kunde_id.in_(kunden_ids)
+            ).all()
+            bekannt = set(flaschen_ids)
+            for flasche_id, kunde_id in sorted(besitzer_treffer, key=lambda r: (rang[r[1]], r[0])):
+                if flasche_id not in bekannt:
+                    flaschen_ids.append(flasche_id)
+
+        return flaschen_ids[:limit] if limit else flaschen_ids
+
+    @staticmethod
+    def nach_ids_laden(model, ids: List[int]) -> list:
+        """Lädt Objekte per IN-Abfrage und behält die Ranking-Reihenfolge"""
+        if not ids:
+            return []
+        objekte = {obj.id: obj for obj in model.query.filter(model.id.in_(ids)).all()}
+        return [objekte[i] for i in ids if i in objekte]
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Lesemodell der Wartungsseiten für WartungsManager
+
+Die Wartungs-Übersicht braucht Patronen-Bestand, Patronenwechsel-Countdown
+und Lagerbestand. Statt drei Services nacheinander (mit mehrfacher
+Berechnung der Betriebsstunden) liefert eine Status-Abfrage alle Zähler,
+Konfiguration, letzten Wechsel und Betriebsstunden auf einmal; der
+Lagerbestand je Typ kommt aus dem Statistik-Snapshot.
+
+Das Ergebnis wird kurz im Prozess gehalten und nach jedem Commit, der
+Patronen vorbereitet, einkauft oder wechselt, verworfen.
+"""
+
+import itertools
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from sqlalchemy import and_, event, func, select
+from sqlalchemy.orm import Session
+
+from app import db
+
+logger = logging.getLogger(__name__)
+
+# Änderungen an diesen Models verwerfen das Lesemodell
+_BETROFFENE_MODELS = {
+    'PatroneVorbereitung', 'PatroneEinkauf', 'PatroneWechselProtokoll',
+    'Patronenwechsel', 'PatronenwechselKonfiguration',
+    'KompressorBetrieb', 'KompressorBetriebsstundenZaehler'
+}
+
+_PENDING_KEY = 'wartung_lesemodell_pending'
+
+
+def _status_abfrage():
+    """Eine Zeile mit allen Werten der Wartungs-Übersicht (skalare Unterabfragen)"""
+    from app.models.patrone_erweitert import PatroneVorbereitung
+    from app.models.patronenwechsel import Patronenwechsel, PatronenwechselKonfiguration
+    from app.models.kompressor import (
+        KompressorBetrieb, KompressorBetriebsstundenZaehler, ABGESCHLOSSENE_STATUS
+    )
+
+    verfuegbar = and_(PatroneVorbereitung.ist_bereit == True, PatroneVorbereitung.ist_verwendet == False)
+
+    def anzahl_patronen(typ=None):
+        bedingung = and_(verfuegbar, PatroneVorbereitung.patrone_typ == typ) if typ else verfuegbar
+        return select(func.count(PatroneVorbereitung.id)).where(bedingung).scalar_subquery()
+
+    konfiguration = select(PatronenwechselKonfiguration).where(
+        PatronenwechselKonfiguration.ist_aktiv == True
+    ).order_by(PatronenwechselKonfiguration.id).limit(1).subquery()
+
+    letzter_wechsel = select(Patronenwechsel).order_by(
+        Patronenwechsel.wechsel_datum.desc()
+    ).limit(1).subquery()
+
+    # Zählerzeile (O(1)); fehlt sie, die klassische Summe über alle Zyklen
+    betriebsminuten = func.coalesce(
+        select(KompressorBetriebsstundenZaehler.gesamt_minuten).where(
+            KompressorBetriebsstundenZaehler.id == KompressorBetriebsstundenZaehler.ZAEHLER_ID
+        ).scalar_subquery(),
+        select(func.coalesce(func.sum(KompressorBetrieb.betriebsdauer_minuten), 0)).where(
+            KompressorBetrieb.status.in_(ABGESCHLOSSENE_STATUS)
+        ).scalar_subquery()
+    )
+
+    return select(
+        anzahl_patronen().label('gesamt_anzahl'),
+        anzahl_patronen('Molekularsieb').label('molekularsieb_anzahl'),
+        anzahl_patronen('Kohle').label('kohle_anzahl'),
+        select(konfiguration.c.patronenwechsel_intervall_stunden).scalar_subquery().label('intervall_stunden'),
+        select(konfiguration.c.warnung_vor_stunden).scalar_subquery().label('warnung_vor_stunden'),
+        select(letzter_wechsel.c.id).scalar_subquery().label('letzter_wechsel_id'),
+        select(letzter_wechsel.c.wechsel_datum).scalar_subquery().label('letzter_wechsel_datum'),
+        select(letzter_wechsel.c.betriebsstunden_bei_wechsel).scalar_subquery().label('letzter_wechsel_stunden'),
+        betriebsminuten.label('betriebsminuten')
+    )
+
+
+class WartungLesemodell:
+    """Gebündelter, kurz gecachter Stand der Wartungsseiten (pro Prozess)"""
+
+    CACHE_SEKUNDEN = 10.0
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stand: Optional[Dict[str, Any]] = None
+        self._berechnet_um = 0.0
+        self._generation = 0
+
+    def verwerfen(self):
+        """Nächster Zugriff berechnet neu"""
+        with self._lock:
+            self._generation += 1
+            self._stand = None
+
+    def uebersicht(self) -> Dict[str, Any]:
+        """
+        Stand der Wartungs-Übersicht
+
+        Returns:
+            Dict mit verfuegbare_patronen, dashboard_status, patronenwechsel,
+            betriebsstunden und lagerbestand (gleiche Struktur wie die
+            Einzel-Services, soweit die Seiten sie anzeigen)
+        """
+        with self._lock:
+            if self._stand is not None and time.monotonic() - self._berechnet_um < self.CACHE_SEKUNDEN:
+                return self._stand
+            generation = self._generation
+
+        stand = self.berechnen()
+
+        with self._lock:
+            # Während der Berechnung verworfen -> Ergebnis nicht cachen
+            if generation == self._generation:
+                self._stand = stand
+                self._berechnet_um = time.monotonic()
+        return stand
+
+    def berechnen(self) -> Dict[str, Any]:
+        """Lesemodell ohne Cache berechnen (Status-Abfrage + Lagerbestand-Snapshot)"""
+        from app.models.patronenwechsel import Patronenwechsel, PatronenwechselKonfiguration
+        from app.services.erweiterter_patronenwechsel_service import ErweiterterPatronenwechselService
+        from app.services.patrone_einkauf_service import PatroneEinkaufService
+
+        try:
+            zeile = db.session.execute(_status_abfrage()).one()
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"FEHLER beim Wartungs-Lesemodell: {str(e)}")
+            return self._fehler(str(e))
+
+        intervall, warnung_vor = zeile.intervall_stunden, zeile.warnung_vor_stunden
+        if intervall is None:
+            # Noch keine Konfiguration: Standard anlegen (einmalig)
+            config = PatronenwechselKonfiguration.get_aktuelle_konfiguration()
+            intervall, warnung_vor = config.patronenwechsel_intervall_stunden, config.warnung_vor_stunden
+
+        betriebsstunden = round((zeile.betriebsminuten or 0) / 60.0, 1)
+        status = Patronenwechsel.status_berechnen(
+            intervall, warnung_vor, betriebsstunden, zeile.letzter_wechsel_stunden
+        )
+        if zeile.letzter_wechsel_id is not None:
+            status['letzter_wechsel'] = {
+                'id': zeile.letzter_wechsel_id,
+                'wechsel_datum': zeile.letzter_wechsel_datum.isoformat() if zeile.letzter_wechsel_datum else None,
+                'betriebsstunden_bei_wechsel': zeile.letzter_wechsel_stunden
+            }
+
+        return {
+            'success': True,
+            'verfuegbare_patronen': {
+                'success': True,
+                'gesamt_anzahl': zeile.gesamt_anzahl,
+                'molekularsieb_anzahl': zeile.molekularsieb_anzahl,
+                'kohle_anzahl': zeile.kohle_anzahl
+            },
+            'dashboard_status': ErweiterterPatronenwechselService.countdown_aus_status(status),
+            'patronenwechsel': status,
+            'betriebsstunden': betriebsstunden,
+            'lagerbestand': PatroneEinkaufService.get_lagerbestand_uebersicht(),
+            'berechnet_am': datetime.now().isoformat()
+        }
+
+    @staticmethod
+    def _fehler(fehler: str) -> Dict[str, Any]:
+        return {
+            'success': False,
+            'error': fehler,
+            'verfuegbare_patronen': {'success': False, 'error': fehler, 'gesamt_anzahl': 0},
+            'dashboard_status': {
+                'countdown_text': "Fehler",
+                'countdown_class': "text-danger",
+                'countdown_icon': "❌",
+                'stunden_bis_wechsel': 0.0,
+                'wechsel_faellig': True,
+                'warnung_aktiv': True,
+                'error': fehler
+            },
+            'patronenwechsel': None,
+            'betriebsstunden': None,
+            'lagerbestand': {'success': False, 'error': fehler, 'lagerbestand_nach_typ': {}}
+        }
+
+
+wartung_lesemodell = WartungLesemodell()
+
+
+# ============================================================================
+# SQLAlchemy-Events: nach Commit mit Patronen-/Wechsel-Änderungen verwerfen
+# ============================================================================
+
+@event.listens_for(Session, 'after_flush')
+def _nach_flush(session, flush_context):
+    for objekt in itertools.chain(session.new, session.deleted, session.dirty):
+        if type(objekt).__name__ in _BETROFFENE_MODELS:
+            session.info[_PENDING_KEY] = True
+            return
+
+
+@event.listens_for(Session, 'after_commit')
+def _nach_commit(session):
+    if session.info.pop(_PENDING_KEY, None):
+        wartung_lesemodell.verwerfen()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _nach_rollback(session):
+    session.info.pop(_PENDING_KEY, None)
+
+
+def init_app(app):
+    """Cache-Dauer aus der Konfiguration (WARTUNG_CACHE_SEKUNDEN, 0 = aus)"""
+    wartung_lesemodell.CACHE_SEKUNDEN = float(
+        app.config.get('WARTUNG_CACHE_SEKUNDEN', WartungLesemodell.CACHE_SEKUNDEN)
+    )
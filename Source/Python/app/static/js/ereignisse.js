@@ -0,0 +1,131 @@
+// Server-Sent Events Client für WartungsManager
+// Eine gemeinsame Verbindung pro Seite; Handler werden je Kanal angemeldet.
+// Ohne EventSource-Unterstützung wird auf Timer-Polling zurückgefallen.
+
+const Ereignisse = (function() {
+    const handler = {};          // kanal -> [callback]
+    const fallbacks = [];        // {callback, intervall, timer}
+    const NEUVERSUCH_MS = 60000; // erneuter Verbindungsversuch nach Ablehnung
+    let quelle = null;
+    let verbindungsTimer = null;
+    let getrennt = false;
+
+    function url() {
+        const kanaele = Object.keys(handler).join(',');
+        return '/api/ereignisse' + (kanaele ? '?kanaele=' + encodeURIComponent(kanaele) : '');
+    }
+
+    function verteilen(kanal, ereignis) {
+        (handler[kanal] || []).forEach(cb => {
+            try {
+                cb(ereignis);
+            } catch (e) {
+                console.error('Ereignis-Handler fehlgeschlagen:', e);
+            }
+        });
+    }
+
+    function verbinden() {
+        if (quelle) {
+            quelle.close();
+        }
+        quelle = new EventSource(url());
+
+        Object.keys(handler).forEach(kanal => {
+            quelle.addEventListener(kanal, e => verteilen(kanal, JSON.parse(e.data)));
+        });
+
+        quelle.onerror = () => {
+            getrennt = true;
+            // Server lehnt ab (z. B. 503, alle Plätze belegt): der Browser verbindet
+            // nicht neu, daher bis zum nächsten Versuch per Timer pollen
+            if (quelle.readyState === EventSource.CLOSED) {
+                fallbackStarten();
+                clearTimeout(verbindungsTimer);
+                verbindungsTimer = setTimeout(verbinden, NEUVERSUCH_MS);
+            }
+        };
+        // Nach Verbindungsabbruch verpasste Änderungen einmal nachladen
+        quelle.onopen = () => {
+            fallbackStoppen();
+            if (getrennt) {
+                getrennt = false;
+                Object.keys(handler).forEach(kanal => verteilen(kanal, {kanal: kanal, typ: 'neu_verbunden', daten: {}}));
+            }
+        };
+    }
+
+    function fallbackStarten() {
+        fallbacks.forEach(f => {
+            if (!f.timer) {
+                f.timer = setInterval(f.callback, f.intervall);
+            }
+        });
+    }
+
+    function fallbackStoppen() {
+        fallbacks.forEach(f => {
+            clearInterval(f.timer);
+            f.timer = null;
+        });
+    }
+
+    return {
+        /**
+         * Meldet einen Handler für einen oder mehrere Kanäle an
+         * (kompressor, warteliste, bulk, wartung, kunden, fuellmanager).
+         * fallbackIntervall: Polling-Intervall in ms, falls kein SSE verfügbar ist.
+         */
+        abonnieren(kanaele, callback, fallbackIntervall) {
+            [].concat(kanaele).forEach(kanal => {
+                (handler[kanal] = handler[kanal] || []).push(callback);
+            });
+            if (fallbackIntervall) {
+                fallbacks.push({callback: callback, intervall: fallbackIntervall, timer: null});
+            }
+
+            if (!window.EventSource) {
+                fallbackStarten();
+                return;
+            }
+            // Mehrere Anmeldungen beim Laden der Seite zu einer Verbindung bündeln
+            clearTimeout(verbindungsTimer);
+            verbindungsTimer = setTimeout(verbinden, 0);
+        },
+
+        /**
+         * Fasst schnelle Ereignisfolgen zusammen (z. B. Bulk-Commits)
+         */
+        gebuendelt(callback, wartezeit) {
+            let timer = null;
+            return function(ereignis) {
+                clearTimeout(timer);
+                timer = setTimeout(() => callback(ereignis), wartezeit || 300);
+            };
+        },
+
+        /**
+         * Filtert Shelly-Telemetrie (kompressor/shelly): callback nur, wenn sich
+         * Schaltzustand oder Erreichbarkeit eines Geräts ändert. Reine
+         * Messwert-Änderungen gehen an beiMesswert (Daten stehen im Ereignis),
+         * statt den kompletten Status neu zu laden. Andere Ereignisse laufen durch.
+         */
+        nurZustandswechsel(callback, beiMesswert) {
+            const zustaende = {};    // ip -> 'online/output'
+            return function(ereignis) {
+                if (ereignis.typ !== 'shelly') {
+                    callback(ereignis);
+                    return;
+                }
+                const daten = ereignis.daten || {};
+                const zustand = daten.online + '/' + daten.output;
+                if (zustaende[daten.ip] !== zustand) {
+                    zustaende[daten.ip] = zustand;
+                    callback(ereignis);
+                } else if (beiMesswert) {
+                    beiMesswert(daten);
+                }
+            };
+        }
+    };
+})();
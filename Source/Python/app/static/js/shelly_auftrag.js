@@ -0,0 +1,33 @@
+// Shelly-Schaltaufträge für WartungsManager
+// Schalt-Endpunkte antworten mit 202 und einer status_url; der Auftrag läuft
+// im Hintergrund. Die Wartezeit richtet sich nach der vom Server gemeldeten
+// Höchstdauer des Auftrags (alle HTTP-Timeouts plus Pausen).
+
+// Reserve für Warteschlange und Netzwerk zusätzlich zur Höchstdauer des Auftrags
+const AUFTRAG_RESERVE_MS = 3000;
+
+/**
+ * Fragt den Auftragsstatus ab, bis er abgeschlossen ist
+ * auftrag: Auftrags-Dict aus der 202-Antwort (max_dauer_sekunden)
+ * Liefert {success: true, auftrag} bzw. {success: false, error}.
+ */
+function warteAufAuftrag(statusUrl, auftrag, intervall = 250) {
+    const maxDauer = (auftrag && auftrag.max_dauer_sekunden) || 15;
+    const frist = Date.now() + maxDauer * 1000 + AUFTRAG_RESERVE_MS;
+
+    function abfragen() {
+        return fetch(statusUrl)
+            .then(response => response.json())
+            .then(data => {
+                const stand = data.auftrag || {};
+                if (stand.status === 'fertig') {
+                    return {success: true, auftrag: stand};
+                }
+                if (stand.status === 'fehler' || !data.success || Date.now() >= frist) {
+                    return {success: false, error: stand.error || data.error || 'Zeitüberschreitung'};
+                }
+                return new Promise(resolve => setTimeout(resolve, intervall)).then(abfragen);
+            });
+    }
+    return abfragen();
+}
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Benchmark: gleichzeitige Schreibzugriffe mehrerer Tablets auf SQLite
+
+Vergleicht das bisherige Verhalten (Rollback-Journal, nur Treiber-Timeout) mit
+den Tuning-Profilen aus config/sqlite_tuning.py. Die Profile setzen busy_timeout
+(15-20 s) und überschreiben damit --timeout; der Kontrolllauf "kontrolle"
+nutzt das Rollback-Journal mit demselben busy_timeout wie "standard", damit
+sich der Effekt von WAL vom längeren Warten trennen lässt. Jedes "Tablet" ist ein Thread
+mit eigener Verbindung und dem Muster der App (lesen, dann eine kurze
+Schreib-Transaktion); parallel liest ein Dashboard laufend Aggregate.
+
+Aufruf:
+    python benchmark_sqlite_tablets.py [--tablets 8] [--sekunden 10] [--timeout 5]
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+
+from config.sqlite_tuning import SQLITE_PROFILE, pragmas_anwenden
+
+
+def datenbank_anlegen(pfad, flaschen=5000):
+    connection = sqlite3.connect(pfad)
+    connection.executescript("""
+        CREATE TABLE flaschen (
+            id INTEGER PRIMARY KEY, kunde_id INTEGER, ist_aktiv INTEGER, fuellungen INTEGER
+        );
+        CREATE TABLE warteliste_eintraege (
+            id INTEGER PRIMARY KEY, flasche_id INTEGER, status TEXT, annahme TEXT, notizen TEXT
+        );
+        CREATE INDEX ix_warteliste_status ON warteliste_eintraege(status);
+    """)
+    connection.executemany(
+        "INSERT INTO flaschen (id, kunde_id, ist_aktiv, fuellungen) VALUES (?, ?, 1, 0)",
+        [(i, i % 500) for i in range(1, flaschen + 1)]
+    )
+    connection.commit()
+    connection.close()
+
+
+def tablet(pfad, pragmas, timeout, ende, ergebnis, flaschen):
+    connection = sqlite3.connect(pfad, timeout=timeout, check_same_thread=False)
+    if pragmas:
+        pragmas_anwenden(connection, pragmas)
+    zufall = random.Random()
+    while time.monotonic() < ende:
+        flasche_id = zufall.randint(1, flaschen)
+        start = time.perf_counter()
+        try:
+            # Lesen (außerhalb einer Transaktion, wie der pysqlite-Treiber)
+            connection.execute(
+                "SELECT COUNT(*) FROM warteliste_eintraege WHERE status = 'wartend'"
+            ).fetchone()
+            # Schreiben: Flasche annehmen
+            connection.execute("UPDATE flaschen SET fuellungen = fuellungen + 1 WHERE id = ?", (flasche_id,))
+            connection.execute(
+                "INSERT INTO warteliste_eintraege (flasche_id, status, annahme, notizen) "
+                "VALUES (?, 'wartend', datetime('now'), ?)",
+                (flasche_id, 'x' * 200)
+            )
+            connection.commit()
+            ergebnis['latenzen'].append(time.perf_counter() - start)
+        except sqlite3.OperationalError as e:
+            connection.rollback()
+            if 'locked' in str(e) or 'busy' in str(e):
+                ergebnis['gesperrt'] += 1
+            else:
+                raise
+    connection.close()
+
+
+def dashboard(pfad, pragmas, timeout, ende, ergebnis):
+    connection = sqlite3.connect(pfad, timeout=timeout, check_same_thread=False)
+    if pragmas:
+        pragmas_anwenden(connection, pragmas)
+    while time.monotonic() < ende:
+        try:
+            # Längere Lese-Transaktion (Statistik-Seite)
+            connection.execute("BEGIN")
+            connection.execute(
+                "SELECT status, COUNT(*), MAX(annahme) FROM warteliste_eintraege GROUP BY status"
+            ).fetchall()
+            connection.execute(
+                "SELECT kunde_id, SUM(fuellungen) FROM flaschen GROUP BY kunde_id ORDER BY 2 DESC LIMIT 5"
+            ).fetchall()
+            connection.execute("COMMIT")
+            ergebnis['dashboard'] += 1
+        except sqlite3.OperationalError as e:
+            connection.rollback()
+            if 'locked' in str(e) or 'busy' in str(e):
+                ergebnis['dashboard_gesperrt'] += 1
+            else:
+                raise
+    connection.close()
+
+
+def lauf(name, pragmas, tablets, sekunden, timeout, flaschen=5000):
+    verzeichnis = tempfile.mkdtemp(prefix='wm_bench_')
+    pfad = os.path.join(verzeichnis, 'benchmark.db')
+    datenbank_anlegen(pfad, flaschen)
+
+    ergebnis = {'latenzen': [], 'gesperrt': 0, 'dashboard': 0, 'dashboard_gesperrt': 0}
+    ende = time.monotonic() + sekunden
+    threads = [
+        threading.Thread(target=tablet, args=(pfad, pragmas, timeout, ende, ergebnis, flaschen))
+        for _ in range(tablets)
+    ]
+    threads.append(threading.Thread(target=dashboard, args=(pfad, pragmas, timeout, ende, ergebnis)))
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    latenzen = sorted(ergebnis['latenzen'])
+    p95 = latenzen[int(len(latenzen) * 0.95) - 1] if latenzen else 0
+    print(f"{name:10} | {len(latenzen) / sekunden:8.1f} Schreibvorgänge/s"
+          f" | 'database is locked': {ergebnis['gesperrt']:5}"
+          f" | Median {statistics.median(latenzen) * 1000 if latenzen else 0:7.1f} ms"
+          f" | p95 {p95 * 1000:7.1f} ms"
+          f" | Dashboard {ergebnis['dashboard']} ({ergebnis['dashboard_gesperrt']} gesperrt)")
+
+    for datei in os.listdir(verzeichnis):
+        os.remove(os.path.join(verzeichnis, datei))
+    os.rmdir(verzeichnis)
+    return ergebnis
+
+
+def main():
+    parser = argparse.ArgumentParser(description='SQLite-Schreibzugriffe mehrerer Tablets')
+    parser.add_argument('--tablets', type=int, default=8)
+    parser.add_argument('--sekunden', type=float, default=10)
+    parser.add_argument('--timeout', type=float, default=5.0,
+                        help='Treiber-Timeout in Sekunden für "bisher" (Python-Standard: 5); '
+                             'die übrigen Läufe nutzen busy_timeout aus dem Profil')
+    args = parser.parse_args()
+
+    print(f"{args.tablets} Tablets + 1 Dashboard, {args.sekunden:.0f}s je Lauf, SQLite {sqlite3.sqlite_version}\n")
+    lauf('bisher', {}, args.tablets, args.sekunden, args.timeout)
+    # Kontrolle: Rollback-Journal, aber gleiches busy_timeout wie das Profil "standard"
+    kontrolle = {'journal_mode': 'DELETE', 'busy_timeout': SQLITE_PROFILE['standard']['busy_timeout']}
+    lauf('kontrolle', kontrolle, args.tablets, args.sekunden, args.timeout)
+    for name in ('standard', 'nas'):
+        lauf(name, SQLITE_PROFILE[name], args.tablets, args.sekunden, args.timeout)
+
+
+if __name__ == '__main__':
+    main()
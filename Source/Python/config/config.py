@@ -16,6 +16,20 @@ class Config:
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SQLALCHEMY_RECORD_QUERIES = True
     
+    # SQLite-Tuning (WAL, Cache, busy_timeout) - Profile in config/sqlite_tuning.py
+    # 'aus' wenn die Datenbank auf einer Netzwerkfreigabe liegt
+    SQLITE_TUNING_PROFIL = os.environ.get('SQLITE_TUNING_PROFIL', 'standard')
+    SQLITE_PRAGMAS = {}  # Einzelwerte überschreiben, z.B. {'cache_size': -16000}
+    SQLITE_WARTUNG_INTERVALL = int(os.environ.get('SQLITE_WARTUNG_INTERVALL', 600))  # WAL-Checkpoint/optimize
+    
+    # Schreibende Hintergrund-Threads (Shelly-Poller, SQLite-Wartung) in diesem Prozess starten
+    # Der Produktionsserver setzt 'false' und vergibt sie an genau einen Worker
+    HINTERGRUND_DIENSTE = os.environ.get('HINTERGRUND_DIENSTE', 'true').lower() in ['true', 'on', '1']
+    
+    # Gleichzeitige Push-Verbindungen (/api/ereignisse) je Prozess; jede belegt
+    # einen Server-Thread, daher deutlich unter SERVER_THREADS halten
+    EREIGNISSE_MAX_CLIENTS = int(os.environ.get('EREIGNISSE_MAX_CLIENTS', 16))
+    
     # Touch-UI Configuration
     TOUCH_BUTTON_MIN_SIZE = 44  # px - Apple Human Interface Guidelines
     TOUCH_SPACING = 8          # px - Minimum spacing between touch elements
@@ -54,6 +68,21 @@ class Config:
         'password': os.environ.get('SHELLY_PASSWORD'),
         'timeout': int(os.environ.get('SHELLY_TIMEOUT', 10))
     }
+    
+    # Abfrage-Takt des Shelly-Telemetrie-Pollers (Sekunden) = Auflösung der Rohwerte
+    SHELLY_POLL_INTERVALL = float(os.environ.get('SHELLY_POLL_INTERVALL', 1.0))
+
+    # Shelly-Erkennung per mDNS (python-zeroconf); HTTP-Sweep bleibt Fallback
+    SHELLY_MDNS = os.environ.get('SHELLY_MDNS', 'true').lower() in ['true', 'on', '1']
+    # Nur auf diesen Netzwerkkarten lauschen (kommagetrennte IPs, leer = alle)
+    SHELLY_MDNS_INTERFACES = [ip.strip() for ip in os.environ.get('SHELLY_MDNS_INTERFACES', '').split(',') if ip.strip()]
+
+    # Lesemodell der Wartungsseiten: Cache-Dauer in Sekunden (Commits verwerfen es sofort)
+    WARTUNG_CACHE_SEKUNDEN = float(os.environ.get('WARTUNG_CACHE_SEKUNDEN', 10))
+
+    # Druck-Worker: Abfrage-Takt der Warteschlange und Versuche pro Etikett
+    DRUCK_POLL_INTERVALL = float(os.environ.get('DRUCK_POLL_INTERVALL', 2.0))
+    DRUCK_MAX_VERSUCHE = int(os.environ.get('DRUCK_MAX_VERSUCHE', 5))
 
     @staticmethod
     def init_app(app):
@@ -0,0 +1,63 @@
+# SQLite-Tuning-Profile für WartungsManager
+# Werden bei jeder neuen Datenbankverbindung angewendet (siehe app/datenbank_tuning.py)
+#
+# WAL erlaubt gleichzeitiges Lesen während ein Tablet schreibt; Schreiber warten
+# per busy_timeout aufeinander statt sofort "database is locked" zu melden.
+# WAL braucht Shared Memory: die Datenbank muss auf einem lokalen Laufwerk des
+# Servers/NAS liegen, nicht auf einer Netzwerkfreigabe (SMB/NFS) -> Profil 'aus'.
+
+SQLITE_PROFILE = {
+    # Server/PC mit ausreichend RAM
+    'standard': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',       # In WAL sicher bei Absturz der Anwendung
+        'cache_size': -32000,          # ~32 MB Seiten-Cache je Verbindung (negativ = KiB)
+        'mmap_size': 128 * 1024 * 1024,
+        'temp_store': 'MEMORY',
+        'busy_timeout': 15000,         # ms warten, bis ein anderer Schreiber fertig ist
+    },
+    # NAS mit wenig RAM (z.B. WD MyCloud), mehrere Tablets gleichzeitig
+    'nas': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'cache_size': -8000,           # ~8 MB je Verbindung
+        'mmap_size': 32 * 1024 * 1024,
+        'temp_store': 'MEMORY',
+        'busy_timeout': 20000,
+    },
+    # Keine Änderungen (Netzwerkfreigabe, Fehlersuche)
+    'aus': {},
+}
+
+# Reihenfolge beim Anwenden: busy_timeout zuerst, damit schon der Wechsel
+# des Journal-Modus auf andere Verbindungen wartet
+PRAGMA_REIHENFOLGE = ['busy_timeout', 'journal_mode', 'synchronous', 'cache_size', 'mmap_size', 'temp_store']
+
+
+def profil(name):
+    """Liefert die Pragmas eines Profils (unbekannte Namen -> ValueError)"""
+    if name not in SQLITE_PROFILE:
+        raise ValueError(f"Unbekanntes SQLite-Profil: {name} (erlaubt: {', '.join(SQLITE_PROFILE)})")
+    return SQLITE_PROFILE[name]
+
+
+def pragmas_anwenden(dbapi_connection, pragmas):
+    """
+    Setzt die Pragmas auf einer DB-API-Verbindung (sqlite3)
+
+    Returns:
+        Tatsächlicher Journal-Modus (z.B. 'wal', bei :memory: 'memory')
+    """
+    cursor = dbapi_connection.cursor()
+    try:
+        journal_mode = None
+        for name in PRAGMA_REIHENFOLGE:
+            if name not in pragmas:
+                continue
+            cursor.execute(f"PRAGMA {name}={pragmas[name]}")
+            if name == 'journal_mode':
+                zeile = cursor.fetchone()
+                journal_mode = zeile[0] if zeile else None
+        return journal_mode
+    finally:
+        cursor.close()
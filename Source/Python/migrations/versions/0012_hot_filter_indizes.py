@@ -0,0 +1,83 @@
+"""Zusammengesetzte Indizes für häufige Filter
+
+Revision ID: 0012_hot_filter_indizes
+Revises: 0011_erweiterte_flaschen_rueckverfolgung_v2
+Create Date: 2026-10-18
+
+Indizes entsprechen den Abfragen in app/services/index_audit.py
+(`flask index-audit` prüft die Abfragepläne).
+"""
+from alembic import op
+from sqlalchemy import text
+
+# revision identifiers
+revision = '0012_hot_filter_indizes'
+down_revision = '0011_erweiterte_flaschen_rueckverfolgung_v2'
+branch_labels = None
+depends_on = None
+
+
+# (Name, Tabelle, Spalten) - gleiche Namen wie in den __table_args__ der Models
+INDIZES = [
+    ('ix_flaschen_kunde_aktiv', 'flaschen', ['kunde_id', 'ist_aktiv']),
+    ('ix_flaschen_aktiv_pruefung', 'flaschen', ['ist_aktiv', 'naechste_pruefung']),
+    ('ix_flaschen_vorgemerkt_aktiv', 'flaschen', ['ist_zum_fuellen_vorgemerkt', 'ist_aktiv']),
+    ('ix_warteliste_status_annahme', 'warteliste_eintraege', ['status', 'annahme_datum']),
+    ('ix_warteliste_status_fuell_ende', 'warteliste_eintraege', ['status', 'fuell_ende']),
+    ('ix_warteliste_flasche_status', 'warteliste_eintraege', ['flasche_id', 'status']),
+    ('ix_kompressor_betrieb_status_start', 'kompressor_betrieb', ['status', 'start_zeit']),
+    ('ix_kompressor_betrieb_start', 'kompressor_betrieb', ['start_zeit']),
+    ('ix_patronenwechsel_wechsel_datum', 'patronenwechsel', ['wechsel_datum']),
+    ('ix_fuellmanager_status_erstellt', 'fuellmanager', ['status', 'erstellt_am']),
+    ('ix_print_jobs_status_erstellt', 'print_jobs', ['status', 'erstellt_am']),
+    ('ix_print_jobs_patronenwechsel', 'print_jobs', ['patronenwechsel_id', 'erstellt_am']),
+    ('ix_flasche_fuellvorgang_bulk_flasche', 'flasche_fuellvorgang', ['bulk_fuellvorgang_id', 'flasche_id']),
+    ('ix_flasche_fuellvorgang_flasche', 'flasche_fuellvorgang', ['flasche_id']),
+]
+
+# Durch die zusammengesetzten Indizes abgedeckt (gleiche führende Spalte)
+UEBERFLUESSIG = [
+    ('idx_warteliste_status', 'warteliste_eintraege', ['status']),
+    ('idx_warteliste_flasche', 'warteliste_eintraege', ['flasche_id']),
+]
+
+
+def _tabellen(connection):
+    result = connection.execute(text("SELECT name FROM sqlite_master WHERE type = 'table'"))
+    return {row[0] for row in result.fetchall()}
+
+
+def upgrade():
+    """
+    Legt die Indizes an (idempotent, fehlende Tabellen werden übersprungen)
+    """
+    connection = op.get_bind()
+    tabellen = _tabellen(connection)
+
+    for name, tabelle, spalten in INDIZES:
+        if tabelle not in tabellen:
+            print(f"  ⚠️ Tabelle {tabelle} fehlt - Index {name} übersprungen")
+            continue
+        op.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {tabelle}({', '.join(spalten)})"))
+        print(f"  📊 Index {name} erstellt")
+
+    for name, _, _ in UEBERFLUESSIG:
+        op.execute(text(f"DROP INDEX IF EXISTS {name}"))
+
+    # Statistiken für den Query-Planer aktualisieren
+    op.execute(text("ANALYZE"))
+
+
+def downgrade():
+    """
+    Entfernt die Indizes wieder
+    """
+    connection = op.get_bind()
+    tabellen = _tabellen(connection)
+
+    for name, tabelle, spalten in UEBERFLUESSIG:
+        if tabelle in tabellen:
+            op.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {tabelle}({', '.join(spalten)})"))
+
+    for name, _, _ in INDIZES:
+        op.execute(text(f"DROP INDEX IF EXISTS {name}"))
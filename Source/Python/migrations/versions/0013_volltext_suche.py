@@ -0,0 +1,93 @@
+"""FTS5-Volltextindex für Kunden und Flaschen
+
+Revision ID: 0013_volltext_suche
+Revises: 0012_hot_filter_indizes
+Create Date: 2026-10-18
+
+External-Content-Tabellen kunden_fts / flaschen_fts mit Sync-Triggern,
+entsprechend app/services/volltext_suche.py. Ohne FTS5-Unterstützung in
+SQLite wird die Migration übersprungen (die Suche nutzt dann LIKE).
+"""
+from alembic import op
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+# revision identifiers
+revision = '0013_volltext_suche'
+down_revision = '0012_hot_filter_indizes'
+branch_labels = None
+depends_on = None
+
+
+# (Basistabelle, FTS-Tabelle, Spalten) - gleiche Reihenfolge wie in volltext_suche.py
+FTS_TABELLEN = [
+    ('kunden', 'kunden_fts', ['vorname', 'nachname', 'firma', 'email', 'mitgliedsnummer',
+                              'externe_kundennummer', 'telefon']),
+    ('flaschen', 'flaschen_fts', ['flasche_nummer', 'externe_flasche_nummer', 'barcode', 'seriennummer']),
+]
+
+
+def _tabellen(connection):
+    result = connection.execute(text("SELECT name FROM sqlite_master WHERE type = 'table'"))
+    return {row[0] for row in result.fetchall()}
+
+
+def _trigger_sql(tabelle, fts, spalten):
+    spalten_liste = ', '.join(spalten)
+    neu = ', '.join(f'new.{s}' for s in spalten)
+    alt = ', '.join(f'old.{s}' for s in spalten)
+    return [
+        f"""CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {tabelle} BEGIN
+            INSERT INTO {fts}(rowid, {spalten_liste}) VALUES (new.id, {neu});
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {tabelle} BEGIN
+            INSERT INTO {fts}({fts}, rowid, {spalten_liste}) VALUES ('delete', old.id, {alt});
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {spalten_liste} ON {tabelle} BEGIN
+            INSERT INTO {fts}({fts}, rowid, {spalten_liste}) VALUES ('delete', old.id, {alt});
+            INSERT INTO {fts}(rowid, {spalten_liste}) VALUES (new.id, {neu});
+        END""",
+    ]
+
+
+def upgrade():
+    """
+    Legt FTS-Tabellen und Trigger an und baut den Index auf (idempotent)
+    """
+    connection = op.get_bind()
+    if connection.dialect.name != 'sqlite':
+        return
+    tabellen = _tabellen(connection)
+
+    for tabelle, fts, spalten in FTS_TABELLEN:
+        if tabelle not in tabellen:
+            print(f"  ⚠️ Tabelle {tabelle} fehlt - {fts} übersprungen")
+            continue
+        if fts not in tabellen:
+            try:
+                op.execute(text(
+                    f"CREATE VIRTUAL TABLE {fts} USING fts5("
+                    f"{', '.join(spalten)}, "
+                    f"content='{tabelle}', content_rowid='id', "
+                    f"tokenize=\"unicode61 remove_diacritics 2\")"
+                ))
+            except OperationalError as e:
+                print(f"  ⚠️ FTS5 nicht verfügbar ({e}) - Suche bleibt bei LIKE")
+                return
+        for sql in _trigger_sql(tabelle, fts, spalten):
+            op.execute(text(sql))
+        op.execute(text(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')"))
+        print(f"  🔎 Volltextindex {fts} aufgebaut")
+
+
+def downgrade():
+    """
+    Entfernt Trigger und FTS-Tabellen
+    """
+    connection = op.get_bind()
+    if connection.dialect.name != 'sqlite':
+        return
+    for _, fts, _ in FTS_TABELLEN:
+        for suffix in ('ai', 'ad', 'au'):
+            op.execute(text(f"DROP TRIGGER IF EXISTS {fts}_{suffix}"))
+        op.execute(text(f"DROP TABLE IF EXISTS {fts}"))
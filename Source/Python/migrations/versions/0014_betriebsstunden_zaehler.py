@@ -0,0 +1,61 @@
+"""Laufender Betriebsstunden-Zähler des Kompressors
+
+Revision ID: 0014_betriebsstunden_zaehler
+Revises: 0013_volltext_suche
+Create Date: 2026-10-18
+
+Eine Zeile (id=1) mit der Summe der Betriebsminuten aller abgeschlossenen
+Zyklen (siehe KompressorBetriebsstundenZaehler in app/models/kompressor.py).
+Die Zeile wird beim Upgrade einmalig aus kompressor_betrieb berechnet.
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import text
+
+# revision identifiers
+revision = '0014_betriebsstunden_zaehler'
+down_revision = '0013_volltext_suche'
+branch_labels = None
+depends_on = None
+
+
+def _tabellen(connection):
+    result = connection.execute(text("SELECT name FROM sqlite_master WHERE type = 'table'"))
+    return {row[0] for row in result.fetchall()}
+
+
+def upgrade():
+    """
+    Legt die Zähler-Tabelle an und initialisiert den Zählerstand (idempotent)
+    """
+    connection = op.get_bind()
+    tabellen = _tabellen(connection)
+
+    if 'kompressor_betriebsstunden_zaehler' not in tabellen:
+        op.create_table('kompressor_betriebsstunden_zaehler',
+            sa.Column('id', sa.Integer, primary_key=True),
+            sa.Column('gesamt_minuten', sa.Integer, nullable=False, server_default='0'),
+            sa.Column('anzahl_zyklen', sa.Integer, nullable=False, server_default='0'),
+            sa.Column('aktualisiert_am', sa.DateTime)
+        )
+        print("  ⏱️ Tabelle kompressor_betriebsstunden_zaehler erstellt")
+
+    if 'kompressor_betrieb' not in tabellen:
+        print("  ⚠️ Tabelle kompressor_betrieb fehlt - Zähler bleibt leer")
+        return
+
+    # Gleiche Definition wie KompressorBetrieb.summe_betriebsminuten (ABGESCHLOSSENE_STATUS)
+    op.execute(text("""
+        INSERT OR IGNORE INTO kompressor_betriebsstunden_zaehler
+            (id, gesamt_minuten, anzahl_zyklen, aktualisiert_am)
+        SELECT 1, COALESCE(SUM(betriebsdauer_minuten), 0), COUNT(*), CURRENT_TIMESTAMP
+        FROM kompressor_betrieb
+        WHERE status IN ('beendet', 'notaus')
+    """))
+
+
+def downgrade():
+    """
+    Entfernt die Zähler-Tabelle
+    """
+    op.drop_table('kompressor_betriebsstunden_zaehler')
@@ -0,0 +1,74 @@
+"""Zeitreihe der Shelly-Messwerte (Rohwerte und Verdichtung)
+
+Revision ID: 0015_shelly_messwerte
+Revises: 0014_betriebsstunden_zaehler
+Create Date: 2026-10-18
+
+Tabellen zu app/models/shelly_messwerte.py: shelly_messwerte (Rohwerte im
+Poller-Takt) und shelly_messwerte_aggregat (Minuten-/Stundenwerte).
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import text
+
+# revision identifiers
+revision = '0015_shelly_messwerte'
+down_revision = '0014_betriebsstunden_zaehler'
+branch_labels = None
+depends_on = None
+
+
+def _tabellen(connection):
+    result = connection.execute(text("SELECT name FROM sqlite_master WHERE type = 'table'"))
+    return {row[0] for row in result.fetchall()}
+
+
+def upgrade():
+    """
+    Legt die Zeitreihen-Tabellen an (idempotent)
+    """
+    connection = op.get_bind()
+    tabellen = _tabellen(connection)
+
+    if 'shelly_messwerte' not in tabellen:
+        op.create_table('shelly_messwerte',
+            sa.Column('id', sa.Integer, primary_key=True),
+            sa.Column('ip', sa.String(64), nullable=False),
+            sa.Column('zeitpunkt', sa.DateTime, nullable=False),
+            sa.Column('apower', sa.Float),
+            sa.Column('voltage', sa.Float),
+            sa.Column('temperatur', sa.Float),
+            sa.Column('output', sa.Boolean)
+        )
+        print("  📈 Tabelle shelly_messwerte erstellt")
+    op.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_shelly_messwerte_ip_zeitpunkt ON shelly_messwerte(ip, zeitpunkt)"
+    ))
+
+    if 'shelly_messwerte_aggregat' not in tabellen:
+        op.create_table('shelly_messwerte_aggregat',
+            sa.Column('id', sa.Integer, primary_key=True),
+            sa.Column('ip', sa.String(64), nullable=False),
+            sa.Column('aufloesung', sa.String(4), nullable=False),
+            sa.Column('zeitpunkt', sa.DateTime, nullable=False),
+            sa.Column('anzahl', sa.Integer, nullable=False, server_default='0'),
+            sa.Column('apower_mittel', sa.Float),
+            sa.Column('apower_min', sa.Float),
+            sa.Column('apower_max', sa.Float),
+            sa.Column('voltage_mittel', sa.Float),
+            sa.Column('temperatur_mittel', sa.Float),
+            sa.Column('temperatur_max', sa.Float),
+            sa.Column('ein_anteil', sa.Float),
+            # Ziel des UPSERTs bei der Verdichtung (ON CONFLICT)
+            sa.UniqueConstraint('ip', 'aufloesung', 'zeitpunkt', name='uq_shelly_aggregat_fenster')
+        )
+        print("  📈 Tabelle shelly_messwerte_aggregat erstellt")
+
+
+def downgrade():
+    """
+    Entfernt die Zeitreihen-Tabellen
+    """
+    op.drop_table('shelly_messwerte_aggregat')
+    op.execute(text("DROP INDEX IF EXISTS ix_shelly_messwerte_ip_zeitpunkt"))
+    op.drop_table('shelly_messwerte')
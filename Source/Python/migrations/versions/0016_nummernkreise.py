@@ -0,0 +1,47 @@
+"""Nummernkreise für Mitglieds-, Flaschen- und Auftragsnummern
+
+Revision ID: 0016_nummernkreise
+Revises: 0015_shelly_messwerte
+Create Date: 2026-10-18
+
+Tabelle zu app/models/nummernkreis.py: ein Zähler je Präfix. Die Zeilen
+entstehen beim ersten Zugriff auf einen Präfix (Startwert aus den
+vorhandenen Nummern), daher wird hier nichts vorbelegt.
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import text
+
+# revision identifiers
+revision = '0016_nummernkreise'
+down_revision = '0015_shelly_messwerte'
+branch_labels = None
+depends_on = None
+
+
+def _tabellen(connection):
+    result = connection.execute(text("SELECT name FROM sqlite_master WHERE type = 'table'"))
+    return {row[0] for row in result.fetchall()}
+
+
+def upgrade():
+    """
+    Legt die Tabelle nummernkreise an (idempotent)
+    """
+    connection = op.get_bind()
+    if 'nummernkreise' in _tabellen(connection):
+        return
+
+    op.create_table('nummernkreise',
+        sa.Column('praefix', sa.String(100), primary_key=True),
+        sa.Column('letzter_wert', sa.Integer, nullable=False, server_default='0'),
+        sa.Column('aktualisiert_am', sa.DateTime)
+    )
+    print("  🔢 Tabelle nummernkreise erstellt")
+
+
+def downgrade():
+    """
+    Entfernt die Tabelle nummernkreise
+    """
+    op.drop_table('nummernkreise')
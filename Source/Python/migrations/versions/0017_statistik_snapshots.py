@@ -0,0 +1,49 @@
+"""Vorberechnete Statistiken (Snapshots je Kennzahlen-Familie)
+
+Revision ID: 0017_statistik_snapshots
+Revises: 0016_nummernkreise
+Create Date: 2026-10-18
+
+Tabelle zu app/models/statistik_snapshot.py. Die Zeilen legt
+app/services/statistik_service.py beim ersten Lesen einer Familie an.
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import text
+
+# revision identifiers
+revision = '0017_statistik_snapshots'
+down_revision = '0016_nummernkreise'
+branch_labels = None
+depends_on = None
+
+
+def _tabellen(connection):
+    result = connection.execute(text("SELECT name FROM sqlite_master WHERE type = 'table'"))
+    return {row[0] for row in result.fetchall()}
+
+
+def upgrade():
+    """
+    Legt die Tabelle statistik_snapshots an (idempotent)
+    """
+    connection = op.get_bind()
+    if 'statistik_snapshots' in _tabellen(connection):
+        return
+
+    op.create_table('statistik_snapshots',
+        sa.Column('familie', sa.String(50), primary_key=True),
+        sa.Column('daten', sa.Text, nullable=False, server_default='{}'),
+        sa.Column('version', sa.Integer, nullable=False, server_default='0'),
+        sa.Column('veraltet', sa.Boolean, nullable=False, server_default='1'),
+        sa.Column('berechnet_am', sa.DateTime),
+        sa.Column('gueltig_bis', sa.DateTime)
+    )
+    print("  📊 Tabelle statistik_snapshots erstellt")
+
+
+def downgrade():
+    """
+    Entfernt die Tabelle statistik_snapshots
+    """
+    op.drop_table('statistik_snapshots')
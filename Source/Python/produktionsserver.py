@@ -0,0 +1,410 @@
+#!/usr/bin/env python3
+"""
+WartungsManager - Produktionsserver (waitress, Worker-Prozesse)
+
+Ersetzt den Flask-Entwicklungsserver (app.run) im Produktivbetrieb:
+
+- Master-Prozess öffnet den Port einmal und startet Worker-Prozesse, die sich
+  den Socket teilen (läuft auf Windows und Linux/NAS)
+- Jeder Worker bedient Anfragen mit einem waitress-Threadpool
+- Warteschlangen-Limit: sind alle Threads belegt und warten bereits
+  SERVER_WARTESCHLANGE Anfragen, wird sofort mit 503 geantwortet
+- Worker-Recycling nach SERVER_MAX_ANFRAGEN Anfragen (Ersatz startet vorher)
+- Graceful Reload ohne Unterbrechung: SIGHUP (Linux) oder Änderung der
+  SERVER_NEUSTART_DATEI (z.B. `type nul > neustart.txt` bzw. `touch neustart.txt`)
+- SQLite: mehrere Prozesse nur mit WAL (siehe config/sqlite_tuning.py);
+  schreibende Hintergrund-Dienste (Shelly-Poller, SQLite-Wartung) laufen
+  über eine Sperrdatei in genau einem Worker
+
+Hinweis: Shelly-Snapshots, Ereignis-Bus (SSE), Kunden-Suchindex und
+Barcode-Cache liegen im Speicher des jeweiligen Prozesses. Standard ist daher
+ein Worker-Prozess mit vielen Threads; SERVER_PROZESSE > 1 nur setzen, wenn
+diese Funktionen prozessübergreifend nicht benötigt werden.
+
+Start: python run_production.py
+"""
+
+import logging
+import multiprocessing
+import os
+import queue
+import random
+import signal
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+logger = logging.getLogger('produktionsserver')
+
+
+class ServerEinstellungen:
+    """Einstellungen des Produktionsservers (Umgebungsvariablen oder Argumente)"""
+
+    def __init__(self, **werte):
+        umgebung = os.environ.get
+        self.host = umgebung('SERVER_HOST', '0.0.0.0')
+        self.port = int(umgebung('SERVER_PORT', 5000))
+        self.prozesse = int(umgebung('SERVER_PROZESSE', 1))
+        # SSE-Verbindungen (Live-Updates) belegen je einen Thread
+        self.threads = int(umgebung('SERVER_THREADS', 32))
+        self.warteschlange = int(umgebung('SERVER_WARTESCHLANGE', 64))
+        self.verbindungen = int(umgebung('SERVER_VERBINDUNGEN', 256))
+        self.backlog = int(umgebung('SERVER_BACKLOG', 128))
+        self.max_anfragen = int(umgebung('SERVER_MAX_ANFRAGEN', 20000))  # 0 = kein Recycling
+        self.stopp_timeout = float(umgebung('SERVER_STOPP_TIMEOUT', 30))
+        self.neustart_datei = umgebung('SERVER_NEUSTART_DATEI', os.path.join(
+            os.path.dirname(os.path.abspath(__file__)), 'neustart.txt'
+        ))
+        self.sperrdatei = umgebung('SERVER_SPERRDATEI', '')
+        for name, wert in werte.items():
+            if wert is not None:
+                setattr(self, name, wert)
+        if not self.sperrdatei:
+            self.sperrdatei = os.path.join(
+                tempfile.gettempdir(), f'wartungsmanager_{self.port}_hintergrund.lock'
+            )
+
+    def als_dict(self):
+        return dict(self.__dict__)
+
+
+# ============================================================================
+# Prozessübergreifende Sperre (Hintergrund-Dienste in genau einem Worker)
+# ============================================================================
+
+class DateiSperre:
+    """Exklusive, nicht blockierende Dateisperre (wird beim Prozessende frei)"""
+
+    def __init__(self, pfad):
+        self.pfad = pfad
+        self._datei = None
+
+    def versuchen(self):
+        datei = open(self.pfad, 'a+')
+        try:
+            if os.name == 'nt':
+                import msvcrt
+                datei.seek(0)
+                msvcrt.locking(datei.fileno(), msvcrt.LK_NBLCK, 1)
+            else:
+                import fcntl
+                fcntl.flock(datei.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            datei.close()
+            return False
+        self._datei = datei
+        return True
+
+
+# ============================================================================
+# Worker-Prozess
+# ============================================================================
+
+def _begrenzter_dispatcher(threads, max_warteschlange):
+    """waitress-Dispatcher, der bei voller Warteschlange sofort 503 antwortet"""
+    from waitress.task import ErrorTask, ThreadedTaskDispatcher
+    from waitress.utilities import Error
+
+    class Ausgelastet(Error):
+        code = 503
+        reason = 'Service Unavailable'
+
+    class BegrenzterDispatcher(ThreadedTaskDispatcher):
+        def add_task(self, task):
+            if (max_warteschlange and len(self.queue) >= max_warteschlange
+                    and not isinstance(task, ErrorTask)):
+                task.request.error = Ausgelastet('Server ausgelastet, bitte erneut versuchen')
+                task = ErrorTask(task.channel, task.request)
+            super().add_task(task)
+
+    dispatcher = BegrenzterDispatcher()
+    dispatcher.set_thread_count(threads)
+    return dispatcher
+
+
+class _AnfrageZaehler:
+    """WSGI-Middleware: zählt Anfragen und meldet das Recycling-Limit einmal"""
+
+    def __init__(self, app, limit, bei_limit):
+        self.app = app
+        self.limit = limit
+        self.bei_limit = bei_limit
+        self.anzahl = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, environ, start_response):
+        with self._lock:
+            self.anzahl += 1
+            erreicht = self.limit and self.anzahl == self.limit
+        if erreicht:
+            self.bei_limit()
+        return self.app(environ, start_response)
+
+
+def _worker_main(sock, config_name, einstellungen, nummer, nachrichten, stop_event):
+    """Einstiegspunkt eines Worker-Prozesses"""
+    # Strg+C/SIGTERM koordiniert der Master
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    logging.basicConfig(level=logging.INFO, format=f'%(asctime)s [worker {nummer}] %(levelname)s %(message)s')
+
+    os.environ['HINTERGRUND_DIENSTE'] = 'false'
+    from app import create_app, hintergrund_dienste_starten
+    from waitress.server import create_server
+
+    app = create_app(config_name)
+    pid = os.getpid()
+
+    # Hintergrund-Dienste: wer die Sperre bekommt, startet sie (Übergabe beim Recycling).
+    # Die Sperre bleibt bis zum Prozessende gehalten.
+    sperre = DateiSperre(einstellungen['sperrdatei'])
+
+    def hintergrund_uebernehmen():
+        while not stop_event.is_set():
+            if sperre.versuchen():
+                logger.info('Hintergrund-Dienste in diesem Worker gestartet')
+                hintergrund_dienste_starten(app)
+                return
+            stop_event.wait(2)
+
+    threading.Thread(target=hintergrund_uebernehmen, name='hintergrund-sperre', daemon=True).start()
+
+    # Recycling-Limit leicht streuen, damit nicht alle Worker gleichzeitig neu starten
+    limit = einstellungen['max_anfragen']
+    if limit:
+        limit += random.randint(0, max(1, limit // 10))
+    wsgi = _AnfrageZaehler(app, limit, lambda: nachrichten.put(('recycling', nummer, pid)))
+
+    server = create_server(
+        wsgi,
+        sockets=[sock],
+        _dispatcher=_begrenzter_dispatcher(einstellungen['threads'], einstellungen['warteschlange']),
+        threads=einstellungen['threads'],
+        connection_limit=einstellungen['verbindungen'],
+        # Erkennt getrennte SSE-Clients ohne Schreibversuch (waitress.client_disconnected)
+        channel_request_lookahead=1,
+        ident='WartungsManager',
+    )
+
+    def stoppen():
+        stop_event.wait()
+        # Keine neuen Verbindungen mehr annehmen, laufende Anfragen abschließen
+        server.accepting = False
+        ende = time.monotonic() + einstellungen['stopp_timeout']
+        dispatcher = server.task_dispatcher
+        while time.monotonic() < ende and (dispatcher.active_count or dispatcher.queue):
+            time.sleep(0.2)
+        dispatcher.shutdown(cancel_pending=True, timeout=2)
+        # Offene SSE-Verbindungen bauen sich beim Ersatz-Worker neu auf
+        os._exit(0)
+
+    threading.Thread(target=stoppen, name='worker-stopp', daemon=True).start()
+
+    nachrichten.put(('bereit', nummer, pid))
+    server.run()
+
+
+# ============================================================================
+# Master-Prozess
+# ============================================================================
+
+class _Worker:
+    def __init__(self, nummer, prozess, stop_event):
+        self.nummer = nummer
+        self.prozess = prozess
+        self.stop_event = stop_event
+        self.gestartet = time.monotonic()
+        self.bereit = False
+        self.ersetzt_durch = None
+        self.stopp_seit = None
+
+
+class ProduktionsServer:
+    """Master: Socket, Worker-Pool, Recycling und Graceful Reload"""
+
+    def __init__(self, config_name='production', einstellungen=None):
+        self.config_name = config_name
+        self.einstellungen = einstellungen or ServerEinstellungen()
+        self._ctx = multiprocessing.get_context('spawn')
+        self._nachrichten = self._ctx.Queue()
+        self._worker = {}          # pid -> _Worker
+        self._naechste_nummer = 0
+        self._beenden = False
+        self._neu_laden = False
+        self._neustart_mtime = None
+        self._socket = None
+
+    # ------------------------------------------------------------------
+
+    def _socket_oeffnen(self):
+        e = self.einstellungen
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        if os.name != 'nt':
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((e.host, e.port))
+        sock.listen(e.backlog)
+        sock.set_inheritable(True)
+        return sock
+
+    def _sqlite_pruefen(self):
+        """Mehrere Prozesse auf einer SQLite-Datenbank nur im WAL-Modus"""
+        if self.einstellungen.prozesse <= 1:
+            return
+        sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+        from config.config import config
+        from config.sqlite_tuning import profil
+        konfiguration = config[self.config_name]
+        if not konfiguration.SQLALCHEMY_DATABASE_URI.startswith('sqlite'):
+            return
+        pragmas = dict(profil(konfiguration.SQLITE_TUNING_PROFIL))
+        pragmas.update(konfiguration.SQLITE_PRAGMAS)
+        if pragmas.get('journal_mode', '').upper() != 'WAL':
+            logger.warning('SQLite ohne WAL: mehrere Schreiber-Prozesse würden sich sperren '
+                           '-> SERVER_PROZESSE=1')
+            self.einstellungen.prozesse = 1
+
+    def _starten(self):
+        nummer = self._naechste_nummer
+        self._naechste_nummer += 1
+        stop_event = self._ctx.Event()
+        prozess = self._ctx.Process(
+            target=_worker_main,
+            args=(self._socket, self.config_name, self.einstellungen.als_dict(),
+                  nummer, self._nachrichten, stop_event),
+            name=f'wartungsmanager-worker-{nummer}',
+            daemon=False,
+        )
+        prozess.start()
+        worker = _Worker(nummer, prozess, stop_event)
+        self._worker[prozess.pid] = worker
+        logger.info(f'Worker {nummer} gestartet (PID {prozess.pid})')
+        return worker
+
+    def _ersetzen(self, alter):
+        """Startet einen Ersatz; der alte Worker stoppt, sobald der neue bereit ist"""
+        if alter.ersetzt_durch or alter.stopp_seit:
+            return
+        neuer = self._starten()
+        alter.ersetzt_durch = neuer.prozess.pid
+
+    def _stoppen(self, worker):
+        if worker.stopp_seit is None:
+            worker.stopp_seit = time.monotonic()
+            worker.stop_event.set()
+
+    def _aktive(self):
+        return [w for w in self._worker.values() if w.stopp_seit is None and not w.ersetzt_durch]
+
+    # ------------------------------------------------------------------
+
+    def _signale_einrichten(self):
+        def beenden(signum, frame):
+            self._beenden = True
+
+        signal.signal(signal.SIGINT, beenden)
+        signal.signal(signal.SIGTERM, beenden)
+        if hasattr(signal, 'SIGHUP'):
+            signal.signal(signal.SIGHUP, lambda signum, frame: setattr(self, '_neu_laden', True))
+
+    def _neustart_datei_geaendert(self):
+        try:
+            mtime = os.path.getmtime(self.einstellungen.neustart_datei)
+        except OSError:
+            return False
+        if self._neustart_mtime is None:
+            self._neustart_mtime = mtime
+            return False
+        if mtime != self._neustart_mtime:
+            self._neustart_mtime = mtime
+            return True
+        return False
+
+    def _nachrichten_verarbeiten(self):
+        while True:
+            try:
+                art, nummer, pid = self._nachrichten.get_nowait()
+            except queue.Empty:
+                return
+            worker = self._worker.get(pid)
+            if not worker:
+                continue
+            if art == 'bereit':
+                worker.bereit = True
+                for alter in self._worker.values():
+                    if alter.ersetzt_durch == pid:
+                        logger.info(f'Worker {alter.nummer} wird durch Worker {nummer} ersetzt')
+                        self._stoppen(alter)
+            elif art == 'recycling':
+                logger.info(f'Worker {nummer} hat das Anfrage-Limit erreicht -> Recycling')
+                self._ersetzen(worker)
+
+    def _prozesse_pruefen(self):
+        jetzt = time.monotonic()
+        for pid, worker in list(self._worker.items()):
+            if worker.prozess.is_alive():
+                # Hängt ein stoppender Worker, wird er beendet
+                if worker.stopp_seit and jetzt - worker.stopp_seit > self.einstellungen.stopp_timeout + 10:
+                    worker.prozess.terminate()
+                continue
+
+            worker.prozess.join(0)
+            del self._worker[pid]
+            if not worker.stopp_seit and not self._beenden:
+                logger.error(f'Worker {worker.nummer} unerwartet beendet (Exit-Code {worker.prozess.exitcode})')
+                # Absturz direkt nach dem Start (z.B. Konfigurationsfehler): nicht im Sekundentakt neu starten
+                if jetzt - worker.gestartet < 5:
+                    time.sleep(2)
+
+        # Ersatz abgestürzt, bevor er bereit war -> alten Worker behalten
+        for worker in self._worker.values():
+            if worker.ersetzt_durch and worker.ersetzt_durch not in self._worker:
+                worker.ersetzt_durch = None
+
+    def _alle_neu_laden(self):
+        logger.info('Graceful Reload: Worker werden nacheinander ersetzt')
+        for worker in self._aktive():
+            self._ersetzen(worker)
+
+    def serve_forever(self):
+        e = self.einstellungen
+        self._sqlite_pruefen()
+        self._socket = self._socket_oeffnen()
+        self._signale_einrichten()
+        logger.info(f'WartungsManager-Produktionsserver auf http://{e.host}:{e.port} '
+                    f'({e.prozesse} Prozess(e) x {e.threads} Threads, Warteschlange {e.warteschlange})')
+
+        for _ in range(e.prozesse):
+            self._starten()
+        self._neustart_datei_geaendert()
+
+        while not self._beenden:
+            time.sleep(1)
+            self._nachrichten_verarbeiten()
+            if self._neu_laden or self._neustart_datei_geaendert():
+                self._neu_laden = False
+                self._alle_neu_laden()
+            self._prozesse_pruefen()
+            # Abgestürzte Worker ersetzen
+            for _ in range(e.prozesse - len(self._aktive())):
+                self._starten()
+
+        logger.info('Server wird beendet ...')
+        for worker in list(self._worker.values()):
+            self._stoppen(worker)
+        ende = time.monotonic() + e.stopp_timeout + 5
+        for worker in list(self._worker.values()):
+            worker.prozess.join(max(0.1, ende - time.monotonic()))
+            if worker.prozess.is_alive():
+                worker.prozess.terminate()
+        self._socket.close()
+
+
+def starten(config_name='production', **werte):
+    """Produktionsserver starten (blockiert bis Strg+C/SIGTERM)"""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s [master] %(levelname)s %(message)s')
+    ProduktionsServer(config_name, ServerEinstellungen(**werte)).serve_forever()
+
+
+if __name__ == '__main__':
+    starten(os.getenv('FLASK_ENV') or 'production')
@@ -3,6 +3,7 @@
 WartungsManager - Production Runner mit C:\\database\\ Pfad
 """
 
+import importlib.util
 import os
 import sys
 import socket
@@ -28,17 +29,28 @@ if 'FLASK_ENV' not in os.environ:
 # Pfad hinzufügen
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from app import create_app, db
+import argparse
+
+
+def argumente():
+    parser = argparse.ArgumentParser(description='WartungsManager Produktionsserver')
+    parser.add_argument('--entwicklung', action='store_true',
+                        help='Flask-Entwicklungsserver statt Produktionsserver (Debug)')
+    parser.add_argument('--port', type=int, help='Port (Standard 5000 bzw. SERVER_PORT)')
+    parser.add_argument('--prozesse', type=int, help='Worker-Prozesse (Standard 1 bzw. SERVER_PROZESSE)')
+    parser.add_argument('--threads', type=int, help='Threads je Worker (Standard 32 bzw. SERVER_THREADS)')
+    return parser.parse_args()
 
-# App mit production config erstellen
-app = create_app('production')
 
 if __name__ == '__main__':
+    args = argumente()
+    port = args.port or int(os.getenv('SERVER_PORT', 5000))
+
     print("\n" + "="*60)
     print("     WartungsManager - Production Mode")
     print("="*60)
     print(f"Datenbank: C:\\database\\wartungsmanager.db")
-    print(f"Touch-optimierte UI verfuegbar auf: http://localhost:5000")
+    print(f"Touch-optimierte UI verfuegbar auf: http://localhost:{port}")
     
     # Shelly-Status anzeigen
     shelly_enabled = os.getenv('SHELLY_ENABLED', 'false').lower() == 'true'
@@ -53,13 +65,33 @@ if __name__ == '__main__':
     # Echte IP-Adresse anzeigen
     hostname = socket.gethostname()
     local_ip = socket.gethostbyname(hostname)
-    print(f"Entwicklungsrechner IP: {local_ip}")
-    print(f"Direkter Zugriff: http://{local_ip}:5000")
+    print(f"Server IP: {local_ip}")
+    print(f"Direkter Zugriff: http://{local_ip}:{port}")
     print(f"Python Version: {sys.version}")
 
-    app.run(
-        host='0.0.0.0',
-        port=5000,
-        debug=True,  # Für Development, in echter Production auf False setzen
-        threaded=True
-    )
\ No newline at end of file
+    produktionsserver_verfuegbar = importlib.util.find_spec('waitress') is not None
+    if not produktionsserver_verfuegbar:
+        print("\n⚠️  waitress nicht installiert - Entwicklungsserver wird verwendet")
+        print("   Installation: pip install waitress")
+
+    if args.entwicklung or not produktionsserver_verfuegbar:
+        from app import create_app
+
+        app = create_app('production')
+        app.run(
+            host='0.0.0.0',
+            port=port,
+            debug=args.entwicklung,
+            threaded=True
+        )
+    else:
+        # Worker-Prozesse, Recycling, Graceful Reload (siehe produktionsserver.py)
+        import produktionsserver
+
+        print(f"Graceful Reload: neustart.txt ändern oder SIGHUP senden")
+        produktionsserver.starten(
+            'production',
+            port=port,
+            prozesse=args.prozesse,
+            threads=args.threads
+        )
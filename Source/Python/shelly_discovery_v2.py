@@ -12,9 +12,10 @@ import ipaddress
 import subprocess
 from typing import List, Dict, Any
 from pathlib import Path
-from concurrent.futures import ThreadPoolExecutor, as_completed
 from dataclasses import dataclass, asdict
 
+from app.services.shelly_discovery import shelly_discovery
+
 @dataclass
 class ShellyDevice:
     """Shelly-Gerät Datenklasse"""
@@ -170,56 +171,41 @@ class ShellyDiscovery:
         return None
     
     def scan_network(self, ip_range=(1, 254)):
-        """Scanne das gesamte Netzwerk"""
+        """Scanne das gesamte Netzwerk (asyncio: TCP-Vorfilter, Gen1/Gen2 parallel)"""
         print(f"\n🔍 Scanne Netzwerk {self.subnet}.0/24")
         print(f"   IP-Bereich: {self.subnet}.{ip_range[0]} bis {self.subnet}.{ip_range[1]}")
-        print("   Tipp: Shellys haben oft IPs im Bereich .100-.150")
-        
-        found_devices = []
         
-        with ThreadPoolExecutor(max_workers=100) as executor:
-            futures = []
-            
-            for i in range(ip_range[0], ip_range[1] + 1):
-                ip = f"{self.subnet}.{i}"
-                futures.append(executor.submit(self.scan_ip, ip))
-            
-            # Progress-Bar
-            completed = 0
-            total = len(futures)
-            
-            for future in as_completed(futures):
-                completed += 1
-                
-                # Update nur alle 10 IPs für Performance
-                if completed % 10 == 0 or completed == total:
-                    print(f"\r   Fortschritt: {completed}/{total} IPs gescannt", end="", flush=True)
-                
-                device = future.result()
-                if device:
-                    found_devices.append(device)
-                    print(f"\n   ✅ GEFUNDEN: {device.model} auf {device.ip} (MAC: {device.mac})")
+        ergebnis = shelly_discovery.scannen(self.subnet, bereich=ip_range)
+        found_devices = [
+            ShellyDevice(
+                ip=g['ip'],
+                mac=g['mac'],
+                name=g['name'],
+                model=g['model'],
+                gen=g['gen'],
+                fw_version=g['firmware'],
+                relay_count=g['relay_count'],
+                has_power_meter=g['has_power_meter']
+            )
+            for g in ergebnis['geraete']
+        ]
+        for device in found_devices:
+            print(f"   ✅ GEFUNDEN: {device.model} auf {device.ip} (MAC: {device.mac})")
         
-        print(f"\n\n📊 Scan abgeschlossen: {len(found_devices)} Shelly-Geräte gefunden")
+        stats = ergebnis['stats']
+        print(f"\n📊 Scan abgeschlossen: {len(found_devices)} Shelly-Geräte gefunden "
+              f"({stats['scanned']} IPs in {stats['dauer_sekunden']}s)")
         self.devices = found_devices
         return found_devices
     
-    def quick_scan(self, common_ranges=[(100, 150), (50, 100), (1, 50), (151, 254)]):
-        """Schnell-Scan in typischen Shelly-IP-Bereichen"""
+    def quick_scan(self):
+        """Schnell-Scan: bekannte Geräte (Cache) zuerst, danach das ganze Subnetz"""
         print(f"\n⚡ Schnell-Scan im Netzwerk {self.subnet}.0/24")
-        all_devices = []
-        
-        for start, end in common_ranges:
-            print(f"\n   Scanne Bereich: .{start}-.{end}")
-            devices = self.scan_network((start, end))
-            all_devices.extend(devices)
-            
-            if len(all_devices) >= 5:  # Wenn genug gefunden, abbrechen
-                print("\n   ✅ Genügend Geräte gefunden, beende Scan")
-                break
-        
-        self.devices = all_devices
-        return all_devices
+        bekannte = shelly_discovery.bekannte_geraete()
+        if bekannte:
+            print(f"   {len(bekannte)} bekannte Geräte werden zuerst geprüft")
+        # Ein Sweep über alle 254 IPs dauert nur noch etwa einen Timeout
+        return self.scan_network((1, 254))
 
 class ShellyManager:
     """Shelly-Verwaltung"""
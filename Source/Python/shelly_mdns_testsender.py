@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+mDNS-Testsender: simuliert Shelly-Ankündigungen ohne echte Geräte
+
+Meldet Gen1- und Gen2-Shellys per Multicast an (standardmäßig nur auf der
+Loopback-Schnittstelle, also ohne Verkehr im LAN). Mit --selbsttest hört
+die Registry der App auf derselben Schnittstelle mit und prüft An- und
+Abmeldung.
+
+Aufruf:
+    python shelly_mdns_testsender.py [--interface 127.0.0.1] [--anzahl 3] [--selbsttest]
+
+Die App mit SHELLY_MDNS_INTERFACES=127.0.0.1 starten, um die simulierten
+Geräte unter /shelly/api/mdns zu sehen.
+"""
+
+import argparse
+import os
+import socket
+import sys
+import tempfile
+import time
+
+from zeroconf import ServiceInfo, Zeroconf
+
+
+def testgeraete(anzahl, ip_basis='127.0.0'):
+    """Gen2- (_shelly._tcp und _http._tcp) und Gen1-Geräte (_http._tcp)"""
+    geraete = []
+    for i in range(anzahl):
+        ip = f'{ip_basis}.{100 + i}'
+        mac = f'a8032ab1{i:04x}'
+        if i % 2 == 0:
+            name = f'shellyplus1pm-{mac}'
+            eigenschaften = {'gen': '2', 'app': 'Plus1PM', 'ver': '1.4.4'}
+            geraete.append(ServiceInfo('_shelly._tcp.local.', f'{name}._shelly._tcp.local.',
+                                       addresses=[socket.inet_aton(ip)], port=80,
+                                       properties=eigenschaften, server=f'{name}.local.'))
+            geraete.append(ServiceInfo('_http._tcp.local.', f'{name}._http._tcp.local.',
+                                       addresses=[socket.inet_aton(ip)], port=80,
+                                       properties=eigenschaften, server=f'{name}.local.'))
+        else:
+            name = f'shelly1pm-{mac.upper()}'
+            geraete.append(ServiceInfo('_http._tcp.local.', f'{name}._http._tcp.local.',
+                                       addresses=[socket.inet_aton(ip)], port=80,
+                                       properties={}, server=f'{name}.local.'))
+    return geraete
+
+
+def warten_bis(bedingung, sekunden=10.0):
+    ende = time.monotonic() + sekunden
+    while time.monotonic() < ende:
+        if bedingung():
+            return True
+        time.sleep(0.1)
+    return bedingung()
+
+
+def selbsttest(interface, anzahl):
+    from app.services.shelly_discovery import shelly_discovery
+    from app.services.shelly_mdns import shelly_mdns
+
+    # Test-Cache statt des echten MAC->IP-Caches
+    shelly_discovery.cache_datei = os.path.join(tempfile.mkdtemp(prefix='wm_mdns_'), 'cache.json')
+
+    if not shelly_mdns.starten([interface]):
+        print("❌ Registry konnte nicht gestartet werden")
+        return 1
+
+    sender = Zeroconf(interfaces=[interface])
+    dienste = testgeraete(anzahl)
+    for info in dienste:
+        sender.register_service(info)
+    start = time.monotonic()
+
+    ok = warten_bis(lambda: len(shelly_mdns.geraete(nur_online=True)) == anzahl)
+    print(f"{'✅' if ok else '❌'} Anmeldung: {len(shelly_mdns.geraete(nur_online=True))}/{anzahl} Geräte "
+          f"nach {time.monotonic() - start:.2f}s")
+    for geraet in shelly_mdns.geraete():
+        print(f"   {geraet['ip']:15} {geraet['name']:28} Gen{geraet['gen']} MAC {geraet['mac']}")
+    ok = ok and len(shelly_discovery.cache()) == anzahl
+
+    # Ein Gerät (alle seine Dienste) abmelden -> offline
+    for info in [d for d in dienste if d.server == dienste[0].server]:
+        sender.unregister_service(info)
+    abgemeldet = warten_bis(lambda: len(shelly_mdns.geraete(nur_online=True)) == anzahl - 1)
+    print(f"{'✅' if abgemeldet else '❌'} Abmeldung erkannt")
+
+    sender.close()
+    shelly_mdns.stoppen()
+    return 0 if ok and abgemeldet else 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Simulierte Shelly-mDNS-Ankündigungen')
+    parser.add_argument('--interface', default='127.0.0.1', help='IP der Schnittstelle (Standard: Loopback)')
+    parser.add_argument('--anzahl', type=int, default=3)
+    parser.add_argument('--selbsttest', action='store_true', help='Registry mitlaufen lassen und prüfen')
+    args = parser.parse_args()
+
+    if args.selbsttest:
+        return selbsttest(args.interface, args.anzahl)
+
+    sender = Zeroconf(interfaces=[args.interface])
+    dienste = testgeraete(args.anzahl)
+    for info in dienste:
+        sender.register_service(info)
+        print(f"📡 Angekündigt: {info.name}")
+    print("\nStrg+C zum Beenden (Geräte werden abgemeldet)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sender.unregister_all_services()
+        sender.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
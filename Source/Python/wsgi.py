@@ -0,0 +1,18 @@
+#!/usr/bin/env python3
+"""
+WSGI-Einstiegspunkt für externe Server
+
+    waitress-serve --port=5000 wsgi:app
+    gunicorn --bind 0.0.0.0:5000 --workers 1 --threads 32 wsgi:app
+
+Mehrere Worker-Prozesse mit Recycling und Graceful Reload: run_production.py
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import create_app
+
+app = create_app(os.getenv('FLASK_ENV') or 'production')
@@ -36,6 +36,11 @@ class ProductionConfig:
         }
     }
     
+    # WAL + Pragmas für mehrere Tablets gleichzeitig (Source/Python/config/sqlite_tuning.py)
+    # Datenbank muss auf einem lokalen NAS-Volume liegen (nicht SMB/NFS), sonst 'aus'
+    SQLITE_TUNING_PROFIL = os.environ.get('SQLITE_TUNING_PROFIL', 'nas')
+    SQLITE_WARTUNG_INTERVALL = 600   # WAL-Checkpoint + PRAGMA optimize alle 10 Min
+    
     # ============================================================================
     # SICHERHEIT
     # ============================================================================